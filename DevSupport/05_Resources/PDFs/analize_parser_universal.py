@@ -13,6 +13,7 @@ Structura output: JSON pentru import în ValyanClinic
 
 import fitz  # PyMuPDF
 import re
+import sys
 import json
 from pathlib import Path
 from dataclasses import dataclass, asdict, field
@@ -20,6 +21,11 @@ from typing import Optional, List, Dict
 from datetime import datetime
 import logging
 
+from detector_categorii import get_detector
+from clasificator_linii import candidati_linii
+from dictionar_analiti import rezolva_cod
+from unitati_masura import campuri_canonice
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -199,6 +205,7 @@ class AnalizeMedicaleParser:
             "COAGULARE", "HORMONI", "ENDOCRINOLOGIE", "MARKERI TUMORALI",
             "URINA", "SUMAR URINA", "EXAMEN URINĂ"
         ]
+        self.categorie_detector = get_detector(tuple(self.categorii_standard))
 
     def detect_laborator(self, text: str) -> str:
         """Detectează laboratorul din text"""
@@ -326,6 +333,8 @@ class AnalizeMedicaleParser:
         current_categorie = "NECUNOSCUT"
         
         lines = text.split('\n')
+        # Categoriile întregului document, într-o singură scanare
+        categorii = self.categorie_detector.index(lines, strip=True)
         i = 0
         
         # Pattern pentru interval
@@ -342,10 +351,7 @@ class AnalizeMedicaleParser:
                 continue
             
             # Detectăm categoria
-            for cat in self.categorii_standard:
-                if cat.upper() in line.upper():
-                    current_categorie = cat
-                    break
+            current_categorie = categorii.get(i, current_categorie)
             
             # Căutăm interval de referință care marchează sfârșitul unei analize
             int_match = interval_regex.match(line)
@@ -372,6 +378,7 @@ class AnalizeMedicaleParser:
                     found_parts = []
                     
                     while search_idx >= max(0, i - 8) and len(found_parts) < 4:
+                        prev_idx = search_idx
                         prev_line = lines[search_idx].strip()
                         search_idx -= 1
                         
@@ -381,7 +388,7 @@ class AnalizeMedicaleParser:
                         # Skip dacă e alt interval sau categorie
                         if interval_regex.match(prev_line):
                             break
-                        if any(cat.upper() in prev_line.upper() for cat in self.categorii_standard):
+                        if prev_idx in categorii:
                             break
                         
                         found_parts.insert(0, prev_line)
@@ -426,6 +433,13 @@ class AnalizeMedicaleParser:
 
     def parse_generic(self, text: str) -> List[AnalizaResult]:
         """Parser generic pentru format necunoscut"""
+        # Păstrăm doar liniile candidate (clasificator_linii) și categoriile
+        lines = text.split('\n')
+        candidati = candidati_linii(lines)
+        if candidati is not None:
+            categorii = self.categorie_detector.index(lines, strip=True)
+            text = '\n'.join(line for i, (line, candidat) in enumerate(zip(lines, candidati))
+                             if candidat or i in categorii)
         # Folosim parsing-ul pentru Clinica Sante ca bază
         return self.parse_clinica_sante(text)
 
@@ -660,6 +674,11 @@ class AnalizeMedicaleParser:
             else:
                 buletin.analize = self.parse_generic(full_text)
             
+            # Coduri canonice din dicționarul analizelor
+            for analiza in buletin.analize:
+                analiza.cod_analiza = (rezolva_cod(analiza.nume_analiza, buletin.laborator_detectat,
+                                                   analiza.cod_analiza) or analiza.cod_analiza)
+            
             logger.info(f"Parsate {len(buletin.analize)} analize din {pdf_path}")
             
         except Exception as e:
@@ -700,7 +719,8 @@ class AnalizeMedicaleParser:
                 'Metoda': analiza.metoda,
                 'DataRecoltare': buletin.buletin.data_recoltare,
                 'Laborator': buletin.laborator_detectat,
-                'NumarBuletin': buletin.buletin.numar_buletin
+                'NumarBuletin': buletin.buletin.numar_buletin,
+                **campuri_canonice(analiza)
             })
         
         return import_data
@@ -717,6 +737,14 @@ def main():
         "analize-b-51-ro.pdf"          # Elite Medical / Poliana
     ]
     
+    # Cu --manifest CALE: doar PDF-urile noi / modificate sau toate după o schimbare
+    # a parserului (--toate: forțat). Fără: se procesează tot, fără fișiere în plus.
+    manifest = None
+    if '--manifest' in sys.argv[:-1]:
+        from manifest_procesare import Manifest
+        manifest = Manifest(sys.argv[sys.argv.index('--manifest') + 1])
+    fortat = '--toate' in sys.argv or manifest is None
+    
     for pdf_name in pdf_files:
         pdf_path = pdf_folder / pdf_name
         
@@ -724,6 +752,11 @@ def main():
             print(f"⚠️ Nu există: {pdf_name}")
             continue
         
+        output_path = pdf_path.with_suffix('.import.json')
+        if not fortat and manifest.la_zi(str(pdf_path), 'universal'):
+            print(f"\n⏭️ {pdf_name}: neschimbat, {output_path.name} la zi")
+            continue
+        
         print(f"\n{'='*80}")
         print(f"📄 Procesare: {pdf_name}")
         print("=" * 80)
@@ -751,10 +784,11 @@ def main():
                 print(f"    ... și încă {len(buletin.analize) - 15} analize")
         
         # Salvăm JSON pentru import
-        output_path = pdf_path.with_suffix('.import.json')
         import_data = parser.to_import_format(buletin)
         with open(output_path, 'w', encoding='utf-8') as f:
             json.dump(import_data, f, indent=2, ensure_ascii=False)
+        if manifest is not None:
+            manifest.inregistreaza(str(pdf_path), 'universal', iesire=str(output_path))
         print(f"\n💾 JSON salvat: {output_path.name}")
 
 
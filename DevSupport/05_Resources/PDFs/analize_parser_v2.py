@@ -16,6 +16,7 @@ Pattern-uri identificate din analiza vizuală a 6 buletine reale.
 
 import fitz  # PyMuPDF
 import re
+import sys
 import json
 from pathlib import Path
 from dataclasses import dataclass, asdict, field
@@ -23,6 +24,11 @@ from typing import Optional, List, Dict, Tuple
 from datetime import datetime
 import logging
 
+from detector_categorii import CategorieDetector
+from clasificator_linii import candidati_linii
+from dictionar_analiti import rezolva_cod
+from unitati_masura import campuri_canonice
+
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -31,7 +37,7 @@ logger = logging.getLogger(__name__)
 # DATA MODELS
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class PacientInfo:
     """Informații pacient extrase din buletin"""
     nume_prenume: str = ""
@@ -44,7 +50,7 @@ class PacientInfo:
     cod_pacient: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class BuletinInfo:
     """Informații despre buletin"""
     numar_buletin: str = ""
@@ -57,9 +63,9 @@ class BuletinInfo:
     contract: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class AnalizaResult:
-    """Model pentru o analiză medicală parsată"""
+    """Model pentru o analiză medicală parsată (slotted, categorie/UM internate)"""
     categorie: str                          # HEMATOLOGIE, BIOCHIMIE, etc.
     nume_analiza: str                       # Hemoglobina (HGB)
     cod_analiza: Optional[str] = None       # HGB, RBC, ALT
@@ -73,9 +79,13 @@ class AnalizaResult:
     directie_anormal: Optional[str] = None  # 'HIGH', 'LOW', None
     metoda: Optional[str] = None            # Metodă de analiză
     observatii: Optional[str] = None
+    
+    def __post_init__(self):
+        self.categorie = sys.intern(self.categorie)
+        self.unitate_masura = sys.intern(self.unitate_masura)
 
 
-@dataclass
+@dataclass(slots=True)
 class BuletinAnalize:
     """Structura completă a unui buletin de analize"""
     pacient: PacientInfo = field(default_factory=PacientInfo)
@@ -113,6 +123,8 @@ class Patterns:
         'Hematologie', 'Biochimie', 'Imunologie', 'Coagulare',
         'Hemoleucograma', 'Formula leucocitara'
     ]
+    # Compilat o singură dată; duplicatele mixed-case sunt comasate
+    CATEGORII_DETECTOR = CategorieDetector(CATEGORII, lungime_max=50)
     
     # Intervale de referință
     INTERVAL_BRACKET = re.compile(r'\[([<>]?\d+[.,]?\d*)\s*[-–]\s*([<>]?\d+[.,]?\d*)\]')
@@ -425,6 +437,9 @@ class AnalizeMedicaleParserV2:
         current_categorie = "GENERAL"
         
         lines = text.split('\n')
+        categorii = Patterns.CATEGORII_DETECTOR.index(lines, strip=True)
+        # Doar liniile candidate (clasificator_linii) ajung la _try_parse_line
+        candidati = candidati_linii(lines)
         
         # Regex pentru linie de analiză tipică
         # Formatul: Nume (COD) ... valoare ... UM ... interval
@@ -435,10 +450,10 @@ class AnalizeMedicaleParserV2:
                 continue
             
             # Detectare categorie
-            for cat in Patterns.CATEGORII:
-                if cat.upper() in line.upper() and len(line) < 50:
-                    current_categorie = cat.upper()
-                    break
+            current_categorie = categorii.get(i, current_categorie)
+            
+            if candidati is not None and not candidati[i]:
+                continue
             
             # Skip linii de header sau footer
             if any(skip in line.lower() for skip in ['denumire', 'rezultat', 'interval', 'pagina', 'disclaimer']):
@@ -548,6 +563,7 @@ class AnalizeMedicaleParserV2:
         current_categorie = "GENERAL"
         
         lines = text.split('\n')
+        categorii = Patterns.CATEGORII_DETECTOR.index(lines, strip=True)
         
         # Pattern pentru linie Regina Maria
         # Exemplu: "Numar de eritrocite (RBC) = 4.22 mil./µL [3.92 - 5.08]"
@@ -558,14 +574,11 @@ class AnalizeMedicaleParserV2:
             r'(\[[^\]]+\])?'                       # [interval] (opțional)
         )
         
-        for line in lines:
+        for i, line in enumerate(lines):
             line = line.strip()
             
             # Detectare categorie
-            for cat in Patterns.CATEGORII:
-                if cat.upper() in line.upper() and len(line) < 50:
-                    current_categorie = cat.upper()
-                    break
+            current_categorie = categorii.get(i, current_categorie)
             
             # Căutăm = în linie
             if '=' not in line:
@@ -612,6 +625,7 @@ class AnalizeMedicaleParserV2:
         current_categorie = "GENERAL"
         
         lines = text.split('\n')
+        categorii = Patterns.CATEGORII_DETECTOR.index(lines, strip=True)
         
         # Pattern pentru linie Bioclinica
         # Exemplu: "Hematii 5.490.000 /mm³ (4.300.000 - 5.750.000)"
@@ -622,14 +636,11 @@ class AnalizeMedicaleParserV2:
             r'\(([^)]+)\)?'                        # (interval)
         )
         
-        for line in lines:
+        for i, line in enumerate(lines):
             line = line.strip()
             
             # Detectare categorie
-            for cat in Patterns.CATEGORII:
-                if cat.upper() in line.upper() and len(line) < 50:
-                    current_categorie = cat.upper()
-                    break
+            current_categorie = categorii.get(i, current_categorie)
             
             match = pattern.match(line)
             if match:
@@ -691,6 +702,11 @@ class AnalizeMedicaleParserV2:
                 # Parser universal
                 buletin.analize = self.parse_analize_tabel(full_text, buletin.laborator_detectat)
             
+            # Coduri canonice din dicționarul analizelor
+            for analiza in buletin.analize:
+                analiza.cod_analiza = (rezolva_cod(analiza.nume_analiza, buletin.laborator_detectat,
+                                                   analiza.cod_analiza) or analiza.cod_analiza)
+            
             logger.info(f"Parsate {len(buletin.analize)} analize din {Path(pdf_path).name}")
             
         except Exception as e:
@@ -732,7 +748,8 @@ class AnalizeMedicaleParserV2:
             'Metoda': a.metoda,
             'DataRecoltare': buletin.buletin.data_recoltare,
             'Laborator': buletin.laborator_detectat,
-            'NumarBuletin': buletin.buletin.numar_buletin
+            'NumarBuletin': buletin.buletin.numar_buletin,
+            **campuri_canonice(a)
         } for a in buletin.analize]
 
 
@@ -756,7 +773,20 @@ def main():
     print(f"{'='*80}")
     print(f"PDF-uri găsite: {len(pdf_files)}")
     
+    # Cu --manifest CALE: doar PDF-urile noi / modificate sau toate după o schimbare
+    # a parserului (--toate: forțat). Fără: se procesează tot, fără fișiere în plus.
+    manifest = None
+    if '--manifest' in sys.argv[:-1]:
+        from manifest_procesare import Manifest
+        manifest = Manifest(sys.argv[sys.argv.index('--manifest') + 1])
+    fortat = '--toate' in sys.argv or manifest is None
+    
     for pdf_path in pdf_files:
+        output_path = pdf_path.with_suffix('.v2.json')
+        if not fortat and manifest.la_zi(str(pdf_path), 'v2'):
+            print(f"\n⏭️ {pdf_path.name}: neschimbat, {output_path.name} la zi")
+            continue
+        
         print(f"\n{'─'*80}")
         print(f"📄 {pdf_path.name}")
         print(f"{'─'*80}")
@@ -782,10 +812,11 @@ def main():
                 print(f"  ... și încă {len(buletin.analize) - 20} analize")
         
         # Salvăm JSON
-        output_path = pdf_path.with_suffix('.v2.json')
         import_data = parser.to_valyan_import(buletin)
         with open(output_path, 'w', encoding='utf-8') as f:
             json.dump(import_data, f, indent=2, ensure_ascii=False)
+        if manifest is not None:
+            manifest.inregistreaza(str(pdf_path), 'v2', iesire=str(output_path))
         print(f"\n💾 JSON salvat: {output_path.name}")
 
 
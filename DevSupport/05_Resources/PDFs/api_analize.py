@@ -4,15 +4,32 @@ API pentru parsare buletine analize medicale
 Endpoint-uri:
 - GET /laboratoare - Lista laboratoarelor disponibile
 - POST /parse - Parsează un PDF
+- POST /parse/stream - Parsează un PDF, rezultate NDJSON pe măsură ce sunt recunoscute
+- POST /parse/auto - Parsează un PDF fără laborator dat (cascadă după amprentă)
+- GET /pacienti/{cnp}/analize - Istoricul analizelor unui pacient (din baza locală)
+- GET /pacienti/{cnp}/buletine - Buletinele unui pacient (din baza locală)
+
+Dacă variabila de mediu ANALIZE_DB conține calea unei baze SQLite, rezultatele
+/parse, /parse/import-format și /parse/auto sunt salvate în ea (stocare_rezultate),
+iar /parse și /parse/auto întorc pentru fiecare analiză și variația față de
+valoarea anterioară a pacientului (istoric_pacienti).
+
+Dacă ANALIZE_DUPLICATE conține calea unui index de duplicate (duplicate_buletine),
+un PDF deja primit (același conținut sau același buletin) nu este reparsat și
+nici reimportat: se întoarce rezultatul original, cu duplicat_de = fișierul lui.
 
 Rulare: uvicorn api_analize:app --host 0.0.0.0 --port 5050
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
+from dataclasses import asdict
+import hashlib
 import tempfile
+import json
 import os
 
 # Import parserele
@@ -20,6 +37,10 @@ from parsere_laboratoare import (
     PARSERS, list_parsers, get_parser, to_valyan_format,
     BuletinResult, AnalizaResult
 )
+from cascada_parsare import parseaza_automat
+from stocare_rezultate import DB_ENV, StoreRezultate
+from istoric_pacienti import DeltaAnaliza, IndexLongitudinal
+from duplicate_buletine import DUPLICATE_ENV, Duplicat, IndexDuplicate
 
 app = FastAPI(
     title="Analize Medicale Parser API",
@@ -36,6 +57,65 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Baza locală de rezultate, deschisă la prima utilizare (None dacă ANALIZE_DB lipsește),
+# și indexul longitudinal construit din ea
+_store: Optional[StoreRezultate] = None
+_istoric: Optional[IndexLongitudinal] = None
+# Indexul de duplicate (None dacă ANALIZE_DUPLICATE lipsește)
+_duplicate: Optional[IndexDuplicate] = None
+
+
+def _get_store() -> Optional[StoreRezultate]:
+    global _store
+    if _store is None and os.environ.get(DB_ENV):
+        _store = StoreRezultate(os.environ[DB_ENV])
+    return _store
+
+
+def _get_duplicate() -> Optional[IndexDuplicate]:
+    global _duplicate
+    if _duplicate is None and os.environ.get(DUPLICATE_ENV):
+        _duplicate = IndexDuplicate(os.environ[DUPLICATE_ENV])
+    return _duplicate
+
+
+def _duplicat_continut(content: bytes) -> Tuple[str, Optional[Tuple[BuletinResult, Duplicat]]]:
+    """(hash, (rezultat original, duplicat) sau None) - fișierul deja primit nu mai este parsat"""
+    hash_ = hashlib.sha256(content).hexdigest()
+    index = _get_duplicate()
+    duplicat = index.cauta_hash(hash_) if index is not None else None
+    if duplicat is None:
+        return hash_, None
+    original = index.rezultat(duplicat.id)
+    return hash_, (None if original is None else (original, duplicat))
+
+
+def _duplicat_semantic(hash_: str, fisier: str, result, laborator: str) -> Optional[Tuple[BuletinResult, Duplicat]]:
+    """Înregistrează rezultatul în indexul de duplicate; (original, duplicat) dacă buletinul era cunoscut"""
+    index = _get_duplicate()
+    if index is None or not result.analize:
+        return None
+    duplicat = index.inregistreaza(fisier, result, laborator, hash_)
+    if duplicat is None:
+        return None
+    return index.rezultat(duplicat.id) or result, duplicat
+
+
+def _salveaza(result, fisier: str, hash_: Optional[str] = None) -> Optional[List[DeltaAnaliza]]:
+    """
+    Salvează rezultatul în baza locală și în indexul longitudinal, dacă baza
+    este configurată; întoarce variațiile față de valorile anterioare.
+    """
+    global _istoric
+    store = _get_store()
+    if store is None or not result.analize:
+        return None
+    if _istoric is None:
+        _istoric = IndexLongitudinal.din_store(store)
+    delte = _istoric.adauga(result)
+    store.salveaza(result, fisier, hash_)
+    return delte
+
 
 # =============================================================================
 # MODELE RESPONSE
@@ -59,6 +139,12 @@ class AnalizaParsata(BaseModel):
     interval_text: str
     este_anormal: bool
     directie_anormal: Optional[str] = None
+    # Față de valoarea anterioară a pacientului (doar cu ANALIZE_DB), în unitatea canonică
+    valoare_anterioara: Optional[float] = None
+    data_anterioara: Optional[str] = None
+    delta: Optional[float] = None
+    delta_procent: Optional[float] = None
+    schimbare: Optional[str] = None  # 'UP', 'DOWN'
 
 
 class ParseResult(BaseModel):
@@ -72,6 +158,25 @@ class ParseResult(BaseModel):
     warnings: List[str]
     total_analize: int
     analize_anormale: int
+    # Fișierul original, dacă PDF-ul este un duplicat (doar cu ANALIZE_DUPLICATE)
+    duplicat_de: Optional[str] = None
+
+
+class PasCascadaInfo(BaseModel):
+    pas: str
+    laborator: str
+    durata_ms: float
+    nr_analize: int
+    scor: Optional[float] = None
+    acceptat: bool
+    nota: str
+
+
+class ParseAutoResult(ParseResult):
+    laborator_key: str
+    scor: float
+    durata_ms: float
+    pasi: List[PasCascadaInfo]
 
 
 class ImportFormat(BaseModel):
@@ -89,6 +194,11 @@ class ImportFormat(BaseModel):
     DataRecoltare: str
     Laborator: str
     NumarBuletin: str
+    # Valoarea în unitatea canonică a analizei (comparabilă între laboratoare)
+    ValoareNumericaCanonic: Optional[float] = None
+    UnitatiMasuraCanonic: str = ""
+    ValoareNormalaMinCanonic: Optional[float] = None
+    ValoareNormalaMaxCanonic: Optional[float] = None
 
 
 # =============================================================================
@@ -135,8 +245,12 @@ async def parse_pdf(
     
     # Salvare temporară și parsare
     try:
+        content = await file.read()
+        hash_, duplicat = _duplicat_continut(content)
+        if duplicat is not None:
+            return ParseResult(**_parse_result(duplicat[0]), duplicat_de=duplicat[1].fisier)
+        
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            content = await file.read()
             tmp.write(content)
             tmp_path = tmp.name
         
@@ -146,36 +260,13 @@ async def parse_pdf(
         # Cleanup
         os.unlink(tmp_path)
         
-        # Convertire în response
-        analize_parsate = [
-            AnalizaParsata(
-                categorie=a.categorie,
-                nume_analiza=a.nume_analiza,
-                cod_analiza=a.cod_analiza,
-                rezultat=a.rezultat,
-                rezultat_numeric=a.rezultat_numeric,
-                unitate_masura=a.unitate_masura,
-                interval_min=a.interval_min,
-                interval_max=a.interval_max,
-                interval_text=a.interval_text,
-                este_anormal=a.este_anormal,
-                directie_anormal=a.directie_anormal
-            )
-            for a in result.analize
-        ]
-        
-        return ParseResult(
-            success=True,
-            laborator=result.laborator,
-            numar_buletin=result.numar_buletin,
-            data_recoltare=result.data_recoltare,
-            pacient_nume=result.pacient_nume,
-            pacient_cnp=result.pacient_cnp,
-            analize=analize_parsate,
-            warnings=result.warnings,
-            total_analize=len(result.analize),
-            analize_anormale=sum(1 for a in result.analize if a.este_anormal)
-        )
+        duplicat = _duplicat_semantic(hash_, file.filename, result, laborator)
+        if duplicat is not None:
+            return ParseResult(**_parse_result(duplicat[0]), duplicat_de=duplicat[1].fisier)
+        
+        delte = _salveaza(result, file.filename, hash_)
+        
+        return ParseResult(**_parse_result(result, delte=delte))
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -197,20 +288,221 @@ async def parse_pdf_import(
         raise HTTPException(status_code=400, detail="Fișierul trebuie să fie PDF")
     
     try:
+        content = await file.read()
+        hash_, duplicat = _duplicat_continut(content)
+        if duplicat is not None:
+            return to_valyan_format(duplicat[0])
+        
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            content = await file.read()
             tmp.write(content)
             tmp_path = tmp.name
         
         result = parser.parse_pdf(tmp_path)
         os.unlink(tmp_path)
         
+        duplicat = _duplicat_semantic(hash_, file.filename, result, laborator)
+        if duplicat is not None:
+            return to_valyan_format(duplicat[0])
+        
+        _salveaza(result, file.filename, hash_)
+        
         return to_valyan_format(result)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/parse/stream")
+async def parse_pdf_stream(
+    file: UploadFile = File(...),
+    laborator: str = Form(...)
+):
+    """
+    Parsează un PDF și trimite rezultatele în flux (NDJSON, un obiect per linie):
+    
+    - {"tip": "header", ...} - imediat, din prima pagină
+    - {"tip": "analiza", ...} - câte una, pe măsură ce sunt recunoscute
+    - {"tip": "sumar", "total_analize", "analize_anormale", "pagini_omise",
+      "linii_omise", "warnings"} - la final (omisele după sfârșitul rezultatelor
+      sunt cunoscute abia după ultima pagină, nu în header)
+    """
+    parser = get_parser(laborator)
+    if not parser:
+        raise HTTPException(status_code=400, detail=f"Laborator necunoscut: {laborator}")
+    
+    if not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Fișierul trebuie să fie PDF")
+    
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
+        content = await file.read()
+        tmp.write(content)
+        tmp_path = tmp.name
+    
+    try:
+        header, analize = parser.iter_pdf(tmp_path)
+    except Exception as e:
+        os.unlink(tmp_path)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    def ndjson() -> Iterator[bytes]:
+        total, anormale = 0, 0
+        try:
+            info = asdict(header)
+            del info['analize']
+            yield _ndjson_line({'tip': 'header', **info})
+            
+            for a in analize:
+                total += 1
+                anormale += a.este_anormal
+                yield _ndjson_line({'tip': 'analiza', **asdict(a)})
+            
+            yield _ndjson_line({
+                'tip': 'sumar',
+                'total_analize': total,
+                'analize_anormale': anormale,
+                'pagini_omise': header.pagini_omise,
+                'linii_omise': header.linii_omise,
+                'warnings': header.warnings
+            })
+        except Exception as e:
+            # Header-ul a plecat deja - eroarea se transmite în flux
+            yield _ndjson_line({'tip': 'eroare', 'detail': str(e)})
+        finally:
+            # Închide generatorul (și documentul PDF) dacă clientul a renunțat
+            close = getattr(analize, 'close', None)
+            if close is not None:
+                close()
+            os.unlink(tmp_path)
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@app.post("/parse/auto", response_model=ParseAutoResult)
+async def parse_pdf_auto(file: UploadFile = File(...)):
+    """
+    Parsează un PDF fără laborator dat: amprentă (metadate + prima pagină) ->
+    parserul laboratorului -> celelalte parsere -> tabel generic -> OCR,
+    oprindu-se la primul rezultat cu scor peste prag. Pașii sunt raportați.
+    """
+    if not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Fișierul trebuie să fie PDF")
+    
+    try:
+        content = await file.read()
+        hash_, duplicat = _duplicat_continut(content)
+        if duplicat is not None:
+            return _parse_auto_duplicat(*duplicat)
+        
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
+            tmp.write(content)
+            tmp_path = tmp.name
+        
+        try:
+            cascada = parseaza_automat(tmp_path)
+        finally:
+            os.unlink(tmp_path)
+        
+        if cascada.acceptat:
+            duplicat = _duplicat_semantic(hash_, file.filename, cascada.rezultat, cascada.laborator)
+            if duplicat is not None:
+                return _parse_auto_duplicat(*duplicat)
+        
+        delte = _salveaza(cascada.rezultat, file.filename, hash_) if cascada.acceptat else None
+        
+        return ParseAutoResult(
+            **_parse_result(cascada.rezultat, success=cascada.acceptat, delte=delte),
+            laborator_key=cascada.laborator,
+            scor=cascada.scor.total,
+            durata_ms=round(cascada.durata_ms, 2),
+            pasi=[PasCascadaInfo(**asdict(p)) for p in cascada.pasi]
+        )
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/pacienti/{cnp}/analize")
+async def get_analize_pacient(
+    cnp: str,
+    cod: Optional[str] = Query(None, description="Codul analizei (ex: HGB)"),
+    de_la: Optional[str] = Query(None, description="Data recoltării minimă (YYYY-MM-DD sau dd.mm.yyyy)"),
+    pana_la: Optional[str] = Query(None, description="Data recoltării maximă (YYYY-MM-DD sau dd.mm.yyyy)")
+):
+    """Analizele unui pacient din baza locală, în ordine cronologică"""
+    return _cere_store().istoric_pacient(cnp, cod=cod, de_la=de_la, pana_la=pana_la)
+
+
+@app.get("/pacienti/{cnp}/buletine")
+async def get_buletine_pacient(cnp: str):
+    """Buletinele unui pacient din baza locală"""
+    return _cere_store().buletine_pacient(cnp)
+
+
+def _cere_store() -> StoreRezultate:
+    store = _get_store()
+    if store is None:
+        raise HTTPException(status_code=503, detail=f"Baza locală nu este configurată ({DB_ENV})")
+    return store
+
+
+def _parse_auto_duplicat(original: BuletinResult, duplicat: Duplicat) -> ParseAutoResult:
+    """Răspunsul /parse/auto pentru un duplicat: rezultatul original, fără cascadă"""
+    return ParseAutoResult(
+        **_parse_result(original),
+        duplicat_de=duplicat.fisier,
+        laborator_key=duplicat.laborator,
+        scor=1.0,
+        durata_ms=0.0,
+        pasi=[PasCascadaInfo(pas='duplicat', laborator=duplicat.laborator, durata_ms=0.0,
+                             nr_analize=len(original.analize), acceptat=True,
+                             nota=f"{duplicat.motiv}: {duplicat.fisier}")]
+    )
+
+
+def _parse_result(result: BuletinResult, success: bool = True,
+                  delte: Optional[List[DeltaAnaliza]] = None) -> dict:
+    """Câmpurile ParseResult pentru un BuletinResult"""
+    if delte is None:
+        delte = [DeltaAnaliza()] * len(result.analize)
+    analize_parsate = [
+        AnalizaParsata(
+            categorie=a.categorie,
+            nume_analiza=a.nume_analiza,
+            cod_analiza=a.cod_analiza,
+            rezultat=a.rezultat,
+            rezultat_numeric=a.rezultat_numeric,
+            unitate_masura=a.unitate_masura,
+            interval_min=a.interval_min,
+            interval_max=a.interval_max,
+            interval_text=a.interval_text,
+            este_anormal=a.este_anormal,
+            directie_anormal=a.directie_anormal,
+            valoare_anterioara=d.valoare_anterioara,
+            data_anterioara=d.data_anterioara,
+            delta=d.delta,
+            delta_procent=d.delta_procent,
+            schimbare=d.schimbare
+        )
+        for a, d in zip(result.analize, delte)
+    ]
+    return dict(
+        success=success,
+        laborator=result.laborator,
+        numar_buletin=result.numar_buletin,
+        data_recoltare=result.data_recoltare,
+        pacient_nume=result.pacient_nume,
+        pacient_cnp=result.pacient_cnp,
+        analize=analize_parsate,
+        warnings=result.warnings,
+        total_analize=len(result.analize),
+        analize_anormale=sum(1 for a in result.analize if a.este_anormal)
+    )
+
+
+def _ndjson_line(obj: dict) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode('utf-8')
+
+
 # =============================================================================
 # MAIN
 # =============================================================================
@@ -225,6 +517,10 @@ if __name__ == "__main__":
     print("  GET  /laboratoare   - Lista laboratoarelor")
     print("  POST /parse         - Parsează PDF")
     print("  POST /parse/import-format - PDF → format import")
+    print("  POST /parse/stream  - PDF → NDJSON în flux")
+    print("  POST /parse/auto    - PDF → laborator detectat automat")
+    print("  GET  /pacienti/{cnp}/analize - Istoric analize (ANALIZE_DB)")
+    print("  GET  /pacienti/{cnp}/buletine - Buletine pacient (ANALIZE_DB)")
     print("="*60 + "\n")
     
     uvicorn.run(app, host="127.0.0.1", port=5050)
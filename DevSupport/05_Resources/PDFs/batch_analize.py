@@ -0,0 +1,578 @@
+"""
+Procesare în Lot (Batch) a Buletinelor PDF
+==========================================
+Comanda pentru volume mari (zeci / sute de mii de PDF-uri):
+- intrări: directoare (recursiv, *.pdf), fișiere PDF sau liste de fișiere
+  (.txt, o cale pe linie)
+- laboratorul: detectat automat (cascada_parsare) sau dintr-un fișier de
+  mapare JSON {"tipar fnmatch": "cheie_laborator"}, ori --laborator fix
+- parsare pe un pool de procese, în loturi de câteva fișiere (costul IPC
+  amortizat), cu un număr limitat de loturi în lucru
+- rezultatele sunt scrise pe măsură ce sosesc, câte o linie JSON per fișier
+  (NDJSON); progresul este raportat periodic pe stderr
+- checkpoint: după fiecare lot scris, <iesire>.checkpoint primește câte o
+  linie "offset<TAB>fișier". La reluare fișierele din checkpoint sunt sărite,
+  iar ieșirea este trunchiată la ultimul offset confirmat - înregistrările
+  unui lot întrerupt la jumătate nu apar de două ori
+- la final: fișiere/s și percentilele latenței per fișier
+- cu --manifest (manifest_procesare): fișierele nemodificate, procesate deja
+  cu aceeași versiune de parser, sunt sărite de la o rulare la alta
+- cu --db (stocare_rezultate): buletinele acceptate sunt salvate și în baza
+  SQLite locală, câte o tranzacție per lot
+- cu --istoric (istoric_pacienti): fiecare înregistrare acceptată primește
+  "delte" - variațiile față de valorile anterioare ale pacientului - iar
+  indexul longitudinal (.npz) este actualizat și salvat la final
+- cu --duplicate (duplicate_buletine): fișierele cu conținut deja văzut nu
+  mai sunt parsate, iar buletinele recunoscute după parsare (aceeași cheie
+  semantică) nu mai ajung în bază / index; ambele apar cu stare "duplicat"
+  și "original" = fișierul originalului
+- cu --similaritate (similaritate_buletine): fiecare PDF acceptat este
+  comparat (MinHash pe textul extras) cu documentele deja importate, iar
+  documentele asemănătoare (similaritate >= prag) sunt doar raportate, în
+  "aproape" (fișier, similaritate). Fișierul este parsat și importat normal:
+  buletinul de luna următoare al aceluiași pacient (alte valori și date,
+  același șablon) are și el ~0.85. Un duplicat se confirmă pe cheia
+  semantică, după parsare (--duplicate)
+
+Fișierele cu erori sunt înregistrate (stare "eroare") și trec în checkpoint.
+
+Utilizare:
+    python batch_analize.py buletine/ -o rezultate.ndjson --workers 8
+    python batch_analize.py lista.txt --mapare laboratoare.json
+    python batch_analize.py buletine/ -o rezultate.ndjson --de-la-zero
+    python batch_analize.py buletine/ -o noi.ndjson --manifest manifest_procesare.sqlite
+    python batch_analize.py buletine/ -o rezultate.ndjson --db rezultate.sqlite
+    python batch_analize.py buletine/ -o rezultate.ndjson --istoric istoric.npz
+    python batch_analize.py inbox/ -o noi.ndjson --duplicate duplicate_buletine.sqlite --db rezultate.sqlite
+    python batch_analize.py inbox/ -o noi.ndjson --similaritate similaritate_buletine.sqlite
+
+Test (fără argumente): python batch_analize.py
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Fișiere per lot trimis unui proces
+LOT = 8
+
+# Loturi în lucru per proces (restul așteaptă, fără a ține 100k futures în memorie)
+LOTURI_PER_PROCES = 4
+
+# Secunde între două rapoarte de progres
+INTERVAL_PROGRES = 2.0
+
+PERCENTILE = (50, 90, 99)
+
+
+# =============================================================================
+# INTRĂRI
+# =============================================================================
+
+def enumera_pdf(intrari: Sequence[str]) -> List[str]:
+    """Fișierele PDF din directoare (recursiv), fișiere și liste .txt, fără duplicate"""
+    fisiere: Dict[str, None] = {}
+    for intrare in intrari:
+        cale = Path(intrare)
+        if cale.is_dir():
+            for pdf in sorted(cale.rglob('*')):
+                if pdf.suffix.lower() == '.pdf' and pdf.is_file():
+                    fisiere.setdefault(str(pdf.resolve()))
+        elif cale.suffix.lower() == '.txt':
+            with open(cale, encoding='utf-8') as f:
+                for linie in f:
+                    if linie.strip():
+                        fisiere.setdefault(str(Path(linie.strip()).resolve()))
+        else:
+            fisiere.setdefault(str(cale.resolve()))
+    return list(fisiere)
+
+
+def incarca_mapare(path: str) -> List[Tuple[str, str]]:
+    """Tiparele din fișierul de mapare JSON, în ordinea din fișier"""
+    with open(path, encoding='utf-8') as f:
+        return list(json.load(f).items())
+
+
+def laborator_mapat(fisier: str, mapare: Sequence[Tuple[str, str]]) -> Optional[str]:
+    """Cheia primului tipar care se potrivește cu numele sau calea fișierului"""
+    nume = Path(fisier).name
+    for tipar, key in mapare:
+        if fnmatch(nume, tipar) or fnmatch(fisier, tipar):
+            return key
+    return None
+
+
+# =============================================================================
+# WORKER
+# =============================================================================
+
+def _initializeaza_worker():
+    # Importurile grele o singură dată per proces, nu la primul fișier
+    import parsere_laboratoare  # noqa: F401
+    import cascada_parsare  # noqa: F401
+
+
+def parseaza_fisier(fisier: str, parser_key: Optional[str] = None, ocr: bool = True,
+                    semnatura: bool = False) -> Dict:
+    """
+    Înregistrarea NDJSON a unui fișier: laborator, stare, durată, rezultat.
+    Cu semnatura=True primește și "_semnatura" MinHash (similaritate_buletine),
+    căutată în index și scoasă la scriere.
+    """
+    from parsere_laboratoare import get_parser
+    from cascada_parsare import parseaza_automat
+
+    start = time.perf_counter()
+    try:
+        if parser_key:
+            parser = get_parser(parser_key)
+            if parser is None:
+                raise KeyError(f"laborator necunoscut: {parser_key}")
+            result = parser.parse_pdf(fisier)
+            laborator, acceptat = parser_key, bool(result.analize)
+        else:
+            cascada = parseaza_automat(fisier, ocr=ocr)
+            result, laborator, acceptat = cascada.rezultat, cascada.laborator, cascada.acceptat
+        inregistrare = {'fisier': fisier, 'laborator': laborator, 'stare': 'ok' if acceptat else 'respins',
+                        'durata_ms': round((time.perf_counter() - start) * 1e3, 3),
+                        'nr_analize': len(result.analize), 'rezultat': asdict(result)}
+        if semnatura and acceptat:
+            from similaritate_buletine import semnatura_pdf
+            inregistrare['_semnatura'] = semnatura_pdf(fisier, ocr)
+        return inregistrare
+    except Exception as e:
+        return {'fisier': fisier, 'laborator': parser_key or "", 'stare': 'eroare',
+                'durata_ms': round((time.perf_counter() - start) * 1e3, 3),
+                'nr_analize': 0, 'eroare': f"{type(e).__name__}: {e}"}
+
+
+def _parseaza_lot(lot: List[Tuple[str, Optional[str]]], ocr: bool, semnatura: bool = False) -> List[Dict]:
+    return [parseaza_fisier(fisier, key, ocr, semnatura) for fisier, key in lot]
+
+
+# =============================================================================
+# CHECKPOINT
+# =============================================================================
+
+def citeste_checkpoint(path: Path) -> Tuple[Dict[str, None], int]:
+    """Fișierele terminate și offset-ul ieșirii după ultimul lot confirmat"""
+    terminate: Dict[str, None] = {}
+    offset = 0
+    if not path.exists():
+        return terminate, offset
+    with open(path, encoding='utf-8') as f:
+        for linie in f:
+            if not linie.endswith('\n'):
+                break           # linie scrisă pe jumătate la întrerupere
+            pozitie, fisier = linie.rstrip('\n').split('\t', 1)
+            terminate[fisier] = None
+            offset = int(pozitie)
+    return terminate, offset
+
+
+# =============================================================================
+# RULARE
+# =============================================================================
+
+@dataclass
+class StatisticiBatch:
+    """Progresul și sumarul unei rulări"""
+    total: int = 0                  # fișiere de procesat în această rulare
+    sarite: int = 0                 # terminate într-o rulare anterioară
+    procesate: int = 0
+    stari: Dict[str, int] = field(default_factory=dict)
+    laboratoare: Dict[str, int] = field(default_factory=dict)
+    latente_ms: List[float] = field(default_factory=list)
+    start: float = field(default_factory=time.perf_counter)
+    durata_s: float = 0.0
+    intrerupt: bool = False
+
+    @property
+    def fisiere_pe_secunda(self) -> float:
+        durata = self.durata_s or (time.perf_counter() - self.start)
+        return self.procesate / durata if durata > 0 else 0.0
+
+    def percentile(self, procente: Sequence[int] = PERCENTILE) -> Dict[int, float]:
+        ordonate = sorted(self.latente_ms)
+        if not ordonate:
+            return {p: 0.0 for p in procente}
+        return {p: ordonate[min(len(ordonate) - 1, int(len(ordonate) * p / 100))] for p in procente}
+
+    def adauga(self, inregistrare: Dict):
+        self.procesate += 1
+        self.stari[inregistrare['stare']] = self.stari.get(inregistrare['stare'], 0) + 1
+        lab = inregistrare['laborator'] or '-'
+        self.laboratoare[lab] = self.laboratoare.get(lab, 0) + 1
+        if inregistrare['stare'] != 'duplicat':
+            self.latente_ms.append(inregistrare['durata_ms'])
+
+
+def raport_progres(stat: StatisticiBatch):
+    """Raportul implicit de progres, pe stderr"""
+    ritm = stat.fisiere_pe_secunda
+    eta = (stat.total - stat.procesate) / ritm if ritm else 0.0
+    print(f"⏳ {stat.procesate}/{stat.total} ({stat.procesate / max(1, stat.total):.1%})  "
+          f"{ritm:.1f} fișiere/s  ETA {eta / 60:.1f} min  {stat.stari}", file=sys.stderr, flush=True)
+
+
+def ruleaza_batch(fisiere: Sequence[str], iesire: str,
+                  laborator: Optional[str] = None,
+                  mapare: Sequence[Tuple[str, str]] = (),
+                  workers: Optional[int] = None,
+                  lot: int = LOT,
+                  ocr: bool = True,
+                  de_la_zero: bool = False,
+                  manifest: Optional['Manifest'] = None,
+                  store: Optional['StoreRezultate'] = None,
+                  istoric: Optional['IndexLongitudinal'] = None,
+                  duplicate: Optional['IndexDuplicate'] = None,
+                  similaritate: Optional['IndexSimilaritate'] = None,
+                  progres: Optional[Callable[[StatisticiBatch], None]] = raport_progres,
+                  interval_progres: float = INTERVAL_PROGRES) -> StatisticiBatch:
+    """
+    Parsează fișierele și scrie câte o înregistrare NDJSON per fișier în
+    iesire, cu checkpoint în iesire + ".checkpoint". O rulare întreruptă
+    (Ctrl+C, excepție în progres) se reia cu aceeași comandă. Cu un manifest,
+    fișierele la zi sunt sărite, iar cele procesate sunt înregistrate în el.
+    Cu un store, buletinele acceptate sunt salvate și în baza locală; cu un
+    index longitudinal, primesc și variațiile față de valorile anterioare.
+    Cu un index de duplicate, duplicatele sunt înregistrate fără parsare /
+    import (stare "duplicat"); cu un index de similaritate, documentele
+    asemănătoare deja importate sunt raportate în "aproape", fără a sări
+    fișierul.
+    """
+    path_iesire = Path(iesire)
+    path_checkpoint = Path(iesire + '.checkpoint')
+    if de_la_zero:
+        for p in (path_iesire, path_checkpoint):
+            if p.exists():
+                p.unlink()
+
+    terminate, offset = citeste_checkpoint(path_checkpoint)
+    de_facut = []
+    duplicate_continut: List[Dict] = []
+    hashuri: Dict[str, str] = {}
+    vazute: Dict[str, str] = {}     # hash -> primul fișier din rularea curentă
+    for f in fisiere:
+        if f in terminate:
+            continue
+        key = laborator or laborator_mapat(f, mapare)
+        if manifest is not None and (manifest.la_zi(f, key) if key else manifest.la_zi_detectat(f)):
+            continue
+        if duplicate is not None:
+            from manifest_procesare import hash_continut
+            try:
+                hash_ = hashuri[f] = hash_continut(f)
+            except OSError:
+                hash_ = None    # raportat ca eroare de parsare
+            original = duplicate.cauta_hash(hash_) if hash_ else None
+            if original is not None and original.fisier == f:
+                original = None     # înregistrat de o rulare întreruptă înainte de checkpoint
+            if original is not None or hash_ in vazute:
+                duplicate_continut.append({
+                    'fisier': f, 'laborator': original.laborator if original else (key or ""),
+                    'stare': 'duplicat', 'durata_ms': 0.0, 'nr_analize': 0,
+                    'original': original.fisier if original else vazute[hash_], 'motiv': 'continut'})
+                continue
+            if hash_:
+                vazute[hash_] = f
+        de_facut.append((f, key))
+    stat = StatisticiBatch(total=len(de_facut) + len(duplicate_continut),
+                           sarite=len(fisiere) - len(de_facut) - len(duplicate_continut))
+
+    path_iesire.parent.mkdir(parents=True, exist_ok=True)
+    with open(path_iesire, 'ab') as out:
+        # Înregistrările de după ultimul checkpoint sunt dintr-un lot neconfirmat
+        out.truncate(offset)
+    with open(path_iesire, 'ab') as out, open(path_checkpoint, 'a', encoding='utf-8') as checkpoint:
+        def scrie(inregistrari: List[Dict]):
+            if duplicate is not None:
+                from export_flux import buletin_din_dict
+                for r in inregistrari:
+                    if r['stare'] == 'ok' and r['fisier'] in hashuri:
+                        original = duplicate.inregistreaza(r['fisier'], buletin_din_dict(r), r['laborator'],
+                                                           hashuri[r['fisier']], commit=False)
+                        if original is not None and original.fisier != r['fisier']:
+                            r.update(stare='duplicat', rezultat=None, original=original.fisier, motiv=original.motiv)
+                duplicate.commit()
+            for r in inregistrari:
+                semnatura = r.pop('_semnatura', None)
+                if similaritate is not None and semnatura is not None and r['stare'] == 'ok':
+                    # Doar raportate: aceeași formă are și buletinul următor al pacientului
+                    potriviri = similaritate.cauta(semnatura)
+                    altele = [p for p in potriviri if p.fisier != r['fisier']]
+                    if altele:
+                        r['aproape'] = [{'fisier': p.fisier, 'similaritate': p.similaritate} for p in altele]
+                    if len(altele) == len(potriviri):     # la reluare fișierul poate fi deja în index
+                        similaritate.adauga(r['fisier'], semnatura, commit=False)
+            if similaritate is not None:
+                similaritate.commit()
+            if istoric is not None:
+                from export_flux import buletin_din_dict
+                for r in inregistrari:
+                    if r['stare'] == 'ok':
+                        r['delte'] = [asdict(d) for d in istoric.adauga(buletin_din_dict(r))]
+            for inregistrare in inregistrari:
+                out.write(json.dumps(inregistrare, ensure_ascii=False, default=str).encode('utf-8') + b'\n')
+                stat.adauga(inregistrare)
+            out.flush()
+            if store is not None:
+                # Înainte de checkpoint: un lot întrerupt e reluat, iar reimportul înlocuiește
+                store.salveaza_lot([r for r in inregistrari if r['stare'] == 'ok'])
+            pozitie = out.tell()
+            checkpoint.writelines(f"{pozitie}\t{r['fisier']}\n" for r in inregistrari)
+            checkpoint.flush()
+            if manifest is not None:
+                for r in inregistrari:
+                    if r['stare'] != 'eroare':
+                        manifest.inregistreaza(r['fisier'], r['laborator'], iesire=iesire, commit=False)
+                manifest.commit()
+
+        loturi = (de_facut[i:i + lot] for i in range(0, len(de_facut), lot))
+        ultimul_raport = time.perf_counter()
+        workers = workers or os.cpu_count() or 1
+        # Workerii calculează doar semnăturile; căutarea și scrierile în index rămân aici
+        cu_semnatura = similaritate is not None
+        try:
+            for i in range(0, len(duplicate_continut), lot):
+                scrie(duplicate_continut[i:i + lot])
+            if workers < 2:
+                _initializeaza_worker()
+                for bucata in loturi:
+                    scrie(_parseaza_lot(bucata, ocr, cu_semnatura))
+                    if progres and time.perf_counter() - ultimul_raport >= interval_progres:
+                        progres(stat)
+                        ultimul_raport = time.perf_counter()
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_initializeaza_worker) as executor:
+                    try:
+                        in_lucru = set()
+                        for bucata in _umple(loturi, workers * LOTURI_PER_PROCES):
+                            in_lucru.add(executor.submit(_parseaza_lot, bucata, ocr, cu_semnatura))
+                        while in_lucru:
+                            gata, in_lucru = wait(in_lucru, timeout=interval_progres,
+                                                  return_when=FIRST_COMPLETED)
+                            for future in gata:
+                                scrie(future.result())
+                                urmatorul = next(loturi, None)
+                                if urmatorul is not None:
+                                    in_lucru.add(executor.submit(_parseaza_lot, urmatorul, ocr, cu_semnatura))
+                            if progres and time.perf_counter() - ultimul_raport >= interval_progres:
+                                progres(stat)
+                                ultimul_raport = time.perf_counter()
+                    except BaseException:
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        raise
+        except KeyboardInterrupt:
+            stat.intrerupt = True
+    stat.durata_s = time.perf_counter() - stat.start
+    return stat
+
+
+def _umple(loturi: Iterator, n: int) -> Iterator:
+    """Primele n loturi (coada inițială a pool-ului)"""
+    for _ in range(n):
+        bucata = next(loturi, None)
+        if bucata is None:
+            return
+        yield bucata
+
+
+def tipareste_sumar(stat: StatisticiBatch):
+    stare = "⚠️ întrerupt" if stat.intrerupt else "✅ terminat"
+    print(f"\n{stare}: {stat.procesate} fișiere procesate în {stat.durata_s:.2f} s "
+          f"({stat.sarite} sărite din checkpoint)")
+    print(f"   Debit: {stat.fisiere_pe_secunda:.2f} fișiere/s")
+    print("   Latență/fișier: " + "  ".join(f"p{p} {ms:.1f} ms" for p, ms in stat.percentile().items()) +
+          f"  max {max(stat.latente_ms, default=0.0):.1f} ms")
+    print(f"   Stări: {stat.stari}")
+    print(f"   Laboratoare: {stat.laboratoare}")
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def cli(argv: Sequence[str]) -> int:
+    ap = argparse.ArgumentParser(prog="batch_analize.py",
+                                 description="Parsează în lot buletine PDF, cu checkpoint și reluare.")
+    ap.add_argument('intrari', nargs='+', help="directoare, fișiere PDF sau liste .txt")
+    ap.add_argument('-o', '--iesire', default='rezultate.ndjson', help="fișierul NDJSON de ieșire")
+    grup = ap.add_mutually_exclusive_group()
+    grup.add_argument('--laborator', help="cheia laboratorului pentru toate fișierele")
+    grup.add_argument('--mapare', help='JSON {"tipar fnmatch": "cheie_laborator"}; restul - detectare automată')
+    ap.add_argument('--workers', type=int, default=None, help="procese (implicit: procesoarele disponibile)")
+    ap.add_argument('--lot', type=int, default=LOT, help="fișiere per lot trimis unui proces")
+    ap.add_argument('--fara-ocr', action='store_true', help="fără pasul OCR al cascadei")
+    ap.add_argument('--de-la-zero', action='store_true', help="ignoră checkpoint-ul și rescrie ieșirea")
+    ap.add_argument('--manifest', help="manifest SQLite: sare peste fișierele la zi (manifest_procesare)")
+    ap.add_argument('--db', help="bază SQLite în care sunt salvate și rezultatele (stocare_rezultate)")
+    ap.add_argument('--istoric', help="index longitudinal .npz: variații față de valorile anterioare (istoric_pacienti)")
+    ap.add_argument('--duplicate', help="index SQLite de duplicate: nu reparsa / reimporta (duplicate_buletine)")
+    ap.add_argument('--similaritate', help="index SQLite MinHash: raportează documentele asemănătoare deja "
+                                           "importate, în \"aproape\" (similaritate_buletine)")
+    ap.add_argument('--prag-similaritate', type=float, default=None,
+                    help="similaritatea minimă raportată (implicit: PRAG_SIMILARITATE)")
+    args = ap.parse_args(argv)
+
+    fisiere = enumera_pdf(args.intrari)
+    mapare = incarca_mapare(args.mapare) if args.mapare else ()
+    print(f"📂 {len(fisiere)} fișiere PDF -> {args.iesire}", file=sys.stderr)
+    manifest = None
+    if args.manifest:
+        from manifest_procesare import Manifest
+        manifest = Manifest(args.manifest)
+    store = None
+    if args.db:
+        from stocare_rezultate import StoreRezultate
+        store = StoreRezultate(args.db)
+    istoric = None
+    if args.istoric:
+        from istoric_pacienti import IndexLongitudinal
+        istoric = IndexLongitudinal.incarca(args.istoric)
+    duplicate = None
+    if args.duplicate:
+        from duplicate_buletine import IndexDuplicate
+        duplicate = IndexDuplicate(args.duplicate)
+    similaritate = None
+    if args.similaritate:
+        from similaritate_buletine import PRAG_SIMILARITATE, IndexSimilaritate
+        similaritate = IndexSimilaritate(args.similaritate, prag=args.prag_similaritate or PRAG_SIMILARITATE)
+    try:
+        stat = ruleaza_batch(fisiere, args.iesire, laborator=args.laborator, mapare=mapare,
+                             workers=args.workers, lot=args.lot, ocr=not args.fara_ocr,
+                             de_la_zero=args.de_la_zero, manifest=manifest, store=store, istoric=istoric,
+                             duplicate=duplicate, similaritate=similaritate)
+    finally:
+        if similaritate is not None:
+            similaritate.close()
+        if duplicate is not None:
+            duplicate.close()
+        if istoric is not None:
+            # Și la întrerupere: reluarea reprocesează lotul neconfirmat, iar reimportul înlocuiește
+            istoric.salveaza(args.istoric)
+    if manifest is not None:
+        manifest.close()
+    if store is not None:
+        store.close()
+    tipareste_sumar(stat)
+    return 130 if stat.intrerupt else 0
+
+
+# =============================================================================
+# MAIN - TEST
+# =============================================================================
+
+def main():
+    if len(sys.argv) > 1:
+        return cli(sys.argv[1:])
+
+    from parsere_laboratoare import _import_fitz
+    if _import_fitz() is None:
+        print("❌ PyMuPDF nu este instalat")
+        return 1
+
+    pdf_dir = Path(__file__).parent
+    surse = sorted(pdf_dir.glob('*.pdf'))
+    with tempfile.TemporaryDirectory() as tmp:
+        # Un arbore de directoare cu copii ale PDF-urilor de test
+        for i in range(4):
+            subdir = Path(tmp) / 'buletine' / f'lot{i}'
+            subdir.mkdir(parents=True)
+            for pdf in surse:
+                shutil.copy(pdf, subdir / f"{pdf.stem}_{i}.pdf")
+        fisiere = enumera_pdf([str(Path(tmp) / 'buletine')])
+        iesire = str(Path(tmp) / 'rezultate.ndjson')
+        mapare = [('1111200901011bolnavul_*.pdf', 'smartlabs')]
+        print(f"📂 {len(fisiere)} fișiere în {len(list((Path(tmp) / 'buletine').iterdir()))} directoare")
+
+        # 1. Rulare întreruptă după ~jumătate din fișiere
+        def intrerupe(stat: StatisticiBatch):
+            if stat.procesate >= len(fisiere) // 2:
+                raise KeyboardInterrupt
+        prima = ruleaza_batch(fisiere, iesire, mapare=mapare, workers=2, lot=2, ocr=False,
+                              progres=intrerupe, interval_progres=0.0)
+        tipareste_sumar(prima)
+        # O înregistrare scrisă pe jumătate, după ultimul checkpoint
+        with open(iesire, 'ab') as f:
+            f.write(b'{"fisier": "trunchiat')
+
+        # 2. Reluare: doar fișierele rămase, ieșirea trunchiată la ultimul checkpoint
+        a_doua = ruleaza_batch(fisiere, iesire, mapare=mapare, workers=2, lot=2, ocr=False, progres=None)
+        tipareste_sumar(a_doua)
+
+        with open(iesire, encoding='utf-8') as f:
+            inregistrari = [json.loads(linie) for linie in f]
+        unice = {r['fisier'] for r in inregistrari}
+        stare = "✅" if len(inregistrari) == len(unice) == len(fisiere) else "❌"
+        print(f"\n{stare} Ieșire: {len(inregistrari)} înregistrări, {len(unice)} fișiere unice "
+              f"din {len(fisiere)}; prima rulare {prima.procesate} + reluare {a_doua.procesate}")
+        mapate = [r for r in inregistrari if Path(r['fisier']).name.startswith('1111200901011bolnavul_')]
+        stare = "✅" if all(r['laborator'] == 'smartlabs' for r in mapate) else "❌"
+        print(f"{stare} Mapare: {len(mapate)} fișiere SmartLabs din tiparul fnmatch")
+
+        # 3. Debit secvențial vs pool
+        for workers in sorted({1, os.cpu_count() or 1, 2}):
+            stat = ruleaza_batch(fisiere, str(Path(tmp) / f'debit_{workers}.ndjson'), workers=workers,
+                                 ocr=False, progres=None)
+            print(f"   workers={workers}: {stat.fisiere_pe_secunda:6.1f} fișiere/s  "
+                  f"p50 {stat.percentile()[50]:.1f} ms  p99 {stat.percentile()[99]:.1f} ms")
+
+        # 4. Index de similaritate: copiile sunt parsate și importate, cu originalul raportat în "aproape"
+        from similaritate_buletine import IndexSimilaritate, _luna_urmatoare, _pdf_din_text
+        with IndexSimilaritate(Path(tmp) / 'similaritate.sqlite') as similaritate:
+            stat = ruleaza_batch(fisiere, str(Path(tmp) / 'similaritate.ndjson'), workers=2, lot=2,
+                                 ocr=False, progres=None, similaritate=similaritate)
+            documente = len(similaritate)
+        with open(Path(tmp) / 'similaritate.ndjson', encoding='utf-8') as f:
+            aproape = [r for r in map(json.loads, f) if r.get('aproape')]
+        ok = stat.stari.get('ok', 0) == documente and 'duplicat' not in stat.stari and aproape
+        print(f"{'✅' if ok else '❌'} Similaritate: {stat.stari}, {documente} documente în index, "
+              f"{len(aproape)} cu documente asemănătoare raportate "
+              f"(ex. {Path(aproape[0]['fisier']).name} ~ {Path(aproape[0]['aproape'][0]['fisier']).name})")
+
+        # 5. Regresie: buletinul de luna următoare (alte rezultate și date, același șablon) trece
+        #    pragul de similaritate, dar nu este un duplicat - doar copia identică este sărită
+        import random
+        from cascada_parsare import _extrage_pdf
+        from parsere_laboratoare import get_parser
+        director = Path(tmp) / 'luna'
+        director.mkdir()
+        rng = random.Random(0)
+        for nume, key in (('AnalizeMedicale', 'clinica_sante'), ('analize-b-51-ro', 'elite_medical'),
+                          ('1111200901011bolnavul', 'smartlabs')):
+            text = "\n".join(_extrage_pdf(str(pdf_dir / f"{nume}.pdf"))[0])
+            _pdf_din_text(text, director / f"{nume}_1.pdf")
+            shutil.copy(director / f"{nume}_1.pdf", director / f"{nume}_1_copie.pdf")
+            _pdf_din_text(_luna_urmatoare(text, get_parser(key).parse_text(text), rng), director / f"{nume}_2.pdf")
+        from duplicate_buletine import IndexDuplicate
+        with IndexSimilaritate(Path(tmp) / 'luna.sqlite') as similaritate, \
+                IndexDuplicate(Path(tmp) / 'luna_duplicate.sqlite') as duplicate:
+            ruleaza_batch(enumera_pdf([str(director)]), str(Path(tmp) / 'luna.ndjson'), workers=1, ocr=False,
+                          progres=None, similaritate=similaritate, duplicate=duplicate)
+        with open(Path(tmp) / 'luna.ndjson', encoding='utf-8') as f:
+            dupa_fisier = {Path(r['fisier']).name: r for r in map(json.loads, f)}
+        urmatoare = [r for n, r in dupa_fisier.items() if n.endswith('_2.pdf')]
+        copii = [r for n, r in dupa_fisier.items() if n.endswith('_copie.pdf')]
+        raportate = [r['aproape'][0]['similaritate'] for r in urmatoare if r.get('aproape')]
+        ok = (all(r['stare'] == 'ok' and r['rezultat'] for r in urmatoare) and raportate
+              and all(r['stare'] == 'duplicat' for r in copii))
+        print(f"{'✅' if ok else '❌'} Luna următoare: {sum(r['stare'] == 'ok' for r in urmatoare)}/{len(urmatoare)} "
+              f"importate, {len(raportate)} raportate ca asemănătoare "
+              f"({', '.join(f'{x:.2f}' for x in raportate)}); "
+              f"{sum(r['stare'] == 'duplicat' for r in copii)}/{len(copii)} copii identice sărite")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,422 @@
+"""
+Cascada de Parsare după Amprentă
+================================
+Alege automat parserul, de la calea cea mai ieftină la cea mai scumpă:
+
+1. amprenta - laboratorul recunoscut din metadatele PDF și prima pagină
+   (regex-urile AMPRENTA / cheia "amprenta" din specificații)
+2. parser - parserul laboratorului recunoscut; rezultatul primește un scor
+3. escaladare - doar dacă scorul e sub prag: celelalte parsere din registry,
+   cele mai ieftine (durata medie măsurată) primele
+4. generic - parserul de tabel universal (analize_parser_v2)
+5. ocr - textul re-extras prin OCR (ocr_analize), doar pentru documentele
+   la care niciun pas anterior nu a trecut de prag
+
+Scorul (ScorParsare) combină numărul de analize, acoperirea liniilor de
+rezultat din document și fracțiunea de rânduri cu interval și unitate.
+Fiecare pas este cronometrat și raportat în RezultatCascada.pasi; totalurile
+pe pași (inclusiv paginile și liniile omise după sfârșitul rezultatelor,
+vezi LaboratorParser.SFARSIT) se adună în METRICI.
+
+Utilizare:
+    from cascada_parsare import parseaza_automat
+    rezultat = parseaza_automat("buletin.pdf")
+    rezultat.laborator, rezultat.scor.total, rezultat.pasi
+
+Test: python cascada_parsare.py [fisier.pdf ...]
+"""
+
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from parsere_laboratoare import (
+    AnalizaResult, BuletinResult, LaboratorParser, ParserRegistry, PARSERS, _import_fitz
+)
+
+# Scorul minim de la care rezultatul unui pas este acceptat
+PRAG_ACCEPTARE = 0.5
+
+# Sub acest număr de analize rezultatul nu contează (scrisori, facturi)
+MIN_ANALIZE = 3
+
+# Textul în care se caută amprenta când prima pagină nu e cunoscută
+LUNGIME_AMPRENTA = 4000
+
+# Ponderile scorului: acoperirea liniilor de rezultat / rânduri complete
+PONDERE_ACOPERIRE = 0.6
+PONDERE_COMPLETE = 0.4
+
+
+# =============================================================================
+# MODELE
+# =============================================================================
+
+@dataclass
+class ScorParsare:
+    """Calitatea rezultatului unui parser pe un document"""
+    nr_analize: int = 0
+    linii_rezultat: int = 0     # liniile "valoare + UM" estimate în document
+    acoperire: float = 0.0      # min(analize, linii) / max(analize, linii)
+    complete: float = 0.0       # fracțiunea analizelor cu interval și UM
+    total: float = 0.0
+
+
+@dataclass
+class PasCascada:
+    """Un pas executat de cascadă"""
+    pas: str                    # amprenta / parser / escaladare / generic / ocr
+    laborator: str = ""
+    durata_ms: float = 0.0
+    nr_analize: int = 0
+    scor: Optional[float] = None
+    acceptat: bool = False
+    pagini_omise: int = 0       # după marcajul de sfârșit al rezultatelor
+    linii_omise: int = 0
+    nota: str = ""
+
+
+@dataclass
+class RezultatCascada:
+    """Rezultatul ales + drumul prin cascadă"""
+    rezultat: BuletinResult
+    laborator: str = ""         # cheia din registry, 'generic' sau '' (nimic acceptat)
+    scor: ScorParsare = field(default_factory=ScorParsare)
+    amprenta: List[Tuple[str, int]] = field(default_factory=list)
+    pasi: List[PasCascada] = field(default_factory=list)
+
+    @property
+    def acceptat(self) -> bool:
+        return self.scor.total >= PRAG_ACCEPTARE
+
+    @property
+    def durata_ms(self) -> float:
+        return sum(p.durata_ms for p in self.pasi)
+
+
+class MetriciCascada:
+    """Totaluri per pas și per laborator, pentru tot procesul"""
+
+    def __init__(self):
+        self.pasi: Dict[str, List[float]] = {}        # pas -> [rulări, acceptate, ms, pagini, linii omise]
+        self.laboratoare: Dict[str, List[float]] = {}  # laborator -> [rulări, ms]
+
+    def inregistreaza(self, pas: PasCascada):
+        totaluri = self.pasi.setdefault(pas.pas, [0, 0, 0.0, 0, 0])
+        totaluri[0] += 1
+        totaluri[1] += pas.acceptat
+        totaluri[2] += pas.durata_ms
+        totaluri[3] += pas.pagini_omise
+        totaluri[4] += pas.linii_omise
+        if pas.pas in ('parser', 'escaladare') and pas.laborator:
+            lab = self.laboratoare.setdefault(pas.laborator, [0, 0.0])
+            lab[0] += 1
+            lab[1] += pas.durata_ms
+
+    def cost_mediu_ms(self, laborator: str) -> float:
+        """Durata medie a unui parser (0 dacă nu a rulat încă - se încearcă primul)"""
+        rulari, ms = self.laboratoare.get(laborator, (0, 0.0))
+        return ms / rulari if rulari else 0.0
+
+    def sumar(self) -> List[Dict]:
+        return [{'pas': pas, 'rulari': int(r), 'acceptate': int(a), 'ms_total': round(ms, 2),
+                 'ms_mediu': round(ms / r, 2) if r else 0.0,
+                 'pagini_omise': int(p), 'linii_omise': int(l)}
+                for pas, (r, a, ms, p, l) in self.pasi.items()]
+
+
+METRICI = MetriciCascada()
+
+
+# =============================================================================
+# AMPRENTĂ
+# =============================================================================
+
+@lru_cache(maxsize=None)
+def _amprenta_compilata(parser_cls: type) -> Tuple['re.Pattern', ...]:
+    return tuple(re.compile(p, re.IGNORECASE) for p in parser_cls.amprenta())
+
+
+def amprenta_laborator(text: str, metadata: Optional[Dict[str, str]] = None,
+                       registry: ParserRegistry = PARSERS) -> List[Tuple[str, int]]:
+    """
+    Laboratoarele recunoscute în metadatele PDF + textul primei pagini,
+    ordonate după numărul de regex-uri potrivite: [(cheie, potriviri)].
+    """
+    if metadata:
+        text = " ".join(str(v) for v in metadata.values() if v) + "\n" + text
+    candidati = []
+    for key in registry:
+        try:
+            pattern_uri = _amprenta_compilata(registry.parser_class(key))
+        except Exception as e:
+            registry.erori.append(f"Parser {key}: {e}")
+            continue
+        potriviri = sum(1 for p in pattern_uri if p.search(text))
+        if potriviri:
+            candidati.append((key, potriviri))
+    candidati.sort(key=lambda kv: -kv[1])
+    return candidati
+
+
+# =============================================================================
+# SCOR
+# =============================================================================
+
+_RE_INTERVAL = re.compile(r'[<>]?\d+(?:[.,]\d+)?\s*[-–]\s*[<>]?\d+(?:[.,]\d+)?')
+
+
+@lru_cache(maxsize=1)
+def _re_valoare_um() -> 're.Pattern':
+    unitati = sorted(set(LaboratorParser.UNITATI), key=len, reverse=True)
+    return re.compile(r'(?<![\w^])[<>]?\d+(?:[.,]\d+)?\s*(?:'
+                      + '|'.join(map(re.escape, unitati)) + r')(?![A-Za-z])', re.IGNORECASE)
+
+
+def numara_linii_rezultat(text: str) -> int:
+    """Liniile care conțin o valoare urmată de o unitate (intervalele sunt ignorate)"""
+    valoare_um = _re_valoare_um()
+    return sum(1 for linie in text.split('\n')
+               if valoare_um.search(_RE_INTERVAL.sub(' ', linie)))
+
+
+def scor_parsare(analize: List[AnalizaResult], linii_rezultat: int) -> ScorParsare:
+    """Scorul unui rezultat față de liniile de rezultat ale documentului"""
+    n = len(analize)
+    scor = ScorParsare(nr_analize=n, linii_rezultat=linii_rezultat)
+    if n < MIN_ANALIZE:
+        return scor
+    scor.acoperire = min(n, linii_rezultat) / max(n, linii_rezultat)
+    scor.complete = sum(1 for a in analize if a.unitate_masura and
+                        (a.interval_min is not None or a.interval_max is not None)) / n
+    scor.total = round(PONDERE_ACOPERIRE * scor.acoperire + PONDERE_COMPLETE * scor.complete, 4)
+    return scor
+
+
+# =============================================================================
+# PARSER GENERIC (TABEL)
+# =============================================================================
+
+class ParserTabelGeneric(LaboratorParser):
+    """Parserul de tabel universal din analize_parser_v2, ca LaboratorParser"""
+    NAME = "Generic (tabel)"
+    DESCRIPTION = "Format tabel: Denumire | Rezultat | UM | Interval"
+    KEY = "generic"
+
+    def _parse_analize(self, text: str) -> List[AnalizaResult]:
+        from analize_parser_v2 import AnalizeMedicaleParserV2  # importă fitz - doar la nevoie
+        return [
+            AnalizaResult(
+                categorie=a.categorie,
+                nume_analiza=a.nume_analiza,
+                cod_analiza=a.cod_analiza,
+                rezultat=a.rezultat,
+                rezultat_numeric=a.rezultat_numeric,
+                unitate_masura=a.unitate_masura,
+                interval_min=a.interval_min,
+                interval_max=a.interval_max,
+                interval_text=a.interval_referinta_text,
+                este_anormal=a.este_anormal,
+                directie_anormal=a.directie_anormal,
+            )
+            for a in AnalizeMedicaleParserV2().parse_analize_tabel(text, self.NAME)
+        ]
+
+
+# =============================================================================
+# CASCADA
+# =============================================================================
+
+def _extrage_pdf(pdf_path: str) -> Tuple[List[str], Dict[str, str]]:
+    """Textul paginilor (concatenate cu '\\n' dau textul din parse_pdf) + metadatele PDF"""
+    fitz = _import_fitz()
+    if fitz is None:
+        raise RuntimeError("PyMuPDF nu este instalat. Instalează cu: pip install pymupdf")
+    doc = fitz.open(pdf_path)
+    try:
+        return [page.get_text() for page in doc], dict(doc.metadata or {})
+    finally:
+        doc.close()
+
+
+def _extrage_ocr(pdf_path: str) -> str:
+    from ocr_analize import extract_text_with_ocr  # pytesseract + Pillow, opționale
+    return extract_text_with_ocr(pdf_path)
+
+
+class _Cascada:
+    """Starea unei rulări: cel mai bun rezultat de până acum + pașii"""
+
+    def __init__(self, registry: ParserRegistry, prag: float):
+        self.registry = registry
+        self.prag = prag
+        self.rezultat = RezultatCascada(rezultat=BuletinResult())
+        self.incercate: set = set()
+        self.pagini: Optional[List[str]] = None  # paginile textului, dacă sunt cunoscute
+
+    def ruleaza(self, pas: str, key: str, parser: LaboratorParser, text: str, linii: int) -> bool:
+        """Rulează un parser, îl notează și păstrează rezultatul dacă e cel mai bun"""
+        self.incercate.add(key)
+        start = time.perf_counter()
+        try:
+            if self.pagini is not None:
+                buletin = parser.parse_pagini(self.pagini)
+            else:
+                buletin = parser.parse_text(text)
+        except Exception as e:
+            self._noteaza(PasCascada(pas, key, (time.perf_counter() - start) * 1e3,
+                                     nota=f"eroare: {e}"))
+            return False
+        durata = (time.perf_counter() - start) * 1e3
+        scor = scor_parsare(buletin.analize, linii)
+        acceptat = scor.total >= self.prag
+        self._noteaza(PasCascada(pas, key, durata, scor.nr_analize, scor.total, acceptat,
+                                 buletin.pagini_omise, buletin.linii_omise))
+        if scor.total > self.rezultat.scor.total or not self.rezultat.laborator:
+            self.rezultat.rezultat, self.rezultat.scor = buletin, scor
+            self.rezultat.laborator = key
+        return acceptat
+
+    def _noteaza(self, pas: PasCascada):
+        self.rezultat.pasi.append(pas)
+        METRICI.inregistreaza(pas)
+
+    def parsere(self, pas: str, chei: List[str], text: str, linii: int) -> bool:
+        for key in chei:
+            if key in self.incercate:
+                continue
+            parser = self.registry.get(key)
+            if parser is None:
+                continue
+            if self.ruleaza(pas, key, parser, text, linii):
+                return True
+        return False
+
+
+def parseaza_text_automat(text: str, metadata: Optional[Dict[str, str]] = None,
+                          registry: ParserRegistry = PARSERS,
+                          prag: float = PRAG_ACCEPTARE,
+                          pdf_path: Optional[str] = None,
+                          ocr: bool = True,
+                          prima_pagina: Optional[str] = None,
+                          pagini: Optional[List[str]] = None) -> RezultatCascada:
+    """
+    Cascada pe un text deja extras. pdf_path (opțional) permite pasul OCR
+    când niciun parser de text nu trece de prag; fără prima_pagina, amprenta
+    se caută în primele LUNGIME_AMPRENTA caractere. Cu pagini (al căror text
+    concatenat este text), parserele se opresc la sfârșitul rezultatelor.
+    """
+    cascada = _Cascada(registry, prag)
+    cascada.pagini = pagini
+    rezultat = cascada.rezultat
+
+    # 1. Amprenta: metadatele + prima pagină
+    start = time.perf_counter()
+    if prima_pagina is None:
+        prima_pagina = text[:LUNGIME_AMPRENTA]
+    rezultat.amprenta = amprenta_laborator(prima_pagina, metadata, registry)
+    linii = numara_linii_rezultat(text)
+    cascada._noteaza(PasCascada('amprenta', ",".join(k for k, _ in rezultat.amprenta),
+                                (time.perf_counter() - start) * 1e3,
+                                nota=f"{linii} linii de rezultat"))
+    recunoscute = [key for key, _ in rezultat.amprenta]
+
+    # 2. Parserul laboratorului recunoscut (o singură rulare pentru documentele bune)
+    if cascada.parsere('parser', recunoscute[:1], text, linii):
+        return rezultat
+
+    # 3. Escaladare: restul amprentelor, apoi celelalte parsere, cele mai ieftine primele
+    restul = sorted((k for k in registry if k not in recunoscute), key=METRICI.cost_mediu_ms)
+    if cascada.parsere('escaladare', recunoscute[1:] + restul, text, linii):
+        return rezultat
+
+    # 4. Parserul de tabel generic
+    if cascada.ruleaza('generic', 'generic', ParserTabelGeneric(), text, linii):
+        return rezultat
+
+    # 5. OCR - cel mai scump pas, doar pentru documentele rămase sub prag
+    if ocr and pdf_path:
+        start = time.perf_counter()
+        try:
+            text_ocr = _extrage_ocr(pdf_path)
+        except ImportError as e:
+            cascada._noteaza(PasCascada('ocr', durata_ms=(time.perf_counter() - start) * 1e3,
+                                        nota=f"indisponibil: {e}"))
+            text_ocr = None
+        except Exception as e:
+            cascada._noteaza(PasCascada('ocr', durata_ms=(time.perf_counter() - start) * 1e3,
+                                        nota=f"eroare: {e}"))
+            text_ocr = None
+        if text_ocr is not None:
+            cascada._noteaza(PasCascada('ocr', durata_ms=(time.perf_counter() - start) * 1e3,
+                                        nota="extragere text"))
+            linii_ocr = numara_linii_rezultat(text_ocr)
+            amprenta_ocr = [k for k, _ in amprenta_laborator(text_ocr[:LUNGIME_AMPRENTA], metadata, registry)]
+            cascada.incercate.clear()
+            cascada.pagini = None
+            if cascada.parsere('ocr', amprenta_ocr or recunoscute[:1], text_ocr, linii_ocr):
+                return rezultat
+            if cascada.ruleaza('ocr', 'generic', ParserTabelGeneric(), text_ocr, linii_ocr):
+                return rezultat
+
+    if not rezultat.scor.total:
+        rezultat.laborator = ""
+    if not rezultat.acceptat:
+        rezultat.rezultat.warnings.append(
+            f"Niciun parser nu a trecut de pragul {prag} (cel mai bun: "
+            f"{rezultat.laborator or '-'}, scor {rezultat.scor.total})")
+    return rezultat
+
+
+def parseaza_automat(pdf_path: str, registry: ParserRegistry = PARSERS,
+                     prag: float = PRAG_ACCEPTARE, ocr: bool = True) -> RezultatCascada:
+    """Parsează un PDF fără laborator dat: amprentă -> parser -> escaladare -> generic -> OCR"""
+    start = time.perf_counter()
+    pagini, metadata = _extrage_pdf(pdf_path)
+    text = "".join(page + "\n" for page in pagini)
+    extragere = PasCascada('extragere', durata_ms=(time.perf_counter() - start) * 1e3,
+                           nota=f"{len(pagini)} pagini, {len(text)} caractere")
+    METRICI.inregistreaza(extragere)
+    rezultat = parseaza_text_automat(text, metadata, registry, prag, pdf_path, ocr,
+                                     prima_pagina=pagini[0] if pagini else "", pagini=pagini)
+    rezultat.pasi.insert(0, extragere)
+    return rezultat
+
+
+# =============================================================================
+# MAIN - TEST
+# =============================================================================
+
+def main():
+    pdf_dir = Path(__file__).parent
+    fisiere = [Path(f) for f in sys.argv[1:]] or sorted(pdf_dir.glob("*.pdf"))
+
+    for pdf in fisiere:
+        rezultat = parseaza_automat(str(pdf))
+        stare = "✅" if rezultat.acceptat else "⚠️"
+        print(f"\n{stare} {pdf.name}")
+        print(f"   Laborator: {rezultat.laborator or '-'}  |  amprentă: {rezultat.amprenta}  |  "
+              f"scor {rezultat.scor.total:.2f} ({rezultat.scor.nr_analize} analize / "
+              f"{rezultat.scor.linii_rezultat} linii)  |  {rezultat.durata_ms:.1f} ms")
+        for pas in rezultat.pasi:
+            scor = f"{pas.scor:.2f}" if pas.scor is not None else "   -"
+            omise = f"omise {pas.pagini_omise}p/{pas.linii_omise}l" if pas.pagini_omise or pas.linii_omise else ""
+            print(f"     {pas.pas:<11} {pas.laborator[:28]:<28} {pas.durata_ms:>8.2f} ms  "
+                  f"{pas.nr_analize:>3} analize  scor {scor}  {'✓' if pas.acceptat else ' '} {omise} {pas.nota}")
+
+    print(f"\n{'='*70}")
+    print("METRICI PE PAȘI")
+    print(f"{'='*70}")
+    for m in METRICI.sumar():
+        print(f"  {m['pas']:<11} {m['rulari']:>4} rulări  {m['acceptate']:>3} acceptate  "
+              f"{m['ms_total']:>9.2f} ms total  {m['ms_mediu']:>7.2f} ms/rulare  "
+              f"omise {m['pagini_omise']} pagini / {m['linii_omise']} linii")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+"""
+Clasificator de Linii (NumPy)
+=============================
+Pentru laboratoarele fără parser dedicat, AnalizeMedicaleParserV2
+(parse_analize_tabel / _try_parse_line) și AnalizeMedicaleParser
+(parse_generic) încearcă mai multe regex-uri pe fiecare linie și caută
+intervalul în următoarele 3 linii - încet și cu multe fals pozitive: date,
+CNP-uri, adrese cu numere, "SR EN ISO 15189".
+
+ClasificatorLinii etichetează toate liniile unui document deodată:
+- analit:    linie din rândul unei analize (nume, valoare, UM, interval)
+- antet:     antetul documentului / al paginii și capul de tabel
+- categorie: titlu de categorie (HEMATOLOGIE, BIOCHIMIE...)
+- zgomot:    metode, note, disclaimere, subsoluri
+
+Trăsăturile sunt n-grame de caractere (2-4) cu hashing, pe textul
+normalizat (fără diacritice, cifrele -> 0), calculate vectorizat pe tot
+documentul; scorurile sunt un singur produs matrice rară x ponderi
+(regresie logistică multinomială, antrenată în NumPy). Doar liniile
+candidate ajung la extractorul de câmpuri.
+
+Antrenarea folosește PDF-urile de test: etichetele vin din parsarea layout
+(parsare_layout) a laboratoarelor cunoscute, iar analizele fals pozitive din
+ieșirile JSON existente (*.v2.json) sunt exemple negative cu pondere mărită.
+
+Utilizare:
+    candidati = candidati_linii(linii)    # mască bool per linie (clasificator_linii.npz)
+
+Fără NumPy sau fără model candidati_linii() returnează None, iar parserele
+(analize_parser_v2, analize_parser_universal) încearcă toate liniile.
+
+Antrenare + evaluare: python clasificator_linii.py
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:     # parserele importă candidati_linii și fără NumPy
+    np = None
+
+CLASE = ('analit', 'antet', 'categorie', 'zgomot')
+ANALIT, ANTET, CATEGORIE, ZGOMOT = range(len(CLASE))
+
+# Spațiul de hashing al n-gramelor (2^BITI coloane)
+BITI = 12
+NGRAME = (2, 3, 4)
+
+# O linie e candidată dacă P(analit) depășește pragul - jos, pentru recall
+PRAG_ANALIT = 0.15
+
+# Analizele fals pozitive din ieșirile JSON cântăresc mai mult la antrenare
+PONDERE_FALS_POZITIV = 3.0
+
+MODEL_PATH = Path(__file__).with_name("clasificator_linii.npz")
+
+_NORMALIZARE = str.maketrans('ăâîșşțţµ123456789', 'aaissttu000000000')
+_SARE = {n: (n * 0x9E3779B1) & 0xFFFF for n in NGRAME}
+
+
+# =============================================================================
+# TRĂSĂTURI
+# =============================================================================
+
+def _octeti_document(linii: Sequence[str]) -> np.ndarray:
+    """Liniile normalizate, fiecare precedată de '\\n', ca un singur array de octeți"""
+    text = "\n" + "\n".join(" ".join(linie.lower().split()) for linie in linii) + "\n"
+    octeti = text.translate(_NORMALIZARE).encode('ascii', 'replace')
+    return np.frombuffer(octeti, dtype=np.uint8).astype(np.int64)
+
+
+def trasaturi(linii: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Matricea rară (linie, coloană hash, valoare) a n-gramelor de caractere.
+    '\\n' marchează începutul și sfârșitul liniei; n-gramele nu trec dintr-o
+    linie în alta. Valorile sunt normalizate L2 per linie.
+    """
+    octeti = _octeti_document(linii)
+    linie_nl = np.cumsum(octeti == 10)          # '\n'-uri până la poziție, inclusiv
+    randuri, coloane = [], []
+    for n in NGRAME:
+        m = len(octeti) - n + 1
+        if m <= 0:
+            continue
+        h = np.zeros(m, dtype=np.int64)
+        for k in range(n):
+            h = h * 257 + octeti[k:k + m]
+        valid = linie_nl[n - 2:n - 2 + m] == linie_nl[:m] if n > 2 else np.ones(m, dtype=bool)
+        h = (((h[valid] + _SARE[n]) * 0x9E3779B1) & 0xFFFFFFFF) >> (32 - BITI)
+        randuri.append(linie_nl[:m][valid] - 1)
+        coloane.append(h)
+    if not randuri:
+        gol = np.zeros(0, dtype=np.int64)
+        return gol, gol, np.zeros(0)
+    randuri = np.concatenate(randuri)
+    coloane = np.concatenate(coloane)
+    numar = np.bincount(randuri, minlength=len(linii))
+    valori = 1.0 / np.sqrt(np.maximum(numar, 1))[randuri]
+    return randuri, coloane, valori
+
+
+def _produs(randuri: np.ndarray, coloane: np.ndarray, valori: np.ndarray,
+            ponderi: np.ndarray, nr_linii: int) -> np.ndarray:
+    """Matricea rară x ponderi: (nr_linii, nr_clase)"""
+    contributii = ponderi[coloane] * valori[:, None]
+    return np.stack([np.bincount(randuri, weights=contributii[:, c], minlength=nr_linii)
+                     for c in range(ponderi.shape[1])], axis=1)
+
+
+def _softmax(scoruri: np.ndarray) -> np.ndarray:
+    e = np.exp(scoruri - scoruri.max(axis=1, keepdims=True))
+    return e / e.sum(axis=1, keepdims=True)
+
+
+# =============================================================================
+# MODEL
+# =============================================================================
+
+class ClasificatorLinii:
+    """Regresie logistică multinomială pe n-grame de caractere cu hashing"""
+
+    def __init__(self, ponderi: np.ndarray, bias: np.ndarray, prag_analit: float = PRAG_ANALIT):
+        self.ponderi = ponderi
+        self.bias = bias
+        self.prag_analit = prag_analit
+
+    def probabilitati(self, linii: Sequence[str]) -> np.ndarray:
+        """P(clasă) pentru fiecare linie: (len(linii), len(CLASE))"""
+        if not linii:
+            return np.zeros((0, len(CLASE)))
+        randuri, coloane, valori = trasaturi(linii)
+        return _softmax(_produs(randuri, coloane, valori, self.ponderi, len(linii)) + self.bias)
+
+    def clasifica(self, linii: Sequence[str]) -> List[str]:
+        return [CLASE[i] for i in self.probabilitati(linii).argmax(axis=1)]
+
+    def candidati(self, linii: Sequence[str]) -> np.ndarray:
+        """Masca liniilor care merg la extractorul de câmpuri"""
+        return self.probabilitati(linii)[:, ANALIT] >= self.prag_analit
+
+    def salveaza(self, path: Optional[Path] = None):
+        np.savez_compressed(path or MODEL_PATH, ponderi=self.ponderi.astype(np.float32),
+                            bias=self.bias, biti=BITI, clase=np.array(CLASE))
+
+    @classmethod
+    def incarca(cls, path: Optional[Path] = None) -> 'ClasificatorLinii':
+        with np.load(path or MODEL_PATH) as data:
+            if int(data['biti']) != BITI or tuple(data['clase']) != CLASE:
+                raise ValueError("Model salvat cu alte trăsături - reantrenează: python clasificator_linii.py")
+            return cls(data['ponderi'].astype(np.float64), data['bias'])
+
+
+@lru_cache(maxsize=1)
+def clasificator_implicit() -> Optional[ClasificatorLinii]:
+    """Modelul antrenat de lângă modul, sau None dacă lipsește"""
+    if not MODEL_PATH.exists():
+        return None
+    return ClasificatorLinii.incarca()
+
+
+def candidati_linii(linii: Sequence[str]) -> Optional[np.ndarray]:
+    """Masca liniilor candidate cu modelul implicit (None fără NumPy / model)"""
+    if np is None:
+        return None
+    clasificator = clasificator_implicit()
+    return clasificator.candidati(linii) if clasificator is not None else None
+
+
+# =============================================================================
+# ANTRENARE
+# =============================================================================
+
+def antreneaza(linii: Sequence[str], etichete: np.ndarray, ponderi_exemple: Optional[np.ndarray] = None,
+               epoci: int = 300, rata: float = 2.0, l2: float = 1e-4) -> ClasificatorLinii:
+    """Gradient descent pe tot lotul; clasele sunt echilibrate prin ponderi"""
+    etichete = np.asarray(etichete)
+    randuri, coloane, valori = trasaturi(linii)
+    frecvente = np.bincount(etichete, minlength=len(CLASE)).astype(np.float64)
+    pondere = (len(etichete) / (len(CLASE) * np.maximum(frecvente, 1)))[etichete]
+    if ponderi_exemple is not None:
+        pondere = pondere * ponderi_exemple
+    pondere /= pondere.sum()
+
+    tinta = np.eye(len(CLASE))[etichete]
+    w = np.zeros((1 << BITI, len(CLASE)))
+    b = np.zeros(len(CLASE))
+    for _ in range(epoci):
+        p = _softmax(_produs(randuri, coloane, valori, w, len(linii)) + b)
+        g = (p - tinta) * pondere[:, None]
+        contributii = g[randuri] * valori[:, None]
+        grad = np.stack([np.bincount(coloane, weights=contributii[:, c], minlength=1 << BITI)
+                         for c in range(len(CLASE))], axis=1)
+        w -= rata * (grad + l2 * w)
+        b -= rata * g.sum(axis=0)
+    return ClasificatorLinii(w, b)
+
+
+def etichete_document(pdf_path: str, parser_key: Optional[str]) -> Tuple[List[str], List[int]]:
+    """
+    Liniile din page.get_text() ale unui PDF și eticheta fiecăreia. Clasa
+    vine din rândul vizual al liniei, clasificat ca în parsarea layout:
+    capul de tabel și ce e deasupra lui = antet, rândurile cu analiză =
+    analit, titlurile de categorie = categorie, restul = zgomot. Fără
+    parser (scrisori, formate necunoscute) toate liniile sunt zgomot.
+    """
+    from parsere_laboratoare import PARSERS, _import_fitz
+    from parsare_layout import analiza_din_celule, celule_rand, detecteaza_benzi, randuri_pagina
+
+    parser = PARSERS[parser_key] if parser_key else None
+    linii: List[str] = []
+    etichete: List[int] = []
+    benzi = None
+    doc = _import_fitz().open(pdf_path)
+    try:
+        for page in doc:
+            clase_randuri: List[Tuple[float, float, int]] = []
+            if parser is not None:
+                randuri = randuri_pagina(page.get_text("words"))
+                benzi_randuri = [detecteaza_benzi(rand) for rand in randuri]
+                in_tabel = all(b is None for b in benzi_randuri)
+                for rand, noi in zip(randuri, benzi_randuri):
+                    text = " ".join(c[4] for c in rand)
+                    if noi is not None:
+                        benzi, in_tabel, clasa = noi, True, ANTET
+                    elif parser._categorie_detector().find(text):
+                        clasa = CATEGORIE
+                    elif benzi is None or not in_tabel:
+                        clasa = ANTET
+                    elif analiza_din_celule(parser, celule_rand(rand, benzi), "GENERAL") is not None:
+                        clasa = ANALIT
+                    else:
+                        clasa = ZGOMOT
+                    clase_randuri.append((min(c[1] for c in rand), max(c[3] for c in rand), clasa))
+
+            for bloc in page.get_text("dict")["blocks"]:
+                for linie in bloc.get("lines", ()):
+                    text = "".join(span["text"] for span in linie["spans"])
+                    if len(text.strip()) < 2:
+                        continue
+                    y = (linie["bbox"][1] + linie["bbox"][3]) / 2
+                    clasa = next((c for y0, y1, c in clase_randuri if y0 <= y <= y1), ZGOMOT)
+                    linii.append(text)
+                    etichete.append(clasa)
+    finally:
+        doc.close()
+    return linii, etichete
+
+
+def _fals_pozitive(json_path: Path, linii: Sequence[str], etichete: Sequence[int]) -> np.ndarray:
+    """Pondere per linie: mărită pentru liniile analizelor din JSON care nu sunt analize"""
+    ponderi = np.ones(len(linii))
+    if not json_path.exists():
+        return ponderi
+    with open(json_path, encoding='utf-8') as f:
+        nume = {" ".join(str(a.get('NumeAnaliza') or '').split()) for a in json.load(f)}
+    nume = [n for n in nume if len(n) >= 4]
+    for i, (linie, eticheta) in enumerate(zip(linii, etichete)):
+        if eticheta != ANALIT and any(n in " ".join(linie.split()) for n in nume):
+            ponderi[i] = PONDERE_FALS_POZITIV
+    return ponderi
+
+
+def set_antrenare(exemple: Sequence[Tuple[str, Optional[str]]]) -> Dict[str, Tuple[List[str], np.ndarray, np.ndarray]]:
+    """PDF -> (linii, etichete, ponderi) pentru fiecare exemplu (pdf, cheie parser sau None)"""
+    date = {}
+    for pdf, key in exemple:
+        linii, etichete = etichete_document(pdf, key)
+        ponderi = _fals_pozitive(Path(pdf).with_suffix('.v2.json'), linii, etichete)
+        date[pdf] = (linii, np.array(etichete, dtype=np.int64), ponderi)
+    return date
+
+
+def _concateneaza(parti: Sequence[Tuple[List[str], np.ndarray, np.ndarray]]):
+    linii = [linie for p in parti for linie in p[0]]
+    return linii, np.concatenate([p[1] for p in parti]), np.concatenate([p[2] for p in parti])
+
+
+# =============================================================================
+# MAIN - TEST
+# =============================================================================
+
+def main():
+    from parsere_laboratoare import _import_fitz
+    if _import_fitz() is None:
+        print("❌ PyMuPDF nu este instalat")
+        return 1
+
+    pdf_dir = Path(__file__).parent
+    exemple = [(str(pdf_dir / f), k) for f, k in [
+        ('AnalizeMedicale.pdf', 'clinica_sante'),
+        ('1111200901011bolnavul.pdf', 'smartlabs'),
+        ('analize-b-51-ro.pdf', 'elite_medical'),
+        ('SCRISOARE-MEDICALA-2024.pdf', None),
+    ]]
+    start = time.perf_counter()
+    date = set_antrenare(exemple)
+    print(f"📚 Set de antrenare: {sum(len(d[0]) for d in date.values())} linii din {len(date)} PDF-uri "
+          f"({(time.perf_counter() - start) * 1e3:.0f} ms)")
+    for pdf, (linii, etichete, ponderi) in date.items():
+        frecvente = np.bincount(etichete, minlength=len(CLASE))
+        print(f"   {Path(pdf).name:<46} " + "  ".join(f"{c} {n:>3}" for c, n in zip(CLASE, frecvente)) +
+              f"  fals pozitive JSON {int((ponderi > 1).sum())}")
+
+    # Laboratorul "necunoscut": antrenare pe celelalte documente, test pe cel lăsat deoparte
+    print("\n🔍 Validare lăsând câte un laborator deoparte (analit = linie candidată):")
+    for pdf, key in exemple:
+        if key is None:
+            continue
+        model = antreneaza(*_concateneaza([d for p, d in date.items() if p != pdf]))
+        linii, etichete, _ = date[pdf]
+        candidati = model.candidati(linii)
+        adevarate = etichete == ANALIT
+        recall = (candidati & adevarate).sum() / max(1, adevarate.sum())
+        precizie = (candidati & adevarate).sum() / max(1, candidati.sum())
+        acuratete = (np.array([CLASE.index(c) for c in model.clasifica(linii)]) == etichete).mean()
+        stare = "✅" if recall >= 0.9 else "⚠️"
+        print(f"   {stare} {Path(pdf).name:<28} recall {recall:5.1%}  precizie {precizie:5.1%}  "
+              f"candidate {int(candidati.sum()):>3}/{len(linii):<3}  acuratețe 4 clase {acuratete:5.1%}")
+
+    start = time.perf_counter()
+    model = antreneaza(*_concateneaza(list(date.values())))
+    print(f"\n🧠 Model final: {(time.perf_counter() - start) * 1e3:.0f} ms antrenare, "
+          f"{model.ponderi.shape[0]}x{model.ponderi.shape[1]} ponderi")
+    model.salveaza()
+    print(f"   Salvat: {MODEL_PATH.name} ({MODEL_PATH.stat().st_size} octeți)")
+
+    linii = date[exemple[0][0]][0]
+    start = time.perf_counter()
+    for _ in range(100):
+        model.candidati(linii)
+    ms = (time.perf_counter() - start) * 10
+    print(f"   Scorare: {len(linii)} linii în {ms:.2f} ms ({ms * 1e3 / len(linii):.1f} µs/linie)")
+    for linie, clasa in list(zip(linii, model.clasifica(linii)))[20:40]:
+        print(f"     {clasa:<10} {linie.strip()[:70]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
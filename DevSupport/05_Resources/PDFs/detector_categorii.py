@@ -0,0 +1,189 @@
+"""
+Detector Compilat pentru Categoriile de Analize
+===============================================
+Înlocuiește bucla "cat in line.upper()" repetată pe fiecare linie din
+fiecare buletin cu un detector construit o singură dată per listă de categorii.
+
+- index(): o singură trecere peste tot documentul -> {index linie: categorie}
+- detect(): varianta per linie, pentru linii citite pe rând
+- Liniile mai lungi decât pragul de header sunt sărite înainte de orice lucru
+- Categoriile duplicate (ex: 'Hematologie' / 'HEMATOLOGIE') sunt comasate
+- Se returnează forma canonică (UPPERCASE) a categoriei
+
+Benchmark per document: python detector_categorii.py
+"""
+
+import re
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+
+class CategorieDetector:
+    """Automat precompilat pentru detectarea categoriei dintr-o linie"""
+
+    def __init__(self, categorii: Sequence[str], lungime_max: Optional[int] = None):
+        canonice = []
+        for cat in categorii:
+            cat_upper = cat.upper()
+            if cat_upper not in canonice:
+                canonice.append(cat_upper)
+
+        # Ordinea din listă dă prioritatea (ca în bucla originală)
+        self.categorii: Tuple[str, ...] = tuple(canonice)
+        self.lungime_max = lungime_max
+        self._pattern = re.compile('|'.join(re.escape(cat) for cat in self.categorii))
+        # bytes.upper() atinge doar ASCII: scanarea pe octeți doar pentru categorii ASCII
+        self._categorii_bytes = (tuple(cat.encode('utf-8') for cat in self.categorii)
+                                 if all(cat.isascii() for cat in self.categorii) else None)
+
+    def find(self, line: str) -> Optional[str]:
+        """Returnează categoria canonică din linie sau None"""
+        if self.lungime_max is not None and len(line) >= self.lungime_max:
+            return None
+
+        line_upper = line.upper()
+        if self._pattern.search(line_upper) is None:
+            return None
+
+        # Linie de categorie (rar) - respectăm prioritatea din listă
+        for cat in self.categorii:
+            if cat in line_upper:
+                return cat
+        return None
+
+    def detect(self, line: str, current: str) -> str:
+        """Returnează categoria din linie sau categoria curentă"""
+        return self.find(line) or current
+
+    def index(self, text: Union[str, Sequence[str]], strip: bool = False) -> Dict[int, str]:
+        """
+        Scanează tot documentul o singură dată și returnează {index linie: categorie}.
+        Doar liniile care conțin o categorie sunt verificate individual
+        (prag de lungime + prioritate); restul nu costă nimic per linie.
+        strip=True aplică pragul pe linia fără spații (ca parserele care fac strip).
+        """
+        if isinstance(text, str):
+            lines = text.split('\n')
+        else:
+            lines = text
+            text = '\n'.join(lines)
+
+        # Cu categorii ASCII scanarea se face pe octeți: bytes.upper() e mult mai
+        # rapid decât str.upper() pe text cu diacritice, iar '\n' rămâne un singur
+        # octet, deci numărul liniei e corect. O categorie cu diacritice ('EXAMEN
+        # URINĂ') are nevoie de str.upper(), ca find(): 'ă' -> 'Ă' nu e ASCII
+        if self._categorii_bytes is not None:
+            text_upper, categorii, linie_noua = text.encode('utf-8').upper(), self._categorii_bytes, b'\n'
+        else:
+            text_upper, categorii, linie_noua = text.upper(), self.categorii, '\n'
+        pozitii = []
+        for cat in categorii:
+            pos = text_upper.find(cat)
+            while pos != -1:
+                pozitii.append(pos)
+                pos = text_upper.find(cat, pos + 1)
+        pozitii.sort()
+
+        rezultat: Dict[int, str] = {}
+        idx, last = 0, 0
+        for pos in pozitii:
+            idx += text_upper.count(linie_noua, last, pos)
+            last = pos
+            if idx in rezultat:
+                continue
+            line = lines[idx].strip() if strip else lines[idx]
+            cat = self.find(line)
+            if cat:
+                rezultat[idx] = cat
+        return rezultat
+
+
+@lru_cache(maxsize=None)
+def get_detector(categorii: Tuple[str, ...], lungime_max: Optional[int] = None) -> CategorieDetector:
+    """Returnează detectorul (compilat o singură dată) pentru o listă de categorii"""
+    return CategorieDetector(categorii, lungime_max)
+
+
+# =============================================================================
+# MAIN - BENCHMARK
+# =============================================================================
+
+def _detect_vechi(line: str, current: str, categorii: Sequence[str], lungime_max: int) -> str:
+    """Bucla originală, păstrată doar pentru comparație"""
+    line_upper = line.upper().strip()
+    for cat in categorii:
+        if cat in line_upper and len(line) < lungime_max:
+            return cat
+    return current
+
+
+def main():
+    import fitz  # PyMuPDF
+    from parsere_laboratoare import LaboratorParser
+
+    categorii = LaboratorParser.CATEGORII
+    detector = get_detector(tuple(categorii), 60)
+    repetari = 200
+
+    # Categorii cu diacritice în text cu litere mici: ca find() / bucla originală
+    linii = ['x', 'Examen urină', 'EXAMEN URINĂ', 'hematologie']
+    cu_diacritice = CategorieDetector(['HEMATOLOGIE', 'EXAMEN URINĂ'])
+    asteptat = {i: cat for i, line in enumerate(linii) if (cat := cu_diacritice.find(line))}
+    assert cu_diacritice.index(linii, strip=True) == asteptat == {1: 'EXAMEN URINĂ', 2: 'EXAMEN URINĂ',
+                                                                  3: 'HEMATOLOGIE'}, "Diferență la diacritice"
+    print("✅ Categorii cu diacritice: index() = find() pe 'Examen urină'")
+
+    pdf_folder = Path(__file__).parent
+    pdf_files = sorted(pdf_folder.glob("*.pdf"))
+
+    print(f"\n{'='*80}")
+    print("BENCHMARK DETECTARE CATEGORII (per document)")
+    print(f"{'='*80}")
+    print(f"  {'Document':<40} {'Linii':>6} {'Vechi µs':>10} {'Linie µs':>10} {'Index µs':>10} {'x':>6}")
+
+    for pdf_path in pdf_files:
+        doc = fitz.open(str(pdf_path))
+        text = "".join(page.get_text() + "\n" for page in doc)
+        doc.close()
+        lines = text.split('\n')
+
+        # Verificare: aceleași categorii ca bucla originală
+        cat_vechi, cat_nou, cat_index = "GENERAL", "GENERAL", "GENERAL"
+        index = detector.index(text)
+        for i, line in enumerate(lines):
+            cat_vechi = _detect_vechi(line, cat_vechi, categorii, 60)
+            cat_nou = detector.detect(line, cat_nou)
+            cat_index = index.get(i, cat_index)
+            assert cat_vechi == cat_nou == cat_index, f"Diferență pe linia: {line!r}"
+
+        start = time.perf_counter()
+        for _ in range(repetari):
+            current = "GENERAL"
+            for line in lines:
+                current = _detect_vechi(line, current, categorii, 60)
+        t_vechi = (time.perf_counter() - start) / repetari * 1e6
+
+        detect = detector.detect
+        start = time.perf_counter()
+        for _ in range(repetari):
+            current = "GENERAL"
+            for line in lines:
+                current = detect(line, current)
+        t_linie = (time.perf_counter() - start) / repetari * 1e6
+
+        start = time.perf_counter()
+        for _ in range(repetari):
+            current = "GENERAL"
+            index = detector.index(text)
+            for i in range(len(lines)):
+                current = index.get(i, current)
+        t_index = (time.perf_counter() - start) / repetari * 1e6
+
+        print(f"  {pdf_path.name[:40]:<40} {len(lines):>6} {t_vechi:>10.1f} {t_linie:>10.1f} "
+              f"{t_index:>10.1f} {t_vechi / t_index:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""
+Dicționarul Canonic al Analizelor
+=================================
+Aceeași analiză apare diferit la fiecare laborator: "Hemoglobina (HGB)",
+"Hemoglobină", "HGB", "Numar de eritrocite (RBC)", "Nr. eritrocite".
+Dicționarul (analiti.json) ține pentru fiecare analiză codul canonic,
+denumirea preferată, sinonimele, codurile alternative și sinonimele
+specifice unui laborator.
+
+Căutarea (rezolva_cod):
+1. codul primit de la parser sau cel din paranteză - index de coduri
+2. denumirea normalizată (fără diacritice, numerotare, punctuație) -
+   index exact (dict), întâi sinonimele laboratorului, apoi cele generale
+3. fallback fuzzy - index de trigrame, scor Dice peste PRAG_FUZZY și
+   fără un al doilea cod aproape la egalitate
+
+Rezultatele sunt într-un cache LRU, așa că o denumire e rezolvată o singură
+dată per proces; parserele completează cod_analiza prin rezolva_cod.
+
+Test: python dictionar_analiti.py
+"""
+
+import json
+import math
+import re
+import sys
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+DICTIONAR_DEFAULT = Path(__file__).parent / "analiti.json"
+
+# Scorul Dice minim (trigrame comune) pentru potrivirea aproximativă
+PRAG_FUZZY = 0.8
+
+# Diferența minimă față de al doilea cod candidat (altfel potrivirea e ambiguă)
+MARJA_AMBIGUITATE = 0.05
+
+# Sub această lungime o denumire nu e căutată aproximativ ("<", "Bd.")
+LUNGIME_MIN_FUZZY = 4
+
+
+# =============================================================================
+# MODEL
+# =============================================================================
+
+@dataclass(frozen=True)
+class AnalitCanonic:
+    """O intrare din dicționar"""
+    cod: str
+    nume: str
+    sinonime: Tuple[str, ...] = ()
+    coduri: Tuple[str, ...] = ()                     # coduri alternative (RDWC -> RDW-CV)
+    laboratoare: Dict[str, Tuple[str, ...]] = field(default_factory=dict, hash=False)
+
+
+# =============================================================================
+# NORMALIZARE
+# =============================================================================
+
+_RE_NUMEROTARE = re.compile(r'^[\W_]*\d{1,3}\.\s+')
+_RE_NON_ALNUM = re.compile(r'[^a-z0-9%#]+')
+_RE_PARANTEZA = re.compile(r'\(([^()]*)\)')
+
+
+def normalizeaza_nume(text: str) -> str:
+    """Cheia de căutare: fără diacritice, litere mici, fără numerotare/punctuație"""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii').lower()
+    text = _RE_NUMEROTARE.sub('', text)
+    return _RE_NON_ALNUM.sub(' ', text).strip()
+
+
+def normalizeaza_cod(cod: str) -> str:
+    return cod.strip().upper().replace(' ', '')
+
+
+def _trigrame(cheie: str) -> frozenset:
+    padded = f"  {cheie} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+# =============================================================================
+# DICȚIONAR + INDEXURI
+# =============================================================================
+
+class DictionarAnaliti:
+    """
+    Dicționarul încărcat, cu trei indexuri construite o singură dată:
+    coduri (cod alternativ -> canonic), exact ((laborator, cheie) -> cod,
+    laborator '' = general) și trigrame (trigramă -> intrări).
+    """
+
+    def __init__(self, analiti: Iterable[AnalitCanonic]):
+        self.analiti: Dict[str, AnalitCanonic] = {}
+        self._coduri: Dict[str, str] = {}
+        self._exact: Dict[Tuple[str, str], str] = {}
+        # Intrările indexului de trigrame: (cheie, cod, laborator)
+        self._chei: List[Tuple[str, str, str]] = []
+        self._seturi: List[frozenset] = []
+        self._trigrame: Dict[str, List[int]] = {}
+
+        for analit in analiti:
+            self.adauga(analit)
+
+    def adauga(self, analit: AnalitCanonic):
+        """Adaugă o analiză; o cheie revendicată de două coduri e o eroare de dicționar"""
+        if analit.cod in self.analiti:
+            raise ValueError(f"Cod duplicat în dicționar: {analit.cod}")
+        self.analiti[analit.cod] = analit
+
+        for cod in (analit.cod,) + analit.coduri:
+            self._revendica(self._coduri, normalizeaza_cod(cod), analit.cod)
+        for nume in (analit.nume, analit.cod) + analit.sinonime + analit.coduri:
+            self._index_nume('', nume, analit.cod)
+        for laborator, sinonime in analit.laboratoare.items():
+            for nume in sinonime:
+                self._index_nume(normalizeaza_nume(laborator), nume, analit.cod)
+
+    def _index_nume(self, laborator: str, nume: str, cod: str):
+        cheie = normalizeaza_nume(nume)
+        if not cheie or self._exact.get((laborator, cheie)) == cod:
+            return
+        self._revendica(self._exact, (laborator, cheie), cod)
+        if len(cheie) >= LUNGIME_MIN_FUZZY:
+            pozitie = len(self._chei)
+            trigrame = _trigrame(cheie)
+            self._chei.append((cheie, cod, laborator))
+            self._seturi.append(trigrame)
+            for trigrama in trigrame:
+                self._trigrame.setdefault(trigrama, []).append(pozitie)
+
+    @staticmethod
+    def _revendica(index: dict, cheie, cod: str):
+        existent = index.setdefault(cheie, cod)
+        if existent != cod:
+            raise ValueError(f"'{cheie}' apare la {existent} și la {cod}")
+
+    def __len__(self) -> int:
+        return len(self.analiti)
+
+    # -------------------------------------------------------------------------
+    # Căutare
+    # -------------------------------------------------------------------------
+
+    def rezolva(self, nume: Optional[str], laborator: str = "",
+                cod: Optional[str] = None) -> Optional[str]:
+        """Codul canonic pentru o denumire (și codul dat de parser), sau None"""
+        if cod:
+            gasit = self._coduri.get(normalizeaza_cod(cod))
+            if gasit:
+                return gasit
+        if not nume:
+            return None
+
+        # Codul din paranteză: "Hemoglobina (HGB)"
+        paranteze = _RE_PARANTEZA.findall(nume)
+        for continut in paranteze:
+            gasit = self._coduri.get(normalizeaza_cod(continut))
+            if gasit:
+                return gasit
+
+        laborator = normalizeaza_nume(laborator) if laborator else ""
+        chei = [normalizeaza_nume(nume)]
+        if paranteze:
+            # Fără paranteze ("VSH (Viteza ...)"), apoi conținutul lor ("(glicemie)")
+            chei.append(normalizeaza_nume(_RE_PARANTEZA.sub(' ', nume)))
+            chei.extend(normalizeaza_nume(continut) for continut in paranteze)
+        for cheie in chei:
+            gasit = self._cauta_exact(cheie, laborator)
+            if gasit:
+                return gasit
+        return self.cauta_fuzzy(chei[1] if paranteze and chei[1] else chei[0], laborator)[0]
+
+    def _cauta_exact(self, cheie: str, laborator: str) -> Optional[str]:
+        if laborator:
+            gasit = self._exact.get((laborator, cheie))
+            if gasit:
+                return gasit
+        return self._exact.get(('', cheie))
+
+    def cauta_fuzzy(self, cheie: str, laborator: str = "") -> Tuple[Optional[str], float]:
+        """
+        Cea mai apropiată intrare după trigrame: (cod, scor Dice) sau (None, 0).
+        
+        Filtre înainte de scor: lungime (Dice >= p cere p/(2-p) <= m/n <= (2-p)/p)
+        și prefix - un candidat cu cel puțin c trigrame comune are sigur una
+        dintre primele n-c+1 trigrame ale interogării, ordonate de la cea mai
+        rară; listele lungi ale trigramelor frecvente nu sunt parcurse.
+        """
+        if len(cheie) < LUNGIME_MIN_FUZZY:
+            return None, 0.0
+        # Rivalii sub prag dar în marja de ambiguitate contează și ei
+        prag = PRAG_FUZZY - MARJA_AMBIGUITATE
+        setul = _trigrame(cheie)
+        n = len(setul)
+        m_min, m_max = n * prag / (2 - prag), n * (2 - prag) / prag
+        comune_min = math.ceil(prag * (n + m_min) / 2 - 1e-9)
+
+        rare = sorted(setul, key=lambda t: len(self._trigrame.get(t, ())))
+        candidati = set()
+        for trigrama in rare[:n - comune_min + 1]:
+            candidati.update(self._trigrame.get(trigrama, ()))
+
+        scoruri: Dict[str, float] = {}  # cel mai bun scor per cod
+        for pozitie in candidati:
+            _, cod, lab = self._chei[pozitie]
+            if lab and lab != laborator:
+                continue
+            altul = self._seturi[pozitie]
+            m = len(altul)
+            if m < m_min or m > m_max:
+                continue
+            scor = 2 * len(setul & altul) / (n + m)
+            if scor >= prag and scor > scoruri.get(cod, 0.0):
+                scoruri[cod] = scor
+        if not scoruri:
+            return None, 0.0
+        clasament = sorted(scoruri.items(), key=lambda kv: -kv[1])
+        cel_mai_bun, scor_maxim = clasament[0]
+        if scor_maxim < PRAG_FUZZY:
+            return None, 0.0
+        # Două coduri aproape la egalitate ("Neutrofile" ~ "Neutrofile #" / "%"): ambiguu
+        if len(clasament) > 1 and clasament[1][1] >= scor_maxim - MARJA_AMBIGUITATE:
+            return None, 0.0
+        return cel_mai_bun, scor_maxim
+
+
+# =============================================================================
+# ÎNCĂRCARE + CACHE
+# =============================================================================
+
+def _din_json(data: dict) -> List[AnalitCanonic]:
+    return [
+        AnalitCanonic(
+            cod=intrare['cod'],
+            nume=intrare['nume'],
+            sinonime=tuple(intrare.get('sinonime', ())),
+            coduri=tuple(intrare.get('coduri', ())),
+            laboratoare={lab: tuple(nume) for lab, nume in intrare.get('laboratoare', {}).items()},
+        )
+        for intrare in data['analize']
+    ]
+
+
+@lru_cache(maxsize=None)
+def incarca_dictionar(path: Optional[str] = None) -> DictionarAnaliti:
+    """Dicționarul din analiti.json (sau alt fișier), încărcat o singură dată"""
+    with open(path or DICTIONAR_DEFAULT, encoding='utf-8') as f:
+        return DictionarAnaliti(_din_json(json.load(f)))
+
+
+@lru_cache(maxsize=8192)
+def rezolva_cod(nume: Optional[str], laborator: str = "",
+                cod: Optional[str] = None) -> Optional[str]:
+    """Codul canonic al analizei (cache LRU peste dicționarul implicit)"""
+    return incarca_dictionar().rezolva(nume, laborator, cod)
+
+
+def nume_preferat(cod: str) -> Optional[str]:
+    analit = incarca_dictionar().analiti.get(cod)
+    return analit.nume if analit else None
+
+
+# =============================================================================
+# MAIN - TEST
+# =============================================================================
+
+def _dictionar_sintetic(n: int) -> DictionarAnaliti:
+    """Dicționarul real + n intrări generate (pentru măsurarea la scară)"""
+    with open(DICTIONAR_DEFAULT, encoding='utf-8') as f:
+        analiti = _din_json(json.load(f))
+    radacini = ['anticorpi', 'antigen', 'proteina', 'enzima', 'hormon', 'marker', 'factor', 'receptor']
+    sufixe = ['seric', 'urinar', 'liber', 'total', 'activ', 'cantitativ', 'calitativ', 'indice']
+    for i in range(n):
+        analiti.append(AnalitCanonic(
+            cod=f"X{i:05d}",
+            nume=f"{radacini[i % 8]} {sufixe[i // 8 % 8]} tip {i}",
+            sinonime=(f"{radacini[i % 8]} {i} {sufixe[i // 64 % 8]}",),
+        ))
+    return DictionarAnaliti(analiti)
+
+
+def main():
+    dictionar = incarca_dictionar()
+    print(f"\n{'='*70}")
+    print(f"DICȚIONAR: {len(dictionar)} analize, {len(dictionar._exact)} chei exacte, "
+          f"{len(dictionar._trigrame)} trigrame")
+    print(f"{'='*70}")
+
+    exemple = [
+        ("Hemoglobina (HGB)", "", None, "HGB"),
+        ("Hemoglobină", "", None, "HGB"),
+        ("HGB", "", None, "HGB"),
+        ("Numar de eritrocite (RBC)", "", None, "RBC"),
+        ("Nr. eritrocite", "", None, "RBC"),
+        ("Largimea distributiei eritrocitare - coeficient variatie (RDWC)", "", "RDWC", "RDW-CV"),
+        ("Indice de distributie a eritrocitelor (RDW)", "", "RDW", "RDW-CV"),
+        ("VSH (Viteza De Sedimentare A Hematiilor) *", "", None, "VSH"),
+        ("TSH (hormon de stimulare tiroidiana)", "", None, "TSH"),
+        ("Glucoza serica (glicemie)", "", None, "GLU"),
+        ("5. Glicemie", "", None, "GLU"),
+        ("4. Sideremie (Fier)", "", None, "FE"),
+        ("6. AST - TGO", "", None, "AST"),
+        ("8. Calciu ionic seric", "", None, "CA-ION"),
+        ("^ 25-OH Vitamina D", "", None, "VITD"),
+        ("Proteina C reactiva (CRP) - cantitativ", "", None, "CRP"),
+        ("Hemoglbina eritrocitara medie", "", None, "MCH"),          # greșeală de tipar
+        ("Colesterol HDL seric", "", None, "HDL"),
+        ("Neutrofile", "smartlabs", None, "NEUT%"),
+        ("Neutrofile", "Elite Medical", None, "NEUT"),
+        ("Neutrofile", "", None, None),
+        ("Data cerere:", "", None, None),
+        ("Pagina 1 din", "", None, None),
+    ]
+    erori = 0
+    for nume, laborator, cod, asteptat in exemple:
+        gasit = rezolva_cod(nume, laborator, cod)
+        ok = gasit == asteptat
+        erori += not ok
+        eticheta = f"{nume} @{laborator}" if laborator else nume
+        print(f"  {'✓' if ok else '✗'} {eticheta[:52]:<52} -> {gasit}")
+    assert erori == 0, f"{erori} rezolvări greșite"
+
+    # Costul per denumire, cu mii de intrări în dicționar
+    print(f"\n{'='*70}")
+    print("COST PER DENUMIRE")
+    print(f"{'='*70}")
+    nume_test = [nume for nume, _, _, _ in exemple]
+    for n in (0, 5_000, 20_000):
+        mare = _dictionar_sintetic(n)
+        for eticheta, cautare in [
+            ("exact", lambda: [mare.rezolva("Nr. eritrocite") for _ in range(1000)]),
+            ("cod din paranteză", lambda: [mare.rezolva("Hemoglobina (HGB)") for _ in range(1000)]),
+            ("fuzzy", lambda: [mare.rezolva("Hemoglbina eritrocitara medie") for _ in range(1000)]),
+            ("toate exemplele", lambda: [mare.rezolva(x) for x in nume_test for _ in range(40)]),
+        ]:
+            start = time.perf_counter()
+            rezultate = cautare()
+            us = (time.perf_counter() - start) / len(rezultate) * 1e6
+            print(f"  {len(mare):>6} intrări  {eticheta:<20} {us:>8.2f} µs")
+    rezolva_cod.cache_clear()
+    start = time.perf_counter()
+    for _ in range(1000):
+        for x in nume_test:
+            rezolva_cod(x)
+    us = (time.perf_counter() - start) / (1000 * len(nume_test)) * 1e6
+    print(f"  {'cache LRU':<35} {us:>8.2f} µs  ({rezolva_cod.cache_info().hits} hit-uri)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
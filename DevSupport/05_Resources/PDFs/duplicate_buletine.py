@@ -0,0 +1,312 @@
+"""
+Index de Buletine Duplicate
+===========================
+Același buletin ajunge pe mai multe căi (PDF primit pe e-mail, rescanare,
+descărcare din portalul laboratorului) și fiecare copie era parsată și
+importată din nou. Indexul ține două chei, ambele căutate în O(1)
+(dicționare în memorie, persistate în SQLite):
+
+- hash-ul conținutului fișierului (sha256): un fișier identic nu mai este
+  parsat - se întoarce direct rezultatul original
+- cheia semantică: laborator, număr buletin, CNP, data recoltării (ISO) și
+  analizele sortate (cod / nume, rezultat) - același buletin într-un fișier
+  diferit (regenerat de portal, resalvat) este recunoscut după parsare și
+  nu mai este importat; hash-ul noului fișier este reținut ca alias, deci a
+  doua oară nici nu mai este parsat
+
+Un duplicat este raportat ca Duplicat: id-ul și fișierul originalului și
+motivul ('continut' / 'semantic'). Rezultatul original (BuletinResult) este
+păstrat comprimat în index.
+
+Folosit de LaboratorParser.parse_pdf(duplicate=...), de api_analize (variabila
+de mediu ANALIZE_DUPLICATE) și de batch_analize (--duplicate).
+
+Utilizare:
+    with IndexDuplicate("duplicate_buletine.sqlite") as index:
+        result = parser.parse_pdf(pdf, duplicate=index)
+
+Test (fără argumente): python duplicate_buletine.py
+"""
+
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+import zlib
+from dataclasses import asdict, dataclass, fields
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from manifest_procesare import hash_continut
+from stocare_rezultate import data_iso
+
+DUPLICATE_PATH = Path(__file__).with_name("duplicate_buletine.sqlite")
+
+# Variabila de mediu cu calea indexului pentru API
+DUPLICATE_ENV = 'ANALIZE_DUPLICATE'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS originale (
+    id          INTEGER PRIMARY KEY,
+    cheie       TEXT UNIQUE,
+    fisier      TEXT NOT NULL,
+    laborator   TEXT NOT NULL DEFAULT '',
+    rezultat    BLOB,
+    inregistrat REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fisiere (
+    hash        TEXT PRIMARY KEY,
+    original_id INTEGER NOT NULL REFERENCES originale(id),
+    fisier      TEXT NOT NULL
+);
+"""
+
+
+@dataclass(slots=True)
+class Duplicat:
+    """Originalul unui buletin recunoscut ca duplicat"""
+    id: int
+    fisier: str
+    laborator: str
+    motiv: str  # 'continut', 'semantic'
+
+
+def cheie_semantica(result) -> Optional[str]:
+    """sha256 peste (laborator, număr, CNP, dată ISO, analize sortate); None fără analize"""
+    if not result.analize:
+        return None
+    if hasattr(result, 'laborator_detectat'):  # BuletinAnalize (v2 / universal)
+        antet = (result.buletin.laborator or result.laborator_detectat, result.buletin.numar_buletin,
+                 result.pacient.cnp, data_iso(result.buletin.data_recoltare))
+    else:
+        antet = (result.laborator, result.numar_buletin, result.pacient_cnp, data_iso(result.data_recoltare))
+    analize = sorted((a.cod_analiza or a.nume_analiza, a.rezultat) for a in result.analize)
+    continut = json.dumps([antet, analize], ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(continut.encode('utf-8')).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _campuri(cls) -> tuple:
+    return tuple(f.name for f in fields(cls))
+
+
+def _comprima(result) -> bytes:
+    """Rezultatul ca JSON comprimat; ca asdict, dar fără deepcopy (câmpurile sunt scalari și liste de șiruri)"""
+    date = {nume: getattr(result, nume) for nume in _campuri(type(result))}
+    date['analize'] = [{nume: getattr(a, nume) for nume in _campuri(type(a))} for a in result.analize]
+    return zlib.compress(json.dumps(date, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+# =============================================================================
+# INDEX
+# =============================================================================
+
+class IndexDuplicate:
+    """Hash conținut / cheie semantică -> buletinul original"""
+
+    def __init__(self, path: Union[str, Path] = DUPLICATE_PATH):
+        self.path = str(path)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        # Cheile încărcate în memorie: căutarea nu atinge baza
+        self._originale: Dict[int, Duplicat] = {
+            id_: Duplicat(id_, fisier, laborator, '')
+            for id_, fisier, laborator in self._db.execute("SELECT id, fisier, laborator FROM originale")}
+        self._hashuri: Dict[str, int] = dict(self._db.execute("SELECT hash, original_id FROM fisiere"))
+        self._chei: Dict[str, int] = dict(self._db.execute(
+            "SELECT cheie, id FROM originale WHERE cheie IS NOT NULL"))
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._originale)
+
+    def commit(self):
+        self._db.commit()
+
+    def _duplicat(self, id_: int, motiv: str) -> Duplicat:
+        original = self._originale[id_]
+        return Duplicat(original.id, original.fisier, original.laborator, motiv)
+
+    # -------------------------------------------------------------------------
+    # Căutare
+    # -------------------------------------------------------------------------
+
+    def cauta_hash(self, hash_: str, laborator: Optional[str] = None) -> Optional[Duplicat]:
+        """Cu laborator: doar originalele parsate cu același parser"""
+        id_ = self._hashuri.get(hash_)
+        if id_ is None or (laborator and self._originale[id_].laborator != laborator):
+            return None
+        return self._duplicat(id_, 'continut')
+
+    def cauta_fisier(self, path: Union[str, Path]) -> Optional[Duplicat]:
+        return self.cauta_hash(hash_continut(str(path)))
+
+    def cauta_rezultat(self, result) -> Optional[Duplicat]:
+        cheie = cheie_semantica(result)
+        id_ = self._chei.get(cheie) if cheie else None
+        return None if id_ is None else self._duplicat(id_, 'semantic')
+
+    def rezultat(self, id_: int):
+        """BuletinResult-ul original (None dacă nu a fost păstrat)"""
+        from export_flux import buletin_din_dict
+        rand = self._db.execute("SELECT rezultat FROM originale WHERE id = ?", (id_,)).fetchone()
+        if rand is None or rand[0] is None:
+            return None
+        return buletin_din_dict(json.loads(zlib.decompress(rand[0])))
+
+    # -------------------------------------------------------------------------
+    # Înregistrare
+    # -------------------------------------------------------------------------
+
+    def inregistreaza(self, fisier: Union[str, Path], result, laborator: str = "",
+                      hash_: Optional[str] = None, commit: bool = True) -> Optional[Duplicat]:
+        """
+        Înregistrează un fișier parsat. Dacă buletinul este deja cunoscut
+        (același conținut sau aceeași cheie semantică) întoarce originalul, iar
+        hash-ul fișierului devine alias al lui; altfel fișierul devine original.
+        """
+        fisier = str(fisier)
+        hash_ = hash_ or hash_continut(fisier)
+        duplicat = self.cauta_hash(hash_, laborator)
+        if duplicat is not None:
+            return duplicat
+        cheie = cheie_semantica(result)
+        id_ = self._chei.get(cheie) if cheie else None
+        if id_ is not None:
+            duplicat = self._duplicat(id_, 'semantic')
+        else:
+            rezultat = None if hasattr(result, 'laborator_detectat') else _comprima(result)
+            id_ = self._db.execute(
+                "INSERT INTO originale (cheie, fisier, laborator, rezultat, inregistrat) VALUES (?, ?, ?, ?, ?)",
+                (cheie, fisier, laborator, rezultat, time.time())).lastrowid
+            self._originale[id_] = Duplicat(id_, fisier, laborator, '')
+            if cheie:
+                self._chei[cheie] = id_
+        self._db.execute("INSERT OR REPLACE INTO fisiere VALUES (?, ?, ?)", (hash_, id_, fisier))
+        self._hashuri[hash_] = id_
+        if commit:
+            self._db.commit()
+        return duplicat
+
+    def parseaza(self, parser, pdf_path: str):
+        """
+        parser.parse_pdf cu verificarea duplicatelor: un fișier cunoscut (același
+        parser) nu este parsat, iar pentru un duplicat se întoarce rezultatul
+        original, cu originalul menționat în warnings. Un rezultat fără analize
+        (parser greșit, parsare eșuată) nu este înregistrat.
+        """
+        hash_ = hash_continut(pdf_path)
+        duplicat = self.cauta_hash(hash_, parser.KEY)
+        if duplicat is None:
+            result = parser.parse_pdf(pdf_path)
+            if not result.analize:
+                return result
+            duplicat = self.inregistreaza(pdf_path, result, parser.KEY, hash_)
+            if duplicat is None:
+                return result
+        original = self.rezultat(duplicat.id)
+        if original is None:
+            original = parser.parse_pdf(pdf_path)
+        original.warnings.append(f"Duplicat ({duplicat.motiv}) al {duplicat.fisier}")
+        return original
+
+
+# =============================================================================
+# MAIN - TEST
+# =============================================================================
+
+def main():
+    import dataclasses
+    import random
+    import tempfile
+    from parsere_laboratoare import _import_fitz, get_parser
+
+    fitz = _import_fitz()
+    if fitz is None:
+        print("❌ PyMuPDF nu este instalat")
+        return 1
+
+    pdf_dir = Path(__file__).parent
+    parser = get_parser('clinica_sante')
+    original = str(pdf_dir / 'AnalizeMedicale.pdf')
+    copie = str(pdf_dir / 'AnalizeMedicale - Copy.pdf')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Același buletin, alt fișier: PDF-ul resalvat (octeți diferiți, același conținut)
+        resalvat = str(Path(tmp) / 'AnalizeMedicale-portal.pdf')
+        with fitz.open(original) as doc:
+            doc.save(resalvat, garbage=4, deflate=True)
+
+        with IndexDuplicate(Path(tmp) / 'duplicate.sqlite') as index:
+            # Un parser greșit (0 analize) nu devine originalul conținutului
+            gresit = get_parser('elite_medical').parse_pdf(original, duplicate=index)
+            start = time.perf_counter()
+            result = parser.parse_pdf(original, duplicate=index)
+            durata_parsare = time.perf_counter() - start
+            ok = not gresit.analize and result.analize and not any('Duplicat' in w for w in result.warnings)
+            print(f"\n{'✅' if ok else '❌'} Parser greșit înainte ({len(gresit.analize)} analize): neînregistrat")
+            print(f"📄 Original: {len(result.analize)} analize, parsat în {durata_parsare * 1e3:.1f} ms")
+
+            start = time.perf_counter()
+            dublura = parser.parse_pdf(copie, duplicate=index)
+            durata = time.perf_counter() - start
+            ok = asdict(dublura)['analize'] == asdict(result)['analize'] and 'continut' in dublura.warnings[-1]
+            print(f"{'✅' if ok else '❌'} Copie identică: fără parsare, {durata * 1e3:.1f} ms - {dublura.warnings[-1]}")
+
+            dublura = parser.parse_pdf(resalvat, duplicate=index)
+            ok = asdict(dublura)['analize'] == asdict(result)['analize'] and 'semantic' in dublura.warnings[-1]
+            print(f"{'✅' if ok else '❌'} PDF resalvat: recunoscut după parsare - {dublura.warnings[-1]}")
+            start = time.perf_counter()
+            dublura = parser.parse_pdf(resalvat, duplicate=index)
+            durata = time.perf_counter() - start
+            ok = 'continut' in dublura.warnings[-1]
+            print(f"{'✅' if ok else '❌'} PDF resalvat, a doua oară: alias de hash, fără parsare "
+                  f"({durata * 1e3:.1f} ms)")
+
+        # Căutări la scară: 100k buletine înregistrate
+        n = 100_000
+        rng = random.Random(0)
+        path = Path(tmp) / 'mare.sqlite'
+        with IndexDuplicate(path) as index:
+            start = time.perf_counter()
+            for i in range(n):
+                b = dataclasses.replace(result, numar_buletin=str(i), pacient_cnp=f"2{i:012d}")
+                index.inregistreaza(f"/arhiva/{i}.pdf", b, 'clinica_sante', hash_=f"{i:064x}", commit=False)
+            index.commit()
+            durata = time.perf_counter() - start
+            print(f"\n💾 {n:,} buletine înregistrate în {durata:.1f} s ({n / durata:,.0f}/s)")
+
+        start = time.perf_counter()
+        index = IndexDuplicate(path)
+        durata_deschidere = time.perf_counter() - start
+        cereri = [rng.randrange(2 * n) for _ in range(20_000)]
+        start = time.perf_counter()
+        gasite = sum(index.cauta_hash(f"{i:064x}") is not None for i in cereri)
+        durata_hash = (time.perf_counter() - start) / len(cereri) * 1e6
+        buletine = [dataclasses.replace(result, numar_buletin=str(i), pacient_cnp=f"2{i:012d}") for i in cereri]
+        start = time.perf_counter()
+        gasite_semantic = sum(index.cauta_rezultat(b) is not None for b in buletine)
+        durata_cheie = (time.perf_counter() - start) / len(cereri) * 1e6
+        index.close()
+        asteptat = sum(i < n for i in cereri)
+        ok = gasite == gasite_semantic == asteptat
+        print(f"{'✅' if ok else '❌'} Deschidere {durata_deschidere * 1e3:.0f} ms; căutare hash {durata_hash:.2f} µs, "
+              f"cheie semantică {durata_cheie:.1f} µs (cu calculul cheii); parsare {durata_parsare * 1e3:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
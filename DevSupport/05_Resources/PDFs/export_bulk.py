@@ -0,0 +1,428 @@
+"""
+Export pentru Încărcare în Masă (bulk load) în baza ValyanClinic
+================================================================
+to_valyan_format produce câte un dict per analiză, iar importul .NET le
+inserează unul câte unul - partea cea mai lentă a unui import istoric mare.
+Modulul scrie în schimb fișiere gata de BULK INSERT / bcp:
+- bucăți (chunk-uri) TSV UTF-8 de cel mult RANDURI_CHUNK analize, fără antet,
+  terminator de linie CRLF; coloanele = BatchId, Rand, câmpurile ImportFormat
+  (aceeași ordine ca în api_analize.py) și PacientCNP
+- fiecare bucată are un BatchId (GUID) stabil: uuid5(id lot, număr bucată) -
+  reîncărcarea aceleiași bucăți înseamnă DELETE WHERE BatchId + BULK INSERT,
+  deci importul este idempotent
+- format.xml: fișierul de format bcp (XML) cu tipurile coloanelor
+- import.sql: tabela de staging (ImportAnalizeStaging) și câte un
+  BULK INSERT per bucată
+- lot.json: bucățile, BatchId-urile, numărul de rânduri și sha256
+
+TSV în loc de CSV: formatul caracter al bcp nu cunoaște ghilimele, așa că
+tab-urile și capetele de linie din texte sunt înlocuite cu spații. Câmpurile
+goale / None devin NULL (KEEPNULLS). Textele mai lungi decât coloana sunt
+trunchiate, ca încărcarea să nu cadă pe o singură valoare.
+
+Scrierea este în flux (memoria nu depinde de mărimea lotului), iar
+incarca_sqlite încarcă un lot într-o schemă SQLite echivalentă, pentru
+verificare locală fără SQL Server.
+
+Utilizare:
+    with ExportBulk("bulk/", id_lot="import-2024") as out:
+        for pdf in fisiere:
+            out.scrie(parser.parse_pdf(pdf))
+    incarca_sqlite("bulk/", "staging.sqlite")
+
+    python export_bulk.py rezultate.ndjson -o bulk/ --lot import-2024
+
+Test (fără argumente): python export_bulk.py
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from export_flux import COLOANE_IMPORT, buletin_din_dict, randuri_import
+
+RANDURI_CHUNK = 100_000
+
+TABEL_STAGING = 'ImportAnalizeStaging'
+
+# Spațiul de nume pentru BatchId-uri (uuid5): același lot + aceeași bucată -> același GUID
+SPATIU_BATCH = uuid.UUID('6f1d3c2e-8a4b-5c9d-9e7f-0a1b2c3d4e5f')
+
+SEPARATOR = '\t'
+TERMINATOR = '\r\n'
+
+# tip -> (SQL Server, tip bcp, SQLite)
+_TIPURI = {
+    'guid': ('UNIQUEIDENTIFIER', 'SQLUNIQUEID', 'TEXT'),
+    'int': ('INT', 'SQLINT', 'INTEGER'),
+    'text': ('NVARCHAR({})', 'SQLNVARCHAR', 'TEXT'),
+    'real': ('FLOAT', 'SQLFLT8', 'REAL'),
+    'bit': ('BIT', 'SQLBIT', 'INTEGER'),
+}
+
+# (coloană, tip, lungime maximă pentru text); câmpurile ImportFormat în ordinea din api_analize.py
+COLOANE_BULK: Tuple[Tuple[str, str, Optional[int]], ...] = (
+    ('BatchId', 'guid', None),
+    ('Rand', 'int', None),
+    ('NumeAnaliza', 'text', 200),
+    ('CodAnaliza', 'text', 50),
+    ('TipAnaliza', 'text', 100),
+    ('Valoare', 'text', 200),
+    ('ValoareNumerica', 'real', None),
+    ('UnitatiMasura', 'text', 50),
+    ('ValoareNormalaMin', 'real', None),
+    ('ValoareNormalaMax', 'real', None),
+    ('ValoareNormalaText', 'text', 200),
+    ('EsteInAfaraLimitelor', 'bit', None),
+    ('DirectieAnormal', 'text', 10),
+    ('DataRecoltare', 'text', 20),
+    ('Laborator', 'text', 100),
+    ('NumarBuletin', 'text', 50),
+    ('ValoareNumericaCanonic', 'real', None),
+    ('UnitatiMasuraCanonic', 'text', 50),
+    ('ValoareNormalaMinCanonic', 'real', None),
+    ('ValoareNormalaMaxCanonic', 'real', None),
+    ('PacientCNP', 'text', 20),
+)
+
+assert tuple(c for c, _, _ in COLOANE_BULK[2:-1]) == COLOANE_IMPORT
+
+_FARA_SEPARATORI = str.maketrans({'\t': ' ', '\r': ' ', '\n': ' '})
+
+
+def batch_id(id_lot: str, numar: int) -> str:
+    """GUID-ul stabil al bucății numar din lotul id_lot"""
+    return str(uuid.uuid5(SPATIU_BATCH, f"{id_lot}/{numar}"))
+
+
+def _text(valoare, tip: str, lungime: Optional[int]) -> str:
+    """Valoarea ca text TSV: '' pentru None, 1/0 pentru bit, repr pentru numere"""
+    if valoare is None:
+        return ''
+    if tip == 'bit':
+        return '1' if valoare else '0'
+    if tip == 'real':
+        valoare = float(valoare)
+        return repr(valoare) if math.isfinite(valoare) else ''
+    text = str(valoare).translate(_FARA_SEPARATORI)
+    return text[:lungime] if lungime else text
+
+
+def _pacient_cnp(result) -> str:
+    if hasattr(result, 'laborator_detectat'):  # BuletinAnalize (v2 / universal)
+        return result.pacient.cnp
+    return result.pacient_cnp
+
+
+# =============================================================================
+# FIȘIER DE FORMAT / SQL
+# =============================================================================
+
+def format_xml(coloane=COLOANE_BULK) -> str:
+    """Fișierul de format bcp (XML) pentru bucățile TSV"""
+    campuri, randuri = [], []
+    for i, (nume, tip, lungime) in enumerate(coloane, 1):
+        terminator = r'\r\n' if i == len(coloane) else r'\t'
+        # MAX_LENGTH e în octeți, iar un caracter UTF-8 are până la 4
+        maxim = f' MAX_LENGTH="{lungime * 4}"' if lungime else ''
+        campuri.append(f'  <FIELD ID="{i}" xsi:type="CharTerm" TERMINATOR="{terminator}"{maxim}/>')
+        randuri.append(f'  <COLUMN SOURCE="{i}" NAME="{nume}" xsi:type="{_TIPURI[tip][1]}"/>')
+    return ('<?xml version="1.0"?>\n'
+            '<BCPFORMAT xmlns="http://schemas.microsoft.com/sqlserver/2004/bulkload/format" '
+            'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">\n'
+            ' <RECORD>\n' + '\n'.join(campuri) + '\n </RECORD>\n'
+            ' <ROW>\n' + '\n'.join(randuri) + '\n </ROW>\n'
+            '</BCPFORMAT>\n')
+
+
+def schema_sqlserver(tabel: str = TABEL_STAGING) -> str:
+    """CREATE TABLE pentru tabela de staging din SQL Server"""
+    coloane = []
+    for nume, tip, lungime in COLOANE_BULK:
+        tip_sql = _TIPURI[tip][0].format(lungime)
+        coloane.append(f"    [{nume}] {tip_sql} {'NOT NULL' if nume in ('BatchId', 'Rand') else 'NULL'}")
+    return (f"IF OBJECT_ID(N'[dbo].[{tabel}]', N'U') IS NULL\n"
+            f"BEGIN\n"
+            f"CREATE TABLE [dbo].[{tabel}]\n(\n" + ',\n'.join(coloane) + ",\n"
+            f"    CONSTRAINT [PK_{tabel}] PRIMARY KEY CLUSTERED ([BatchId], [Rand])\n)\n"
+            f"END\nGO\n")
+
+
+def schema_sqlite(tabel: str = TABEL_STAGING) -> str:
+    """Aceeași tabelă de staging, în SQLite (verificare locală)"""
+    coloane = [f"    {nume} {_TIPURI[tip][2]}{' NOT NULL' if nume in ('BatchId', 'Rand') else ''}"
+               for nume, tip, _ in COLOANE_BULK]
+    return (f"CREATE TABLE IF NOT EXISTS {tabel} (\n" + ',\n'.join(coloane) +
+            ",\n    PRIMARY KEY (BatchId, Rand)\n);\n")
+
+
+def _sql_text(text: str) -> str:
+    return "'" + text.replace("'", "''") + "'"
+
+
+def script_import(bucati: Sequence[Dict], director: str, tabel: str = TABEL_STAGING) -> str:
+    """import.sql: schema de staging + DELETE / BULK INSERT per bucată (reluabil)"""
+    format_path = os.path.join(director, 'format.xml')
+    linii = [schema_sqlserver(tabel)]
+    for b in bucati:
+        linii.append(
+            f"BEGIN TRANSACTION;\n"
+            f"DELETE FROM [dbo].[{tabel}] WHERE [BatchId] = '{b['batch_id']}';\n"
+            f"BULK INSERT [dbo].[{tabel}] FROM {_sql_text(os.path.join(director, b['fisier']))}\n"
+            f"    WITH (FORMATFILE = {_sql_text(format_path)}, CODEPAGE = '65001', KEEPNULLS, TABLOCK);\n"
+            f"COMMIT;\nGO\n")
+    return '\n'.join(linii)
+
+
+# =============================================================================
+# EXPORT
+# =============================================================================
+
+class ExportBulk:
+    """Bucăți TSV gata de BULK INSERT, scrise în flux, cu format.xml / import.sql / lot.json"""
+
+    def __init__(self, director: Union[str, Path], id_lot: Optional[str] = None,
+                 randuri_chunk: int = RANDURI_CHUNK, tabel: str = TABEL_STAGING):
+        self.director = Path(director)
+        self.director.mkdir(parents=True, exist_ok=True)
+        self.id_lot = id_lot or self.director.resolve().name
+        self.randuri_chunk = randuri_chunk
+        self.tabel = tabel
+        self.bucati: List[Dict] = []
+        self.buletine = 0
+        self.randuri = 0
+        self._out = None
+        self._hash = None
+        self._in_bucata = 0
+        self._coloane = tuple((c, tip, lungime) for c, tip, lungime in COLOANE_BULK[2:])
+
+    def _deschide_bucata(self):
+        numar = len(self.bucati) + 1
+        self._bucata = {'fisier': f"analize-{numar:05d}.tsv", 'batch_id': batch_id(self.id_lot, numar)}
+        # Scris sub .tmp și redenumit la închidere: o bucată din lot.json este completă
+        self._out = open(self.director / (self._bucata['fisier'] + '.tmp'), 'wb', buffering=1 << 20)
+        self._hash = hashlib.sha256()
+        self._in_bucata = 0
+
+    def _inchide_bucata(self):
+        self._out.close()
+        tmp = self.director / (self._bucata['fisier'] + '.tmp')
+        os.replace(tmp, self.director / self._bucata['fisier'])
+        self.bucati.append({**self._bucata, 'randuri': self._in_bucata, 'sha256': self._hash.hexdigest()})
+        self._out = None
+
+    def scrie(self, result) -> int:
+        """Scrie analizele unui rezultat; întoarce numărul de rânduri"""
+        if isinstance(result, dict):
+            result = buletin_din_dict(result)
+        cnp = _pacient_cnp(result) or ''
+        randuri = randuri_import(result)
+        self.buletine += 1
+        for r in randuri:
+            if self._out is None:
+                self._deschide_bucata()
+            self._in_bucata += 1
+            valori = [r.get(c) for c, _, _ in self._coloane[:-1]] + [cnp]
+            linie = SEPARATOR.join([self._bucata['batch_id'], str(self._in_bucata)] +
+                                   [_text(v, tip, lungime) for v, (_, tip, lungime) in zip(valori, self._coloane)])
+            date = (linie + TERMINATOR).encode('utf-8')
+            self._out.write(date)
+            self._hash.update(date)
+            if self._in_bucata >= self.randuri_chunk:
+                self._inchide_bucata()
+        self.randuri += len(randuri)
+        return len(randuri)
+
+    def scrie_toate(self, rezultate: Iterable) -> int:
+        return sum(self.scrie(r) for r in rezultate)
+
+    def close(self):
+        if self._out is not None:
+            self._inchide_bucata()
+        (self.director / 'format.xml').write_text(format_xml(), encoding='utf-8')
+        (self.director / 'import.sql').write_text(
+            script_import(self.bucati, str(self.director.resolve()), self.tabel), encoding='utf-8')
+        lot = {'id_lot': self.id_lot, 'tabel': self.tabel, 'coloane': [c for c, _, _ in COLOANE_BULK],
+               'buletine': self.buletine, 'randuri': self.randuri, 'bucati': self.bucati}
+        (self.director / 'lot.json').write_text(json.dumps(lot, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# =============================================================================
+# ÎNCĂRCARE LOCALĂ (SQLITE)
+# =============================================================================
+
+def citeste_bucata(path: Union[str, Path]) -> Iterable[Tuple]:
+    """Rândurile unei bucăți TSV, cu tipurile din COLOANE_BULK (NULL pentru câmpuri goale)"""
+    conversii = {'int': int, 'real': float, 'bit': int}
+    tipuri = [conversii.get(tip) for _, tip, _ in COLOANE_BULK]
+    with open(path, encoding='utf-8', newline='') as f:
+        for linie in f:
+            campuri = linie[:-len(TERMINATOR)].split(SEPARATOR)
+            yield tuple(None if c == '' else (conv(c) if conv else c) for c, conv in zip(campuri, tipuri))
+
+
+def incarca_sqlite(director: Union[str, Path], db: Union[str, Path, sqlite3.Connection]) -> int:
+    """
+    Încarcă un lot în tabela de staging SQLite, la fel ca import.sql: per
+    bucată o tranzacție cu DELETE WHERE BatchId + inserare în masă. Verifică
+    sha256 din lot.json. Întoarce numărul de rânduri încărcate.
+    """
+    director = Path(director)
+    lot = json.loads((director / 'lot.json').read_text(encoding='utf-8'))
+    conn = db if isinstance(db, sqlite3.Connection) else sqlite3.connect(str(db), isolation_level=None)
+    try:
+        conn.executescript(schema_sqlite(lot['tabel']))
+        insert = (f"INSERT INTO {lot['tabel']} ({', '.join(lot['coloane'])}) "
+                  f"VALUES ({', '.join('?' * len(lot['coloane']))})")
+        total = 0
+        for b in lot['bucati']:
+            path = director / b['fisier']
+            with open(path, 'rb') as f:
+                if hashlib.file_digest(f, 'sha256').hexdigest() != b['sha256']:
+                    raise ValueError(f"{b['fisier']}: sha256 diferit de lot.json")
+            conn.execute("BEGIN")
+            try:
+                conn.execute(f"DELETE FROM {lot['tabel']} WHERE BatchId = ?", (b['batch_id'],))
+                conn.executemany(insert, citeste_bucata(path))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            total += b['randuri']
+        return total
+    finally:
+        if conn is not db:
+            conn.close()
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def cli(argv: Sequence[str]) -> int:
+    from export_flux import _rezultate
+
+    ap = argparse.ArgumentParser(prog="export_bulk.py",
+                                 description="Bucăți TSV + format bcp pentru BULK INSERT în ValyanClinic.")
+    ap.add_argument('intrari', nargs='+', help="ieșiri batch_analize (*.ndjson[.gz|.zst]), directoare sau PDF-uri")
+    ap.add_argument('-o', '--iesire', required=True, help="directorul lotului")
+    ap.add_argument('--lot', help="id-ul lotului (implicit: numele directorului); dă BatchId-urile")
+    ap.add_argument('--randuri', type=int, default=RANDURI_CHUNK, help="analize per bucată")
+    ap.add_argument('--tabel', default=TABEL_STAGING, help="tabela de staging din import.sql")
+    ap.add_argument('--sqlite', help="încarcă lotul și într-o bază SQLite (verificare)")
+    ap.add_argument('--fara-ocr', action='store_true')
+    args = ap.parse_args(argv)
+
+    with ExportBulk(args.iesire, id_lot=args.lot, randuri_chunk=args.randuri, tabel=args.tabel) as out:
+        out.scrie_toate(_rezultate(args.intrari, ocr=not args.fara_ocr))
+    print(f"💾 {out.buletine} buletine, {out.randuri} analize în {len(out.bucati)} bucăți -> {args.iesire}",
+          file=sys.stderr)
+    if args.sqlite:
+        print(f"🗄️ {incarca_sqlite(args.iesire, args.sqlite)} rânduri încărcate în {args.sqlite}", file=sys.stderr)
+    return 0
+
+
+# =============================================================================
+# MAIN - TEST
+# =============================================================================
+
+def main():
+    if len(sys.argv) > 1:
+        return cli(sys.argv[1:])
+
+    import tempfile
+    import time
+    import xml.etree.ElementTree as ET
+    from parsere_laboratoare import _import_fitz, get_parser, to_valyan_format
+
+    if _import_fitz() is None:
+        print("❌ PyMuPDF nu este instalat")
+        return 1
+
+    pdf_dir = Path(__file__).parent
+    rezultate = [get_parser(key).parse_pdf(str(pdf_dir / nume)) for key, nume in (
+        ('clinica_sante', 'AnalizeMedicale.pdf'),
+        ('smartlabs', '1111200901011bolnavul.pdf'),
+        ('elite_medical', 'analize-b-51-ro.pdf'),
+    )]
+    n = 3000
+    toate = [rezultate[i % len(rezultate)] for i in range(n)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        director = Path(tmp) / 'lot'
+        start = time.perf_counter()
+        with ExportBulk(director, id_lot='test', randuri_chunk=10_000) as out:
+            out.scrie_toate(toate)
+        durata = time.perf_counter() - start
+        marime = sum((director / b['fisier']).stat().st_size for b in out.bucati)
+        print(f"\n💾 Export: {out.randuri:,} analize / {out.buletine:,} buletine în {len(out.bucati)} bucăți, "
+              f"{durata * 1e3:.0f} ms ({marime / 1e6:.1f} MB)")
+        ET.parse(director / 'format.xml')
+        print(f"✅ format.xml valid ({len(COLOANE_BULK)} coloane), import.sql: "
+              f"{(director / 'import.sql').read_text(encoding='utf-8').count('BULK INSERT')} BULK INSERT")
+
+        # Reîncărcare = aceleași BatchId-uri, deci nimic dublat
+        with ExportBulk(Path(tmp) / 'lot2', id_lot='test', randuri_chunk=10_000) as out2:
+            out2.scrie_toate(toate)
+        ok = [b['batch_id'] for b in out2.bucati] == [b['batch_id'] for b in out.bucati]
+        print(f"{'✅' if ok else '❌'} BatchId-uri stabile la regenerarea lotului")
+
+        # Referință: un INSERT + commit per analiză, ca importul actual rând cu rând
+        db = Path(tmp) / 'rand.sqlite'
+        conn = sqlite3.connect(str(db), isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(schema_sqlite())
+        coloane = [c for c, _, _ in COLOANE_BULK]
+        insert = f"INSERT INTO {TABEL_STAGING} ({', '.join(coloane)}) VALUES ({', '.join('?' * len(coloane))})"
+        start = time.perf_counter()
+        rand = 0
+        for r in toate:
+            for a in to_valyan_format(r):
+                rand += 1
+                conn.execute(insert, ['rand', rand] + [a[c] for c in COLOANE_IMPORT] + [r.pacient_cnp])
+        durata_rand = time.perf_counter() - start
+        conn.close()
+
+        db = Path(tmp) / 'bulk.sqlite'
+        conn = sqlite3.connect(str(db), isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        start = time.perf_counter()
+        incarcate = incarca_sqlite(director, conn)
+        durata_bulk = time.perf_counter() - start
+        print(f"\n🗄️ SQLite rând cu rând: {rand:,} analize în {durata_rand:.2f} s "
+              f"({rand / durata_rand:,.0f}/s)")
+        print(f"🗄️ SQLite în masă:     {incarcate:,} analize în {durata_bulk:.2f} s "
+              f"({incarcate / durata_bulk:,.0f}/s) -> x{durata_rand / durata_bulk:.1f}")
+
+        # Reluare: aceleași bucăți încărcate din nou nu dublează nimic
+        incarca_sqlite(director, conn)
+        total = conn.execute(f"SELECT COUNT(*) FROM {TABEL_STAGING}").fetchone()[0]
+        print(f"{'✅' if total == out.randuri else '❌'} Reîncărcare idempotentă: {total:,} rânduri")
+
+        # Valorile încărcate = to_valyan_format
+        asteptat = [a for r in rezultate for a in to_valyan_format(r)]
+        cursor = conn.execute(f"SELECT {', '.join(COLOANE_IMPORT)} FROM {TABEL_STAGING} "
+                              f"WHERE BatchId = ? ORDER BY Rand LIMIT ?", (out.bucati[0]['batch_id'], len(asteptat)))
+        citite = [dict(zip(COLOANE_IMPORT, rand)) for rand in cursor]
+        ok = all(c[k] == (int(a[k]) if isinstance(a[k], bool) else (a[k] if a[k] != '' else None))
+                 for c, a in zip(citite, asteptat) for k in COLOANE_IMPORT)
+        print(f"{'✅' if ok else '❌'} Round-trip TSV -> SQLite identic cu to_valyan_format")
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,362 @@
+"""
+Export în Flux (NDJSON / CSV, opțional gzip / zstd)
+===================================================
+Scriitori pentru exporturi de volum mare, alimentați cu rezultatele pe
+măsură ce sosesc - memoria rămâne constantă indiferent de mărimea corpusului
+(nu se mai construiește lista completă pentru un json.dump final):
+- ScriitorNDJSON: o linie per buletin (nivel='buletin') sau per analiză
+  (nivel='analiza', câmpurile formatului de import ValyanClinic)
+- ScriitorCSV: o linie per analiză, exact coloanele ImportFormat din
+  api_analize.py, cu antet
+- compresia se alege după extensie: .gz (gzip, stdlib) sau .zst (zstd,
+  pachetul opțional zstandard)
+- scrierile trec printr-un buffer de TAMPON octeți înainte de compresor / disc
+
+Acceptă orice rezultat din proiect: BuletinResult (parsere_laboratoare),
+BuletinAnalize (analize_parser_v2 / analize_parser_universal) sau
+înregistrările NDJSON ale batch_analize.
+
+Utilizare:
+    with scriitor("analize.csv.gz") as out:
+        for pdf in fisiere:
+            out.scrie(parser.parse_pdf(pdf))
+
+    python export_flux.py rezultate.ndjson -o analize.csv.zst
+    python export_flux.py buletine/ -o buletine.ndjson.gz --nivel buletin
+
+Test (fără argumente): python export_flux.py
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import sys
+from abc import ABC, abstractmethod
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Sequence, TextIO, Union
+
+# Octeți acumulați înainte de a ajunge la compresor / disc
+TAMPON = 1 << 20
+
+NIVEL_GZIP = 6
+NIVEL_ZSTD = 3
+
+# Ordinea coloanelor din ImportFormat (api_analize.py)
+COLOANE_IMPORT = (
+    'NumeAnaliza', 'CodAnaliza', 'TipAnaliza', 'Valoare', 'ValoareNumerica',
+    'UnitatiMasura', 'ValoareNormalaMin', 'ValoareNormalaMax', 'ValoareNormalaText',
+    'EsteInAfaraLimitelor', 'DirectieAnormal', 'DataRecoltare', 'Laborator', 'NumarBuletin',
+    'ValoareNumericaCanonic', 'UnitatiMasuraCanonic', 'ValoareNormalaMinCanonic', 'ValoareNormalaMaxCanonic',
+)
+
+NIVELURI = ('buletin', 'analiza')
+
+
+# =============================================================================
+# FLUXURI (COMPRESIE DUPĂ EXTENSIE)
+# =============================================================================
+
+def _import_zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Exportul .zst necesită pachetul zstandard (pip install zstandard)") from None
+    return zstandard
+
+
+def compresie(path: Union[str, Path]) -> str:
+    """'gzip', 'zstd' sau '' după extensia fișierului"""
+    sufix = Path(path).suffix.lower()
+    return {'.gz': 'gzip', '.zst': 'zstd'}.get(sufix, '')
+
+
+def deschide_scriere(path: Union[str, Path]) -> BinaryIO:
+    """Flux binar de scriere, comprimat după extensie, cu buffer de TAMPON octeți"""
+    tip = compresie(path)
+    if tip == 'gzip':
+        # gzip.open deține fișierul: close() închide și fluxul de pe disc
+        return io.BufferedWriter(gzip.open(path, 'wb', compresslevel=NIVEL_GZIP), buffer_size=TAMPON)
+    zstd = _import_zstd() if tip == 'zstd' else None    # înainte de a crea fișierul
+    fisier = open(path, 'wb', buffering=TAMPON)
+    if tip == 'zstd':
+        return io.BufferedWriter(zstd.ZstdCompressor(level=NIVEL_ZSTD).stream_writer(fisier, closefd=True),
+                                 buffer_size=TAMPON)
+    return fisier
+
+
+def deschide_citire(path: Union[str, Path]) -> TextIO:
+    """Flux text de citire (NDJSON / CSV), decomprimat după extensie"""
+    tip = compresie(path)
+    if tip == 'gzip':
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    if tip == 'zstd':
+        reader = _import_zstd().ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True,
+                                                                 closefd=True)
+        return io.TextIOWrapper(io.BufferedReader(reader, buffer_size=TAMPON), encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+# =============================================================================
+# CONVERSIE REZULTAT -> ÎNREGISTRĂRI
+# =============================================================================
+
+def buletin_din_dict(data: Dict):
+    """BuletinResult dintr-o înregistrare batch_analize (sau asdict(BuletinResult))"""
+    from parsere_laboratoare import AnalizaResult, BuletinResult
+    if 'fisier' in data:
+        data = data.get('rezultat') or {}
+    campuri = {k: v for k, v in data.items() if k != 'analize'}
+    return BuletinResult(**campuri, analize=[AnalizaResult(**a) for a in data.get('analize', ())])
+
+
+def randuri_import(result) -> List[Dict]:
+    """Analizele unui rezultat în formatul de import ValyanClinic"""
+    if isinstance(result, dict):
+        result = buletin_din_dict(result)
+    if hasattr(result, 'laborator_detectat'):
+        # BuletinAnalize (analize_parser_v2 / analize_parser_universal)
+        from unitati_masura import campuri_canonice
+        info = result.buletin
+        return [{
+            'NumeAnaliza': a.nume_analiza,
+            'CodAnaliza': a.cod_analiza,
+            'TipAnaliza': a.categorie,
+            'Valoare': a.rezultat,
+            'ValoareNumerica': a.rezultat_numeric,
+            'UnitatiMasura': a.unitate_masura,
+            'ValoareNormalaMin': a.interval_min,
+            'ValoareNormalaMax': a.interval_max,
+            'ValoareNormalaText': a.interval_referinta_text,
+            'EsteInAfaraLimitelor': a.este_anormal,
+            'DirectieAnormal': a.directie_anormal,
+            'DataRecoltare': info.data_recoltare,
+            'Laborator': result.laborator_detectat,
+            'NumarBuletin': info.numar_buletin,
+            **campuri_canonice(a)
+        } for a in result.analize]
+    from parsere_laboratoare import to_valyan_format
+    return to_valyan_format(result)
+
+
+def _inregistrare_buletin(result) -> Dict:
+    if isinstance(result, dict):
+        return result
+    return asdict(result) if is_dataclass(result) else dict(result)
+
+
+# =============================================================================
+# SCRIITORI
+# =============================================================================
+
+class _Scriitor(ABC):
+    """Baza scriitorilor: flux text UTF-8 peste deschide_scriere, context manager"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._out = io.TextIOWrapper(deschide_scriere(self.path), encoding='utf-8', newline='')
+        self.buletine = 0
+        self.randuri = 0
+
+    @abstractmethod
+    def scrie(self, result) -> int:
+        """Scrie un rezultat; întoarce numărul de linii scrise"""
+
+    def scrie_toate(self, rezultate: Iterable) -> int:
+        return sum(self.scrie(r) for r in rezultate)
+
+    def close(self):
+        if not self._out.closed:
+            self._out.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ScriitorNDJSON(_Scriitor):
+    """O linie JSON per buletin sau per analiză"""
+
+    def __init__(self, path: Union[str, Path], nivel: str = 'analiza'):
+        if nivel not in NIVELURI:
+            raise ValueError(f"Nivel necunoscut: {nivel} (permise: {', '.join(NIVELURI)})")
+        super().__init__(path)
+        self.nivel = nivel
+        self._json = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str).encode
+
+    def scrie(self, result) -> int:
+        self.buletine += 1
+        if self.nivel == 'buletin':
+            self._out.write(self._json(_inregistrare_buletin(result)) + '\n')
+            self.randuri += 1
+            return 1
+        randuri = randuri_import(result)
+        self._out.writelines(self._json(r) + '\n' for r in randuri)
+        self.randuri += len(randuri)
+        return len(randuri)
+
+
+class ScriitorCSV(_Scriitor):
+    """O linie per analiză, coloanele ImportFormat, cu antet"""
+
+    def __init__(self, path: Union[str, Path], coloane: Sequence[str] = COLOANE_IMPORT):
+        super().__init__(path)
+        self.coloane = tuple(coloane)
+        self._csv = csv.writer(self._out)
+        self._csv.writerow(self.coloane)
+
+    def scrie(self, result) -> int:
+        self.buletine += 1
+        randuri = randuri_import(result)
+        self._csv.writerows([r.get(c) for c in self.coloane] for r in randuri)
+        self.randuri += len(randuri)
+        return len(randuri)
+
+
+def scriitor(path: Union[str, Path], nivel: str = 'analiza') -> _Scriitor:
+    """ScriitorCSV pentru *.csv[.gz|.zst], altfel ScriitorNDJSON"""
+    baza = Path(path).name.lower()
+    if compresie(path):
+        baza = baza.rsplit('.', 1)[0]
+    if baza.endswith('.csv'):
+        if nivel != 'analiza':
+            raise ValueError("CSV-ul are doar nivelul 'analiza' (coloanele ImportFormat)")
+        return ScriitorCSV(path)
+    return ScriitorNDJSON(path, nivel)
+
+
+def citeste_ndjson(path: Union[str, Path]) -> Iterator[Dict]:
+    """Înregistrările unui NDJSON (comprimat sau nu), una câte una"""
+    with deschide_citire(path) as f:
+        for linie in f:
+            if linie.strip():
+                yield json.loads(linie)
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def _rezultate(intrari: Sequence[str], ocr: bool) -> Iterator:
+    """Rezultatele intrărilor: înregistrări NDJSON existente sau PDF-uri parsate pe rând"""
+    pdf = []
+    for intrare in intrari:
+        nume = Path(intrare).name.lower()
+        if compresie(intrare):
+            nume = nume.rsplit('.', 1)[0]
+        if nume.endswith(('.ndjson', '.jsonl')):
+            yield from (r for r in citeste_ndjson(intrare) if r.get('stare', 'ok') != 'eroare')
+        else:
+            pdf.append(intrare)
+    if pdf:
+        from batch_analize import enumera_pdf
+        from cascada_parsare import parseaza_automat
+        for fisier in enumera_pdf(pdf):
+            yield parseaza_automat(fisier, ocr=ocr).rezultat
+
+
+def cli(argv: Sequence[str]) -> int:
+    ap = argparse.ArgumentParser(prog="export_flux.py",
+                                 description="Export în flux NDJSON / CSV (opțional .gz / .zst).")
+    ap.add_argument('intrari', nargs='+', help="ieșiri batch_analize (*.ndjson[.gz|.zst]), directoare sau PDF-uri")
+    ap.add_argument('-o', '--iesire', required=True, help="*.ndjson / *.csv, opțional cu .gz sau .zst")
+    ap.add_argument('--nivel', choices=NIVELURI, default='analiza', help="o linie per buletin sau per analiză")
+    ap.add_argument('--fara-ocr', action='store_true')
+    args = ap.parse_args(argv)
+
+    with scriitor(args.iesire, args.nivel) as out:
+        out.scrie_toate(_rezultate(args.intrari, ocr=not args.fara_ocr))
+    print(f"💾 {out.buletine} buletine, {out.randuri} linii -> {args.iesire}", file=sys.stderr)
+    return 0
+
+
+# =============================================================================
+# MAIN - TEST
+# =============================================================================
+
+def main():
+    if len(sys.argv) > 1:
+        return cli(sys.argv[1:])
+
+    import tempfile
+    import time
+    import tracemalloc
+    from parsere_laboratoare import _import_fitz, get_parser
+
+    if _import_fitz() is None:
+        print("❌ PyMuPDF nu este instalat")
+        return 1
+
+    pdf_dir = Path(__file__).parent
+    rezultate = [get_parser(key).parse_pdf(str(pdf_dir / nume)) for key, nume in (
+        ('clinica_sante', 'AnalizeMedicale.pdf'),
+        ('smartlabs', '1111200901011bolnavul.pdf'),
+        ('elite_medical', 'analize-b-51-ro.pdf'),
+    )]
+    n = 3000
+    print(f"📦 {n} buletine ({sum(len(r.analize) for r in rezultate) * n // len(rezultate)} analize)")
+
+    try:
+        _import_zstd()
+        extensii = ('', '.gz', '.zst')
+    except ImportError as e:
+        print(f"⚠️ {e} - variantele .zst sunt omise")
+        extensii = ('', '.gz')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"\n   {'Fișier':<28} {'Linii':>7} {'Octeți':>11} {'Timp':>8} {'Vârf memorie':>13}")
+        for baza, nivel in (('buletine.ndjson', 'buletin'), ('analize.ndjson', 'analiza'), ('analize.csv', 'analiza')):
+            for ext in extensii:
+                path = Path(tmp) / (baza + ext)
+                start = time.perf_counter()
+                with scriitor(path, nivel) as out:
+                    out.scrie_toate(rezultate[i % len(rezultate)] for i in range(n))
+                durata = time.perf_counter() - start
+                # A doua trecere, doar pentru vârful de memorie (tracemalloc încetinește scrierea)
+                tracemalloc.start()
+                with scriitor(path, nivel) as out:
+                    out.scrie_toate(rezultate[i % len(rezultate)] for i in range(n))
+                varf = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"   {path.name:<28} {out.randuri:>7} {path.stat().st_size:>11,} "
+                      f"{durata * 1e3:>6.0f}ms {varf / 1024:>10.0f} KB")
+
+        # Referință: lista completă + un singur json.dump(indent=2)
+        from parsere_laboratoare import to_valyan_format
+
+        def json_dump() -> int:
+            toate = [r for i in range(n) for r in to_valyan_format(rezultate[i % len(rezultate)])]
+            with open(Path(tmp) / 'analize.json', 'w', encoding='utf-8') as f:
+                json.dump(toate, f, indent=2, ensure_ascii=False)
+            return len(toate)
+
+        start = time.perf_counter()
+        linii = json_dump()
+        durata = time.perf_counter() - start
+        tracemalloc.start()
+        json_dump()
+        varf = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"   {'analize.json (json.dump)':<28} {linii:>7} {(Path(tmp) / 'analize.json').stat().st_size:>11,} "
+              f"{durata * 1e3:>6.0f}ms {varf / 1024:>10.0f} KB")
+
+        # Citire înapoi: aceleași înregistrări din fiecare variantă
+        asteptat = [r for b in rezultate for r in to_valyan_format(b)]
+        for ext in extensii:
+            citite = list(citeste_ndjson(Path(tmp) / f'analize.ndjson{ext}'))
+            with deschide_citire(Path(tmp) / f'analize.csv{ext}') as f:
+                csv_randuri = list(csv.DictReader(f))
+            ok = (citite[:len(asteptat)] == json.loads(json.dumps(asteptat, default=str))
+                  and [r['NumeAnaliza'] for r in csv_randuri[:len(asteptat)]] == [r['NumeAnaliza'] for r in asteptat]
+                  and list(csv_randuri[0]) == list(COLOANE_IMPORT))
+            print(f"{'✅' if ok else '❌'} Citire înapoi analize.ndjson{ext} / analize.csv{ext}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,404 @@
+"""
+Export Columnar Apache Arrow / Parquet
+======================================
+Scrie loturi de buletine parsate într-un set de date Parquet partiționat
+(hive) după laborator și luna recoltării:
+
+    <director>/laborator=clinica_sante/luna=2024-03/lot-...-0.parquet
+
+- schema Arrow = coloanele ImportFormat (api_analize.py) + metadatele de
+  buletin / pacient (Fisier, PacientNume, PacientCNP)
+- categoriile, unitățile, laboratoarele, numele / codurile analizelor și
+  direcția sunt coloane dicționar (dictionary encoding și în Parquet)
+- rândurile sunt acumulate per partiție până la RANDURI_GRUP, ca fiecare
+  fișier să fie un grup de rânduri suficient de mare pentru scanări rapide
+  chiar și când buletinele sosesc unul câte unul; compresie zstd
+- adăugare incrementală: fiecare scriere creează fișiere noi în partiții;
+  importa_ndjson preia din ieșirea batch_analize doar înregistrările noi
+  (offset-ul importat e reținut în <director>/_surse.json, numele fișierelor
+  sunt deterministe - o reluare după întrerupere suprascrie, nu dublează)
+- citirea înapoi produce direct un ResultTable (tabel_rezultate), cu
+  coduri dicționar și array-uri NumPy - fără obiecte Python per rând;
+  filtrele pe laborator / lună sar peste partițiile nepotrivite
+
+Dependență opțională: pyarrow.
+
+Utilizare:
+    with ExportParquet("parquet/") as out:
+        for pdf in fisiere:
+            out.scrie(parser.parse_pdf(pdf), fisier=pdf)
+    tabel = citeste_parquet("parquet/", laborator="clinica_sante", luna="2024-03")
+
+    python export_parquet.py rezultate.ndjson -o parquet/
+
+Test (fără argumente): python export_parquet.py
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from export_flux import COLOANE_IMPORT, randuri_import
+from stocare_rezultate import data_iso
+
+# Rânduri per grup de rânduri (și per scriere din buffer)
+RANDURI_GRUP = 128 * 1024
+
+COMPRESIE = 'zstd'
+
+FISIER_SURSE = '_surse.json'
+
+_TEXT = pa.dictionary(pa.int32(), pa.string())
+
+SCHEMA = pa.schema([
+    ('NumeAnaliza', _TEXT),
+    ('CodAnaliza', _TEXT),
+    ('TipAnaliza', _TEXT),
+    ('Valoare', pa.string()),
+    ('ValoareNumerica', pa.float64()),
+    ('UnitatiMasura', _TEXT),
+    ('ValoareNormalaMin', pa.float64()),
+    ('ValoareNormalaMax', pa.float64()),
+    ('ValoareNormalaText', pa.string()),
+    ('EsteInAfaraLimitelor', pa.bool_()),
+    ('DirectieAnormal', _TEXT),
+    ('DataRecoltare', pa.string()),
+    ('Laborator', _TEXT),
+    ('NumarBuletin', pa.string()),
+    ('ValoareNumericaCanonic', pa.float64()),
+    ('UnitatiMasuraCanonic', _TEXT),
+    ('ValoareNormalaMinCanonic', pa.float64()),
+    ('ValoareNormalaMaxCanonic', pa.float64()),
+    # Metadate buletin / pacient
+    ('Fisier', pa.string()),
+    ('PacientNume', pa.string()),
+    ('PacientCNP', pa.string()),
+    # Partiții (în calea fișierului, nu în fișier)
+    ('laborator', pa.string()),
+    ('luna', pa.string()),
+])
+assert tuple(SCHEMA.names[:len(COLOANE_IMPORT)]) == COLOANE_IMPORT
+
+# Schema din fișiere: partițiile sunt doar în cale
+SCHEMA_FISIER = pa.schema([f for f in SCHEMA if f.name not in ('laborator', 'luna')])
+
+PARTITII = ds.partitioning(pa.schema([('laborator', pa.string()), ('luna', pa.string())]), flavor='hive')
+
+
+# =============================================================================
+# PARTIȚII
+# =============================================================================
+
+def luna_recoltare(data: Optional[str]) -> str:
+    """'YYYY-MM' din data recoltării (dd.mm.yyyy sau ISO), 'necunoscuta' altfel"""
+    iso = data_iso(data)
+    return iso[:7] if iso else 'necunoscuta'
+
+
+def cheie_laborator(laborator: Optional[str]) -> str:
+    """Numele laboratorului ca segment de cale ('Clinica Sante' -> 'clinica_sante')"""
+    return re.sub(r'\W+', '_', (laborator or '').lower()).strip('_') or 'necunoscut'
+
+
+def _pacient(result) -> Tuple[str, str]:
+    if isinstance(result, dict):
+        result = result.get('rezultat') or {} if 'fisier' in result else result
+        return result.get('pacient_nume', ""), result.get('pacient_cnp', "")
+    if hasattr(result, 'pacient'):  # BuletinAnalize (v2 / universal)
+        return result.pacient.nume_prenume, result.pacient.cnp
+    return result.pacient_nume, result.pacient_cnp
+
+
+# =============================================================================
+# SCRIERE
+# =============================================================================
+
+class ExportParquet:
+    """
+    Acumulează buletinele pe coloane, separat per partiție (laborator, lună),
+    și scrie o partiție când ajunge la randuri_grup rânduri - un fișier cu un
+    grup de rânduri complet. Dacă bufferele depășesc împreună max_buffer
+    rânduri, se scrie cea mai mare partiție. Numele fișierelor:
+    <nume_baza>-<nr. fișier în partiție>.parquet.
+    """
+
+    def __init__(self, director: Union[str, Path], randuri_grup: int = RANDURI_GRUP,
+                 compresie: str = COMPRESIE, nume_baza: Optional[str] = None,
+                 max_buffer: Optional[int] = None):
+        self.director = Path(director)
+        self.randuri_grup = randuri_grup
+        self.compresie = compresie
+        self.nume_baza = nume_baza or f"lot-{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        self.max_buffer = max_buffer or 8 * randuri_grup
+        self._buffere: Dict[Tuple[str, str], Dict[str, list]] = {}
+        self._contoare: Dict[Tuple[str, str], int] = {}
+        self._in_buffer = 0
+        self.buletine = 0
+        self.randuri = 0
+        self.fisiere: List[str] = []
+
+    def __len__(self) -> int:
+        """Rândurile din buffere, încă nescrise"""
+        return self._in_buffer
+
+    def scrie(self, result, fisier: str = "") -> int:
+        """Adaugă un buletin; scrie partiția pe disc când bufferul ei e plin"""
+        randuri = randuri_import(result)
+        self.buletine += 1
+        if not randuri:
+            return 0
+        partitie = (cheie_laborator(randuri[0]['Laborator']), luna_recoltare(randuri[0]['DataRecoltare']))
+        coloane = self._buffere.get(partitie)
+        if coloane is None:
+            coloane = self._buffere[partitie] = {nume: [] for nume in SCHEMA_FISIER.names}
+        for nume in COLOANE_IMPORT:
+            coloane[nume].extend(r[nume] for r in randuri)
+        n = len(randuri)
+        if not fisier and isinstance(result, dict):
+            fisier = result.get('fisier', "")
+        pacient_nume, pacient_cnp = _pacient(result)
+        for nume, valoare in (('Fisier', str(fisier)), ('PacientNume', pacient_nume), ('PacientCNP', pacient_cnp)):
+            coloane[nume].extend([valoare] * n)
+        self.randuri += n
+        self._in_buffer += n
+
+        if len(coloane['NumeAnaliza']) >= self.randuri_grup:
+            self._scrie_partitie(partitie)
+        elif self._in_buffer > self.max_buffer:
+            self._scrie_partitie(max(self._buffere, key=lambda p: len(self._buffere[p]['NumeAnaliza'])))
+        return n
+
+    def _scrie_partitie(self, partitie: Tuple[str, str]):
+        import pyarrow.parquet as pq
+
+        coloane = self._buffere.pop(partitie)
+        tabel = pa.table({nume: pa.array(valori, type=SCHEMA_FISIER.field(nume).type)
+                          for nume, valori in coloane.items()}, schema=SCHEMA_FISIER)
+        self._in_buffer -= len(tabel)
+        nr = self._contoare.get(partitie, 0)
+        self._contoare[partitie] = nr + 1
+
+        director = self.director / f"laborator={partitie[0]}" / f"luna={partitie[1]}"
+        director.mkdir(parents=True, exist_ok=True)
+        path = director / f"{self.nume_baza}-{nr}.parquet"
+        pq.write_table(tabel, path, row_group_size=self.randuri_grup, compression=self.compresie,
+                       use_dictionary=True)
+        self.fisiere.append(str(path))
+
+    def flush(self):
+        """Scrie toate partițiile din buffer"""
+        for partitie in sorted(self._buffere):
+            self._scrie_partitie(partitie)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+
+
+def importa_ndjson(ndjson: Union[str, Path], director: Union[str, Path],
+                   randuri_grup: int = RANDURI_GRUP) -> ExportParquet:
+    """
+    Adaugă în setul Parquet înregistrările din ieșirea batch_analize scrise de
+    la ultimul import (până la ultimul checkpoint al batch-ului, dacă există).
+    Numele fișierelor derivă din NDJSON și offset-ul de start, iar offset-ul
+    nou se salvează doar după scrierea tuturor partițiilor: un import
+    întrerupt se reia de la același offset și rescrie aceleași fișiere.
+    """
+    from batch_analize import citeste_checkpoint
+
+    ndjson = Path(ndjson).resolve()
+    director = Path(director)
+    path_surse = director / FISIER_SURSE
+    surse = json.loads(path_surse.read_text(encoding='utf-8')) if path_surse.exists() else {}
+    offset = surse.get(str(ndjson), 0)
+    _, confirmat = citeste_checkpoint(Path(str(ndjson) + '.checkpoint'))
+    limita = confirmat or ndjson.stat().st_size
+    prefix = hashlib.sha1(str(ndjson).encode()).hexdigest()[:8]
+
+    out = ExportParquet(director, randuri_grup, nume_baza=f"src-{prefix}-{offset}")
+    pozitie = offset
+    with open(ndjson, 'rb') as f:
+        f.seek(offset)
+        for linie in f:
+            if pozitie + len(linie) > limita or not linie.endswith(b'\n'):
+                break
+            pozitie += len(linie)
+            inregistrare = json.loads(linie)
+            if inregistrare.get('stare') != 'eroare':
+                out.scrie(inregistrare)
+    out.close()
+
+    surse[str(ndjson)] = pozitie
+    director.mkdir(parents=True, exist_ok=True)
+    tmp = path_surse.with_suffix('.tmp')
+    tmp.write_text(json.dumps(surse, indent=2, ensure_ascii=False), encoding='utf-8')
+    os.replace(tmp, path_surse)
+    return out
+
+
+# =============================================================================
+# CITIRE
+# =============================================================================
+
+def set_date(director: Union[str, Path]) -> ds.Dataset:
+    """Setul de date Parquet (partițiile laborator / luna descoperite din căi)"""
+    return ds.dataset(str(director), format='parquet', partitioning=PARTITII,
+                      exclude_invalid_files=False, ignore_prefixes=['_', '.'])
+
+
+def citeste_arrow(director: Union[str, Path], laborator: Union[str, Sequence[str], None] = None,
+                  luna: Union[str, Sequence[str], None] = None,
+                  coloane: Optional[Sequence[str]] = None) -> pa.Table:
+    """Tabelul Arrow filtrat pe partiții (laborator = cheie_laborator, luna = 'YYYY-MM')"""
+    filtru = None
+    for camp, valoare in (('laborator', laborator), ('luna', luna)):
+        if valoare is None:
+            continue
+        valori = [valoare] if isinstance(valoare, str) else list(valoare)
+        conditie = ds.field(camp).isin(valori)
+        filtru = conditie if filtru is None else filtru & conditie
+    return set_date(director).to_table(columns=list(coloane) if coloane else None, filter=filtru)
+
+
+def citeste_parquet(director: Union[str, Path], laborator: Union[str, Sequence[str], None] = None,
+                    luna: Union[str, Sequence[str], None] = None) -> 'ResultTable':
+    """ResultTable din setul Parquet, fără obiecte Python per rând"""
+    from tabel_rezultate import ResultTable
+    return ResultTable.from_arrow(citeste_arrow(director, laborator, luna))
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def cli(argv: Sequence[str]) -> int:
+    ap = argparse.ArgumentParser(prog="export_parquet.py",
+                                 description="Adaugă ieșiri batch_analize (NDJSON) într-un set Parquet partiționat.")
+    ap.add_argument('intrari', nargs='+', help="fișiere *.ndjson scrise de batch_analize")
+    ap.add_argument('-o', '--director', required=True)
+    ap.add_argument('--randuri-grup', type=int, default=RANDURI_GRUP)
+    args = ap.parse_args(argv)
+
+    for ndjson in args.intrari:
+        out = importa_ndjson(ndjson, args.director, args.randuri_grup)
+        print(f"💾 {ndjson}: {out.buletine} buletine noi, {out.randuri} rânduri, {len(out.fisiere)} fișiere",
+              file=sys.stderr)
+    return 0
+
+
+# =============================================================================
+# MAIN - TEST
+# =============================================================================
+
+def main():
+    if len(sys.argv) > 1:
+        return cli(sys.argv[1:])
+
+    import dataclasses
+    import tempfile
+    import numpy as np
+    from parsere_laboratoare import _import_fitz, get_parser
+    from tabel_rezultate import ResultTable
+
+    if _import_fitz() is None:
+        print("❌ PyMuPDF nu este instalat")
+        return 1
+
+    pdf_dir = Path(__file__).parent
+    baza = [get_parser(key).parse_pdf(str(pdf_dir / nume)) for key, nume in (
+        ('clinica_sante', 'AnalizeMedicale.pdf'),
+        ('smartlabs', '1111200901011bolnavul.pdf'),
+        ('elite_medical', 'analize-b-51-ro.pdf'),
+    )]
+    # Buletine distincte: număr și lună de recoltare diferite
+    n = 12000
+    buletine = [dataclasses.replace(b, numar_buletin=f"{b.numar_buletin}-{i}",
+                                    data_recoltare=f"15.{i % 12 + 1:02d}.2024")
+                for i in range(n) for b in (baza[i % len(baza)],)]
+    print(f"📦 {n} buletine, {sum(len(b.analize) for b in buletine)} analize")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        director = Path(tmp) / 'parquet'
+        start = time.perf_counter()
+        with ExportParquet(director) as out:
+            for b in buletine:
+                out.scrie(b)
+        t_scriere = time.perf_counter() - start
+        marime = sum(os.path.getsize(f) for f in out.fisiere)
+        partitii = {str(Path(f).parent.relative_to(director)) for f in out.fisiere}
+        print(f"\n💾 Scriere: {t_scriere:.2f} s, {len(out.fisiere)} fișiere în {len(partitii)} partiții, "
+              f"{marime / 1e6:.2f} MB")
+        import pyarrow.parquet as pq
+        meta = pq.ParquetFile(out.fisiere[0]).metadata
+        print(f"   {Path(out.fisiere[0]).relative_to(director)}: {meta.num_row_groups} grupuri, "
+              f"{meta.num_rows} rânduri; TipAnaliza: {meta.row_group(0).column(2).encodings}")
+
+        # Referință: câte un .import.json per buletin, citite și decodate integral
+        json_dir = Path(tmp) / 'json'
+        json_dir.mkdir()
+        from parsere_laboratoare import to_valyan_format
+        for i, b in enumerate(buletine):
+            (json_dir / f"{i}.import.json").write_text(json.dumps(to_valyan_format(b), indent=2, ensure_ascii=False),
+                                                      encoding='utf-8')
+        start = time.perf_counter()
+        randuri = [r for f in json_dir.iterdir() for r in json.loads(f.read_text(encoding='utf-8'))]
+        t_json = time.perf_counter() - start
+
+        start = time.perf_counter()
+        tabel = citeste_parquet(director)
+        t_parquet = time.perf_counter() - start
+        start = time.perf_counter()
+        ianuarie = citeste_parquet(director, laborator='clinica_sante', luna='2024-01')
+        t_filtru = time.perf_counter() - start
+        print(f"\n📖 Citire toate rândurile: .import.json {t_json * 1e3:.0f} ms ({len(randuri)} dict-uri), "
+              f"Parquet -> ResultTable {t_parquet * 1e3:.0f} ms ({len(tabel)} rânduri)")
+        print(f"   Filtru laborator=clinica_sante, luna=2024-01: {t_filtru * 1e3:.0f} ms ({len(ianuarie)} rânduri)")
+
+        # Round-trip: aceleași agregate ca tabelul construit din buletine (mediile diferă doar prin ordinea sumei)
+        referinta = ResultTable.from_buletine(buletine)
+
+        def agregate(t: ResultTable) -> List[Tuple]:
+            return sorted((g['categorie'], g['total'], g['anormale'], g['low'], g['high'], round(g['medie'] or 0, 6))
+                          for g in t.grupeaza('categorie'))
+
+        ok = (len(tabel) == len(referinta) and sorted(tabel.buletine) == sorted(referinta.buletine)
+              and tabel.numar_anormale() == referinta.numar_anormale() and agregate(tabel) == agregate(referinta)
+              and np.array_equal(np.sort(tabel.text('nume').astype(str)), np.sort(referinta.text('nume').astype(str))))
+        print(f"{'✅' if ok else '❌'} Round-trip ResultTable: {len(tabel.buletine)} buletine, "
+              f"{tabel.numar_anormale()} anormale, grupări pe categorie identice")
+
+        # Import incremental din ieșirea batch_analize
+        from batch_analize import ruleaza_batch
+        ndjson = str(Path(tmp) / 'rezultate.ndjson')
+        pdf = [str(pdf_dir / nume) for nume in ('AnalizeMedicale.pdf', '1111200901011bolnavul.pdf')]
+        ruleaza_batch(pdf, ndjson, workers=1, ocr=False, progres=None)
+        inc = Path(tmp) / 'incremental'
+        prima = importa_ndjson(ndjson, inc)
+        ruleaza_batch(pdf + [str(pdf_dir / 'analize-b-51-ro.pdf')], ndjson, workers=1, ocr=False, progres=None)
+        a_doua = importa_ndjson(ndjson, inc)
+        a_treia = importa_ndjson(ndjson, inc)
+        total = set_date(inc).count_rows()
+        ok = a_treia.randuri == 0 and total == prima.randuri + a_doua.randuri
+        print(f"{'✅' if ok else '❌'} Import incremental: {prima.randuri} + {a_doua.randuri} + {a_treia.randuri} "
+              f"rânduri, {total} în setul de date")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
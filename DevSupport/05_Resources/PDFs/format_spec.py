@@ -0,0 +1,469 @@
+"""
+Specificații Declarative pentru Formatele de Laborator
+======================================================
+Un laborator nou se descrie printr-o intrare JSON (sau YAML, dacă PyYAML
+este instalat) în loc de încă o buclă _parse_analize scrisă de mână.
+Specificația este compilată o singură dată într-un matcher optimizat,
+păstrat în cache.
+
+Layout-uri suportate:
+- "orizontal" + extractor "regex": o linie = o analiză, grupuri numite
+  (nume, valoare, um, interval, cod, min, max)
+- "orizontal" + extractor "numere": primul număr = valoarea, unitatea din
+  lista UNITATI, intervalul căutat în linie (MedLife, Synevo)
+- "vertical": linie ancoră (denumirea) urmată de câmpuri căutate în ferestre
+  de linii (valoare, interval); ancora acceptă filtre pe substring
+  (incepe_cu, contine, exclude) verificate înaintea regex-ului
+
+Markeri de anomalie (ex: "23" la Synevo) prin cheia "marker_anormal".
+Amprenta laboratorului (regex-uri căutate în metadatele PDF și prima
+pagină, folosite de cascada_parsare) prin cheia "amprenta".
+Sfârșitul secțiunii de rezultate (regex-uri pe început de linie, după care
+parsarea și extragerea paginilor se opresc) prin cheia "sfarsit".
+"layout_pdf": true - parse_pdf / iter_pdf citesc tabelul după coordonatele
+cuvintelor (parsare_layout) și revin la text doar dacă nu găsesc niciun
+tabel. Opt-in: se activează pentru un laborator doar după ce ieșirea a fost
+verificată pe buletinele lui de probă.
+Specificațiile incluse: formate_laboratoare.json
+"""
+
+import re
+import json
+from bisect import bisect_right
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Generator, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+SPEC_FILE = Path(__file__).parent / 'formate_laboratoare.json'
+
+
+class RandAnaliza(NamedTuple):
+    """
+    Câmpurile brute ale unei analize recunoscute de matcher (construit
+    pozițional în buclele matcherului - de două ori mai ieftin decât cu nume)
+    """
+    nume: str
+    cod: Optional[str]
+    valoare: str
+    um: str
+    interval_text: str
+    # (min, max) ca text când specificația le dă explicit; None -> se parsează interval_text
+    limite: Optional[Tuple[Optional[str], Optional[str]]]
+    marker_anormal: bool
+
+
+# =============================================================================
+# ÎNCĂRCARE SPECIFICAȚII
+# =============================================================================
+
+def load_spec_file(path: Path) -> Dict[str, Dict]:
+    """Citește un fișier de specificații (.json sau .yaml/.yml)"""
+    with open(path, encoding='utf-8') as f:
+        if path.suffix in ('.yaml', '.yml'):
+            import yaml  # opțional
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    return data.get('laboratoare', data)
+
+
+@lru_cache(maxsize=None)
+def load_specs(path: Optional[str] = None) -> Dict[str, Dict]:
+    """Specificațiile din fișier (citite o singură dată)"""
+    return load_spec_file(Path(path) if path else SPEC_FILE)
+
+
+@lru_cache(maxsize=None)
+def get_matcher(key: str, unitati: Tuple[str, ...], path: Optional[str] = None) -> 'FormatMatcher':
+    """Matcherul compilat pentru un laborator (compilat o singură dată)"""
+    return FormatMatcher(load_specs(path)[key], unitati)
+
+
+# =============================================================================
+# INTERVALE
+# =============================================================================
+
+class _IntervalMatcher:
+    """Un pattern de interval + șablonul textului + limitele explicite"""
+
+    def __init__(self, spec: Dict):
+        self.pattern = re.compile(spec['pattern'])
+        self.text = spec.get('text', '{0}')
+        self.are_min = 'min' in self.pattern.groupindex
+        self.are_max = 'max' in self.pattern.groupindex
+        self.explicit = self.are_min or self.are_max
+        # Șabloanele doar cu grupuri numite merg direct pe groupdict (fără {0})
+        self._pozitional = '{0}' in self.text
+
+    def build(self, match) -> Tuple[str, Optional[Tuple[Optional[str], Optional[str]]]]:
+        if self.text == '{0}':
+            text = match.group(0)
+        elif self._pozitional:
+            text = self.text.format(match.group(0), **match.groupdict(''))
+        else:
+            text = self.text.format_map(match.groupdict(''))
+        if self.explicit:
+            return text, (match.group('min') if self.are_min else None,
+                          match.group('max') if self.are_max else None)
+        return text, None
+
+
+def _contine_tot(line: str, texte: Tuple[str, ...]) -> bool:
+    for text in texte:
+        if text not in line:
+            return False
+    return True
+
+
+def _contine_ceva(line: str, texte: Tuple[str, ...]) -> bool:
+    for text in texte:
+        if text in line:
+            return True
+    return False
+
+
+def _pereche(categorie: str, rand: RandAnaliza) -> Tuple[str, RandAnaliza]:
+    return categorie, rand
+
+
+def _formatter(template: Optional[str]):
+    """Șablon simplu '{grup}' aplicat pe grupurile unui match"""
+    if not template:
+        return None
+    return lambda m: template.format(m.group(0), **{k: v or '' for k, v in m.groupdict().items()})
+
+
+# =============================================================================
+# MATCHER
+# =============================================================================
+
+class FormatMatcher:
+    """Specificația compilată a unui format de laborator"""
+
+    def __init__(self, spec: Dict, unitati: Sequence[str] = ()):
+        self.spec = spec
+        self.name = spec.get('name', '')
+        self.description = spec.get('description', '')
+        self.layout = spec.get('layout', 'orizontal')
+        self.extractor = spec.get('extractor', 'regex')
+        self.valoare = spec.get('valoare', 'numeric')
+        # Parserele verticale detectau categoria pe linia fără spații
+        self.strip_categorii = spec.get('strip_categorii', self.layout == 'vertical')
+        self.unitati = tuple(unitati)
+
+        self.contine = spec.get('linie_contine')
+        self.linie_min = spec.get('linie_min', 0)
+        self.ignora = tuple(spec.get('ignora', ()))
+        self.marker = spec.get('marker_anormal')
+        self.nume_min = spec.get('nume_min', 0)
+        self.nume_fara_cifra = spec.get('nume_fara_cifra', False)
+        self.pozitie_min = spec.get('pozitie_min_valoare', 0)
+        self.cod = re.compile(spec['cod_din_nume']) if spec.get('cod_din_nume') else None
+        self.interval_format = spec.get('interval_text', '{interval}')
+        self.intervale = [_IntervalMatcher(s) for s in spec.get('intervale', ())]
+
+        if self.layout == 'vertical':
+            ancora = spec['ancora']
+            # Filtre ieftine pe substring, aplicate înainte de regex
+            self.ancora_prefix = ancora.get('incepe_cu', '')
+            self.ancora_contine = tuple(ancora.get('contine', ()))
+            self.ancora_exclude = tuple(ancora.get('exclude', ()))
+            self.ancora = re.compile(ancora['pattern']) if ancora.get('pattern') else None
+            self.nume_format = _formatter(ancora.get('nume'))
+            self.camp_valoare = re.compile(spec['valoare_linie']['pattern'])
+            self.fereastra_valoare = spec['valoare_linie'].get('fereastra', 1)
+            self.fereastra_interval = spec.get('fereastra_interval', 1)
+            self.consuma = spec.get('consuma', 0)
+            self._iter = self._iter_vertical
+        elif self.extractor == 'numere':
+            self.numar = re.compile(spec.get('numar', r'(\d+[.,]?\d*)'))
+            self._iter = self._iter_numere
+        else:
+            self.linie = re.compile(spec['pattern'])
+            # Limitele explicite pot lipsi pe o parte (ex: doar grupul min)
+            self.are_min = 'min' in self.linie.groupindex
+            self.are_max = 'max' in self.linie.groupindex
+            self._iter = self._iter_regex
+
+    def iter_randuri(self, lines: Sequence[str], categorii: Dict[int, str],
+                     categorie: str = "GENERAL", start: int = 0, limita: Optional[int] = None,
+                     construieste: Optional[Callable[[str, RandAnaliza], Any]] = None) -> Generator:
+        """
+        Generează construieste(categorie, rând) pentru fiecare analiză recunoscută
+        (implicit perechea (categorie, rând)).
+
+        Pentru parsarea pe bucăți (pagini) sunt emise doar analizele care încep
+        în [start, limita); liniile de după limita servesc doar ca fereastră.
+        Generatorul returnează (categoria la limita, prima linie neconsumată),
+        adică starea cu care continuă bucata următoare.
+        """
+        if limita is None:
+            limita = len(lines)
+        return self._iter(lines, categorii, categorie, start, limita, construieste or _pereche)
+
+    # -------------------------------------------------------------------------
+    # Utilitare comune
+    # -------------------------------------------------------------------------
+
+    def _cod(self, nume: str) -> Optional[str]:
+        if self.cod is None:
+            return None
+        match = self.cod.search(nume)
+        return match.group(1) if match else None
+
+    def _nume_valid(self, nume: str) -> bool:
+        if len(nume) < self.nume_min:
+            return False
+        return not (self.nume_fara_cifra and nume[0].isdigit())
+
+    def _interval(self, line: str):
+        for interval in self.intervale:
+            match = interval.pattern.search(line)
+            if match:
+                return interval.build(match)
+        return "", None
+
+    def _find_unitate(self, text: str) -> str:
+        for um in self.unitati:
+            if um in text:
+                return um
+        return ""
+
+    # -------------------------------------------------------------------------
+    # Layout orizontal - regex pe linie
+    # -------------------------------------------------------------------------
+
+    def _iter_regex(self, lines, categorii, current_cat, start, limita, construieste):
+        match_linie = self.linie.match
+        contine = self.contine
+        interval_format = self.interval_format
+        explicit = self.are_min or self.are_max
+
+        for i, line in enumerate(lines[start:limita], start):
+            current_cat = categorii.get(i, current_cat)
+
+            if contine and contine not in line:
+                continue
+
+            match = match_linie(line.strip())
+            if match is None:
+                continue
+
+            groups = match.groupdict()
+            nume = groups['nume'].strip()
+            if not self._nume_valid(nume):
+                continue
+
+            interval = groups.get('interval')
+            if interval:
+                interval_text = interval_format.format(interval=interval)
+            else:
+                interval_text = ""
+            limite = (groups.get('min'), groups.get('max')) if explicit else None
+
+            yield construieste(current_cat, RandAnaliza(
+                nume, groups.get('cod') or self._cod(nume), groups['valoare'],
+                (groups.get('um') or "").strip(), interval_text, limite, False))
+
+        return current_cat, max(start, limita)
+
+    # -------------------------------------------------------------------------
+    # Layout orizontal - primul număr din linie
+    # -------------------------------------------------------------------------
+
+    def _iter_numere(self, lines, categorii, current_cat, start, limita, construieste):
+        findall = self.numar.findall
+        find_unitate = self._find_unitate
+        linie_min, ignora, marker = self.linie_min, self.ignora, self.marker
+
+        for i, line in enumerate(lines[start:limita], start):
+            current_cat = categorii.get(i, current_cat)
+            line = line.strip()
+
+            if len(line) < linie_min:
+                continue
+            if ignora:
+                line_lower = line.lower()
+                if any(skip in line_lower for skip in ignora):
+                    continue
+
+            este_marcat = bool(marker) and line.startswith(marker)
+            if este_marcat:
+                line = line[len(marker):].strip()
+
+            numbers = findall(line)
+            if not numbers:
+                continue
+            um = find_unitate(line)
+            if not um:
+                continue
+
+            pozitie = line.find(numbers[0])
+            if pozitie < self.pozitie_min:
+                continue
+
+            nume = line[:pozitie].strip()
+            interval_text, limite = self._interval(line)
+
+            if self._nume_valid(nume):
+                yield construieste(current_cat, RandAnaliza(
+                    nume, self._cod(nume), numbers[0], um, interval_text, limite, este_marcat))
+
+        return current_cat, max(start, limita)
+
+    # -------------------------------------------------------------------------
+    # Layout vertical - ancoră + ferestre de linii
+    # -------------------------------------------------------------------------
+
+    def _linii_candidat(self, lines: Sequence[str]) -> Sequence[int]:
+        """
+        Indicii liniilor care pot fi ancore: cu un filtru pe substring
+        (incepe_cu / contine), doar liniile care îl conțin - un singur test
+        `in` per linie, fără regex și fără strip.
+        """
+        gate = self.ancora_contine[0] if self.ancora_contine else self.ancora_prefix
+        if not gate:
+            return range(len(lines))
+        return [i for i, line in enumerate(lines) if gate in line]
+
+    def _iter_vertical(self, lines, categorii, current_cat, start, limita, construieste):
+        prefix, contine, exclude = self.ancora_prefix, self.ancora_contine, self.ancora_exclude
+        match_ancora = self.ancora.match if self.ancora is not None else None
+        nume_format, cod_din_nume = self.nume_format, self._cod
+        search_valoare = self.camp_valoare.search
+        are_um = 'um' in self.camp_valoare.groupindex
+        intervale = self.intervale
+        fereastra_valoare, fereastra_interval = self.fereastra_valoare, self.fereastra_interval
+        consuma = self.consuma
+        n = len(lines)
+
+        # Categoria unei linii = ultima linie de categorie de la ea în sus
+        linii_categorie = sorted(categorii)
+        categorie_initiala = current_cat
+        urmatoarea = start  # prima linie neconsumată de analiza anterioară
+
+        for i in self._linii_candidat(lines):
+            if i < urmatoarea:
+                continue
+            if i >= limita:
+                break
+            line = lines[i].strip()
+
+            if prefix and not line.startswith(prefix):
+                continue
+            if not _contine_tot(line, contine) or _contine_ceva(line, exclude):
+                continue
+            if match_ancora is None:
+                ancora = None
+            else:
+                ancora = match_ancora(line)
+                if ancora is None:
+                    continue
+
+            # Valoarea: prima potrivire din fereastra de după ancoră
+            valoare = None
+            for pos in range(i + 1, min(i + 1 + fereastra_valoare, n)):
+                valoare = search_valoare(lines[pos].strip())
+                if valoare is not None:
+                    break
+            if valoare is None:
+                continue
+
+            # Intervalul: prima potrivire din fereastra de după valoare
+            interval_text, limite = "", None
+            for int_pos in range(pos + 1, min(pos + 1 + fereastra_interval, n)):
+                int_line = lines[int_pos].strip()
+                for interval in intervale:
+                    match = interval.pattern.search(int_line)
+                    if match is not None:
+                        interval_text, limite = interval.build(match)
+                        break
+                if interval_text:
+                    break
+
+            if ancora is None:
+                nume, cod = line, cod_din_nume(line)
+            else:
+                nume = nume_format(ancora) if nume_format else line
+                cod = ancora.groupdict().get('cod') or cod_din_nume(nume)
+
+            k = bisect_right(linii_categorie, i)
+            if k:
+                current_cat = categorii[linii_categorie[k - 1]]
+
+            if are_um:
+                text_valoare, um = valoare.group('valoare', 'um')
+                um = (um or "").strip()
+            else:
+                text_valoare, um = valoare.group('valoare'), ""
+            yield construieste(current_cat, RandAnaliza(
+                nume, cod, text_valoare, um, interval_text, limite, False))
+            urmatoarea = i + 1 + consuma
+
+        k = bisect_right(linii_categorie, limita - 1)
+        return categorii[linii_categorie[k - 1]] if k else categorie_initiala, max(urmatoarea, limita)
+
+
+# =============================================================================
+# MAIN - TEST
+# =============================================================================
+
+def main():
+    """Listează specificațiile și măsoară parserele declarative pe PDF-urile de test"""
+    import sys
+    import time
+    import fitz  # PyMuPDF
+    from parsere_laboratoare import PARSERS, SpecParser
+
+    # Opțional: un modul cu parserele scrise de mână, pentru comparație
+    referinta = None
+    if len(sys.argv) > 1:
+        import importlib.util
+        spec = importlib.util.spec_from_file_location('parsere_referinta', sys.argv[1])
+        referinta = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(referinta)
+
+    print(f"\n{'='*80}")
+    print("SPECIFICAȚII FORMATE LABORATOARE")
+    print(f"{'='*80}")
+    for key, spec in load_specs().items():
+        print(f"  {key:<15} {spec.get('layout', 'orizontal'):<10} "
+              f"{spec.get('extractor', 'regex') if spec.get('layout') != 'vertical' else '-':<8} "
+              f"{spec.get('name', key)}")
+
+    repetari = 200
+    pdf_folder = Path(__file__).parent
+    print(f"\n  {'Document':<32} {'Laborator':<15} {'Analize':>7} {'Spec µs':>10} {'Manual µs':>10}")
+    for pdf_path in sorted(pdf_folder.glob("*.pdf")):
+        doc = fitz.open(str(pdf_path))
+        text = "".join(page.get_text() + "\n" for page in doc)
+        doc.close()
+
+        for key in PARSERS:
+            parser = PARSERS[key]
+            if not isinstance(parser, SpecParser):
+                continue
+            analize = parser._parse_analize(text)
+            if not analize:
+                continue
+
+            # Fără codurile canonice (iter_analize): parserele de referință nu le rezolvă
+            start = time.perf_counter()
+            for _ in range(repetari):
+                list(parser._iter_brut(text))
+            t_spec = (time.perf_counter() - start) / repetari * 1e6
+
+            t_manual = ""
+            if referinta is not None and key in referinta.PARSERS:
+                manual = referinta.PARSERS[key]
+                assert len(manual._parse_analize(text)) == len(analize), f"{key}: număr diferit de analize"
+                start = time.perf_counter()
+                for _ in range(repetari):
+                    manual._parse_analize(text)
+                t_manual = f"{(time.perf_counter() - start) / repetari * 1e6:.1f}"
+
+            print(f"  {pdf_path.name[:32]:<32} {key:<15} {len(analize):>7} {t_spec:>10.1f} {t_manual:>10}")
+
+
+if __name__ == "__main__":
+    main()
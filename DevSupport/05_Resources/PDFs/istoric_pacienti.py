@@ -0,0 +1,436 @@
+"""
+Index Longitudinal per Pacient (serii de timp + variații)
+========================================================
+Fiecare buletin este parsat izolat, deci este_anormal compară doar cu
+intervalul tipărit. Pentru semnale de tipul "HGB a scăzut cu 20% față de luna
+trecută" indexul ține, per pacient, seriile de valori ale fiecărei analize:
+
+    CNP -> cod analiză -> (zi, valoare, unitate, laborator), sortate după dată
+
+- valorile sunt în unitatea canonică (unitati_masura), deci comparabile între
+  laboratoare; codul analizei este cel canonic (identifica_analit), cu
+  fallback pe cod_analiza din buletin
+- valoarea anterioară: căutare binară în seria analizei - O(log n)
+- la adăugarea unui buletin se calculează întâi variațiile față de valorile
+  anterioare (vectorizat, NumPy, pentru toate analizele buletinului), apoi
+  valorile intră în index; un buletin reimportat (aceeași zi, același
+  laborator) înlocuiește valorile vechi
+- pe disc: .npz cu coloanele seriilor (salveaza / incarca) sau reconstruit
+  din baza locală de rezultate (din_store, stocare_rezultate)
+
+Semnalul schimbare ('UP' / 'DOWN') apare când |variația procentuală| atinge
+pragul (PRAG_PROCENT, ajustabil per cod) și unitățile celor două valori sunt
+aceleași.
+
+Utilizare:
+    index = IndexLongitudinal.incarca("istoric.npz")
+    for delta in index.adauga(result):
+        if delta.schimbare:
+            print(delta.cod_analiza, delta.delta_procent)
+    index.salveaza("istoric.npz")
+
+Benchmark: python istoric_pacienti.py [pacienți]
+"""
+
+import os
+import sys
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from stocare_rezultate import data_iso
+
+# Variația procentuală de la care este semnalată o schimbare
+PRAG_PROCENT = 20.0
+
+# Zile până la 1970-01-01 (date.toordinal), ca zilele să încapă în int32 în .npz
+_EPOCA = date(1970, 1, 1).toordinal()
+
+
+@dataclass(slots=True)
+class DeltaAnaliza:
+    """Variația unei analize față de valoarea anterioară a pacientului"""
+    cod_analiza: Optional[str] = None
+    valoare: Optional[float] = None
+    unitate: str = ""
+    valoare_anterioara: Optional[float] = None
+    data_anterioara: Optional[str] = None
+    laborator_anterior: Optional[str] = None
+    zile: Optional[int] = None
+    delta: Optional[float] = None
+    delta_procent: Optional[float] = None
+    schimbare: Optional[str] = None  # 'UP', 'DOWN'
+
+
+class _Serie:
+    """Valorile unei analize pentru un pacient, sortate după zi"""
+    __slots__ = ('zile', 'valori', 'unitati', 'laboratoare')
+
+    def __init__(self):
+        self.zile: List[int] = []
+        self.valori: List[float] = []
+        self.unitati: List[str] = []
+        self.laboratoare: List[str] = []
+
+    def anterioara(self, zi: int) -> int:
+        """Poziția ultimei valori dinaintea zilei zi, -1 dacă nu există"""
+        return bisect_left(self.zile, zi) - 1
+
+    def adauga(self, zi: int, valoare: float, unitate: str, laborator: str):
+        stanga, dreapta = bisect_left(self.zile, zi), bisect_right(self.zile, zi)
+        for i in range(stanga, dreapta):
+            if self.laboratoare[i] == laborator:
+                # Același buletin reimportat
+                self.valori[i], self.unitati[i] = valoare, unitate
+                return
+        self.zile.insert(dreapta, zi)
+        self.valori.insert(dreapta, valoare)
+        self.unitati.insert(dreapta, unitate)
+        self.laboratoare.insert(dreapta, laborator)
+
+
+def _zi(data: Optional[str]) -> Optional[int]:
+    iso = data_iso(data)
+    if iso is None:
+        return None
+    try:
+        return date.fromisoformat(iso).toordinal() - _EPOCA
+    except ValueError:
+        return None
+
+
+def _data(zi: int) -> str:
+    return date.fromordinal(zi + _EPOCA).isoformat()
+
+
+def _antet(result) -> Tuple[str, str, Optional[str]]:
+    """(CNP, laborator, dată recoltare) din BuletinResult sau BuletinAnalize"""
+    if hasattr(result, 'laborator_detectat'):  # BuletinAnalize (v2 / universal)
+        return (result.pacient.cnp, result.buletin.laborator or result.laborator_detectat,
+                result.buletin.data_recoltare)
+    return result.pacient_cnp, result.laborator, result.data_recoltare
+
+
+def _valoare_canonica(analiza) -> Tuple[Optional[str], Optional[float], str]:
+    """(cod canonic, valoare, unitate) în unitatea canonică a analizei"""
+    from unitati_masura import factor_conversie, identifica_analit
+    analit = identifica_analit(analiza.nume_analiza, analiza.cod_analiza)
+    cod = analit or analiza.cod_analiza
+    if analiza.rezultat_numeric is None:
+        return cod, None, ""
+    factor, unitate = factor_conversie(analiza.unitate_masura, analit)
+    return cod, analiza.rezultat_numeric * factor, unitate
+
+
+# =============================================================================
+# INDEX
+# =============================================================================
+
+class IndexLongitudinal:
+    """CNP -> cod analiză -> serie de timp, actualizat incremental"""
+
+    def __init__(self, prag_procent: float = PRAG_PROCENT, praguri: Optional[Mapping[str, float]] = None):
+        self.prag_procent = prag_procent
+        self.praguri = dict(praguri or {})
+        self._serii: Dict[str, Dict[str, _Serie]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(s.zile) for analize in self._serii.values() for s in analize.values())
+
+    @property
+    def pacienti(self) -> int:
+        return len(self._serii)
+
+    def _adauga_valoare(self, cnp: str, cod: str, zi: int, valoare: float, unitate: str, laborator: str):
+        analize = self._serii.get(cnp)
+        if analize is None:
+            analize = self._serii[cnp] = {}
+        serie = analize.get(cod)
+        if serie is None:
+            serie = analize[cod] = _Serie()
+        serie.adauga(zi, valoare, unitate, laborator)
+
+    # -------------------------------------------------------------------------
+    # Interogări
+    # -------------------------------------------------------------------------
+
+    def anterioara(self, cnp: str, cod: str, data: str) -> Optional[Tuple[str, float, str, str]]:
+        """(dată, valoare, unitate, laborator) - ultima valoare dinaintea datei sau None"""
+        serie = self._serii.get(cnp, {}).get(cod)
+        zi = _zi(data)
+        if serie is None or zi is None:
+            return None
+        i = serie.anterioara(zi)
+        if i < 0:
+            return None
+        return _data(serie.zile[i]), serie.valori[i], serie.unitati[i], serie.laboratoare[i]
+
+    def serie(self, cnp: str, cod: str) -> List[Tuple[str, float, str, str]]:
+        """Seria completă (dată, valoare, unitate, laborator) a unei analize"""
+        serie = self._serii.get(cnp, {}).get(cod)
+        if serie is None:
+            return []
+        return [(_data(z), v, u, l) for z, v, u, l in zip(serie.zile, serie.valori, serie.unitati, serie.laboratoare)]
+
+    def analize_pacient(self, cnp: str) -> List[str]:
+        return sorted(self._serii.get(cnp, ()))
+
+    # -------------------------------------------------------------------------
+    # Actualizare
+    # -------------------------------------------------------------------------
+
+    def delte(self, result) -> List[DeltaAnaliza]:
+        """Variațiile analizelor unui buletin față de valorile anterioare, fără a-l adăuga"""
+        return self._delte(result)[0]
+
+    def adauga(self, result) -> List[DeltaAnaliza]:
+        """Calculează variațiile buletinului, apoi îl adaugă în index; o DeltaAnaliza per analiză"""
+        delte, cnp, laborator, zi, valori = self._delte(result)
+        if cnp and zi is not None:
+            for cod, valoare, unitate in valori:
+                if cod and valoare is not None:
+                    self._adauga_valoare(cnp, cod, zi, valoare, unitate, laborator)
+        return delte
+
+    def adauga_toate(self, rezultate: Iterable) -> int:
+        n = 0
+        for result in rezultate:
+            self.adauga(result)
+            n += 1
+        return n
+
+    def _delte(self, result):
+        import numpy as np
+
+        cnp, laborator, data = _antet(result)
+        zi = _zi(data)
+        valori = [_valoare_canonica(a) for a in result.analize]
+        n = len(valori)
+        curente = np.full(n, np.nan)
+        anterioare = np.full(n, np.nan)
+        praguri = np.full(n, self.prag_procent)
+        pozitii: List[Optional[Tuple[_Serie, int]]] = [None] * n
+        analize = self._serii.get(cnp) if cnp and zi is not None else None
+        for k, (cod, valoare, unitate) in enumerate(valori):
+            if valoare is not None:
+                curente[k] = valoare
+            if cod in self.praguri:
+                praguri[k] = self.praguri[cod]
+            serie = analize.get(cod) if analize else None
+            if serie is None:
+                continue
+            i = serie.anterioara(zi)
+            if i >= 0 and serie.unitati[i] == unitate:
+                anterioare[k] = serie.valori[i]
+                pozitii[k] = (serie, i)
+
+        # Variațiile tuturor analizelor deodată
+        delta = curente - anterioare
+        with np.errstate(divide='ignore', invalid='ignore'):
+            procent = np.where(anterioare != 0, delta / np.abs(anterioare) * 100.0, np.nan)
+        semnificativ = np.abs(procent) >= praguri
+        schimbari = np.where(semnificativ & (delta > 0), 'UP', np.where(semnificativ & (delta < 0), 'DOWN', ''))
+        # Listele Python sunt mult mai rapide decât indexarea scalarilor NumPy în bucla de mai jos
+        delta, procent, schimbari = delta.tolist(), procent.tolist(), schimbari.tolist()
+
+        delte = []
+        for k, (cod, valoare, unitate) in enumerate(valori):
+            d = DeltaAnaliza(cod_analiza=cod, valoare=valoare, unitate=unitate)
+            if pozitii[k] is not None:
+                serie, i = pozitii[k]
+                d.valoare_anterioara = serie.valori[i]
+                d.data_anterioara = _data(serie.zile[i])
+                d.laborator_anterior = serie.laboratoare[i]
+                d.zile = zi - serie.zile[i]
+                if valoare is not None:
+                    d.delta = round(delta[k], 6)
+                    if procent[k] == procent[k]:  # nu NaN
+                        d.delta_procent = round(procent[k], 2)
+                    d.schimbare = schimbari[k] or None
+            delte.append(d)
+        return delte, cnp, laborator, zi, valori
+
+    # -------------------------------------------------------------------------
+    # Persistență
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def din_store(cls, store, **kwargs) -> 'IndexLongitudinal':
+        """Indexul reconstruit din baza locală de rezultate (StoreRezultate)"""
+        from unitati_masura import identifica_analit
+
+        index = cls(**kwargs)
+        coduri: Dict[Tuple[str, Optional[str]], Optional[str]] = {}
+        randuri = store._interogheaza(
+            "SELECT b.pacient_cnp, b.laborator, b.data_recoltare, a.nume_analiza, a.cod_analiza, "
+            "a.valoare_canonica, a.unitate_canonica FROM buletine b JOIN analize a ON a.buletin_id = b.id "
+            "WHERE b.pacient_cnp != '' AND b.data_recoltare IS NOT NULL AND a.valoare_canonica IS NOT NULL "
+            "ORDER BY b.data_recoltare, b.id", ())
+        for r in randuri:
+            cheie = (r['nume_analiza'], r['cod_analiza'])
+            if cheie not in coduri:
+                coduri[cheie] = identifica_analit(*cheie) or r['cod_analiza']
+            cod = coduri[cheie]
+            zi = _zi(r['data_recoltare'])
+            if cod and zi is not None:
+                index._adauga_valoare(r['pacient_cnp'], cod, zi, r['valoare_canonica'],
+                                      r['unitate_canonica'], r['laborator'])
+        return index
+
+    def salveaza(self, path: Union[str, Path]):
+        """Indexul ca .npz: cheile seriilor + coloanele concatenate (scriere atomică)"""
+        import numpy as np
+
+        cnp, coduri, lungimi = [], [], []
+        zile, valori, unitati, laboratoare = [], [], [], []
+        for c, analize in self._serii.items():
+            for cod, serie in analize.items():
+                cnp.append(c)
+                coduri.append(cod)
+                lungimi.append(len(serie.zile))
+                zile.extend(serie.zile)
+                valori.extend(serie.valori)
+                unitati.extend(serie.unitati)
+                laboratoare.extend(serie.laboratoare)
+        dict_unitati, idx_unitati = np.unique(np.array(unitati, dtype=str), return_inverse=True)
+        dict_lab, idx_lab = np.unique(np.array(laboratoare, dtype=str), return_inverse=True)
+        path = Path(path)
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            np.savez(f, cnp=np.array(cnp, dtype=str), cod=np.array(coduri, dtype=str),
+                     lungimi=np.array(lungimi, dtype=np.int32), zile=np.array(zile, dtype=np.int32),
+                     valori=np.array(valori, dtype=np.float64),
+                     unitati=idx_unitati.astype(np.int32), dict_unitati=dict_unitati,
+                     laboratoare=idx_lab.astype(np.int32), dict_laboratoare=dict_lab)
+        os.replace(tmp, path)
+
+    @classmethod
+    def incarca(cls, path: Union[str, Path], **kwargs) -> 'IndexLongitudinal':
+        """Indexul salvat cu salveaza; un index gol dacă fișierul nu există"""
+        index = cls(**kwargs)
+        if not Path(path).exists():
+            return index
+        import numpy as np
+
+        with np.load(path) as date_npz:
+            zile = date_npz['zile'].tolist()
+            valori = date_npz['valori'].tolist()
+            unitati = date_npz['dict_unitati'][date_npz['unitati']].tolist()
+            laboratoare = date_npz['dict_laboratoare'][date_npz['laboratoare']].tolist()
+            start = 0
+            for cnp, cod, lungime in zip(date_npz['cnp'].tolist(), date_npz['cod'].tolist(),
+                                         date_npz['lungimi'].tolist()):
+                serie = _Serie()
+                stop = start + lungime
+                serie.zile, serie.valori = zile[start:stop], valori[start:stop]
+                serie.unitati, serie.laboratoare = unitati[start:stop], laboratoare[start:stop]
+                index._serii.setdefault(cnp, {})[cod] = serie
+                start = stop
+        return index
+
+
+# =============================================================================
+# MAIN - BENCHMARK
+# =============================================================================
+
+def main():
+    import dataclasses
+    import random
+    import tempfile
+    from parsere_laboratoare import _import_fitz, get_parser
+    from stocare_rezultate import StoreRezultate
+
+    if _import_fitz() is None:
+        print("❌ PyMuPDF nu este instalat")
+        return 1
+
+    pacienti = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    pdf_dir = Path(__file__).parent
+    baza = [get_parser(key).parse_pdf(str(pdf_dir / nume)) for key, nume in (
+        ('clinica_sante', 'AnalizeMedicale.pdf'),
+        ('smartlabs', '1111200901011bolnavul.pdf'),
+        ('elite_medical', 'analize-b-51-ro.pdf'),
+    )]
+
+    # Câte 12 buletine lunare per pacient, valori variind aleator în jurul celor reale
+    rng = random.Random(0)
+    buletine = []
+    for luna in range(12):
+        for p in range(pacienti):
+            b = baza[p % len(baza)]
+            buletine.append(dataclasses.replace(
+                b, pacient_cnp=f"1{p:012d}", numar_buletin=f"{p}-{luna}",
+                data_recoltare=f"15.{luna + 1:02d}.2024",
+                analize=[dataclasses.replace(a, rezultat_numeric=None if a.rezultat_numeric is None else
+                                             round(a.rezultat_numeric * rng.uniform(0.75, 1.25), 2))
+                         for a in b.analize]))
+    total_analize = sum(len(b.analize) for b in buletine)
+
+    index = IndexLongitudinal()
+    start = time.perf_counter()
+    semnalate = 0
+    for b in buletine:
+        semnalate += sum(d.schimbare is not None for d in index.adauga(b))
+    durata = time.perf_counter() - start
+    print(f"\n📈 Index: {len(buletine):,} buletine / {total_analize:,} analize / {index.pacienti:,} pacienți "
+          f"în {durata:.2f} s ({len(buletine) / durata:,.0f} buletine/s, variații incluse)")
+    print(f"   {semnalate:,} schimbări >= {PRAG_PROCENT:.0f}% semnalate")
+
+    exemplu = buletine[-1]
+    for d in index.delte(exemplu)[:4]:
+        print(f"   {exemplu.pacient_cnp} {d.cod_analiza}: {d.valoare_anterioara} ({d.data_anterioara}) -> "
+              f"{d.valoare} {d.unitate}, {d.delta_procent}% {d.schimbare or ''}")
+
+    # Valoarea anterioară: index vs. o interogare SQLite per analiză
+    cereri = [(f"1{rng.randrange(pacienti):012d}", 'HGB', f"{rng.randint(1, 28):02d}.{rng.randint(2, 12):02d}.2024")
+              for _ in range(5000)]
+    start = time.perf_counter()
+    for cnp, cod, data in cereri:
+        index.anterioara(cnp, cod, data)
+    durata_index = (time.perf_counter() - start) / len(cereri) * 1e6
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with StoreRezultate(Path(tmp) / 'rezultate.sqlite') as store:
+            for i in range(0, len(buletine), 1000):
+                store.salveaza_lot(buletine[i:i + 1000])
+            start = time.perf_counter()
+            for cnp, cod, data in cereri:
+                rand = store._interogheaza(
+                    "SELECT b.data_recoltare, a.valoare_canonica FROM buletine b CROSS JOIN analize a "
+                    "ON a.buletin_id = b.id WHERE b.pacient_cnp = ? AND a.cod_analiza = ? "
+                    "AND b.data_recoltare < ? ORDER BY b.data_recoltare DESC LIMIT 1", (cnp, cod, data_iso(data)))
+            durata_sql = (time.perf_counter() - start) / len(cereri) * 1e6
+            print(f"\n🔎 Valoare anterioară: index {durata_index:.1f} µs, SQLite {durata_sql:.1f} µs "
+                  f"per analiză (x{durata_sql / durata_index:.0f})")
+
+            start = time.perf_counter()
+            din_store = IndexLongitudinal.din_store(store)
+            durata = time.perf_counter() - start
+            ok = len(din_store) == len(index) and all(
+                din_store.serie(cnp, cod) == index.serie(cnp, cod) for cnp, cod, _ in cereri[:500])
+            print(f"{'✅' if ok else '❌'} Reconstruit din SQLite: {len(din_store):,} valori în {durata:.2f} s")
+
+        path = Path(tmp) / 'istoric.npz'
+        start = time.perf_counter()
+        index.salveaza(path)
+        durata_scriere = time.perf_counter() - start
+        start = time.perf_counter()
+        incarcat = IndexLongitudinal.incarca(path)
+        durata_citire = time.perf_counter() - start
+        ok = len(incarcat) == len(index) and all(
+            incarcat.serie(cnp, cod) == index.serie(cnp, cod) for cnp, cod, _ in cereri[:500])
+        print(f"{'✅' if ok else '❌'} .npz: {path.stat().st_size / 1e6:.1f} MB, scriere {durata_scriere:.2f} s, "
+              f"citire {durata_citire:.2f} s")
+
+    # Reimport: aceleași valori, nu dublate
+    n = len(index)
+    index.adauga(buletine[0])
+    print(f"{'✅' if len(index) == n else '❌'} Reimport: buletinul existent este înlocuit, nu dublat")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
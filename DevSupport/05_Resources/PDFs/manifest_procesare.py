@@ -0,0 +1,460 @@
+"""
+Manifest de Procesare Incrementală
+==================================
+Evidența SQLite a fișierelor deja procesate: pentru fiecare (fișier, parser)
+se rețin hash-ul conținutului PDF, amprenta versiunii parserului și locul
+ieșirii. O rulare nouă sare peste fișierele la zi și reface doar documentele
+al căror conținut sau cod de parser s-a schimbat.
+
+Amprenta unui parser este calculată din cod, nu dintr-un număr de versiune
+întreținut manual:
+- arborele AST (fără comentarii / formatare) al claselor din MRO-ul parserului
+- definițiile de la nivel de modul referite de acestea, tranzitiv și peste
+  modulele locale importate (funcții, constante, dataclass-uri precum
+  AnalizaResult; 'from m import f' aduce doar f, 'import m' tot modulul)
+- fișierele de date numite de acele definiții (analiti.json,
+  clasificator_linii.npz)
+- intrarea din formate_laboratoare.json a laboratorului (doar a lui)
+
+Astfel o modificare în ClinicaSanteParser schimbă amprenta doar pentru
+'clinica_sante', iar una în LaboratorParser sau în dictionar_analiti schimbă
+amprentele tuturor parserelor care le folosesc. Detectarea laboratorului
+(cascada_parsare) nu intră în amprentă: după o schimbare în cascadă se
+reprocesează cu --de-la-zero.
+
+Hash-ul conținutului este refolosit cât timp mărimea și mtime-ul fișierului
+nu se schimbă (fără recitirea a 100k PDF-uri la fiecare rulare).
+
+Utilizare:
+    manifest = Manifest("manifest_procesare.sqlite")
+    amprenta = amprenta_cheie('clinica_sante')
+    if not manifest.la_zi(pdf, 'clinica_sante', amprenta):
+        ...parsare, scriere...
+        manifest.inregistreaza(pdf, 'clinica_sante', amprenta, iesire)
+
+    python manifest_procesare.py raport
+    python manifest_procesare.py afectate clinica_sante
+    python manifest_procesare.py reproceseaza clinica_sante -o clinica_sante.ndjson
+
+Test (fără argumente): python manifest_procesare.py
+"""
+
+import argparse
+import ast
+import hashlib
+import inspect
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+MANIFEST_PATH = Path(__file__).with_name("manifest_procesare.sqlite")
+
+# Cheile scripturilor vechi, ținute separat de laboratorul detectat
+CHEI_SCRIPTURI = ('v2', 'universal')
+
+# Specificațiile sunt amprentate per laborator, nu ca fișier întreg
+SPEC_FILE_NUME = "formate_laboratoare.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS manifest (
+    fisier     TEXT NOT NULL,
+    parser     TEXT NOT NULL,
+    hash       TEXT NOT NULL,
+    marime     INTEGER NOT NULL,
+    mtime_ns   INTEGER NOT NULL,
+    amprenta   TEXT NOT NULL,
+    iesire     TEXT NOT NULL DEFAULT '',
+    actualizat REAL NOT NULL,
+    PRIMARY KEY (fisier, parser)
+);
+CREATE INDEX IF NOT EXISTS manifest_parser ON manifest (parser, amprenta);
+"""
+
+_RE_FISIER_DATE = re.compile(r'^[\w\-]+\.(?:json|npz|ya?ml)$')
+
+
+# =============================================================================
+# AMPRENTA PARSERULUI
+# =============================================================================
+
+@lru_cache(maxsize=None)
+def _arbore(path: str) -> ast.Module:
+    return ast.parse(Path(path).read_text(encoding='utf-8'), filename=path)
+
+
+@lru_cache(maxsize=None)
+def _definitii(path: str) -> Dict[str, Tuple[ast.stmt, ...]]:
+    """Numele definite la nivelul modulului -> instrucțiunile care le definesc"""
+    definitii: Dict[str, List[ast.stmt]] = {}
+    for stmt in _arbore(path).body:
+        if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            nume = [stmt.name]
+        elif isinstance(stmt, (ast.Import, ast.ImportFrom)):
+            nume = [(a.asname or a.name).split('.')[0] for a in stmt.names]
+        elif isinstance(stmt, (ast.Assign, ast.AnnAssign)):
+            tinte = stmt.targets if isinstance(stmt, ast.Assign) else [stmt.target]
+            nume = [n.id for t in tinte for n in ast.walk(t) if isinstance(n, ast.Name)]
+        else:
+            continue
+        for n in nume:
+            definitii.setdefault(n, []).append(stmt)
+    return {n: tuple(s) for n, s in definitii.items()}
+
+
+def _modul_local(nume: Optional[str], director: Path) -> Optional[str]:
+    """Fișierul .py din director pentru un import absolut, dacă există"""
+    if not nume:
+        return None
+    path = director / f"{nume.split('.')[0]}.py"
+    return str(path) if path.is_file() else None
+
+
+def _referinte(stmt: ast.stmt, path: str) -> Iterable[Tuple[str, str]]:
+    """(modul, nume) de care depinde o instrucțiune: nume din același modul și importuri locale"""
+    director = Path(path).parent
+    for n in ast.walk(stmt):
+        if isinstance(n, ast.Name):
+            yield path, n.id
+        elif isinstance(n, ast.ImportFrom) and not n.level:
+            modul = _modul_local(n.module, director)
+            if modul:
+                yield from ((modul, a.name) for a in n.names)
+        elif isinstance(n, ast.Import):
+            for a in n.names:
+                modul = _modul_local(a.name, director)
+                if modul:
+                    yield modul, '*'
+
+
+def _fisiere_date(stmt: ast.stmt, director: Path) -> Set[str]:
+    """Fișierele de date din director numite prin constante șir (ex. 'analiti.json')"""
+    return {str(director / n.value) for n in ast.walk(stmt)
+            if isinstance(n, ast.Constant) and isinstance(n.value, str)
+            and _RE_FISIER_DATE.match(n.value) and n.value != SPEC_FILE_NUME
+            and (director / n.value).is_file()}
+
+
+@lru_cache(maxsize=None)
+def _hash_fisier(path: str) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def _inchidere(radacini: Iterable[Tuple[str, str]]) -> Tuple[List[Tuple[str, ast.stmt]], Set[str]]:
+    """
+    Definițiile de care depind radacini, tranzitiv și peste module: un
+    'from m import f' urmează doar f din m, un 'import m' - tot modulul.
+    Întoarce instrucțiunile (modul, stmt) și fișierele de date numite de ele.
+    """
+    noduri: Dict[int, Tuple[str, ast.stmt]] = {}
+    date: Set[str] = set()
+    vazute: Set[Tuple[str, str]] = set()
+    stiva = list(radacini)
+    while stiva:
+        path, nume = stiva.pop()
+        if (path, nume) in vazute:
+            continue
+        vazute.add((path, nume))
+        definitii = _definitii(path)
+        if nume == '*':
+            stiva.extend((path, n) for n in definitii)
+            continue
+        for stmt in definitii.get(nume, ()):
+            if isinstance(stmt, (ast.Import, ast.ImportFrom)):
+                # Importul în sine nu intră în amprentă, doar ce aduce din modulele locale
+                director = Path(path).parent
+                for alias in stmt.names:
+                    if (alias.asname or alias.name).split('.')[0] != nume:
+                        continue
+                    if isinstance(stmt, ast.ImportFrom):
+                        modul = None if stmt.level else _modul_local(stmt.module, director)
+                        if modul:
+                            stiva.append((modul, alias.name))
+                    else:
+                        modul = _modul_local(alias.name, director)
+                        if modul:
+                            stiva.append((modul, '*'))
+                continue
+            if id(stmt) in noduri:
+                continue
+            noduri[id(stmt)] = (path, stmt)
+            date |= _fisiere_date(stmt, Path(path).parent)
+            stiva.extend(_referinte(stmt, path))
+    return sorted(noduri.values(), key=lambda x: (x[0], x[1].lineno)), date
+
+
+def _sursa_clasei(cls: type) -> Optional[str]:
+    try:
+        return inspect.getsourcefile(cls)
+    except (TypeError, OSError):
+        return None
+
+
+@lru_cache(maxsize=None)
+def amprenta_parser(cls: type) -> str:
+    """Amprenta codului de care depinde rezultatul parserului (vezi docstring-ul modulului)"""
+    radacini = []
+    for baza in cls.__mro__:
+        path = _sursa_clasei(baza)
+        if path and path.endswith('.py') and baza.__name__ in _definitii(path):
+            radacini.append((path, baza.__name__))
+
+    h = hashlib.sha256()
+    noduri, date = _inchidere(radacini)
+    for path, stmt in noduri:
+        h.update(Path(path).name.encode())
+        h.update(ast.dump(stmt, include_attributes=False).encode())
+    for path in sorted(date):
+        h.update(Path(path).name.encode() + _hash_fisier(path).encode())
+
+    spec_key = getattr(cls, 'SPEC_KEY', '')
+    if spec_key:
+        from format_spec import load_specs
+        spec = load_specs(getattr(cls, 'SPEC_PATH', None)).get(spec_key, {})
+        h.update(json.dumps(spec, sort_keys=True, ensure_ascii=False).encode())
+    return h.hexdigest()[:16]
+
+
+def amprenta_cheie(key: str) -> str:
+    """
+    Amprenta pentru o cheie din manifest: laborator din registry, 'generic'
+    (parserul de tabel al cascadei), 'v2' / 'universal' (scripturile vechi)
+    sau '' (nimic acceptat - depinde de toate parserele).
+    """
+    from parsere_laboratoare import PARSERS
+    if key == 'generic':
+        from cascada_parsare import ParserTabelGeneric
+        return amprenta_parser(ParserTabelGeneric)
+    if key == 'v2':
+        from analize_parser_v2 import AnalizeMedicaleParserV2
+        return amprenta_parser(AnalizeMedicaleParserV2)
+    if key == 'universal':
+        from analize_parser_universal import AnalizeMedicaleParser
+        return amprenta_parser(AnalizeMedicaleParser)
+    if not key:
+        h = hashlib.sha256()
+        for k in sorted(list(PARSERS)) + ['generic']:
+            h.update(amprenta_cheie(k).encode())
+        return h.hexdigest()[:16]
+    return amprenta_parser(PARSERS.parser_class(key))
+
+
+# =============================================================================
+# MANIFEST
+# =============================================================================
+
+def hash_continut(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloc in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+class Manifest:
+    """Evidența (fișier, parser) -> hash conținut, amprentă parser, ieșire"""
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = str(path)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._amprente: Dict[str, str] = {}
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def amprenta(self, key: str) -> str:
+        """amprenta_cheie, calculată o singură dată per manifest"""
+        if key not in self._amprente:
+            self._amprente[key] = amprenta_cheie(key)
+        return self._amprente[key]
+
+    def _stare_fisier(self, fisier: str) -> Tuple[str, int, int]:
+        """(hash, mărime, mtime_ns); hash-ul din manifest dacă fișierul nu s-a atins"""
+        st = os.stat(fisier)
+        rand = self._db.execute(
+            "SELECT hash FROM manifest WHERE fisier = ? AND marime = ? AND mtime_ns = ? LIMIT 1",
+            (fisier, st.st_size, st.st_mtime_ns)).fetchone()
+        return (rand[0] if rand else hash_continut(fisier)), st.st_size, st.st_mtime_ns
+
+    def la_zi(self, fisier: str, parser: str, amprenta: Optional[str] = None) -> bool:
+        """Fișierul a fost procesat cu același conținut, aceeași amprentă și ieșirea există"""
+        rand = self._db.execute("SELECT hash, amprenta, iesire FROM manifest WHERE fisier = ? AND parser = ?",
+                                (fisier, parser)).fetchone()
+        if rand is None or rand[1] != (amprenta or self.amprenta(parser)):
+            return False
+        if rand[2] and not os.path.exists(rand[2]):
+            return False
+        try:
+            return self._stare_fisier(fisier)[0] == rand[0]
+        except OSError:
+            return False
+
+    def la_zi_detectat(self, fisier: str) -> bool:
+        """Ca la_zi, cu parserul înregistrat la ultima procesare (laborator detectat automat)"""
+        rand = self._db.execute("SELECT parser FROM manifest WHERE fisier = ? ORDER BY actualizat DESC LIMIT 1",
+                                (fisier,)).fetchone()
+        return rand is not None and self.la_zi(fisier, rand[0])
+
+    def inregistreaza(self, fisier: str, parser: str, amprenta: Optional[str] = None,
+                      iesire: str = "", commit: bool = True):
+        hash_, marime, mtime_ns = self._stare_fisier(fisier)
+        if parser not in CHEI_SCRIPTURI:
+            # O singură intrare per fișier procesat automat: laboratorul poate diferi între rulări
+            self._db.execute(
+                f"DELETE FROM manifest WHERE fisier = ? AND parser != ? "
+                f"AND parser NOT IN ({', '.join('?' * len(CHEI_SCRIPTURI))})",
+                (fisier, parser, *CHEI_SCRIPTURI))
+        self._db.execute(
+            "INSERT OR REPLACE INTO manifest VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (fisier, parser, hash_, marime, mtime_ns, amprenta or self.amprenta(parser), str(iesire), time.time()))
+        if commit:
+            self._db.commit()
+
+    def commit(self):
+        self._db.commit()
+
+    def afectate(self, parser: str) -> List[str]:
+        """Fișierele procesate cu parser a căror amprentă nu mai este cea curentă"""
+        return [r[0] for r in self._db.execute(
+            "SELECT fisier FROM manifest WHERE parser = ? AND amprenta != ? ORDER BY fisier",
+            (parser, self.amprenta(parser)))]
+
+    def raport(self) -> List[Dict]:
+        """Per parser: fișiere înregistrate și câte au amprenta veche"""
+        rezultat = []
+        for parser, total in self._db.execute("SELECT parser, COUNT(*) FROM manifest GROUP BY parser ORDER BY parser"):
+            try:
+                vechi = len(self.afectate(parser))
+            except Exception:
+                vechi = None    # parser eliminat din registry
+            rezultat.append({'parser': parser, 'fisiere': total, 'afectate': vechi})
+        return rezultat
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def cli(argv: Sequence[str]) -> int:
+    ap = argparse.ArgumentParser(prog="manifest_procesare.py",
+                                 description="Manifestul procesării incrementale a buletinelor PDF.")
+    ap.add_argument('--manifest', default=str(MANIFEST_PATH))
+    sub = ap.add_subparsers(dest='comanda', required=True)
+    sub.add_parser('raport', help="fișiere înregistrate / afectate per parser")
+    p_afectate = sub.add_parser('afectate', help="fișierele de reprocesat după o modificare a parserului")
+    p_afectate.add_argument('parser')
+    p_repro = sub.add_parser('reproceseaza', help="reparsează fișierele afectate (batch_analize)")
+    p_repro.add_argument('parser')
+    p_repro.add_argument('-o', '--iesire', required=True)
+    p_repro.add_argument('--workers', type=int, default=None)
+    args = ap.parse_args(argv)
+
+    with Manifest(args.manifest) as manifest:
+        if args.comanda == 'raport':
+            for r in manifest.raport():
+                print(f"{r['parser']:<16} {r['fisiere']:>8} fișiere  {r['afectate']} afectate")
+        elif args.comanda == 'afectate':
+            for fisier in manifest.afectate(args.parser):
+                print(fisier)
+        else:
+            from batch_analize import ruleaza_batch, tipareste_sumar
+            fisiere = manifest.afectate(args.parser)
+            print(f"🔁 {len(fisiere)} fișiere afectate de {args.parser}", file=sys.stderr)
+            stat = ruleaza_batch(fisiere, args.iesire, laborator=args.parser, workers=args.workers,
+                                 manifest=manifest)
+            tipareste_sumar(stat)
+    return 0
+
+
+# =============================================================================
+# MAIN - TEST
+# =============================================================================
+
+def main():
+    if len(sys.argv) > 1:
+        return cli(sys.argv[1:])
+
+    import shutil
+    import subprocess
+    import tempfile
+    from parsere_laboratoare import PARSERS
+
+    chei = list(PARSERS) + ['generic', 'v2', 'universal']
+    print("🔑 Amprente parsere:")
+    start = time.perf_counter()
+    amprente = {key: amprenta_cheie(key) for key in chei}
+    print(f"   ({(time.perf_counter() - start) * 1e3:.0f} ms pentru {len(amprente)} parsere)")
+    for key, amprenta in amprente.items():
+        print(f"   {key:<14} {amprenta}")
+
+    pdf_dir = Path(__file__).parent
+    with tempfile.TemporaryDirectory() as tmp:
+        # 1. O modificare în ClinicaSanteParser, într-o copie a surselor
+        copie = Path(tmp) / 'surse'
+        shutil.copytree(pdf_dir, copie, ignore=shutil.ignore_patterns('*.pdf', '__pycache__', '*.sqlite*'))
+        sursa = copie / 'parsere_laboratoare.py'
+        sursa.write_text(sursa.read_text(encoding='utf-8').replace(
+            '    NAME = "Clinica Sante"', '    NAME = "Clinica Sante"\n    PRAG_NOU = 1'), encoding='utf-8')
+        cod = ("import json, manifest_procesare as m; "
+               f"print(json.dumps({{k: m.amprenta_cheie(k) for k in {chei!r}}}))")
+        iesire = subprocess.run([sys.executable, '-c', cod], cwd=copie, capture_output=True, text=True, check=True)
+        noi = json.loads(iesire.stdout.strip().splitlines()[-1])
+        schimbate = [k for k in chei if noi[k] != amprente[k]]
+        stare = "✅" if schimbate == ['clinica_sante'] else "❌"
+        print(f"\n{stare} Modificare în ClinicaSanteParser -> amprente schimbate: {schimbate}")
+
+        # 2. Rulări batch incrementale
+        from batch_analize import enumera_pdf, ruleaza_batch
+        buletine = Path(tmp) / 'buletine'
+        buletine.mkdir()
+        for pdf in sorted(pdf_dir.glob('*.pdf')):
+            shutil.copy(pdf, buletine / pdf.name)
+        fisiere = enumera_pdf([str(buletine)])
+        with Manifest(Path(tmp) / 'manifest.sqlite') as manifest:
+            for rulare, descriere in enumerate(("prima rulare", "fără modificări", "un PDF modificat")):
+                if rulare == 2:
+                    with open(buletine / 'AnalizeMedicale.pdf', 'ab') as f:
+                        f.write(b'\n% modificat\n')
+                start = time.perf_counter()
+                stat = ruleaza_batch(fisiere, str(Path(tmp) / f'rulare{rulare}.ndjson'), ocr=False,
+                                     workers=1, progres=None, manifest=manifest)
+                print(f"   {descriere:<18} {stat.procesate} procesate, {stat.sarite} sărite "
+                      f"({(time.perf_counter() - start) * 1e3:.0f} ms)")
+
+            print(f"\n📊 Raport manifest:")
+            for r in manifest.raport():
+                print(f"   {r['parser']:<14} {r['fisiere']} fișiere, {r['afectate']} afectate")
+
+            # Intrări procesate cu o versiune anterioară a ClinicaSanteParser
+            manifest._db.execute("UPDATE manifest SET amprenta = 'versiune-veche' WHERE parser = 'clinica_sante'")
+            afectate = manifest.afectate('clinica_sante')
+            print(f"📋 Afectate de clinica_sante: {[Path(f).name for f in afectate]}")
+            stat = ruleaza_batch(afectate, str(Path(tmp) / 'clinica_sante.ndjson'), laborator='clinica_sante',
+                                 workers=1, progres=None, manifest=manifest)
+            stare = "✅" if stat.procesate == len(afectate) and not manifest.afectate('clinica_sante') else "❌"
+            print(f"{stare} Reprocesate: {stat.procesate}, rămase afectate: {len(manifest.afectate('clinica_sante'))}")
+
+            n = 1000
+            start = time.perf_counter()
+            for fisier in fisiere * (n // len(fisiere)):
+                manifest.la_zi_detectat(fisier)
+            print(f"\n⏱️ Verificare fișier la zi: {(time.perf_counter() - start) / n * 1e6:.0f} µs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,411 @@
+"""
+Parsare după Coordonate (Layout)
+================================
+Tabelele de rezultate (ProMed "Nr | Denumire | Rezultat | U.M. | Interval",
+MedLife, Synevo, dar și Clinica Sante / SmartLabs / Elite Medical) își pierd
+coloanele în page.get_text(): parserele pe text ghicesc cu regex-uri care e
+valoarea ("primul număr") și unde începe intervalul.
+
+Modul layout lucrează pe cuvintele poziționate din PyMuPDF
+(page.get_text("words")):
+1. cuvintele sunt grupate în rânduri vizuale după centrul vertical
+2. rândul de antet al tabelului (Denumire / Rezultat / UM / Interval) dă
+   benzile x ale coloanelor, o dată per pagină; paginile fără antet
+   continuă cu benzile paginii anterioare, iar benzile fiecărui laborator
+   sunt păstrate în cache (șablonul tabelului, refolosit cât timp antetul
+   documentelor noi se potrivește)
+3. fiecare cuvânt intră în coloana benzii lui - maparea este deterministă,
+   fără încercări de regex pe fiecare linie
+4. opțional, un StoreSabloane (sabloane_layout) decupează extragerea pe
+   regiunile tabelului învățate din documentele anterioare ale laboratorului
+
+Utilizare:
+    parser = get_parser('promed')
+    rezultat = parser.parse_pdf_layout("buletin.pdf")     # explicit
+    rezultat = parser.parse_pdf("buletin.pdf")            # laboratoarele cu "layout_pdf" (opt-in)
+    rezultat = parser.parse_pdf_layout("buletin.pdf", sabloane=StoreSabloane())
+
+Test: python parsare_layout.py [fisier.pdf cheie_laborator ...]
+"""
+
+import re
+import sys
+import time
+import unicodedata
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from parsere_laboratoare import (
+    AnalizaResult, BuletinResult, LaboratorParser, PARSERS, _RE_CONTOR_PAGINA, _import_fitz
+)
+from dictionar_analiti import rezolva_cod
+
+# Cuvintele de antet care denumesc coloanele tabelului (fără diacritice, lower)
+CUVINTE_COLOANE: Dict[str, Tuple[str, ...]] = {
+    'nume': ('analize', 'analiza', 'denumire', 'test', 'investigatie', 'parametru'),
+    'rezultat': ('rezultat', 'rezultate', 'valoare', 'valori rezultat'),
+    'um': ('um', 'u.m.', 'u.m', 'unitate', 'unitati'),
+    'interval': ('interval', 'valori', 'referinta'),
+}
+
+# O coloană începe cu atât înaintea cuvântului din antet (unitățile și
+# valorile aliniate la dreapta ies în stânga titlului coloanei)
+MARJA_BANDA = 15.0
+
+# Cuvintele cu centrul la cel mult atâtea înălțimi de rând sunt pe același rând
+TOLERANTA_RAND = 0.5
+
+_RE_NUMAR = re.compile(r'^[<>]?=?\d+(?:[.,]\d+)?$')
+# Rezultatele calitative acceptate ca valoare (și ca interval, cu UM lipită)
+_RE_CALITATIV = re.compile(r'^(NEGATIV|POZITIV|NORMAL|ABSENT|PREZENT|NEREACTIV|REACTIV)(.*)$')
+_RE_NUMEROTARE = re.compile(r'^\d{1,3}\.\s*')
+_RE_COD_INAINTE = re.compile(r'^\(([A-Z0-9%#\-]{2,10})\)\s*(.+)$')
+_RE_COD = re.compile(r'\(([A-Z0-9%#\-]{2,10})\)')
+# Intervalul numeric de la începutul celulei + unitatea lipită sau după '/'
+_RE_INTERVAL_UM = re.compile(
+    r'^\s*([\[(]?\s*[<>≤≥]?=?\s*\d+(?:[.,]\d+)?(?:\s*[-–]\s*\d+(?:[.,]\d+)?)?\s*[\])]?)\s*/?\s*(.*)$')
+
+
+# =============================================================================
+# MODELE
+# =============================================================================
+
+# Un cuvânt din page.get_text("words"): (x0, y0, x1, y1, text, bloc, linie, cuvânt)
+Cuvant = Tuple[float, float, float, float, str, int, int, int]
+
+
+@dataclass(frozen=True)
+class BenziColoane:
+    """Coloanele unui tabel: începutul benzii x și numele coloanei, ordonate"""
+    starturi: Tuple[float, ...]
+    coloane: Tuple[str, ...]
+
+    def coloana(self, x0: float) -> Optional[str]:
+        i = bisect_right(self.starturi, x0) - 1
+        return self.coloane[i] if i >= 0 else None
+
+    def potrivire(self, alta: 'BenziColoane', toleranta: float = 3.0) -> bool:
+        """Aceleași coloane, la aceleași poziții (în toleranță)"""
+        return (self.coloane == alta.coloane and
+                all(abs(a - b) <= toleranta for a, b in zip(self.starturi, alta.starturi)))
+
+
+@dataclass
+class GeometrieLayout:
+    """Unde a găsit parsarea tabelul, per pagină (pentru șabloanele din sabloane_layout)"""
+    benzi: Optional[BenziColoane] = None                        # benzile primului antet de tabel
+    inceput: List[Optional[float]] = field(default_factory=list)  # y sus: antetul / primul rând
+    sfarsit: List[Optional[float]] = field(default_factory=list)  # y jos: ultima analiză
+    marcaje: Dict[int, float] = field(default_factory=dict)       # pagina -> y jos al marcajului SFARSIT
+    antete: int = 0                                              # pagini cu antet de tabel
+
+
+# Benzile învățate per laborator (șablonul tabelului)
+_BENZI: Dict[str, BenziColoane] = {}
+
+
+# =============================================================================
+# RÂNDURI ȘI COLOANE
+# =============================================================================
+
+def randuri_pagina(cuvinte: List[Cuvant]) -> List[List[Cuvant]]:
+    """Cuvintele grupate în rânduri vizuale (după centrul vertical), ordonate pe x"""
+    randuri: List[List[Cuvant]] = []
+    centru = inaltime = 0.0
+    for cuvant in sorted(cuvinte, key=lambda c: (c[1] + c[3]) / 2):
+        c = (cuvant[1] + cuvant[3]) / 2
+        if randuri and abs(c - centru) <= TOLERANTA_RAND * inaltime:
+            randuri[-1].append(cuvant)
+        else:
+            randuri.append([cuvant])
+            centru, inaltime = c, cuvant[3] - cuvant[1]
+    for rand in randuri:
+        rand.sort(key=lambda c: c[0])
+    return randuri
+
+
+def text_randuri(randuri: List[List[Cuvant]]) -> str:
+    """Textul paginii cu un rând vizual pe linie"""
+    return "".join(" ".join(c[4] for c in rand) + "\n" for rand in randuri)
+
+
+def taie_randuri(randuri: List[List[Cuvant]], pozitie: int) -> List[List[Cuvant]]:
+    """Rândurile dinaintea poziției date în text_randuri"""
+    taiate = []
+    for rand in randuri:
+        pozitie -= sum(len(c[4]) for c in rand) + len(rand)
+        if pozitie < 0:
+            break
+        taiate.append(rand)
+    return taiate
+
+
+@lru_cache(maxsize=4096)
+def _coloana_cuvant(text: str) -> Optional[str]:
+    cheie = unicodedata.normalize('NFKD', text.lower().strip('|:/')).encode('ascii', 'ignore').decode()
+    for coloana, cuvinte in CUVINTE_COLOANE.items():
+        if cheie in cuvinte:
+            return coloana
+    return None
+
+
+def detecteaza_benzi(rand: List[Cuvant]) -> Optional[BenziColoane]:
+    """Benzile coloanelor dacă rândul este antetul tabelului (nume + rezultat cel puțin)"""
+    gasite: Dict[str, float] = {}
+    for cuvant in rand:
+        coloana = _coloana_cuvant(cuvant[4])
+        if coloana and coloana not in gasite:
+            gasite[coloana] = cuvant[0]
+    if 'nume' not in gasite or 'rezultat' not in gasite:
+        return None
+    ordonate = sorted(gasite.items(), key=lambda kv: kv[1])
+    if ordonate[0][0] != 'nume':
+        return None
+    starturi = [0.0] + [x - MARJA_BANDA for _, x in ordonate[1:]]
+    return BenziColoane(tuple(starturi), tuple(c for c, _ in ordonate))
+
+
+def celule_rand(rand: List[Cuvant], benzi: BenziColoane) -> Dict[str, str]:
+    """Textul fiecărei coloane din rând"""
+    celule: Dict[str, List[str]] = {}
+    for cuvant in rand:
+        celule.setdefault(benzi.coloana(cuvant[0]), []).append(cuvant[4])
+    return {coloana: " ".join(cuvinte) for coloana, cuvinte in celule.items()}
+
+
+# =============================================================================
+# ANALIZE
+# =============================================================================
+
+def _nume_si_cod(text: str) -> Tuple[str, Optional[str]]:
+    """'2. (HGB) Hemoglobina' -> ('Hemoglobina (HGB)', 'HGB')"""
+    text = _RE_NUMEROTARE.sub('', text.strip())
+    inainte = _RE_COD_INAINTE.match(text)
+    if inainte:
+        text = f"{inainte.group(2)} ({inainte.group(1)})"
+    cod = _RE_COD.search(text)
+    return text, cod.group(1) if cod else None
+
+
+def _separa_interval(text: str) -> Tuple[str, str]:
+    """'[4.44 - 5.61] / mil./µL' -> ('[4.44 - 5.61]', 'mil./µL'); '4,2-5,5x10^6/µl' -> ('4,2-5,5', 'x10^6/µl')"""
+    potrivire = _RE_INTERVAL_UM.match(text) or _RE_CALITATIV.match(text.strip())
+    if potrivire is not None:
+        return potrivire.group(1).strip(), potrivire.group(2).strip()
+    return "", text.strip()     # doar unitatea (ex: 'x10^3/µl'), fără interval
+
+
+def analiza_din_celule(parser: LaboratorParser, celule: Dict[str, str],
+                       categorie: str) -> Optional[AnalizaResult]:
+    """AnalizaResult din celulele unui rând (None dacă rândul nu are nume și valoare)"""
+    nume_text = celule.get('nume', "")
+    valori = celule.get('rezultat', "").split()
+    while valori and valori[0] == '=':
+        valori.pop(0)
+    if not nume_text or not valori:
+        return None
+    valoare = valori[0].lstrip('=')
+    if not (_RE_NUMAR.match(valoare) or _RE_CALITATIV.match(valoare)):
+        return None
+
+    nume, cod = _nume_si_cod(nume_text)
+    rezultat, numeric = parser._parse_numeric(valoare)
+    interval, um_interval = _separa_interval(celule.get('interval', ""))
+    um = celule.get('um') or (valori[1] if len(valori) > 1 else "") or um_interval
+    min_v, max_v = parser._parse_interval(interval)
+    anormal, directie = parser._check_anormal(numeric, min_v, max_v)
+    return AnalizaResult(
+        categorie=categorie,
+        nume_analiza=nume,
+        cod_analiza=rezolva_cod(nume, parser.KEY or parser.NAME, cod) or cod,
+        rezultat=rezultat,
+        rezultat_numeric=numeric,
+        unitate_masura=um,
+        interval_min=min_v,
+        interval_max=max_v,
+        interval_text=interval,
+        este_anormal=anormal,
+        directie_anormal=directie,
+    )
+
+
+def parseaza_randuri(parser: LaboratorParser, pagini: List[List[List[Cuvant]]],
+                     laborator: str) -> Tuple[List[AnalizaResult], 'GeometrieLayout']:
+    """Analizele din rândurile paginilor + unde a fost găsit tabelul pe fiecare pagină"""
+    analize: List[AnalizaResult] = []
+    categorie = "GENERAL"
+    benzi: Optional[BenziColoane] = None
+    geometrie = GeometrieLayout()
+    for randuri in pagini:
+        benzi_randuri = [detecteaza_benzi(rand) for rand in randuri]
+        antet_pagina = next((rand for rand, b in zip(randuri, benzi_randuri) if b is not None), None)
+        # Pe paginile cu antet, rândurile de deasupra lui (datele pacientului)
+        # nu sunt tabel; paginile fără antet continuă tabelul de pe pagina anterioară
+        in_tabel = antet_pagina is None
+        ultima: Optional[float] = None
+        for rand, noi in zip(randuri, benzi_randuri):
+            if noi is not None:
+                if benzi is None or not benzi.potrivire(noi):
+                    # Același șablon ca documentele anterioare: benzile din cache
+                    cache = _BENZI.get(laborator)
+                    benzi = _BENZI[laborator] = cache if cache is not None and cache.potrivire(noi) else noi
+                if geometrie.benzi is None:
+                    geometrie.benzi = benzi
+                in_tabel = True
+                continue
+            if benzi is None or not in_tabel:
+                categorie = parser._detect_categorie(" ".join(c[4] for c in rand), categorie)
+                continue
+            celule = celule_rand(rand, benzi)
+            analiza = analiza_din_celule(parser, celule, categorie)
+            if analiza is not None:
+                analize.append(analiza)
+                ultima = max(c[3] for c in rand)
+            elif not celule.get('rezultat'):
+                categorie = parser._detect_categorie(" ".join(c[4] for c in rand), categorie)
+        inceput = antet_pagina or (randuri[0] if randuri else None)
+        geometrie.inceput.append(min(c[1] for c in inceput) if inceput else None)
+        geometrie.sfarsit.append(ultima)
+        geometrie.antete += antet_pagina is not None
+    return analize, geometrie
+
+
+def _parseaza_doc(parser: LaboratorParser, doc, laborator: str,
+                  sablon: Optional['SablonLayout'] = None) -> Tuple[BuletinResult, 'GeometrieLayout']:
+    """
+    Parsarea layout a unui document deschis. Cu șablon, paginile sunt extrase
+    doar din regiunea tabelului; subsolul este citit numai pe prima pagină a
+    fiecărui buletin, iar contorul "Pagina x din y" al paginilor următoare
+    este dedus din el.
+    """
+    omise = [0, 0]
+    marcaje: Dict[int, float] = {}
+    curenta = [0]
+    contor = [0, 0]     # prima pagină a buletinului curent, numărul lui de pagini
+
+    def pagina(i: int) -> List[List[Cuvant]]:
+        curenta[0] = i
+        if sablon is None:
+            return randuri_pagina(doc[i].get_text("words"))
+        if i < contor[0] + contor[1]:
+            return randuri_pagina(doc[i].get_text("words", clip=sablon.regiune(i)))
+        x0, y0, x1, _ = sablon.regiune(i)
+        randuri = randuri_pagina(doc[i].get_text("words", clip=(x0, y0, x1, sablon.inaltime)))
+        subsol = [rand for rand in randuri if rand[0][1] >= sablon.y_subsol]
+        potrivire = _RE_CONTOR_PAGINA.search(text_randuri(subsol))
+        # Fără contor, tot restul documentului e un singur buletin
+        contor[:] = ([i - int(potrivire.group(1)) + 1, int(potrivire.group(2))] if potrivire
+                     else [i, len(doc)])
+        return randuri[:len(randuri) - len(subsol)]
+
+    def text(randuri: List[List[Cuvant]]) -> str:
+        text_pagina = text_randuri(randuri)
+        # Contorul contează doar dacă după buletinul curent mai sunt pagini
+        if sablon is not None and contor[0] + contor[1] < len(doc):
+            text_pagina += f"Pagina {curenta[0] - contor[0] + 1} din {contor[1]}\n"
+        return text_pagina
+
+    def taie(randuri: List[List[Cuvant]], pozitie: int) -> List[List[Cuvant]]:
+        taiate = taie_randuri(randuri, pozitie)
+        if len(taiate) < len(randuri):
+            marcaje[curenta[0]] = max(c[3] for c in randuri[len(taiate)])
+        return taiate
+
+    pagini = list(parser._pagini_rezultate(len(doc), pagina, omise, text=text, taie=taie))
+    result = parser.parse_header(text_randuri(pagini[0]) if pagini else "")
+    result.analize, geometrie = parseaza_randuri(parser, pagini, laborator)
+    result.pagini_omise, result.linii_omise = omise
+    # Marcajul de sfârșit face parte din regiunea tabelului (altfel șablonul l-ar tăia)
+    geometrie.marcaje = marcaje
+    if not geometrie.antete:
+        result.warnings.append("Layout: niciun antet de tabel (Denumire / Rezultat) găsit")
+    return result, geometrie
+
+
+def parseaza_layout(parser: LaboratorParser, pdf_path: str,
+                    sabloane: Optional['StoreSabloane'] = None) -> BuletinResult:
+    """
+    Parsează un PDF după coordonatele cuvintelor (header-ul din textul rândurilor).
+    Cu un StoreSabloane, extragerea este decupată pe regiunile învățate pentru
+    laborator (sabloane_layout).
+    """
+    fitz = _import_fitz()
+    if fitz is None:
+        result = BuletinResult(laborator=parser.NAME)
+        result.warnings.append("PyMuPDF nu este instalat. Instalează cu: pip install pymupdf")
+        return result
+
+    laborator = parser.KEY or parser.NAME
+    doc = fitz.open(pdf_path)
+    try:
+        if sabloane is None:
+            return _parseaza_doc(parser, doc, laborator)[0]
+        return sabloane.parseaza(parser, doc, laborator)
+    finally:
+        doc.close()
+
+
+# =============================================================================
+# MAIN - TEST
+# =============================================================================
+
+def main():
+    if _import_fitz() is None:
+        print("❌ PyMuPDF nu este instalat")
+        return 1
+
+    pdf_dir = Path(__file__).parent
+    args = sys.argv[1:]
+    teste = (list(zip(args[::2], args[1::2])) if args else
+             [(str(pdf_dir / f), k) for f, k in [('AnalizeMedicale.pdf', 'clinica_sante'),
+                                                 ('1111200901011bolnavul.pdf', 'smartlabs'),
+                                                 ('analize-b-51-ro.pdf', 'elite_medical')]])
+
+    # Celula doar cu unitatea (rândurile Neu#/Lym#/... SmartLabs): nimic în interval_text
+    for celula, asteptat in [('[4.44 - 5.61] / mil./µL', ('[4.44 - 5.61]', 'mil./µL')),
+                             ('4,2-5,5x10^6/µl', ('4,2-5,5', 'x10^6/µl')),
+                             ('x10^3/µl', ('', 'x10^3/µl')), ('mg/dL', ('', 'mg/dL'))]:
+        assert _separa_interval(celula) == asteptat, f"{celula!r} -> {_separa_interval(celula)}"
+    print("✅ _separa_interval: unitatea fără interval nu ajunge în interval_text")
+
+    for pdf, key in teste:
+        parser = PARSERS[key]
+        start = time.perf_counter()
+        text = parser.parse_pdf(pdf)
+        ms_text = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        layout = parser.parse_pdf_layout(pdf)
+        ms_layout = (time.perf_counter() - start) * 1e3
+
+        # Analizele găsite de ambele moduri trebuie să aibă aceleași valori
+        dupa_nume = {" ".join(a.nume_analiza.split()): a for a in layout.analize}
+        comune = [(a, dupa_nume[" ".join(a.nume_analiza.split())]) for a in text.analize
+                  if " ".join(a.nume_analiza.split()) in dupa_nume]
+        diferite = [a.nume_analiza for a, b in comune if a.rezultat_numeric != b.rezultat_numeric or
+                    (a.interval_max is not None and (a.interval_min, a.interval_max) != (b.interval_min, b.interval_max))]
+        recuperate = sum(1 for a, b in comune if a.interval_max is None and b.interval_max is not None)
+        stare = "✅" if not diferite and len(comune) == len(text.analize) else "⚠️"
+        print(f"\n{stare} {Path(pdf).name} ({parser.NAME})")
+        print(f"   Text:   {len(text.analize):>3} analize  {ms_text:6.2f} ms")
+        print(f"   Layout: {len(layout.analize):>3} analize  {ms_layout:6.2f} ms  "
+              f"(comune {len(comune)}, valori diferite {len(diferite)}, intervale recuperate {recuperate}) "
+              f"{layout.warnings or ''}")
+        for nume in diferite[:5]:
+            print(f"     ≠ {nume}")
+        fara_um = sum(1 for a in layout.analize if not a.unitate_masura)
+        print(f"   Fără UM: text {sum(1 for a in text.analize if not a.unitate_masura)}, layout {fara_um}")
+        for a in layout.analize[:60]:
+            print(f"     {a.categorie[:12]:<12} {a.nume_analiza[:44]:<44} {a.rezultat:>8} "
+                  f"{a.unitate_masura[:12]:<12} {a.interval_text[:16]:<16} {a.cod_analiza or ''}")
+
+    # parse_pdf_layout folosește modulul importat, nu __main__
+    from parsare_layout import _BENZI as benzi
+    print(f"\n   Benzi în cache: {', '.join(f'{k}: {dict(zip(b.coloane, b.starturi))}' for k, b in benzi.items())}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,28 +13,69 @@ Laboratoare suportate:
 6. Clinica Sante
 7. SmartLabs
 8. Elite Medical / Poliana
+
+Parserele sunt instanțiate leneș la get_parser(); laboratoare noi pot fi
+adăugate ca plugin (vezi ParserRegistry) fără a modifica acest fișier.
+Parsare în flux: parser.iter_analize(text sau pagini), parser.iter_pdf(cale).
+Parsarea PDF se oprește la marcajele de sfârșit ale rezultatelor (SFARSIT);
+paginile rămase din buletin nu mai sunt extrase.
+Tabele după coordonatele cuvintelor: parser.parse_pdf_layout(cale) (vezi
+parsare_layout); în parse_pdf / iter_pdf doar pentru laboratoarele cu
+LAYOUT_PDF (opțiune explicită, activată după validarea pe buletine reale).
+Verificare timp import: python parsere_laboratoare.py --import-time [buget_ms]
+Memorie per rezultat: python parsere_laboratoare.py --memorie [n]
 """
 
 import re
+import os
+import sys
 import json
-from abc import ABC, abstractmethod
+import importlib
+import importlib.util
+from abc import ABC
 from dataclasses import dataclass, asdict, field
-from typing import Optional, List, Dict, Tuple
+from typing import Optional, List, Dict, Tuple, Callable, Iterator, Iterable, Generator, Union, Mapping
 from pathlib import Path
 
-try:
-    import fitz  # PyMuPDF
-    HAS_FITZ = True
-except ImportError:
-    HAS_FITZ = False
-    print("PyMuPDF nu este instalat. Instalează cu: pip install pymupdf")
+from detector_categorii import CategorieDetector, get_detector
+from format_spec import FormatMatcher, RandAnaliza, get_matcher, load_specs
+from dictionar_analiti import rezolva_cod
+from unitati_masura import campuri_canonice
+
+
+# =============================================================================
+# PyMuPDF - import leneș (importul modulului nu plătește costul fitz)
+# =============================================================================
+
+def _import_fitz():
+    """Importă PyMuPDF la prima utilizare; None dacă nu este instalat"""
+    try:
+        import fitz  # PyMuPDF
+    except ImportError:
+        return None
+    return fitz
+
+
+def __getattr__(name: str):
+    # Compatibilitate: HAS_FITZ este calculat doar când e cerut
+    if name == 'HAS_FITZ':
+        return importlib.util.find_spec('fitz') is not None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Contorul de pagină al buletinului ("Pagina 2 din 4")
+_RE_CONTOR_PAGINA = re.compile(r'Pagina\s+(\d+)\s+din\s+(\d+)', re.IGNORECASE)
 
 
 # =============================================================================
 # DATA MODELS
 # =============================================================================
 
-@dataclass
+# slots=True: fără __dict__ per instanță (sute de mii de rezultate la
+# re-parsarea arhivei); valorile implicite ("" / None) sunt obiecte partajate.
+# Categoria, unitatea și laboratorul se repetă - sunt internate.
+
+@dataclass(slots=True)
 class AnalizaResult:
     """Model unificat pentru o analiză"""
     categorie: str = ""
@@ -48,9 +89,13 @@ class AnalizaResult:
     interval_text: str = ""
     este_anormal: bool = False
     directie_anormal: Optional[str] = None  # 'HIGH', 'LOW'
+    
+    def __post_init__(self):
+        self.categorie = sys.intern(self.categorie)
+        self.unitate_masura = sys.intern(self.unitate_masura)
 
 
-@dataclass
+@dataclass(slots=True)
 class BuletinResult:
     """Rezultatul parsării unui buletin"""
     laborator: str = ""
@@ -60,6 +105,11 @@ class BuletinResult:
     pacient_cnp: str = ""
     analize: List[AnalizaResult] = field(default_factory=list)
     warnings: List[str] = field(default_factory=list)
+    pagini_omise: int = 0   # pagini neextrase după sfârșitul rezultatelor
+    linii_omise: int = 0    # linii tăiate după marcajul de sfârșit
+    
+    def __post_init__(self):
+        self.laborator = sys.intern(self.laborator)
 
 
 # =============================================================================
@@ -71,6 +121,23 @@ class LaboratorParser(ABC):
     
     NAME: str = "Abstract"
     DESCRIPTION: str = ""
+    KEY: str = ""  # Cheia în registry (folosită de plugin-uri)
+    # Regex-uri (case-insensitive) care recunosc laboratorul în metadatele
+    # PDF sau în prima pagină - vezi cascada_parsare
+    AMPRENTA: Tuple[str, ...] = ()
+    # Regex-uri (case-insensitive, re.MULTILINE) care marchează sfârșitul
+    # secțiunii de rezultate (ex: blocul de semnătură / validare): restul
+    # paginii nu mai este parsat, iar paginile rămase din buletin nu mai
+    # sunt extrase - vezi _pagini_rezultate
+    SFARSIT: Tuple[str, ...] = ()
+    # Tabel parsat după coordonatele cuvintelor (parsare_layout) în parse_pdf
+    # și iter_pdf - opt-in, doar după validarea pe buletine de probă
+    LAYOUT_PDF: bool = False
+    # True: subclasa implementează _iter_analize(lines, categorie, start, limita)
+    # - generator pe linii, returnează (categoria la limita, prima linie
+    # neconsumată) - și e parsată incremental, pagină cu pagină. Altfel
+    # (plugin-uri) se apelează _parse_analize pe textul complet
+    PARSARE_PE_LINII: bool = False
     
     # Unități de măsură comune
     UNITATI = [
@@ -91,32 +158,214 @@ class LaboratorParser(ABC):
         'ANALIZE DE URINA', 'SUMAR URINA', 'VSH'
     ]
     
+    # Lungimea maximă a unei linii de categorie (header)
+    CATEGORIE_LUNGIME_MAX = 60
+    
+    # Pattern-uri regex specifice parserului (compilate leneș, o dată per clasă)
+    PATTERNS: Dict[str, str] = {}
+    
+    # Câte linii de după o bucată vede parserul la parsarea pe pagini
+    # (ferestrele formatelor verticale pot trece peste marginea paginii)
+    FEREASTRA_PAGINA = 8
+    
     def parse_text(self, text: str) -> BuletinResult:
         """Parsează textul extras din PDF"""
-        result = BuletinResult(laborator=self.NAME)
-        result = self._extract_header_info(text, result)
-        result.analize = self._parse_analize(text)
+        result = self.parse_header(text)
+        result.analize = list(self.iter_analize(text))
         return result
     
-    def parse_pdf(self, pdf_path: str) -> BuletinResult:
-        """Parsează un fișier PDF"""
-        if not HAS_FITZ:
+    def parse_header(self, text: str) -> BuletinResult:
+        """Doar header-ul buletinului (fără analize)"""
+        return self._extract_header_info(text, BuletinResult(laborator=self.NAME))
+    
+    def parse_pdf(self, pdf_path: str, duplicate: Optional['IndexDuplicate'] = None) -> BuletinResult:
+        """
+        Parsează un fișier PDF. Cu un IndexDuplicate (duplicate_buletine), un
+        buletin deja cunoscut nu este reparsat: se întoarce rezultatul original.
+        """
+        if duplicate is not None:
+            return duplicate.parseaza(self, pdf_path)
+        
+        fitz = _import_fitz()
+        if fitz is None:
             result = BuletinResult(laborator=self.NAME)
-            result.warnings.append("PyMuPDF nu este instalat")
+            result.warnings.append("PyMuPDF nu este instalat. Instalează cu: pip install pymupdf")
             return result
         
+        if self.layout_pdf():
+            result = self.parse_pdf_layout(pdf_path)
+            if result.analize:
+                return result
+            # Fără tabel recunoscut: parsarea pe text
+        
         doc = fitz.open(pdf_path)
-        text = ""
-        for page in doc:
-            text += page.get_text() + "\n"
-        doc.close()
+        omise = [0, 0]
+        try:
+            pagini = self._pagini_rezultate(len(doc), lambda i: doc[i].get_text(), omise)
+            result = self.parse_text("".join(page + "\n" for page in pagini))
+        finally:
+            doc.close()
         
-        return self.parse_text(text)
+        result.pagini_omise, result.linii_omise = omise
+        return result
+    
+    def parse_pdf_layout(self, pdf_path: str, sabloane: Optional['StoreSabloane'] = None) -> BuletinResult:
+        """Parsează tabelul de rezultate după coordonatele cuvintelor (parsare_layout)"""
+        from parsare_layout import parseaza_layout
+        return parseaza_layout(self, pdf_path, sabloane)
+    
+    def parse_pagini(self, pagini: List[str]) -> BuletinResult:
+        """Parsează paginile deja extrase (textul fiecărei pagini), până la sfârșitul rezultatelor"""
+        omise = [0, 0]
+        pagini_rezultate = self._pagini_rezultate(len(pagini), pagini.__getitem__, omise)
+        result = self.parse_text("".join(page + "\n" for page in pagini_rezultate))
+        result.pagini_omise, result.linii_omise = omise
+        return result
+    
+    def iter_pdf(self, pdf_path: str) -> Tuple[BuletinResult, Iterator[AnalizaResult]]:
+        """
+        Parsare în flux a unui PDF: header-ul (din prima pagină) imediat,
+        analizele pe măsură ce paginile sunt citite și recunoscute.
+        pagini_omise / linii_omise din header sunt completate la epuizarea fluxului.
+        Cu LAYOUT_PDF analizele sunt cele din parse_pdf: tabelul este parsat
+        întreg (după coordonate) înainte de primul element al fluxului.
+        """
+        fitz = _import_fitz()
+        if fitz is None:
+            result = BuletinResult(laborator=self.NAME)
+            result.warnings.append("PyMuPDF nu este instalat. Instalează cu: pip install pymupdf")
+            return result, iter(())
+        
+        if self.layout_pdf():
+            result = self.parse_pdf_layout(pdf_path)
+            if result.analize:
+                analize, result.analize = result.analize, []
+                return result, iter(analize)
+            # Fără tabel recunoscut: fluxul pe text, ca în parse_pdf
+        
+        doc = fitz.open(pdf_path)
+        header = self.parse_header(doc[0].get_text() if len(doc) else "")
+        
+        def pagini() -> Iterator[str]:
+            omise = [0, 0]
+            try:
+                yield from self._pagini_rezultate(len(doc), lambda i: doc[i].get_text(), omise)
+            finally:
+                doc.close()
+                header.pagini_omise, header.linii_omise = omise
+        
+        return header, self.iter_analize(pagini())
+    
+    def iter_analize(self, text_or_pages: Union[str, Iterable[str]]) -> Iterator[AnalizaResult]:
+        """
+        Generează analizele pe măsură ce sunt recunoscute, cu cod_analiza
+        completat din dicționarul canonic (dictionar_analiti).
+        
+        Acceptă textul complet sau paginile (textul fiecărei pagini, ca în
+        parse_pdf); paginile sunt consumate leneș, iar ultimele
+        FEREASTRA_PAGINA linii sunt păstrate pentru bucata următoare, ca
+        ferestrele formatelor verticale să poată trece peste marginea paginii.
+        Rezultatul este identic cu parsarea textului complet.
+        """
+        laborator = self.KEY or self.NAME
+        for analiza in self._iter_brut(text_or_pages):
+            analiza.cod_analiza = (rezolva_cod(analiza.nume_analiza, laborator, analiza.cod_analiza)
+                                   or analiza.cod_analiza)
+            yield analiza
+    
+    def _iter_brut(self, text_or_pages: Union[str, Iterable[str]]) -> Iterator[AnalizaResult]:
+        """Analizele exact cum le recunoaște parserul (fără codurile canonice)"""
+        if not self.PARSARE_PE_LINII:
+            # Parser (plugin) care implementează doar _parse_analize
+            if not isinstance(text_or_pages, str):
+                text_or_pages = "".join(page + "\n" for page in text_or_pages)
+            yield from self._parse_analize(text_or_pages)
+            return
+        
+        if isinstance(text_or_pages, str):
+            yield from self._iter_analize(text_or_pages.split('\n'))
+            return
+        
+        categorie, start = "GENERAL", 0
+        linii: List[str] = []  # linii neprocesate + fereastra de după ele
+        for page in text_or_pages:
+            # Liniile paginii exact ca în textul concatenat din parse_pdf
+            linii.extend((page + "\n").split('\n')[:-1])
+            limita = len(linii) - self.FEREASTRA_PAGINA
+            if limita > 0:
+                categorie, urmatoarea = yield from self._iter_analize(linii, categorie, start, limita)
+                linii = linii[limita:]
+                start = urmatoarea - limita
+        
+        # Restul + linia goală de după ultimul '\n'
+        linii.append('')
+        yield from self._iter_analize(linii, categorie, start)
     
-    @abstractmethod
     def _parse_analize(self, text: str) -> List[AnalizaResult]:
-        """Parsează analizele - implementat de fiecare subclasă"""
-        pass
+        """Parsează analizele - subclasele implementează _iter_analize (PARSARE_PE_LINII) sau această metodă"""
+        return list(self.iter_analize(text))
+    
+    def _pagini_rezultate(self, nr_pagini: int, pagina: Callable[[int], object], omise: List[int],
+                          text: Callable[[object], str] = lambda p: p,
+                          taie: Callable[[object, int], object] = lambda p, poz: p[:poz]) -> Iterator:
+        """
+        Paginile documentului, extrase leneș prin pagina(i), până la sfârșitul
+        rezultatelor. Pe pagina cu marcaj SFARSIT restul paginii este tăiat;
+        paginile rămase din buletin (după contorul "Pagina x din y"; fără
+        contor - tot restul documentului) nu mai sunt extrase. Dacă PDF-ul are
+        mai multe pagini decât buletinul, extragerea continuă cu următorul.
+        omise = [pagini, linii] sărite, adunate pe loc.
+        """
+        i = 0
+        while i < nr_pagini:
+            continut = pagina(i)
+            i += 1
+            text_pagina = text(continut)
+            sfarsit = self._sfarsit_pagina(text_pagina)
+            if sfarsit is None:
+                yield continut
+                continue
+            pozitie, ramase = sfarsit
+            omise[1] += text_pagina.count('\n', pozitie)
+            yield taie(continut, pozitie)
+            sari = nr_pagini - i if ramase is None else min(ramase, nr_pagini - i)
+            omise[0] += sari
+            i += sari
+    
+    def _sfarsit_pagina(self, text: str) -> Optional[Tuple[int, Optional[int]]]:
+        """
+        (începutul liniei cu marcajul de sfârșit, pagini rămase din buletin
+        după contor sau None fără contor), ori None dacă pagina nu are marcaj
+        """
+        marcaj = self._re_sfarsit()
+        potrivire = marcaj.search(text) if marcaj is not None else None
+        if potrivire is None:
+            return None
+        contor = _RE_CONTOR_PAGINA.search(text)
+        ramase = max(0, int(contor.group(2)) - int(contor.group(1))) if contor else None
+        return text.rfind('\n', 0, potrivire.start()) + 1, ramase
+    
+    @classmethod
+    def amprenta(cls) -> Tuple[str, ...]:
+        return cls.AMPRENTA
+    
+    @classmethod
+    def sfarsit(cls) -> Tuple[str, ...]:
+        return cls.SFARSIT
+    
+    @classmethod
+    def layout_pdf(cls) -> bool:
+        return cls.LAYOUT_PDF
+    
+    @classmethod
+    def _re_sfarsit(cls) -> Optional['re.Pattern']:
+        """Marcajele de sfârșit într-un singur regex, compilat o dată per clasă"""
+        if '_sfarsit_compilat' not in cls.__dict__:
+            marcaje = cls.sfarsit()
+            cls._sfarsit_compilat = (
+                re.compile("|".join(f"(?:{m})" for m in marcaje), re.IGNORECASE | re.MULTILINE)
+                if marcaje else None)
+        return cls._sfarsit_compilat
     
     def _extract_header_info(self, text: str, result: BuletinResult) -> BuletinResult:
         """Extrage informații header comune"""
@@ -205,339 +454,194 @@ class LaboratorParser(ABC):
                 return um
         return ""
     
+    @classmethod
+    def _patterns(cls) -> Dict[str, 're.Pattern']:
+        """Setul de pattern-uri compilate, construit la prima utilizare per clasă"""
+        compiled = cls.__dict__.get('_compiled_patterns')
+        if compiled is None:
+            compiled = {name: re.compile(pattern) for name, pattern in cls.PATTERNS.items()}
+            cls._compiled_patterns = compiled
+        return compiled
+    
+    @classmethod
+    def _categorie_detector(cls) -> CategorieDetector:
+        """Detectorul de categorii, compilat o singură dată per clasă"""
+        detector = cls.__dict__.get('_detector')
+        if detector is None:
+            detector = get_detector(tuple(cls.CATEGORII), cls.CATEGORIE_LUNGIME_MAX)
+            cls._detector = detector
+        return detector
+    
     def _detect_categorie(self, line: str, current: str) -> str:
         """Detectează categoria din linie"""
-        line_upper = line.upper().strip()
-        for cat in self.CATEGORII:
-            if cat in line_upper and len(line) < 60:
-                return cat
-        return current
+        return self._categorie_detector().detect(line, current)
+
+
+# =============================================================================
+# PARSER DECLARATIV (format_spec.py + formate_laboratoare.json)
+# =============================================================================
+
+class SpecParser(LaboratorParser):
+    """
+    Parser construit dintr-o specificație declarativă de format.
+    Matcherul este compilat o singură dată per laborator și păstrat în cache;
+    construcția AnalizaResult este comună tuturor laboratoarelor declarative.
+    """
+    SPEC_KEY: str = ""
+    SPEC_PATH: Optional[str] = None  # None = formate_laboratoare.json
+    PARSARE_PE_LINII = True
+    
+    def _matcher(self) -> FormatMatcher:
+        return get_matcher(self.SPEC_KEY, tuple(self.UNITATI), self.SPEC_PATH)
+    
+    @classmethod
+    def amprenta(cls) -> Tuple[str, ...]:
+        return tuple(load_specs(cls.SPEC_PATH)[cls.SPEC_KEY].get('amprenta', ())) or cls.AMPRENTA
+    
+    @classmethod
+    def sfarsit(cls) -> Tuple[str, ...]:
+        return tuple(load_specs(cls.SPEC_PATH)[cls.SPEC_KEY].get('sfarsit', ())) or cls.SFARSIT
+    
+    @classmethod
+    def layout_pdf(cls) -> bool:
+        return bool(load_specs(cls.SPEC_PATH)[cls.SPEC_KEY].get('layout_pdf', cls.LAYOUT_PDF))
+    
+    def _iter_analize(self, lines: List[str], categorie: str = "GENERAL",
+                      start: int = 0, limita: Optional[int] = None) -> Generator:
+        matcher = self._matcher()
+        categorii = self._categorie_detector().index(lines, strip=matcher.strip_categorii)
+        if matcher.valoare == 'separator_mii':
+            construieste = lambda cat, rand: self._analiza_din_rand(cat, rand, True)  # noqa: E731
+        else:
+            construieste = self._analiza_din_rand     # fără un apel în plus per analiză
+        return (yield from matcher.iter_randuri(lines, categorii, categorie, start, limita,
+                                                construieste=construieste))
+    
+    def _analiza_din_rand(self, categorie: str, rand: RandAnaliza, separator_mii: bool = False) -> AnalizaResult:
+        """Construiește AnalizaResult din câmpurile brute ale matcherului"""
+        if separator_mii:
+            # Valori de tip 5.490.000 (punct = separator de mii)
+            val_text = rand.valoare
+            try:
+                val_num = float(val_text.replace('.', '').replace(',', '.'))
+            except ValueError:
+                val_num = None
+        else:
+            val_text, val_num = self._parse_numeric(rand.valoare)
+        
+        if rand.limite is None:
+            min_v, max_v = self._parse_interval(rand.interval_text)
+        else:
+            min_v, max_v = self._parse_limita(rand.limite[0]), self._parse_limita(rand.limite[1])
+        
+        anormal, directie = self._check_anormal(val_num, min_v, max_v)
+        if rand.marker_anormal:
+            anormal = True
+        
+        return AnalizaResult(
+            categorie=categorie,
+            nume_analiza=rand.nume,
+            cod_analiza=rand.cod,
+            rezultat=val_text,
+            rezultat_numeric=val_num,
+            unitate_masura=rand.um,
+            interval_min=min_v,
+            interval_max=max_v,
+            interval_text=rand.interval_text,
+            este_anormal=anormal,
+            directie_anormal=directie
+        )
+    
+    @staticmethod
+    def _parse_limita(text: Optional[str]) -> Optional[float]:
+        if not text:
+            return None
+        try:
+            return float(text.replace(',', '.'))
+        except ValueError:
+            return None
+
+
+def spec_parser_class(key: str, spec_path: Optional[str] = None) -> type:
+    """Creează clasa de parser pentru un laborator descris doar în specificații"""
+    spec = load_specs(spec_path)[key]
+    return type(f"SpecParser_{key}", (SpecParser,), {
+        'NAME': spec.get('name', key),
+        'DESCRIPTION': spec.get('description', ''),
+        'KEY': key,
+        'SPEC_KEY': key,
+        'SPEC_PATH': spec_path,
+    })
 
 
 # =============================================================================
 # PARSER: REGINA MARIA
 # =============================================================================
 
-class ReginaMariaParser(LaboratorParser):
+class ReginaMariaParser(SpecParser):
     """
     Parser pentru Regina Maria
     Format: Denumire (COD) = Valoare UM [min - max]
     """
     NAME = "Regina Maria"
     DESCRIPTION = "Format: Denumire (COD) = Valoare UM [min - max]"
-    
-    def _parse_analize(self, text: str) -> List[AnalizaResult]:
-        analize = []
-        current_cat = "GENERAL"
-        
-        # Pattern: Nume (COD) = valoare UM [interval]
-        pattern = re.compile(
-            r'^\s*(.+?)\s*'                    # Nume
-            r'=\s*([<>]?\d+[.,]?\d*)\s*'       # = Valoare
-            r'([a-zA-Z/%µ\.\^0-9]+)?\s*'       # UM
-            r'(\[[^\]]+\])?',                  # [interval]
-            re.MULTILINE
-        )
-        
-        for line in text.split('\n'):
-            current_cat = self._detect_categorie(line, current_cat)
-            
-            if '=' not in line:
-                continue
-            
-            match = pattern.match(line.strip())
-            if match:
-                nume = match.group(1).strip()
-                val_text, val_num = self._parse_numeric(match.group(2))
-                um = (match.group(3) or "").strip()
-                interval = match.group(4) or ""
-                
-                min_v, max_v = self._parse_interval(interval)
-                anormal, directie = self._check_anormal(val_num, min_v, max_v)
-                
-                # Extrage cod din nume
-                cod = None
-                cod_match = re.search(r'\(([A-Z]{2,10})\)', nume)
-                if cod_match:
-                    cod = cod_match.group(1)
-                
-                analize.append(AnalizaResult(
-                    categorie=current_cat,
-                    nume_analiza=nume,
-                    cod_analiza=cod,
-                    rezultat=val_text,
-                    rezultat_numeric=val_num,
-                    unitate_masura=um,
-                    interval_min=min_v,
-                    interval_max=max_v,
-                    interval_text=interval,
-                    este_anormal=anormal,
-                    directie_anormal=directie
-                ))
-        
-        return analize
+    SPEC_KEY = 'regina_maria'
 
 
 # =============================================================================
 # PARSER: PROMED
 # =============================================================================
 
-class ProMedParser(LaboratorParser):
+class ProMedParser(SpecParser):
     """
     Parser pentru ProMed
     Format tabel: Nr | Denumire test | Rezultat | U.M. | Interval
     """
     NAME = "ProMed"
     DESCRIPTION = "Format tabel: Nr. | Denumire | Rezultat | U.M. | Interval"
-    
-    def _parse_analize(self, text: str) -> List[AnalizaResult]:
-        analize = []
-        current_cat = "GENERAL"
-        
-        # Pattern pentru linie cu număr la început
-        pattern = re.compile(
-            r'^\s*(\d+)\s+'                    # Nr.
-            r'(.+?)\s+'                        # Denumire
-            r'(\d+[.,]?\d*)\s+'                # Rezultat
-            r'([a-zA-Z/%µ]+)\s+'               # U.M.
-            r'(\d+[.,]?\d*\s*[-–]\s*\d+[.,]?\d*)',  # Interval
-            re.MULTILINE
-        )
-        
-        for line in text.split('\n'):
-            current_cat = self._detect_categorie(line, current_cat)
-            
-            match = pattern.match(line.strip())
-            if match:
-                nume = match.group(2).strip()
-                val_text, val_num = self._parse_numeric(match.group(3))
-                um = match.group(4).strip()
-                interval = match.group(5)
-                
-                min_v, max_v = self._parse_interval(interval)
-                anormal, directie = self._check_anormal(val_num, min_v, max_v)
-                
-                analize.append(AnalizaResult(
-                    categorie=current_cat,
-                    nume_analiza=nume,
-                    rezultat=val_text,
-                    rezultat_numeric=val_num,
-                    unitate_masura=um,
-                    interval_min=min_v,
-                    interval_max=max_v,
-                    interval_text=interval,
-                    este_anormal=anormal,
-                    directie_anormal=directie
-                ))
-        
-        return analize
+    SPEC_KEY = 'promed'
 
 
 # =============================================================================
 # PARSER: MEDLIFE
 # =============================================================================
 
-class MedLifeParser(LaboratorParser):
+class MedLifeParser(SpecParser):
     """
     Parser pentru MedLife
     Format: Test | Rezultat | UM | min - max UM
     """
     NAME = "MedLife"
     DESCRIPTION = "Format: Test | Rezultat | UM | Interval"
-    
-    def _parse_analize(self, text: str) -> List[AnalizaResult]:
-        analize = []
-        current_cat = "GENERAL"
-        lines = text.split('\n')
-        
-        for i, line in enumerate(lines):
-            current_cat = self._detect_categorie(line, current_cat)
-            line = line.strip()
-            
-            # Căutăm pattern: Nume analiza urmată de valoare numerică
-            # Exemplu: "Nr. eritrocite    4.38    *10^6/µl    3.8 - 5.3 *10^6/µl"
-            
-            # Găsim toate numerele din linie
-            numbers = re.findall(r'(\d+[.,]?\d*)', line)
-            if len(numbers) >= 1:
-                # Verificăm dacă linia pare să fie o analiză
-                um = self._find_unitate(line)
-                if um:
-                    # Extragem numele (tot ce e înainte de primul număr)
-                    first_num_pos = line.find(numbers[0])
-                    if first_num_pos > 5:
-                        nume = line[:first_num_pos].strip()
-                        val_text, val_num = self._parse_numeric(numbers[0])
-                        
-                        # Căutăm interval
-                        interval_match = re.search(r'(\d+[.,]?\d*)\s*[-–]\s*(\d+[.,]?\d*)', line)
-                        min_v, max_v = None, None
-                        interval_text = ""
-                        if interval_match:
-                            min_v, max_v = self._parse_interval(interval_match.group(0))
-                            interval_text = interval_match.group(0)
-                        
-                        anormal, directie = self._check_anormal(val_num, min_v, max_v)
-                        
-                        # Validare: numele trebuie să arate a analiză
-                        if len(nume) > 3 and not nume[0].isdigit():
-                            analize.append(AnalizaResult(
-                                categorie=current_cat,
-                                nume_analiza=nume,
-                                rezultat=val_text,
-                                rezultat_numeric=val_num,
-                                unitate_masura=um,
-                                interval_min=min_v,
-                                interval_max=max_v,
-                                interval_text=interval_text,
-                                este_anormal=anormal,
-                                directie_anormal=directie
-                            ))
-        
-        return analize
+    SPEC_KEY = 'medlife'
 
 
 # =============================================================================
 # PARSER: SYNEVO
 # =============================================================================
 
-class SynevoParser(LaboratorParser):
+class SynevoParser(SpecParser):
     """
     Parser pentru Synevo
     Format: Denumire | Rezultat | UM | Interval (cu indicator 23 pentru anormal)
     """
     NAME = "Synevo"
     DESCRIPTION = "Format: Denumire | Rezultat | UM | Interval"
-    
-    def _parse_analize(self, text: str) -> List[AnalizaResult]:
-        analize = []
-        current_cat = "GENERAL"
-        lines = text.split('\n')
-        
-        for i, line in enumerate(lines):
-            current_cat = self._detect_categorie(line, current_cat)
-            line = line.strip()
-            
-            # Skip linii scurte sau de header
-            if len(line) < 10:
-                continue
-            if any(skip in line.lower() for skip in ['denumire', 'rezultat', 'interval', 'pagina']):
-                continue
-            
-            # Pattern Synevo: poate avea "23" la început pentru anormal
-            is_anormal_marker = line.startswith('23')
-            if is_anormal_marker:
-                line = line[2:].strip()
-            
-            # Căutăm valori numerice
-            numbers = re.findall(r'(\d+[.,]?\d*)', line)
-            um = self._find_unitate(line)
-            
-            if numbers and um:
-                first_num_pos = line.find(numbers[0])
-                if first_num_pos > 3:
-                    nume = line[:first_num_pos].strip()
-                    val_text, val_num = self._parse_numeric(numbers[0])
-                    
-                    # Interval
-                    min_v, max_v = None, None
-                    interval_text = ""
-                    
-                    # Format < valoare
-                    less_match = re.search(r'<\s*(\d+[.,]?\d*)', line)
-                    if less_match:
-                        max_v = float(less_match.group(1).replace(',', '.'))
-                        interval_text = f"< {less_match.group(1)}"
-                    else:
-                        interval_match = re.search(r'(\d+[.,]?\d*)\s*[-–]\s*(\d+[.,]?\d*)', line)
-                        if interval_match:
-                            min_v, max_v = self._parse_interval(interval_match.group(0))
-                            interval_text = interval_match.group(0)
-                    
-                    anormal, directie = self._check_anormal(val_num, min_v, max_v)
-                    if is_anormal_marker:
-                        anormal = True
-                    
-                    if len(nume) > 2 and not nume[0].isdigit():
-                        analize.append(AnalizaResult(
-                            categorie=current_cat,
-                            nume_analiza=nume,
-                            rezultat=val_text,
-                            rezultat_numeric=val_num,
-                            unitate_masura=um,
-                            interval_min=min_v,
-                            interval_max=max_v,
-                            interval_text=interval_text,
-                            este_anormal=anormal,
-                            directie_anormal=directie
-                        ))
-        
-        return analize
+    SPEC_KEY = 'synevo'
 
 
 # =============================================================================
 # PARSER: BIOCLINICA
 # =============================================================================
 
-class BioclinicaParser(LaboratorParser):
+class BioclinicaParser(SpecParser):
     """
     Parser pentru Bioclinica
     Format: Denumire | Valoare /UM | (min - max)
     """
     NAME = "Bioclinica"
     DESCRIPTION = "Format: Denumire | Valoare /UM | (min - max)"
-    
-    def _parse_analize(self, text: str) -> List[AnalizaResult]:
-        analize = []
-        current_cat = "GENERAL"
-        
-        for line in text.split('\n'):
-            current_cat = self._detect_categorie(line, current_cat)
-            line = line.strip()
-            
-            # Pattern Bioclinica: Nume valoare /um (interval)
-            # Exemplu: "Hematii 5.490.000 /mm³ (4.300.000 - 5.750.000)"
-            
-            match = re.match(
-                r'^(.+?)\s+'                      # Nume
-                r'([\d.,]+)\s*'                   # Valoare (poate avea . ca separator mii)
-                r'/?([a-zA-Z/%µ³0-9]+)?\s*'       # UM
-                r'\(([^)]+)\)?',                  # (interval)
-                line
-            )
-            
-            if match:
-                nume = match.group(1).strip()
-                
-                # Parsează valoarea (poate fi 5.490.000)
-                val_str = match.group(2).replace('.', '').replace(',', '.')
-                val_text = match.group(2)
-                try:
-                    val_num = float(val_str)
-                except ValueError:
-                    val_num = None
-                
-                um = (match.group(3) or "").strip()
-                interval = f"({match.group(4)})" if match.group(4) else ""
-                
-                min_v, max_v = self._parse_interval(interval)
-                anormal, directie = self._check_anormal(val_num, min_v, max_v)
-                
-                if len(nume) > 2:
-                    analize.append(AnalizaResult(
-                        categorie=current_cat,
-                        nume_analiza=nume,
-                        rezultat=val_text,
-                        rezultat_numeric=val_num,
-                        unitate_masura=um,
-                        interval_min=min_v,
-                        interval_max=max_v,
-                        interval_text=interval,
-                        este_anormal=anormal,
-                        directie_anormal=directie
-                    ))
-        
-        return analize
+    SPEC_KEY = 'bioclinica'
 
 
 # =============================================================================
@@ -556,25 +660,36 @@ class ClinicaSanteParser(LaboratorParser):
     """
     NAME = "Clinica Sante"
     DESCRIPTION = "Format vertical: Nume → [Interval] → UM → Valoare"
+    AMPRENTA = (r'Clinica\s+Sante', r'clinica-sante', r'analizeonline\.ro')
+    SFARSIT = (r'^Verificat si autorizat de',)
+    PARSARE_PE_LINII = True
     
-    def _parse_analize(self, text: str) -> List[AnalizaResult]:
-        analize = []
-        current_cat = "GENERAL"
-        lines = text.split('\n')
-        
+    PATTERNS = {
         # Pattern pentru interval
-        interval_pattern = re.compile(r'^\[([<>]?\d+[.,]?\d*)\s*[-–]\s*([<>]?\d+[.,]?\d*)\]$')
+        'interval': r'^\[([<>]?\d+[.,]?\d*)\s*[-–]\s*([<>]?\d+[.,]?\d*)\]$',
         # Pattern pentru nume analiză (conține paranteze cu cod)
-        nume_pattern = re.compile(r'^([A-Za-zĂÂÎȘȚăâîșț\s.\-]+)\s*\(([A-Z0-9\-%]+)\)\s*$')
+        'nume': r'^([A-Za-zĂÂÎȘȚăâîșț\s.\-]+)\s*\(([A-Z0-9\-%]+)\)\s*$',
         # Pattern pentru valoare (număr cu spații)
-        valoare_pattern = re.compile(r'^\s*(\d+[.,]?\d*)\s*$')
+        'valoare': r'^\s*(\d+[.,]?\d*)\s*$',
+    }
+    
+    def _iter_analize(self, lines: List[str], categorie: str = "GENERAL",
+                      start: int = 0, limita: Optional[int] = None) -> Generator:
+        current_cat = categorie
+        categorii = self._categorie_detector().index(lines, strip=True)
+        patterns = self._patterns()
+        interval_pattern = patterns['interval']
+        nume_pattern = patterns['nume']
+        valoare_pattern = patterns['valoare']
+        if limita is None:
+            limita = len(lines)
         
-        i = 0
-        while i < len(lines):
+        i = start
+        while i < limita:
             line = lines[i].strip()
             
             # Detectare categorie
-            current_cat = self._detect_categorie(line, current_cat)
+            current_cat = categorii.get(i, current_cat)
             
             # Căutăm nume analiză cu cod în paranteză
             nume_match = nume_pattern.match(line)
@@ -619,7 +734,7 @@ class ClinicaSanteParser(LaboratorParser):
                 if valoare_text and interval_text:
                     anormal, directie = self._check_anormal(valoare_num, interval_min, interval_max)
                     
-                    analize.append(AnalizaResult(
+                    yield AnalizaResult(
                         categorie=current_cat,
                         nume_analiza=nume,
                         cod_analiza=cod,
@@ -631,191 +746,239 @@ class ClinicaSanteParser(LaboratorParser):
                         interval_text=interval_text,
                         este_anormal=anormal,
                         directie_anormal=directie
-                    ))
+                    )
             
             i += 1
         
-        return analize
+        return current_cat, i
 
 
 # =============================================================================
 # PARSER: SMARTLABS
 # =============================================================================
 
-class SmartLabsParser(LaboratorParser):
+class SmartLabsParser(SpecParser):
     """
     Parser pentru SmartLabs
     Format: (COD) Nume / Valoare UM / Interval UM
     """
     NAME = "SmartLabs"
     DESCRIPTION = "Format: (COD) Nume | Valoare UM | Interval UM"
-    
-    def _parse_analize(self, text: str) -> List[AnalizaResult]:
-        analize = []
-        current_cat = "GENERAL"
-        lines = text.split('\n')
-        
-        # Pattern pentru linie cu cod
-        cod_pattern = re.compile(r'^\(([A-Z]+)\)\s+(.+)$')
-        
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            current_cat = self._detect_categorie(line, current_cat)
-            
-            cod_match = cod_pattern.match(line)
-            if cod_match:
-                cod = cod_match.group(1)
-                nume = cod_match.group(2).strip()
-                
-                # Următoarea linie: valoare UM
-                if i + 1 < len(lines):
-                    val_line = lines[i + 1].strip()
-                    val_match = re.match(r'^([\d.,]+)\s+(.+)$', val_line)
-                    if val_match:
-                        val_text, val_num = self._parse_numeric(val_match.group(1))
-                        um = val_match.group(2).strip()
-                        
-                        # Următoarea: interval
-                        min_v, max_v = None, None
-                        interval_text = ""
-                        if i + 2 < len(lines):
-                            int_line = lines[i + 2].strip()
-                            int_match = re.match(r'^([\d.,]+)\s*[-–]\s*([\d.,]+)', int_line)
-                            if int_match:
-                                min_v = float(int_match.group(1).replace(',', '.'))
-                                max_v = float(int_match.group(2).replace(',', '.'))
-                                interval_text = int_match.group(0)
-                        
-                        anormal, directie = self._check_anormal(val_num, min_v, max_v)
-                        
-                        analize.append(AnalizaResult(
-                            categorie=current_cat,
-                            nume_analiza=f"{nume} ({cod})",
-                            cod_analiza=cod,
-                            rezultat=val_text,
-                            rezultat_numeric=val_num,
-                            unitate_masura=um,
-                            interval_min=min_v,
-                            interval_max=max_v,
-                            interval_text=interval_text,
-                            este_anormal=anormal,
-                            directie_anormal=directie
-                        ))
-                        i += 2
-            i += 1
-        
-        return analize
+    SPEC_KEY = 'smartlabs'
 
 
 # =============================================================================
 # PARSER: ELITE MEDICAL / POLIANA
 # =============================================================================
 
-class EliteMedicalParser(LaboratorParser):
+class EliteMedicalParser(SpecParser):
     """
     Parser pentru Elite Medical / Poliana
     Format: Nume (COD) / = Valoare UM / [min - max] / UM
     """
     NAME = "Elite Medical"
     DESCRIPTION = "Format: Nume (COD) | = Valoare UM | [min - max] / UM"
-    
-    def _parse_analize(self, text: str) -> List[AnalizaResult]:
-        analize = []
-        current_cat = "GENERAL"
-        lines = text.split('\n')
-        
-        # Pattern pentru linie cu = valoare
-        val_pattern = re.compile(r'^=\s*([\d.,]+)\s+(.+)$')
-        # Pattern pentru interval
-        int_pattern = re.compile(r'\[([\d.,]+)\s*[-–]\s*([\d.,]+)\]')
-        
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            current_cat = self._detect_categorie(line, current_cat)
-            
-            # Căutăm linie cu denumire care conține (COD)
-            if '(' in line and ')' in line and '=' not in line and '[' not in line:
-                nume = line.strip()
-                cod_match = re.search(r'\(([A-Z%0-9-]+)\)', nume)
-                cod = cod_match.group(1) if cod_match else None
-                
-                # Căutăm = valoare în liniile următoare
-                for offset in range(1, 4):
-                    if i + offset >= len(lines):
-                        break
-                    next_line = lines[i + offset].strip()
-                    
-                    val_match = val_pattern.match(next_line)
-                    if val_match:
-                        val_text, val_num = self._parse_numeric(val_match.group(1))
-                        um = val_match.group(2).strip()
-                        
-                        # Căutăm interval
-                        min_v, max_v = None, None
-                        interval_text = ""
-                        for offset2 in range(offset + 1, offset + 4):
-                            if i + offset2 >= len(lines):
-                                break
-                            int_line = lines[i + offset2].strip()
-                            int_match = int_pattern.search(int_line)
-                            if int_match:
-                                min_v = float(int_match.group(1).replace(',', '.'))
-                                max_v = float(int_match.group(2).replace(',', '.'))
-                                interval_text = f"[{int_match.group(1)} - {int_match.group(2)}]"
-                                break
-                        
-                        anormal, directie = self._check_anormal(val_num, min_v, max_v)
-                        
-                        analize.append(AnalizaResult(
-                            categorie=current_cat,
-                            nume_analiza=nume,
-                            cod_analiza=cod,
-                            rezultat=val_text,
-                            rezultat_numeric=val_num,
-                            unitate_masura=um,
-                            interval_min=min_v,
-                            interval_max=max_v,
-                            interval_text=interval_text,
-                            este_anormal=anormal,
-                            directie_anormal=directie
-                        ))
-                        break
-            
-            i += 1
-        
-        return analize
+    SPEC_KEY = 'elite_medical'
 
 
 # =============================================================================
 # REGISTRY - Lista tuturor parserelor
 # =============================================================================
 
-PARSERS: Dict[str, LaboratorParser] = {
-    'regina_maria': ReginaMariaParser(),
-    'promed': ProMedParser(),
-    'medlife': MedLifeParser(),
-    'synevo': SynevoParser(),
-    'bioclinica': BioclinicaParser(),
-    'clinica_sante': ClinicaSanteParser(),
-    'smartlabs': SmartLabsParser(),
-    'elite_medical': EliteMedicalParser(),
-}
+ParserFactory = Union[type, Callable[[], LaboratorParser], str]
+
+
+class ParserRegistry(Mapping):
+    """
+    Registry leneș de parsere: stochează fabrici (clasă, callable sau
+    'modul:Clasa') și instanțiază fiecare parser la primul get_parser(key).
+    
+    Parserele externe sunt descoperite o singură dată, la prima cheie
+    necunoscută sau la listare, fără modificarea acestui fișier:
+    - entry points Python din grupul 'valyan.parsere_laboratoare'
+      (nume = cheia, valoare = 'pachet.modul:ClasaParser')
+    - fișiere *.py din directoarele de plugin (ANALIZE_PARSERS_PLUGINS,
+      separate prin os.pathsep, implicit ./parsere_plugin); un plugin definește
+      register_parsers(registry) sau subclase LaboratorParser cu KEY setat
+    - laboratoare descrise doar declarativ: intrările din formate_laboratoare.json
+      fără clasă dedicată și fișierele *.json / *.yaml din directoarele de plugin
+    """
+    
+    ENTRY_POINT_GROUP = 'valyan.parsere_laboratoare'
+    PLUGIN_ENV = 'ANALIZE_PARSERS_PLUGINS'
+    PLUGIN_DIR = Path(__file__).parent / 'parsere_plugin'
+    
+    def __init__(self, factories: Optional[Dict[str, ParserFactory]] = None):
+        self._factories: Dict[str, ParserFactory] = dict(factories or {})
+        self._instances: Dict[str, LaboratorParser] = {}
+        self._discovered = False
+        self.erori: List[str] = []
+    
+    def register(self, key: str, factory: ParserFactory, replace: bool = True):
+        """Înregistrează o fabrică de parser (fără a o instanția)"""
+        if not replace and key in self._factories:
+            return
+        self._factories[key] = factory
+        self._instances.pop(key, None)
+    
+    def get(self, key: str, default=None) -> Optional[LaboratorParser]:
+        """Returnează parserul, instanțiat la prima utilizare"""
+        parser = self._instances.get(key)
+        if parser is not None:
+            return parser
+        
+        if key not in self._factories:
+            self.discover()
+            if key not in self._factories:
+                return default
+        
+        parser = self._resolve(self._factories[key])()
+        self._instances[key] = parser
+        return parser
+    
+    def parser_class(self, key: str):
+        """Clasa parserului (pentru NAME/DESCRIPTION fără instanțiere)"""
+        factory = self._resolve(self._factories[key])
+        return factory if isinstance(factory, type) else type(self.get(key))
+    
+    def __getitem__(self, key: str) -> LaboratorParser:
+        parser = self.get(key)
+        if parser is None:
+            raise KeyError(key)
+        return parser
+    
+    def __iter__(self) -> Iterator[str]:
+        self.discover()
+        return iter(list(self._factories))
+    
+    def __len__(self) -> int:
+        self.discover()
+        return len(self._factories)
+    
+    def __contains__(self, key) -> bool:
+        if key not in self._factories:
+            self.discover()
+        return key in self._factories
+    
+    # -------------------------------------------------------------------------
+    # DESCOPERIRE PLUGIN-URI
+    # -------------------------------------------------------------------------
+    
+    def discover(self):
+        """Caută parsere externe (o singură dată per proces)"""
+        if self._discovered:
+            return
+        self._discovered = True
+        self._discover_entry_points()
+        self._discover_specs(None)
+        for plugin_dir in self._plugin_dirs():
+            self._discover_directory(plugin_dir)
+    
+    def _plugin_dirs(self) -> List[Path]:
+        env = os.environ.get(self.PLUGIN_ENV)
+        if env:
+            return [Path(p) for p in env.split(os.pathsep) if p]
+        return [self.PLUGIN_DIR]
+    
+    def _discover_entry_points(self):
+        try:
+            from importlib.metadata import entry_points
+            eps = entry_points()
+            if hasattr(eps, 'select'):
+                eps = eps.select(group=self.ENTRY_POINT_GROUP)
+            else:  # Python < 3.10
+                eps = eps.get(self.ENTRY_POINT_GROUP, [])
+            for ep in eps:
+                # Parserele incluse au prioritate față de plugin-uri
+                self.register(ep.name, ep, replace=False)
+        except Exception as e:
+            self.erori.append(f"Entry points {self.ENTRY_POINT_GROUP}: {e}")
+    
+    def _discover_specs(self, path: Optional[Path]):
+        """Înregistrează laboratoarele declarative (fișierul inclus dacă path=None)"""
+        spec_path = str(path) if path else None
+        try:
+            keys = list(load_specs(spec_path))
+        except Exception as e:
+            self.erori.append(f"Specificații {path or 'formate_laboratoare.json'}: {e}")
+            return
+        for key in keys:
+            if key not in self._factories:
+                self.register(key, spec_parser_class(key, spec_path), replace=False)
+    
+    def _discover_directory(self, plugin_dir: Path):
+        if not plugin_dir.is_dir():
+            return
+        for pattern in ('*.json', '*.yaml', '*.yml'):
+            for path in sorted(plugin_dir.glob(pattern)):
+                self._discover_specs(path)
+        for path in sorted(plugin_dir.glob('*.py')):
+            if path.name.startswith('_'):
+                continue
+            try:
+                spec = importlib.util.spec_from_file_location(f"parsere_plugin_{path.stem}", path)
+                module = importlib.util.module_from_spec(spec)
+                sys.modules[spec.name] = module
+                spec.loader.exec_module(module)
+            except Exception as e:
+                self.erori.append(f"Plugin {path.name}: {e}")
+                continue
+            
+            if hasattr(module, 'register_parsers'):
+                try:
+                    module.register_parsers(self)
+                except Exception as e:
+                    self.erori.append(f"Plugin {path.name}: register_parsers: {e}")
+                continue
+            for obj in vars(module).values():
+                if (isinstance(obj, type) and issubclass(obj, LaboratorParser)
+                        and obj.__module__ == module.__name__ and obj.KEY):
+                    self.register(obj.KEY, obj, replace=False)
+    
+    @staticmethod
+    def _resolve(factory: ParserFactory):
+        """Transformă 'modul:Clasa' / EntryPoint într-un callable"""
+        if isinstance(factory, str):
+            module_name, _, attr = factory.partition(':')
+            return getattr(importlib.import_module(module_name), attr)
+        if not callable(factory) and hasattr(factory, 'load'):
+            return factory.load()
+        return factory
+
+
+PARSERS = ParserRegistry({
+    'regina_maria': ReginaMariaParser,
+    'promed': ProMedParser,
+    'medlife': MedLifeParser,
+    'synevo': SynevoParser,
+    'bioclinica': BioclinicaParser,
+    'clinica_sante': ClinicaSanteParser,
+    'smartlabs': SmartLabsParser,
+    'elite_medical': EliteMedicalParser,
+})
 
 def get_parser(laborator_key: str) -> Optional[LaboratorParser]:
-    """Returnează parserul pentru un laborator"""
+    """Returnează parserul pentru un laborator (instanțiat la prima utilizare)"""
     return PARSERS.get(laborator_key)
 
 def list_parsers() -> List[Dict[str, str]]:
     """Lista laboratoarelor disponibile pentru dropdown"""
-    return [
-        {'key': key, 'name': parser.NAME, 'description': parser.DESCRIPTION}
-        for key, parser in PARSERS.items()
-    ]
+    result = []
+    for key in PARSERS:
+        try:
+            parser_cls = PARSERS.parser_class(key)
+        except Exception as e:
+            PARSERS.erori.append(f"Parser {key}: {e}")
+            continue
+        result.append({'key': key, 'name': parser_cls.NAME, 'description': parser_cls.DESCRIPTION})
+    return result
 
 def to_valyan_format(result: BuletinResult) -> List[Dict]:
-    """Convertește în format ValyanClinic pentru import"""
+    """
+    Convertește în format ValyanClinic pentru import.
+    Câmpurile *Canonic* conțin valoarea / limitele în unitatea canonică a
+    analizei (unitati_masura), pentru comparații între laboratoare.
+    """
     return [{
         'NumeAnaliza': a.nume_analiza,
         'CodAnaliza': a.cod_analiza,
@@ -830,15 +993,134 @@ def to_valyan_format(result: BuletinResult) -> List[Dict]:
         'DirectieAnormal': a.directie_anormal,
         'DataRecoltare': result.data_recoltare,
         'Laborator': result.laborator,
-        'NumarBuletin': result.numar_buletin
+        'NumarBuletin': result.numar_buletin,
+        **campuri_canonice(a)
     } for a in result.analize]
 
 
+# =============================================================================
+# BUGET TIMP IMPORT
+# =============================================================================
+
+# Module care nu au voie să fie importate odată cu parserele (CLI / workers)
+IMPORTURI_INTERZISE = ('fitz', 'pymupdf', 'numpy')
+
+def check_import_time(module: str = 'parsere_laboratoare', buget_ms: float = 50.0) -> bool:
+    """
+    Rulează 'python -X importtime -c "import <module>"' într-un proces nou și
+    verifică timpul cumulat al importului față de buget.
+    Returnează False dacă bugetul e depășit sau se importă un modul interzis.
+    """
+    import subprocess
+    
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=str(Path(__file__).parent), capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        print(proc.stderr)
+        return False
+    
+    # Format: "import time: self [us] | cumulative | imported package"
+    timpi = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulat_us, nume = line[len('import time:'):].split('|')
+        timpi.append((int(self_us), int(cumulat_us), nume[1:].rstrip()))
+    
+    # Linia modulului de nivel superior nu este indentată
+    total_ms = next((c for _, c, n in timpi if n == module), 0) / 1000
+    interzise = sorted({n.strip() for _, _, n in timpi if n.strip().split('.')[0] in IMPORTURI_INTERZISE})
+    
+    print(f"Import {module}: {total_ms:.1f} ms (buget {buget_ms:.0f} ms)")
+    for self_us, _, nume in sorted(timpi, reverse=True)[:5]:
+        print(f"  {self_us / 1000:7.2f} ms  {nume.strip()}")
+    if interzise:
+        print(f"  ⚠️ Module interzise importate: {', '.join(interzise)}")
+    
+    return total_ms <= buget_ms and not interzise
+
+
+def benchmark_memorie(n: int = 100_000):
+    """
+    Octeți per rezultat la n rezultate ținute în memorie: modelul vechi
+    (dataclass cu __dict__, fără internare) față de cel slotted, pentru
+    AnalizaResult din acest modul și din analize_parser_v2.
+    """
+    import tracemalloc
+    import dataclasses
+    import analize_parser_v2
+    
+    # Rezultate reale din PDF-urile de test, copiate ca la o parsare nouă
+    # (fiecare parsare produce alte obiecte str/float)
+    mostre = []
+    for pdf_path in sorted(Path(__file__).parent.glob("*.pdf")):
+        for key in PARSERS:
+            mostre.extend(asdict(a) for a in PARSERS[key].parse_pdf(str(pdf_path)).analize)
+    if not mostre:
+        print("Nu există PDF-uri de test")
+        return
+    
+    def copie(valoare):
+        if isinstance(valoare, str):
+            return valoare.encode('utf-8').decode('utf-8')
+        if isinstance(valoare, float):
+            return valoare + 0.0
+        return valoare
+    
+    def masoara(cls, campuri: Callable[[Dict], Dict]) -> float:
+        randuri = [mostre[i % len(mostre)] for i in range(n)]
+        tracemalloc.start()
+        inainte = tracemalloc.get_traced_memory()[0]
+        obiecte = [cls(**{k: copie(v) for k, v in campuri(r).items()}) for r in randuri]
+        dupa = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        assert len(obiecte) == n
+        return (dupa - inainte) / n
+    
+    def vechi(cls):
+        # Aceleași câmpuri, dataclass clasic (cu __dict__, fără internare)
+        return dataclasses.make_dataclass(
+            f"{cls.__name__}Vechi",
+            [(f.name, f.type, f.default) for f in dataclasses.fields(cls)]
+        )
+    
+    def v2(r: Dict) -> Dict:
+        r = dict(r)
+        r['interval_referinta_text'] = r.pop('interval_text')
+        return r
+    
+    print(f"\n{'='*70}")
+    print(f"MEMORIE PER REZULTAT ({n:,} rezultate)")
+    print(f"{'='*70}")
+    print(f"  {'Model':<40} {'Vechi B':>9} {'Nou B':>9} {'Câștig':>8}")
+    for nume, cls, campuri in [
+        ('parsere_laboratoare.AnalizaResult', AnalizaResult, dict),
+        ('analize_parser_v2.AnalizaResult', analize_parser_v2.AnalizaResult, v2),
+    ]:
+        b_vechi = masoara(vechi(cls), campuri)
+        b_nou = masoara(cls, campuri)
+        print(f"  {nume:<40} {b_vechi:>9.0f} {b_nou:>9.0f} {1 - b_nou / b_vechi:>7.0%}")
+
+
 # =============================================================================
 # MAIN - TEST
 # =============================================================================
 
 def main():
+    # python parsere_laboratoare.py --import-time [buget_ms]
+    if '--import-time' in sys.argv:
+        args = sys.argv[sys.argv.index('--import-time') + 1:]
+        ok = check_import_time(buget_ms=float(args[0]) if args else 50.0)
+        sys.exit(0 if ok else 1)
+    
+    # python parsere_laboratoare.py --memorie [n]
+    if '--memorie' in sys.argv:
+        args = sys.argv[sys.argv.index('--memorie') + 1:]
+        benchmark_memorie(int(args[0]) if args else 100_000)
+        return
+    
     print("\n" + "="*70)
     print("PARSERE MODULARE - LABORATOARE DISPONIBILE")
     print("="*70)
@@ -882,6 +1164,7 @@ def main():
             print(f"  Nr. buletin: {result.numar_buletin}")
             print(f"  Data recoltare: {result.data_recoltare}")
             print(f"  Analize găsite: {len(result.analize)}")
+            print(f"  Omise după sfârșitul rezultatelor: {result.pagini_omise} pagini, {result.linii_omise} linii")
             
             if result.analize:
                 print(f"\n  {'Analiză':<40} {'Valoare':<10} {'UM':<12} {'Interval':<15} {'St'}")
@@ -891,7 +1174,41 @@ def main():
                 
                 if len(result.analize) > 10:
                     print(f"  ... și încă {len(result.analize) - 10} analize")
+        
+        # Sfârșitul rezultatelor pe pagina 2 din 4: paginile 3-4 (metode) nu sunt extrase
+        pagini = ["HEMATOLOGIE\nHemoglobina\n[12 - 16]\n\ng/dL\n 13.2\nPagina 1 din 4\n",
+                  "Glicemie\n[70 - 110]\n\nmg/dL\n 92\nVerificat si autorizat de\nDr. X\nPagina 2 din 4\n",
+                  "Metode de lucru\nPagina 3 din 4\n", "Metode de lucru\nPagina 4 din 4\n"]
+        extrase, omise = [], [0, 0]
+        list(get_parser('clinica_sante')._pagini_rezultate(
+            len(pagini), lambda i: extrase.append(i) or pagini[i], omise))
+        print(f"\n  Sfârșit rezultate (buletin sintetic de {len(pagini)} pagini): extrase {extrase}, "
+              f"omise {omise[0]} pagini / {omise[1]} linii")
+    
+    # Plugin-uri: un register_parsers care aruncă nu strică registry-ul; un plugin
+    # cu doar _parse_analize (PARSARE_PE_LINII = False) primește textul complet
+    import tempfile
+    import textwrap
+    with tempfile.TemporaryDirectory() as tmp:
+        Path(tmp, 'a_stricat.py').write_text("def register_parsers(registry):\n    raise RuntimeError('config lipsă')\n")
+        Path(tmp, 'b_simplu.py').write_text(textwrap.dedent('''
+            from parsere_laboratoare import AnalizaResult, LaboratorParser
+            class SimpluParser(LaboratorParser):
+                KEY = NAME = 'simplu'
+                def _parse_analize(self, text):
+                    return [AnalizaResult(categorie='GENERAL', nume_analiza=linie, rezultat='1')
+                            for linie in text.split('\\n') if linie.startswith('Analiza')]
+        '''))
+        registry = ParserRegistry()
+        registry._plugin_dirs = lambda: [Path(tmp)]
+        simplu = registry.get('simplu')
+        analize = list(simplu.iter_analize(["Analiza A\n", "Analiza B\n"])) if simplu else []
+        ok = len(analize) == 2 and any('register_parsers' in e for e in registry.erori)
+        print(f"\n  {'✅' if ok else '❌'} Plugin-uri: {len(analize)} analize din plugin-ul simplu; "
+              f"erori: {registry.erori}")
 
 
 if __name__ == "__main__":
+    # Plugin-urile importă 'parsere_laboratoare' - folosim același modul
+    sys.modules.setdefault('parsere_laboratoare', sys.modules['__main__'])
     main()
@@ -0,0 +1,359 @@
+"""
+Șabloane de Layout per Laborator
+================================
+Buletinele unui laborator ies din același program de raportare și așază
+pagina la fel: antetul cu datele pacientului sus, tabelul de rezultate la
+mijloc, disclaimerele și contorul "Pagina x din y" în subsol. Parsarea
+layout (parsare_layout) extrage totuși fiecare pagină întreagă.
+
+StoreSabloane învață, per laborator și producător PDF (metadata "producer":
+"Crystal Reports", "QuickReports"...), regiunile paginii:
+- antetul: deasupra tabelului - păstrat doar pe prima pagină (header-ul)
+- tabelul: [y_tabel, y_subsol) - antetul coloanelor, categoriile,
+  rezultatele și marcajul de sfârșit, cu margini
+- subsolul: de la y_subsol - citit doar pe pagina cu marcajul de sfârșit,
+  pentru contor
+- benzile coloanelor (BenziColoane)
+
+Un șablon este folosit după PRAG_INVATARE documente parsate complet cu
+succes. Fiecare document parsat cu șablon este verificat: antetul tabelului
+găsit în regiune trebuie să aibă benzile șablonului și să dea analize, iar
+din VERIFICARE_LA în VERIFICARE_LA utilizări parsarea completă confirmă și
+numărul de analize. La nepotrivire documentul este reparsat complet; când
+rata de potrivire din ultimele FEREASTRA utilizări scade sub
+PRAG_POTRIVIRE, șablonul este invalidat și reînvățat.
+
+Șabloanele sunt opționale (parse_pdf_layout fără sabloane= extrage pagina
+întreagă). Pe buletinele de test regiunile învățate taie puțin din pagină
+(ex: Clinica Sante păstrează [107, 800) din 841 pt), iar câștigul măsurat
+e în zgomot: ~1 ms din 14-20 ms per document, uneori mai lent (SmartLabs).
+Costul dominant rămâne deschiderea documentului și extragerea cuvintelor,
+nu suprafața paginii.
+
+Utilizare:
+    sabloane = StoreSabloane("sabloane.json")
+    result = parser.parse_pdf_layout("buletin.pdf", sabloane=sabloane)
+    print(sabloane.raport())
+    sabloane.salveaza()
+
+Test: python sabloane_layout.py
+"""
+
+import json
+import sys
+import tempfile
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+from parsere_laboratoare import BuletinResult, LaboratorParser, PARSERS, _import_fitz
+from parsare_layout import BenziColoane, GeometrieLayout, _parseaza_doc
+
+# Documente parsate complet (cu tabel găsit) până la folosirea șablonului
+PRAG_INVATARE = 2
+
+# Marginea de deasupra antetului de tabel (rândul categoriei) și de sub
+# ultimul rând de rezultat, în puncte
+MARJA_SUS = 25.0
+MARJA_JOS = 10.0
+
+# Rata de potrivire se calculează pe ultimele FEREASTRA utilizări, după
+# cel puțin MIN_UTILIZARI
+FEREASTRA = 20
+MIN_UTILIZARI = 5
+PRAG_POTRIVIRE = 0.8
+
+# La fiecare a N-a utilizare, parsarea completă verifică numărul de analize
+VERIFICARE_LA = 10
+
+# Paginile cu dimensiuni diferite (în puncte) nu folosesc același șablon
+TOLERANTA_PAGINA = 1.0
+
+
+# =============================================================================
+# MODELE
+# =============================================================================
+
+@dataclass
+class SablonLayout:
+    """Regiunile paginii pentru un laborator (+ producător PDF)"""
+    latime: float
+    inaltime: float
+    y_tabel: Optional[float]        # paginile 2+: începutul tabelului (None = necunoscut)
+    y_subsol: float                 # începutul subsolului
+    benzi: BenziColoane
+    documente: int = 1              # documente din care a fost învățat
+    utilizari: int = 0
+    potriviri: int = 0
+    istoric: Deque[bool] = field(default_factory=lambda: deque(maxlen=FEREASTRA))
+
+    @property
+    def rata_potrivire(self) -> float:
+        """Rata de potrivire din fereastra curentă (1.0 fără utilizări)"""
+        return sum(self.istoric) / len(self.istoric) if self.istoric else 1.0
+
+    def regiune(self, pagina: int) -> Tuple[float, float, float, float]:
+        """Clip-ul extragerii: antet + tabel pe prima pagină, doar tabelul pe următoarele"""
+        sus = 0.0 if pagina == 0 else (self.y_tabel or 0.0)
+        return (0.0, sus, self.latime, self.y_subsol)
+
+    def aceeasi_pagina(self, latime: float, inaltime: float) -> bool:
+        return (abs(self.latime - latime) <= TOLERANTA_PAGINA and
+                abs(self.inaltime - inaltime) <= TOLERANTA_PAGINA)
+
+
+def _regiuni(geometrie: GeometrieLayout, inaltime: float) -> Tuple[Optional[float], float]:
+    """(y_tabel, y_subsol) dintr-o parsare completă"""
+    # Prima pagină extrasă e mereu pagina 0 - antetul ei rămâne în regiune
+    sus = [y for y in geometrie.inceput[1:] if y is not None]
+    jos = [y for y in geometrie.sfarsit if y is not None] + list(geometrie.marcaje.values())
+    y_tabel = max(0.0, min(sus) - MARJA_SUS) if sus else None
+    y_subsol = min(inaltime, max(jos) + MARJA_JOS) if jos else inaltime
+    return y_tabel, y_subsol
+
+
+# =============================================================================
+# STORE
+# =============================================================================
+
+class StoreSabloane:
+    """Șabloane de layout învățate per laborator (+ producător PDF)"""
+
+    def __init__(self, path: Optional[str] = None, prag_invatare: int = PRAG_INVATARE,
+                 per_producator: bool = True, verificare_la: int = VERIFICARE_LA):
+        self.path = Path(path) if path else None
+        self.prag_invatare = prag_invatare
+        self.per_producator = per_producator
+        self.verificare_la = verificare_la
+        self._sabloane: Dict[str, SablonLayout] = {}
+        self.statistici = {'documente': 0, 'invatare': 0, 'cu_sablon': 0, 'potriviri': 0,
+                           'ratari': 0, 'verificari': 0, 'invalidari': 0}
+        if self.path and self.path.exists():
+            self._incarca()
+
+    def cheie(self, laborator: str, doc) -> str:
+        """Laboratorul + producătorul PDF (dacă per_producator)"""
+        if not self.per_producator:
+            return laborator
+        producator = (doc.metadata or {}).get('producer') or ""
+        return f"{laborator}|{producator.strip()}"
+
+    def sablon(self, cheie: str) -> Optional[SablonLayout]:
+        """Șablonul activ (învățat din destule documente) sau None"""
+        sablon = self._sabloane.get(cheie)
+        return sablon if sablon is not None and sablon.documente >= self.prag_invatare else None
+
+    def rata_potrivire(self) -> float:
+        """Documente parsate cu șablon / documente la care s-a încercat șablonul"""
+        return self.statistici['potriviri'] / max(1, self.statistici['cu_sablon'])
+
+    # -------------------------------------------------------------------------
+    # Parsare
+    # -------------------------------------------------------------------------
+
+    def parseaza(self, parser: LaboratorParser, doc, laborator: str) -> BuletinResult:
+        """Parsarea layout a documentului deschis, cu șablonul laboratorului dacă există"""
+        self.statistici['documente'] += 1
+        if not len(doc):
+            return _parseaza_doc(parser, doc, laborator)[0]
+        cheie = self.cheie(laborator, doc)
+        latime, inaltime = doc[0].rect.width, doc[0].rect.height
+
+        sablon = self.sablon(cheie)
+        if sablon is not None:
+            result = self._cu_sablon(parser, doc, laborator, cheie, sablon, latime, inaltime)
+            if result is not None:
+                return result
+
+        result, geometrie = _parseaza_doc(parser, doc, laborator)
+        if result.analize and geometrie.benzi is not None:
+            self.invata(cheie, geometrie, latime, inaltime)
+        return result
+
+    def _cu_sablon(self, parser: LaboratorParser, doc, laborator: str, cheie: str,
+                   sablon: SablonLayout, latime: float, inaltime: float) -> Optional[BuletinResult]:
+        """Rezultatul parsării decupate, sau None dacă documentul nu se potrivește șablonului"""
+        self.statistici['cu_sablon'] += 1
+        sablon.utilizari += 1
+        if not sablon.aceeasi_pagina(latime, inaltime):
+            self._noteaza(cheie, sablon, False)
+            return None
+
+        result, geometrie = _parseaza_doc(parser, doc, laborator, sablon)
+        potrivit = (bool(result.analize) and geometrie.benzi is not None and
+                    geometrie.benzi.potrivire(sablon.benzi))
+        if potrivit and sablon.utilizari % self.verificare_la == 0:
+            self.statistici['verificari'] += 1
+            complet, _ = _parseaza_doc(parser, doc, laborator)
+            if len(complet.analize) != len(result.analize):
+                self._noteaza(cheie, sablon, False)
+                return complet
+        self._noteaza(cheie, sablon, potrivit)
+        return result if potrivit else None
+
+    def _noteaza(self, cheie: str, sablon: SablonLayout, potrivit: bool):
+        sablon.istoric.append(potrivit)
+        sablon.potriviri += potrivit
+        self.statistici['potriviri' if potrivit else 'ratari'] += 1
+        if len(sablon.istoric) >= MIN_UTILIZARI and sablon.rata_potrivire < PRAG_POTRIVIRE:
+            del self._sabloane[cheie]
+            self.statistici['invalidari'] += 1
+
+    # -------------------------------------------------------------------------
+    # Învățare
+    # -------------------------------------------------------------------------
+
+    def invata(self, cheie: str, geometrie: GeometrieLayout, latime: float, inaltime: float):
+        """
+        Adaugă geometria unei parsări complete: regiunile se lărgesc (y_tabel
+        minim, y_subsol maxim) cât timp benzile și pagina se potrivesc; altfel
+        învățarea reîncepe - dar un șablon activ nu este înlocuit, doar invalidat.
+        """
+        y_tabel, y_subsol = _regiuni(geometrie, inaltime)
+        sablon = self._sabloane.get(cheie)
+        if (sablon is not None and sablon.benzi.potrivire(geometrie.benzi) and
+                sablon.aceeasi_pagina(latime, inaltime)):
+            sablon.documente += 1
+            if y_tabel is not None:
+                sablon.y_tabel = y_tabel if sablon.y_tabel is None else min(sablon.y_tabel, y_tabel)
+            sablon.y_subsol = max(sablon.y_subsol, y_subsol)
+        elif sablon is None or sablon.documente < self.prag_invatare:
+            self._sabloane[cheie] = SablonLayout(latime, inaltime, y_tabel, y_subsol, geometrie.benzi)
+        else:
+            return
+        self.statistici['invatare'] += 1
+
+    # -------------------------------------------------------------------------
+    # Raport
+    # -------------------------------------------------------------------------
+
+    def raport(self) -> List[Dict]:
+        """Șabloanele cu regiunile și ratele de potrivire"""
+        return [{'sablon': cheie,
+                 'activ': sablon.documente >= self.prag_invatare,
+                 'documente': sablon.documente,
+                 'utilizari': sablon.utilizari,
+                 'potriviri': sablon.potriviri,
+                 'rata_potrivire': round(sablon.rata_potrivire, 3),
+                 'y_tabel': sablon.y_tabel,
+                 'y_subsol': sablon.y_subsol,
+                 'coloane': list(sablon.benzi.coloane)}
+                for cheie, sablon in self._sabloane.items()]
+
+    # -------------------------------------------------------------------------
+    # Persistență
+    # -------------------------------------------------------------------------
+
+    def salveaza(self, path: Optional[str] = None):
+        path = Path(path) if path else self.path
+        if path is None:
+            raise ValueError("StoreSabloane fără fișier - dă un path la salvare")
+        data = {cheie: {'latime': s.latime, 'inaltime': s.inaltime,
+                        'y_tabel': s.y_tabel, 'y_subsol': s.y_subsol,
+                        'starturi': list(s.benzi.starturi), 'coloane': list(s.benzi.coloane),
+                        'documente': s.documente, 'utilizari': s.utilizari,
+                        'potriviri': s.potriviri, 'istoric': list(s.istoric)}
+                for cheie, s in self._sabloane.items()}
+        tmp = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        tmp.replace(path)
+
+    def _incarca(self):
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        for cheie, intrare in data.items():
+            benzi = BenziColoane(tuple(intrare['starturi']), tuple(intrare['coloane']))
+            self._sabloane[cheie] = SablonLayout(
+                intrare['latime'], intrare['inaltime'], intrare.get('y_tabel'), intrare['y_subsol'],
+                benzi, documente=intrare.get('documente', 1), utilizari=intrare.get('utilizari', 0),
+                potriviri=intrare.get('potriviri', 0),
+                istoric=deque(intrare.get('istoric', ()), maxlen=FEREASTRA))
+
+
+# =============================================================================
+# MAIN - TEST
+# =============================================================================
+
+def _acelasi_rezultat(a: BuletinResult, b: BuletinResult) -> bool:
+    """Aceleași analize (nume, valoare, interval, categorie) și același header"""
+    def analize(r):
+        return [(" ".join(x.nume_analiza.split()), x.rezultat, x.interval_text, x.categorie) for x in r.analize]
+    return (analize(a) == analize(b) and
+            (a.pacient_nume, a.pacient_cnp, a.data_recoltare) == (b.pacient_nume, b.pacient_cnp, b.data_recoltare))
+
+
+def main():
+    if _import_fitz() is None:
+        print("❌ PyMuPDF nu este instalat")
+        return 1
+
+    pdf_dir = Path(__file__).parent
+    teste = [('AnalizeMedicale.pdf', 'clinica_sante'),
+             ('1111200901011bolnavul.pdf', 'smartlabs'),
+             ('analize-b-51-ro.pdf', 'elite_medical')]
+    runde = 8
+
+    sabloane = StoreSabloane()
+    for fisier, key in teste:
+        pdf = str(pdf_dir / fisier)
+        parser = PARSERS[key]
+        referinta = parser.parse_pdf_layout(pdf)
+        start = time.perf_counter()
+        for _ in range(runde):
+            parser.parse_pdf_layout(pdf)
+        ms_complet = (time.perf_counter() - start) * 1e3 / runde
+
+        invatare, decupat, identice = 0, [], True
+        for _ in range(runde):
+            inainte = sabloane.statistici['potriviri']
+            start = time.perf_counter()
+            result = parser.parse_pdf_layout(pdf, sabloane=sabloane)
+            ms = (time.perf_counter() - start) * 1e3
+            if sabloane.statistici['potriviri'] > inainte:
+                decupat.append(ms)
+            else:
+                invatare += 1
+            identice &= _acelasi_rezultat(result, referinta)
+        stare = "✅" if identice and decupat else "⚠️"
+        ms_decupat = sum(decupat) / len(decupat) if decupat else 0.0
+        print(f"\n{stare} {fisier} ({parser.NAME}): {len(referinta.analize)} analize, "
+              f"{invatare} documente de învățare, rezultate identice: {identice}")
+        print(f"   Complet:    {ms_complet:6.2f} ms")
+        print(f"   Cu șablon:  {ms_decupat:6.2f} ms  ({len(decupat)} documente)")
+
+    print("\n📐 Șabloane:")
+    for intrare in sabloane.raport():
+        print(f"   {intrare['sablon']:<40} tabel [{intrare['y_tabel'] or 0:5.1f}, {intrare['y_subsol']:5.1f})  "
+              f"potriviri {intrare['potriviri']}/{intrare['utilizari']} ({intrare['rata_potrivire']:.0%})  "
+              f"{intrare['coloane']}")
+    print(f"   Statistici: {sabloane.statistici}  rată globală {sabloane.rata_potrivire():.0%}")
+
+    # Layout schimbat sub aceeași cheie: documentele nu se mai potrivesc -> invalidare
+    print("\n🔄 Schimbare de layout (cheie fără producător, alt format de tabel):")
+    drift = StoreSabloane(per_producator=False)
+    parser = PARSERS['clinica_sante']
+    for fisier in ['AnalizeMedicale.pdf'] * 3 + ['analize-b-51-ro.pdf'] * MIN_UTILIZARI:
+        parser.parse_pdf_layout(str(pdf_dir / fisier), sabloane=drift)
+        activ = drift.sablon(parser.NAME)
+        print(f"   {fisier:<22} șablon {'activ' if activ else '-':<6} "
+              f"rată {activ.rata_potrivire if activ else 0:.0%}  invalidări {drift.statistici['invalidari']}")
+    stare = "✅" if drift.statistici['invalidari'] == 1 else "❌"
+    print(f"   {stare} șablon invalidat după ratări, reînvățat din documentele noi: "
+          f"{[r['sablon'] + (' (activ)' if r['activ'] else '') for r in drift.raport()]}")
+
+    # Persistență
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "sabloane.json"
+        sabloane.salveaza(str(path))
+        incarcat = StoreSabloane(str(path))
+        stare = "✅" if incarcat.raport() == sabloane.raport() else "❌"
+        print(f"\n{stare} Salvat / reîncărcat: {len(incarcat.raport())} șabloane, "
+              f"{path.stat().st_size} octeți")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
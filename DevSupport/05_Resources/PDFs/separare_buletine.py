@@ -0,0 +1,301 @@
+"""
+Separarea PDF-urilor cu mai multe buletine
+==========================================
+Clinicile trimit des un singur PDF cu mai multe buletine (mai mulți
+pacienți sau mai multe recoltări ale aceluiași pacient). parse_pdf îl
+tratează ca un singur document: header-ul păstrează doar primul
+CNP / număr / dată, iar analizele se amestecă.
+
+Separatorul lucrează la nivel de pagină, pe semnătura header-ului:
+1. contorul "Pagina 1 din y" - începe un buletin nou
+2. CNP, număr de buletin sau dată de recoltare diferite de ale buletinului
+   curent (câmpurile goale nu contează)
+3. antetul buletinului ("Buletin de analize ...") reapare după o pagină fără
+   antet, într-un buletin care a început cu antet
+
+Fiecare segment este parsat separat (parserul dat sau cascada_parsare când
+laboratorul nu e cunoscut). Pe fișierele mari, extragerea paginilor și
+parsarea segmentelor rulează în paralel pe un ProcessPoolExecutor.
+
+Utilizare:
+    from separare_buletine import parseaza_pdf_combinat
+    buletine = parseaza_pdf_combinat("combinat.pdf", "clinica_sante")
+
+Test: python separare_buletine.py
+"""
+
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from parsere_laboratoare import (
+    BuletinResult, LaboratorParser, PARSERS, _RE_CONTOR_PAGINA, _import_fitz
+)
+
+# Sub acest număr de pagini pornirea proceselor costă mai mult decât câștigă
+PRAG_PARALEL_PAGINI = 24
+
+# Antetul de buletin comun laboratoarelor
+_RE_ANTET = re.compile(r'Buletin\s+de\s+analize', re.IGNORECASE)
+
+# Câmpurile header-ului care separă buletinele când diferă
+CAMPURI_SEMNATURA = ('cnp', 'numar', 'data')
+
+# Numerele de buletin mai scurte vin din pattern-ul de rezervă al header-ului
+# ("Nr. 679" din textul legal al paginilor fără antet) - nu separă buletine
+LUNGIME_MIN_NUMAR = 5
+
+
+# =============================================================================
+# MODELE
+# =============================================================================
+
+@dataclass
+class SemnaturaPagina:
+    """Semnătura header-ului unei pagini"""
+    cnp: str = ""
+    numar: str = ""
+    data: str = ""
+    antet: bool = False         # antetul buletinului apare pe pagină
+    prima: bool = False         # contorul paginii este "Pagina 1 din y"
+
+
+@dataclass
+class SegmentBuletin:
+    """Un buletin din PDF: paginile [start, stop)"""
+    start: int
+    stop: int
+    cnp: str = ""
+    numar: str = ""
+    data: str = ""
+    antet: bool = False
+    motiv: str = "inceput"      # de ce începe aici: inceput / contor / cnp / numar / data / antet
+
+    @property
+    def nr_pagini(self) -> int:
+        return self.stop - self.start
+
+
+# =============================================================================
+# SEPARARE
+# =============================================================================
+
+def _parser_header(parser_key: Optional[str]) -> LaboratorParser:
+    """Parserul cu care se citește header-ul (cel generic dacă laboratorul nu e cunoscut)"""
+    parser = PARSERS.get(parser_key) if parser_key else None
+    if parser is None:
+        from cascada_parsare import ParserTabelGeneric
+        parser = ParserTabelGeneric()
+    return parser
+
+
+def semnatura_pagina(text: str, parser: LaboratorParser) -> SemnaturaPagina:
+    """CNP / număr / dată (extrase ca header-ul buletinului), antet și contor"""
+    header = parser.parse_header(text)
+    contor = _RE_CONTOR_PAGINA.search(text)
+    return SemnaturaPagina(
+        cnp=header.pacient_cnp,
+        numar=header.numar_buletin if len(header.numar_buletin) >= LUNGIME_MIN_NUMAR else "",
+        data=header.data_recoltare,
+        antet=_RE_ANTET.search(text) is not None,
+        prima=contor is not None and int(contor.group(1)) == 1,
+    )
+
+
+def _motiv_separare(segment: SegmentBuletin, semnatura: SemnaturaPagina,
+                    antet_precedent: bool) -> str:
+    """Motivul pentru care pagina începe un buletin nou ('' = continuă segmentul)"""
+    if semnatura.prima:
+        return "contor"
+    for camp in CAMPURI_SEMNATURA:
+        curent, nou = getattr(segment, camp), getattr(semnatura, camp)
+        if curent and nou and curent != nou:
+            return camp
+    if semnatura.antet and not antet_precedent and segment.antet:
+        return "antet"
+    return ""
+
+
+def imparte_pagini(pagini: List[str], parser_key: Optional[str] = None) -> List[SegmentBuletin]:
+    """Împarte paginile (textul fiecărei pagini) în buletine"""
+    parser = _parser_header(parser_key)
+    segmente: List[SegmentBuletin] = []
+    antet_precedent = False
+    for i, text in enumerate(pagini):
+        semnatura = semnatura_pagina(text, parser)
+        motiv = _motiv_separare(segmente[-1], semnatura, antet_precedent) if segmente else "inceput"
+        if motiv:
+            segmente.append(SegmentBuletin(i, i + 1, semnatura.cnp, semnatura.numar,
+                                           semnatura.data, semnatura.antet, motiv))
+        else:
+            segment = segmente[-1]
+            segment.stop = i + 1
+            for camp in CAMPURI_SEMNATURA:
+                if not getattr(segment, camp):
+                    setattr(segment, camp, getattr(semnatura, camp))
+        antet_precedent = semnatura.antet
+    return segmente
+
+
+# =============================================================================
+# PARSARE (secvențial sau în procese)
+# =============================================================================
+
+def _extrage_pagini(pdf_path: str, start: int, stop: int) -> List[str]:
+    """Textul paginilor [start, stop) - rulează și în procesele worker"""
+    fitz = _import_fitz()
+    if fitz is None:
+        raise RuntimeError("PyMuPDF nu este instalat. Instalează cu: pip install pymupdf")
+    doc = fitz.open(pdf_path)
+    try:
+        return [doc[i].get_text() for i in range(start, min(stop, len(doc)))]
+    finally:
+        doc.close()
+
+
+def _parseaza_segment(parser_key: Optional[str], pagini: List[str]) -> BuletinResult:
+    """Un buletin: parserul laboratorului sau, fără laborator, cascada"""
+    parser = PARSERS.get(parser_key) if parser_key else None
+    if parser is not None:
+        return parser.parse_pagini(pagini)
+    from cascada_parsare import parseaza_text_automat
+    text = "".join(page + "\n" for page in pagini)
+    return parseaza_text_automat(text, ocr=False, prima_pagina=pagini[0] if pagini else "",
+                                 pagini=pagini).rezultat
+
+
+def parseaza_segmente(pagini: List[str], segmente: List[SegmentBuletin],
+                      parser_key: Optional[str] = None,
+                      executor: Optional[Executor] = None) -> List[BuletinResult]:
+    """Parsează fiecare segment; cu executor, segmentele rulează în paralel (ordinea se păstrează)"""
+    bucati = [pagini[s.start:s.stop] for s in segmente]
+    if executor is None:
+        return [_parseaza_segment(parser_key, bucata) for bucata in bucati]
+    return list(executor.map(_parseaza_segment, [parser_key] * len(bucati), bucati))
+
+
+def parseaza_pdf_combinat(pdf_path: str, parser_key: Optional[str] = None,
+                          workers: Optional[int] = None) -> List[BuletinResult]:
+    """
+    Parsează un PDF care poate conține mai multe buletine: o listă de
+    BuletinResult, câte unul per buletin, în ordinea din document.
+    Fără parser_key, fiecare buletin trece prin cascada de parsare.
+    workers=None: procesoarele disponibile; paralelismul pornește doar de la
+    PRAG_PARALEL_PAGINI pagini.
+    """
+    fitz = _import_fitz()
+    if fitz is None:
+        result = BuletinResult()
+        result.warnings.append("PyMuPDF nu este instalat. Instalează cu: pip install pymupdf")
+        return [result]
+    with fitz.open(pdf_path) as doc:
+        nr_pagini = len(doc)
+
+    workers = workers or os.cpu_count() or 1
+    if workers < 2 or nr_pagini < PRAG_PARALEL_PAGINI:
+        pagini = _extrage_pagini(pdf_path, 0, nr_pagini)
+        return parseaza_segmente(pagini, imparte_pagini(pagini, parser_key), parser_key)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Extragerea - costul dominant - pe bucăți contigue de pagini
+        pas = -(-nr_pagini // workers)
+        starturi = range(0, nr_pagini, pas)
+        pagini = [text for bucata in executor.map(
+                      _extrage_pagini, [pdf_path] * len(starturi), starturi,
+                      [s + pas for s in starturi])
+                  for text in bucata]
+        segmente = imparte_pagini(pagini, parser_key)
+        return parseaza_segmente(pagini, segmente, parser_key, executor)
+
+
+# =============================================================================
+# MAIN - TEST
+# =============================================================================
+
+def _combina(fisiere: List[Path], destinatie: str, repetari: int = 1):
+    """PDF combinat din fișierele date (de `repetari` ori)"""
+    fitz = _import_fitz()
+    combinat = fitz.open()
+    for _ in range(repetari):
+        for f in fisiere:
+            with fitz.open(str(f)) as doc:
+                combinat.insert_pdf(doc)
+    combinat.save(destinatie)
+    combinat.close()
+
+
+def main():
+    if _import_fitz() is None:
+        print("❌ PyMuPDF nu este instalat")
+        return 1
+
+    pdf_dir = Path(__file__).parent
+    surse = [('AnalizeMedicale.pdf', 'clinica_sante'), ('analize-b-51-ro.pdf', 'elite_medical'),
+             ('1111200901011bolnavul.pdf', 'smartlabs'), ('AnalizeMedicale.pdf', 'clinica_sante')]
+    surse = [(pdf_dir / f, k) for f, k in surse if (pdf_dir / f).exists()]
+    if not surse:
+        print("❌ Lipsesc PDF-urile de test")
+        return 1
+
+    # Buletinele așteptate: fiecare sursă parsată cu parserul ei și separată la rândul ei
+    asteptate = []
+    for f, key in surse:
+        pagini = _extrage_pagini(str(f), 0, 10_000)
+        asteptate.extend(parseaza_segmente(pagini, imparte_pagini(pagini, key), key))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Un singur laborator, două recoltări
+        combinat = str(Path(tmp) / "clinica.pdf")
+        _combina([surse[0][0]], combinat, repetari=2)
+        buletine = parseaza_pdf_combinat(combinat, 'clinica_sante')
+        ok = len(buletine) == 2 and all(len(b.analize) == len(asteptate[0].analize) for b in buletine)
+        print(f"\n{'✅' if ok else '❌'} {Path(combinat).name}: {len(buletine)} buletine "
+              f"({', '.join(str(len(b.analize)) for b in buletine)} analize)")
+
+        # Laboratoare diferite, fără parser dat: cascada per buletin
+        combinat = str(Path(tmp) / "combinat.pdf")
+        _combina([f for f, _ in surse], combinat)
+        pagini = _extrage_pagini(combinat, 0, 10_000)
+
+        print(f"\n{'='*70}")
+        print(f"PDF COMBINAT: {len(pagini)} pagini din {len(surse)} fișiere")
+        print(f"{'='*70}")
+        segmente = imparte_pagini(pagini)
+        buletine = parseaza_pdf_combinat(combinat)
+        for segment, buletin, asteptat in zip(segmente, buletine, asteptate):
+            if buletin.warnings:
+                stare = "⚠️"    # niciun parser nu a trecut de prag pe acest buletin
+            else:
+                ok = ([a.nume_analiza for a in buletin.analize] == [a.nume_analiza for a in asteptat.analize]
+                      and buletin.numar_buletin == asteptat.numar_buletin)
+                stare = "✅" if ok else "❌"
+            print(f"  {stare} pagini {segment.start + 1}-{segment.stop:<3} ({segment.motiv:<7}) "
+                  f"{buletin.laborator:<14} nr {buletin.numar_buletin or '-':<9} "
+                  f"CNP {buletin.pacient_cnp or '-':<13} recoltare {buletin.data_recoltare or '-':<10} "
+                  f"{len(buletin.analize):>3} analize")
+        stare = "✅" if len(buletine) == len(asteptate) else "❌"
+        print(f"  {stare} {len(buletine)} buletine (așteptate {len(asteptate)})")
+
+        # Fișier mare: secvențial vs procese
+        mare = str(Path(tmp) / "mare.pdf")
+        _combina([f for f, _ in surse], mare, repetari=20)
+        print(f"\n{'='*70}")
+        print(f"FIȘIER MARE ({len(surse) * 20} fișiere sursă, {os.cpu_count()} procesoare)")
+        print(f"{'='*70}")
+        for workers in sorted({1, os.cpu_count() or 1, 4}):
+            start = time.perf_counter()
+            buletine = parseaza_pdf_combinat(mare, workers=workers)
+            durata = (time.perf_counter() - start) * 1e3
+            print(f"  workers={workers}: {len(buletine)} buletine, "
+                  f"{sum(len(b.analize) for b in buletine)} analize, {durata:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,423 @@
+"""
+Detectarea Buletinelor Aproape Duplicate (MinHash + LSH)
+========================================================
+O copie rescanată sau reexportată a unui buletin (alt producător de PDF)
+are alți octeți, deci indexul pe hash (duplicate_buletine) nu o vede.
+Aici documentele sunt comparate după textul extras, înainte de parsare:
+
+- text normalizat: fără diacritice, litere mici, fără spații (OCR-ul și
+  exporturile diferite rup altfel spațierea)
+- shingle-uri de LUNGIME_SHINGLE caractere, hash polinomial pe 64 biți
+  calculat vectorizat (NumPy)
+- semnătura MinHash: NUM_PERMUTARI minime ale unor funcții multiply-shift;
+  fracția de componente egale estimează similaritatea Jaccard
+- LSH: semnătura tăiată în BENZI benzi de RANDURI_BANDA valori; două
+  documente devin candidate dacă au cel puțin o bandă identică. Căutarea
+  atinge doar gălețile benzilor (index SQLite), nu tot corpusul; candidații
+  sunt apoi verificați pe semnătura completă
+
+Parametrii aleși pe buletinele din proiect: copiile (reexport, ~1%
+caractere greșite de OCR) au similaritatea 0.8-0.9, buletine ale altor
+pacienți (alte numere peste tot, inclusiv intervalele) ~0.4-0.6. Buletinul
+de luna următoare al aceluiași pacient la același laborator (rezultate
+±15%, alte date și alt număr, aceleași intervale) ajunge însă tot la
+~0.85-0.9: similaritatea textului nu deosebește o copie de un buletin nou.
+Potrivirile sunt deci doar candidați raportați; un duplicat se confirmă
+după parsare, pe cheia semantică (duplicate_buletine). Cu 16 benzi x 12
+rânduri probabilitatea de a deveni candidat este ~3% la 0.6, ~68% la 0.8,
+~91% la 0.85 și >99% de la 0.9 în sus; dintre candidați se raportează cei
+cu similaritatea estimată >= PRAG_SIMILARITATE.
+
+PDF-urile fără strat de text primesc semnătură doar cu ocr=True (pytesseract,
+opțional).
+
+Utilizare:
+    with IndexSimilaritate("similaritate_buletine.sqlite") as index:
+        semnatura, potriviri = index.verifica(pdf)
+        ...parsare, import; potriviri raportate ca posibile copii...
+        index.adauga(pdf, semnatura)
+
+    python similaritate_buletine.py adauga buletine/ --index similaritate.sqlite
+    python similaritate_buletine.py cauta nou.pdf --index similaritate.sqlite
+
+Test (fără argumente): python similaritate_buletine.py
+"""
+
+import argparse
+import re
+import sqlite3
+import sys
+import time
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+SIMILARITATE_PATH = Path(__file__).with_name("similaritate_buletine.sqlite")
+
+LUNGIME_SHINGLE = 7
+NUM_PERMUTARI = 192
+BENZI = 16
+RANDURI_BANDA = NUM_PERMUTARI // BENZI
+PRAG_SIMILARITATE = 0.75
+
+# Sub atâtea shingle-uri textul nu spune nimic (pagină scanată, PDF gol)
+MIN_SHINGLE = 50
+
+# Parametrii funcțiilor de hash: ficși, ca semnăturile să rămână comparabile între rulări
+SEMINTA = 20240601
+
+_rng = np.random.default_rng(SEMINTA)
+_A = _rng.integers(1, 2 ** 63, NUM_PERMUTARI, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_B = _rng.integers(0, 2 ** 63, NUM_PERMUTARI, dtype=np.uint64)
+_BAZA_SHINGLE = np.uint64(1_000_003)
+_MULT_BANDA = _rng.integers(1, 2 ** 63, RANDURI_BANDA, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+del _rng
+
+_RE_SPATII = re.compile(r'\s+')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parametri (
+    nume    TEXT PRIMARY KEY,
+    valoare TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documente (
+    id          INTEGER PRIMARY KEY,
+    fisier      TEXT NOT NULL,
+    semnatura   BLOB NOT NULL,
+    inregistrat REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS benzi (
+    banda  INTEGER NOT NULL,
+    cheie  INTEGER NOT NULL,
+    doc_id INTEGER NOT NULL,
+    PRIMARY KEY (banda, cheie, doc_id)
+) WITHOUT ROWID;
+"""
+
+_PARAMETRI = {'shingle': LUNGIME_SHINGLE, 'permutari': NUM_PERMUTARI, 'benzi': BENZI, 'seminta': SEMINTA}
+
+
+@dataclass(slots=True)
+class Potrivire:
+    """Un document din index asemănător cu cel căutat"""
+    id: int
+    fisier: str
+    similaritate: float
+
+
+# =============================================================================
+# SEMNĂTURI
+# =============================================================================
+
+def text_normalizat(text: str) -> str:
+    """Fără diacritice și alte semne non-ASCII, litere mici, fără spații"""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return _RE_SPATII.sub('', text.lower())
+
+
+def shingle(text: str, lungime: int = LUNGIME_SHINGLE) -> np.ndarray:
+    """Hash-urile (uint64, unice) ale subșirurilor de lungime caractere ale textului normalizat"""
+    octeti = np.frombuffer(text_normalizat(text).encode('ascii'), dtype=np.uint8).astype(np.uint64)
+    n = len(octeti) - lungime + 1
+    if n <= 0:
+        return np.empty(0, dtype=np.uint64)
+    h = np.zeros(n, dtype=np.uint64)
+    for j in range(lungime):
+        h = h * _BAZA_SHINGLE + octeti[j:j + n]     # modulo 2^64
+    return np.unique(h)
+
+
+def semnatura_text(text: str) -> Optional[np.ndarray]:
+    """Semnătura MinHash (uint32 x NUM_PERMUTARI) a textului; None pentru texte prea scurte"""
+    h = shingle(text)
+    if len(h) < MIN_SHINGLE:
+        return None
+    semnatura = np.full(NUM_PERMUTARI, np.iinfo(np.uint32).max, dtype=np.uint64)
+    # Pe bucăți: matricea shingle x permutări rămâne mică
+    for start in range(0, len(h), 4096):
+        bucata = h[start:start + 4096, None]
+        np.minimum(semnatura, ((bucata * _A + _B) >> np.uint64(32)).min(axis=0), out=semnatura)
+    return semnatura.astype(np.uint32)
+
+
+def semnatura_pdf(pdf_path: str, ocr: bool = False) -> Optional[np.ndarray]:
+    """Semnătura textului extras din PDF (OCR doar dacă ocr=True și PDF-ul nu are text)"""
+    from cascada_parsare import _extrage_ocr, _extrage_pdf
+    pagini, _ = _extrage_pdf(pdf_path)
+    semnatura = semnatura_text("\n".join(pagini))
+    if semnatura is None and ocr:
+        try:
+            semnatura = semnatura_text(_extrage_ocr(pdf_path))
+        except ImportError:
+            pass
+    return semnatura
+
+
+def similaritate(a: np.ndarray, b: np.ndarray) -> float:
+    """Similaritatea Jaccard estimată din două semnături"""
+    return float(np.mean(a == b))
+
+
+def chei_benzi(semnatura: np.ndarray) -> List[int]:
+    """Cheia (int64) fiecărei benzi a semnăturii"""
+    benzi = semnatura.astype(np.uint64).reshape(BENZI, RANDURI_BANDA)
+    return (benzi * _MULT_BANDA).sum(axis=1).view(np.int64).tolist()
+
+
+# =============================================================================
+# INDEX LSH
+# =============================================================================
+
+class IndexSimilaritate:
+    """Semnături MinHash + găleți LSH per bandă, în SQLite"""
+
+    def __init__(self, path: Union[str, Path] = SIMILARITATE_PATH, prag: float = PRAG_SIMILARITATE):
+        self.path = str(path)
+        self.prag = prag
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        parametri = dict(self._db.execute("SELECT nume, valoare FROM parametri"))
+        if not parametri:
+            self._db.executemany("INSERT INTO parametri VALUES (?, ?)",
+                                 [(k, str(v)) for k, v in _PARAMETRI.items()])
+            self._db.commit()
+        elif parametri != {k: str(v) for k, v in _PARAMETRI.items()}:
+            raise ValueError(f"{self.path}: index creat cu alți parametri MinHash ({parametri})")
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM documente").fetchone()[0]
+
+    def commit(self):
+        self._db.commit()
+
+    def adauga(self, fisier: Union[str, Path], semnatura: np.ndarray, commit: bool = True) -> int:
+        id_ = self._db.execute("INSERT INTO documente (fisier, semnatura, inregistrat) VALUES (?, ?, ?)",
+                               (str(fisier), semnatura.astype(np.uint32).tobytes(), time.time())).lastrowid
+        self._db.executemany("INSERT OR IGNORE INTO benzi VALUES (?, ?, ?)",
+                             [(banda, cheie, id_) for banda, cheie in enumerate(chei_benzi(semnatura))])
+        if commit:
+            self._db.commit()
+        return id_
+
+    def candidati(self, semnatura: np.ndarray) -> List[int]:
+        """Documentele cu cel puțin o bandă identică"""
+        gasite = set()
+        for banda, cheie in enumerate(chei_benzi(semnatura)):
+            gasite.update(r[0] for r in self._db.execute(
+                "SELECT doc_id FROM benzi WHERE banda = ? AND cheie = ?", (banda, cheie)))
+        return sorted(gasite)
+
+    def cauta(self, semnatura: Optional[np.ndarray], prag: Optional[float] = None,
+              limita: int = 5) -> List[Potrivire]:
+        """Candidații LSH cu similaritatea estimată >= prag, descrescător"""
+        if semnatura is None:
+            return []
+        prag = self.prag if prag is None else prag
+        candidati = self.candidati(semnatura)
+        if not candidati:
+            return []
+        randuri = []
+        for i in range(0, len(candidati), 500):
+            bucata = candidati[i:i + 500]
+            randuri += self._db.execute(
+                f"SELECT id, fisier, semnatura FROM documente WHERE id IN ({', '.join('?' * len(bucata))})",
+                bucata).fetchall()
+        semnaturi = np.frombuffer(b"".join(r[2] for r in randuri), dtype=np.uint32).reshape(len(randuri), -1)
+        scoruri = (semnaturi == semnatura).mean(axis=1)
+        ordine = np.argsort(-scoruri, kind='stable')
+        return [Potrivire(randuri[i][0], randuri[i][1], round(float(scoruri[i]), 4))
+                for i in ordine[:limita] if scoruri[i] >= prag]
+
+    def verifica(self, pdf_path: str, ocr: bool = False) -> Tuple[Optional[np.ndarray], List[Potrivire]]:
+        """(semnătura, potriviri) pentru un PDF - înainte de parsare"""
+        semnatura = semnatura_pdf(pdf_path, ocr)
+        return semnatura, self.cauta(semnatura)
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def cli(argv: Sequence[str]) -> int:
+    from batch_analize import enumera_pdf
+
+    ap = argparse.ArgumentParser(prog="similaritate_buletine.py",
+                                 description="Buletine aproape duplicate (MinHash + LSH pe textul extras).")
+    ap.add_argument('comanda', choices=('adauga', 'cauta'))
+    ap.add_argument('intrari', nargs='+', help="directoare, fișiere PDF sau liste .txt")
+    ap.add_argument('--index', default=str(SIMILARITATE_PATH))
+    ap.add_argument('--prag', type=float, default=PRAG_SIMILARITATE, help="similaritatea minimă raportată")
+    ap.add_argument('--ocr', action='store_true', help="OCR pentru PDF-urile fără text")
+    args = ap.parse_args(argv)
+
+    with IndexSimilaritate(args.index, prag=args.prag) as index:
+        for fisier in enumera_pdf(args.intrari):
+            semnatura, potriviri = index.verifica(fisier, ocr=args.ocr)
+            if semnatura is None:
+                print(f"⚠️ {fisier}: fără text")
+                continue
+            for p in potriviri:
+                print(f"🔁 {fisier} ~ {p.fisier} ({p.similaritate:.0%})")
+            if args.comanda == 'adauga' and all(p.fisier != fisier for p in potriviri):
+                index.adauga(fisier, semnatura, commit=False)
+        index.commit()
+        print(f"📚 {len(index)} documente în {args.index}", file=sys.stderr)
+    return 0
+
+
+# =============================================================================
+# MAIN - TEST
+# =============================================================================
+
+def _luna_urmatoare(text: str, result, rng) -> str:
+    """Buletinul următor al aceluiași pacient: rezultate ±15%, alte date și alt număr, aceleași intervale"""
+    valori = {v for a in result.analize if re.fullmatch(r'\d+(?:[.,]\d+)?', a.rezultat or '')
+              for v in (a.rezultat, a.rezultat.replace('.', ','))}
+
+    def alta_valoare(match) -> str:
+        valoare = match.group(0)
+        separator = ',' if ',' in valoare else '.'
+        zecimale = len(valoare.split(separator)[1]) if separator in valoare else 0
+        noua = float(valoare.replace(',', '.')) * rng.uniform(0.85, 1.15)
+        return f"{noua:.{zecimale}f}".replace('.', separator)
+
+    if valori:
+        alternative = '|'.join(map(re.escape, sorted(valori, key=len, reverse=True)))
+        text = re.sub(rf'(?<![\d.,])(?:{alternative})(?![\d.,])', alta_valoare, text)
+    text = re.sub(r'\b\d{2}([./-])\d{2}\1(\d{4})\b',
+                  lambda m: f"{rng.randint(1, 28):02d}{m.group(1)}{rng.randint(1, 12):02d}{m.group(1)}{m.group(2)}",
+                  text)
+    if result.numar_buletin:
+        text = text.replace(result.numar_buletin, str(rng.randint(10 ** 5, 10 ** 6 - 1)))
+    return text
+
+
+def _pdf_din_text(text: str, path: Union[str, Path]):
+    """PDF cu stratul de text dat, câte 60 de linii pe pagină (pentru teste)"""
+    from parsere_laboratoare import _import_fitz
+
+    doc = _import_fitz().open()
+    linii = text.split('\n')
+    for i in range(0, len(linii), 60):
+        doc.new_page().insert_text((36, 36), "\n".join(linii[i:i + 60]), fontsize=9)
+    doc.save(str(path))
+    doc.close()
+
+
+def main():
+    if len(sys.argv) > 1:
+        return cli(sys.argv[1:])
+
+    import random
+    import tempfile
+    from cascada_parsare import _extrage_pdf
+    from parsere_laboratoare import _import_fitz, get_parser
+
+    fitz = _import_fitz()
+    if fitz is None:
+        print("❌ PyMuPDF nu este instalat")
+        return 1
+
+    pdf_dir = Path(__file__).parent
+    nume = ('AnalizeMedicale.pdf', 'analize-b-51-ro.pdf', '1111200901011bolnavul.pdf')
+    texte = {n: "\n".join(_extrage_pdf(str(pdf_dir / n))[0]) for n in nume}
+    rng = random.Random(0)
+
+    def alte_valori(text: str) -> str:
+        # Alt pacient al aceluiași laborator: același șablon, alte numere peste tot (și intervalele)
+        return re.sub(r'\d+(?:[.,]\d+)?', lambda m: str(rng.randint(1, 999)), text)
+
+    def zgomot_ocr(text: str, proportie: float) -> str:
+        return ''.join(rng.choice('abcdeilo01 ') if rng.random() < proportie else c for c in text)
+
+    start = time.perf_counter()
+    semnaturi = {n: semnatura_text(t) for n, t in texte.items()}
+    durata = (time.perf_counter() - start) / len(texte) * 1e3
+    print(f"\n✍️ Semnătură MinHash: {durata:.1f} ms / document ({NUM_PERMUTARI} permutări)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        resalvat = str(Path(tmp) / 'AnalizeMedicale-reexport.pdf')
+        with fitz.open(str(pdf_dir / 'AnalizeMedicale.pdf')) as doc:
+            doc.set_metadata({**doc.metadata, 'producer': 'Alt producător'})
+            doc.save(resalvat, garbage=4, deflate=True, clean=True)
+
+        with IndexSimilaritate(Path(tmp) / 'index.sqlite') as index:
+            for n in nume:
+                index.adauga(n, semnaturi[n])
+            print(f"\n   {'Document':<44} {'Potrivire':<28} {'Estimat':>8} {'Jaccard':>8}")
+            cazuri = [('AnalizeMedicale - Copy.pdf', texte['AnalizeMedicale.pdf'], True)]
+            cazuri.append(('AnalizeMedicale (reexport, alt producător)', "\n".join(_extrage_pdf(resalvat)[0]), True))
+            for n, key in zip(nume, ('clinica_sante', 'elite_medical', 'smartlabs')):
+                cazuri.append((f"{n} (OCR ~1% erori)", zgomot_ocr(texte[n], 0.01), True))
+                cazuri.append((f"{n} (alte valori)", alte_valori(texte[n]), False))
+                # Regresie: buletinul nou al aceluiași pacient trece pragul - de aceea doar raportat
+                urmator = _luna_urmatoare(texte[n], get_parser(key).parse_text(texte[n]), rng)
+                cazuri.append((f"{n} (luna următoare)", urmator, True))
+            corecte = 0
+            for descriere, text, duplicat in cazuri:
+                potriviri = index.cauta(semnatura_text(text))
+                baza = next((n for n in nume if descriere.startswith(n.split('.')[0])), nume[0])
+                a, b = set(shingle(texte[baza]).tolist()), set(shingle(text).tolist())
+                jaccard = len(a & b) / len(a | b)
+                corecte += bool(potriviri) == duplicat
+                p = potriviri[0] if potriviri else None
+                print(f"{'✅' if bool(potriviri) == duplicat else '❌'} {descriere:<44} "
+                      f"{p.fisier if p else '-':<28} {f'{p.similaritate:.2f}' if p else '-':>8} {jaccard:>8.2f}")
+            print(f"   {corecte}/{len(cazuri)} cazuri corecte (luna următoare: candidat raportat, nu sărit - "
+                  f"batch_analize confirmă pe cheia semantică)")
+
+        # Scară: 200k buletine, în grupuri de laborator (același șablon -> similaritate ~0.55 între ele)
+        n = 200_000
+        nprng = np.random.default_rng(0)
+        sabloane = np.stack(list(semnaturi.values()))
+
+        def amesteca(baza: np.ndarray, pastrat: float) -> np.ndarray:
+            aleator = nprng.integers(0, 2 ** 32, baza.shape, dtype=np.uint32)
+            return np.where(nprng.random(baza.shape) < pastrat, baza, aleator)
+
+        corpus = amesteca(sabloane[np.arange(n) % len(sabloane)], 0.74)
+        path = Path(tmp) / 'mare.sqlite'
+        with IndexSimilaritate(path) as index:
+            start = time.perf_counter()
+            for i in range(n):
+                index.adauga(f"/arhiva/{i}.pdf", corpus[i], commit=False)
+            index.commit()
+            durata = time.perf_counter() - start
+        print(f"\n💾 {n:,} semnături indexate în {durata:.1f} s ({path.stat().st_size / 1e6:.0f} MB)")
+
+        with IndexSimilaritate(path) as index:
+            cereri = nprng.integers(0, n, 200)
+            gasite, candidati = 0, 0
+            start = time.perf_counter()
+            for i in cereri:
+                copie = amesteca(corpus[i], 0.9)
+                candidati += len(index.candidati(copie))
+                potriviri = index.cauta(copie)
+                gasite += bool(potriviri) and potriviri[0].fisier == f"/arhiva/{i}.pdf"
+            durata_lsh = (time.perf_counter() - start) / len(cereri) * 1e3
+            start = time.perf_counter()
+            for i in cereri[:20]:
+                (corpus == amesteca(corpus[i], 0.9)).mean(axis=1).argmax()
+            durata_liniar = (time.perf_counter() - start) / 20 * 1e3
+            print(f"🔎 Copii ~0.9: {gasite}/{len(cereri)} găsite, {candidati / len(cereri):.1f} candidați / căutare; "
+                  f"LSH {durata_lsh:.2f} ms vs. comparație cu tot corpusul {durata_liniar:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
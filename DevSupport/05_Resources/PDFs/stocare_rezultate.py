@@ -0,0 +1,372 @@
+"""
+Stocare Locală a Rezultatelor (SQLite)
+======================================
+Bază SQLite embedded pentru buletine și analize, ca întrebări de tipul
+"valorile HGB anterioare ale pacientului" să nu mai ceară reparsarea PDF-urilor.
+
+- tabele: buletine (laborator, număr, dată recoltare, pacient, fișier) și
+  analize (câmpurile AnalizaResult + valoarea în unitatea canonică)
+- data recoltării este stocată ISO (YYYY-MM-DD), ca să se poată sorta și
+  filtra pe intervale; textul original rămâne în data_recoltare_text
+- indexuri: CNP (+ dată), cod_analiza, data_recoltare, laborator (+ dată)
+- WAL (cititorii nu blochează scrierea), inserări executemany într-o singură
+  tranzacție per lot; id-urile buletinelor sunt alocate în tranzacție, fără
+  un INSERT + lastrowid per buletin
+- un buletin reimportat (același laborator, număr, CNP, dată) îl înlocuiește
+  pe cel vechi; un buletin fără număr este recunoscut după fișier și hash-ul
+  conținutului (același PDF reîncărcat / reluat în batch)
+
+Scris de api_analize (variabila de mediu ANALIZE_DB) și de batch_analize
+(--db). Interogări: istoric_pacient, analize, buletine_pacient, statistici.
+
+Utilizare:
+    with StoreRezultate("rezultate.sqlite") as store:
+        store.salveaza_lot(rezultate)
+        store.istoric_pacient("2800101123456", cod="HGB")
+
+Benchmark (1M analize): python stocare_rezultate.py [n]
+"""
+
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+DB_PATH = Path(__file__).with_name("rezultate.sqlite")
+
+# Variabila de mediu cu calea bazei pentru API
+DB_ENV = 'ANALIZE_DB'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buletine (
+    id                  INTEGER PRIMARY KEY,
+    laborator           TEXT NOT NULL DEFAULT '',
+    numar_buletin       TEXT NOT NULL DEFAULT '',
+    data_recoltare      TEXT,
+    data_recoltare_text TEXT NOT NULL DEFAULT '',
+    pacient_nume        TEXT NOT NULL DEFAULT '',
+    pacient_cnp         TEXT NOT NULL DEFAULT '',
+    fisier              TEXT NOT NULL DEFAULT '',
+    importat            REAL NOT NULL,
+    hash_continut       TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS analize (
+    id                  INTEGER PRIMARY KEY,
+    buletin_id          INTEGER NOT NULL REFERENCES buletine(id),
+    categorie           TEXT NOT NULL DEFAULT '',
+    nume_analiza        TEXT NOT NULL DEFAULT '',
+    cod_analiza         TEXT,
+    rezultat            TEXT NOT NULL DEFAULT '',
+    rezultat_numeric    REAL,
+    unitate_masura      TEXT NOT NULL DEFAULT '',
+    interval_min        REAL,
+    interval_max        REAL,
+    interval_text       TEXT NOT NULL DEFAULT '',
+    este_anormal        INTEGER NOT NULL DEFAULT 0,
+    directie_anormal    TEXT,
+    valoare_canonica    REAL,
+    unitate_canonica    TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS buletine_cnp ON buletine (pacient_cnp, data_recoltare);
+CREATE INDEX IF NOT EXISTS buletine_data ON buletine (data_recoltare);
+CREATE INDEX IF NOT EXISTS buletine_laborator ON buletine (laborator, data_recoltare);
+CREATE INDEX IF NOT EXISTS buletine_cheie ON buletine (laborator, numar_buletin, pacient_cnp, data_recoltare);
+CREATE INDEX IF NOT EXISTS analize_buletin ON analize (buletin_id, cod_analiza);
+CREATE INDEX IF NOT EXISTS analize_cod ON analize (cod_analiza);
+"""
+
+# După migrarea bazelor create fără hash_continut
+_INDEX_FISIER = "CREATE INDEX IF NOT EXISTS buletine_fisier ON buletine (fisier, hash_continut)"
+
+_COLOANE_BULETIN = ('id', 'laborator', 'numar_buletin', 'data_recoltare', 'data_recoltare_text',
+                    'pacient_nume', 'pacient_cnp', 'fisier', 'importat', 'hash_continut')
+_COLOANE_ANALIZA = ('buletin_id', 'categorie', 'nume_analiza', 'cod_analiza', 'rezultat', 'rezultat_numeric',
+                    'unitate_masura', 'interval_min', 'interval_max', 'interval_text', 'este_anormal',
+                    'directie_anormal', 'valoare_canonica', 'unitate_canonica')
+
+_RE_DATA_RO = re.compile(r'\b(\d{1,2})[./-](\d{1,2})[./-](\d{4})\b')
+_RE_DATA_ISO = re.compile(r'\b(\d{4})-(\d{2})-(\d{2})\b')
+
+
+def data_iso(data: Optional[str]) -> Optional[str]:
+    """'YYYY-MM-DD' din data recoltării (dd.mm.yyyy, dd/mm/yyyy sau ISO), None altfel"""
+    if not data:
+        return None
+    m = _RE_DATA_ISO.search(data)
+    if m:
+        return m.group(0)
+    m = _RE_DATA_RO.search(data)
+    if m:
+        return f"{m.group(3)}-{int(m.group(2)):02d}-{int(m.group(1)):02d}"
+    return None
+
+
+def _campuri_buletin(result) -> Tuple[str, str, str, str, str]:
+    """(laborator, număr, dată, nume pacient, CNP) din BuletinResult sau BuletinAnalize"""
+    if hasattr(result, 'laborator_detectat'):  # BuletinAnalize (v2 / universal)
+        info, pacient = result.buletin, result.pacient
+        return (getattr(info, 'laborator', '') or result.laborator_detectat, info.numar_buletin,
+                info.data_recoltare or "", pacient.nume_prenume, pacient.cnp)
+    return result.laborator, result.numar_buletin, result.data_recoltare, result.pacient_nume, result.pacient_cnp
+
+
+# =============================================================================
+# STORE
+# =============================================================================
+
+class StoreRezultate:
+    """Buletine și analize într-o bază SQLite locală"""
+
+    def __init__(self, path: Union[str, Path] = DB_PATH):
+        self.path = str(path)
+        # Conexiunea e folosită din mai multe fire (API); accesul e serializat de _lock
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        for pragma in ("journal_mode=WAL", "synchronous=NORMAL", "temp_store=MEMORY", "cache_size=-65536"):
+            self._db.execute(f"PRAGMA {pragma}")
+        self._db.executescript(_SCHEMA)
+        if 'hash_continut' not in {rand[1] for rand in self._db.execute("PRAGMA table_info(buletine)")}:
+            self._db.execute("ALTER TABLE buletine ADD COLUMN hash_continut TEXT NOT NULL DEFAULT ''")
+        self._db.execute(_INDEX_FISIER)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -------------------------------------------------------------------------
+    # Scriere
+    # -------------------------------------------------------------------------
+
+    def salveaza(self, result, fisier: str = "", hash_: Optional[str] = None) -> int:
+        return self.salveaza_lot([(result, fisier, hash_)])
+
+    def salveaza_lot(self, rezultate: Iterable) -> int:
+        """
+        Salvează un lot într-o singură tranzacție. Elementele pot fi
+        BuletinResult / BuletinAnalize, înregistrări batch_analize (dict) sau
+        tupluri (rezultat, fișier[, hash conținut]). Întoarce numărul de
+        analize inserate. Fără număr de buletin, reimportul este recunoscut
+        după fișier + hash (calculat din fișier dacă nu este dat).
+        """
+        from export_flux import buletin_din_dict
+        from manifest_procesare import hash_continut
+        from unitati_masura import campuri_canonice
+
+        acum = time.time()
+        buletine, chei, chei_fisier, analize = [], [], [], []
+        for element in rezultate:
+            result, fisier, hash_ = (element + (None,))[:3] if isinstance(element, tuple) else (element, "", None)
+            if isinstance(result, dict):
+                fisier = fisier or result.get('fisier', "")
+                result = buletin_din_dict(result)
+            fisier = str(fisier)
+            laborator, numar, data, nume, cnp = _campuri_buletin(result)
+            iso = data_iso(data)
+            if numar:
+                chei.append((laborator, numar, cnp, iso))
+            elif fisier:
+                if not hash_:
+                    try:
+                        hash_ = hash_continut(fisier)
+                    except OSError:
+                        hash_ = ""      # fișierul nu mai există: doar numele
+                chei_fisier.append((fisier, hash_))
+            buletine.append([None, laborator, numar, iso, data, nume, cnp, fisier, acum, hash_ or ""])
+            analize.append(result.analize)
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Reimport: buletinul vechi și analizele lui sunt înlocuite
+                for cheie, valori in (
+                        ("laborator = ? AND numar_buletin = ? AND pacient_cnp = ? AND data_recoltare IS ?", chei),
+                        ("fisier = ? AND hash_continut = ? AND numar_buletin = ''", chei_fisier)):
+                    if valori:
+                        self._db.executemany(
+                            f"DELETE FROM analize WHERE buletin_id IN (SELECT id FROM buletine WHERE {cheie})",
+                            valori)
+                        self._db.executemany(f"DELETE FROM buletine WHERE {cheie}", valori)
+                urmatorul = self._db.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM buletine").fetchone()[0]
+                randuri = []
+                for i, (buletin, lista) in enumerate(zip(buletine, analize)):
+                    buletin[0] = id_buletin = urmatorul + i
+                    for a in lista:
+                        canonic = campuri_canonice(a)
+                        randuri.append((
+                            id_buletin, a.categorie, a.nume_analiza, a.cod_analiza, a.rezultat, a.rezultat_numeric,
+                            a.unitate_masura, a.interval_min, a.interval_max,
+                            getattr(a, 'interval_text', None) or getattr(a, 'interval_referinta_text', ''),
+                            int(a.este_anormal), a.directie_anormal,
+                            canonic['ValoareNumericaCanonic'], canonic['UnitatiMasuraCanonic'],
+                        ))
+                self._db.executemany(
+                    f"INSERT INTO buletine ({', '.join(_COLOANE_BULETIN)}) "
+                    f"VALUES ({', '.join('?' * len(_COLOANE_BULETIN))})", buletine)
+                self._db.executemany(
+                    f"INSERT INTO analize ({', '.join(_COLOANE_ANALIZA)}) "
+                    f"VALUES ({', '.join('?' * len(_COLOANE_ANALIZA))})", randuri)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return len(randuri)
+
+    # -------------------------------------------------------------------------
+    # Interogări
+    # -------------------------------------------------------------------------
+
+    def _interogheaza(self, sql: str, parametri: Sequence) -> List[Dict]:
+        with self._lock:
+            cursor = self._db.execute(sql, parametri)
+            coloane = [c[0] for c in cursor.description]
+            return [dict(zip(coloane, rand)) for rand in cursor.fetchall()]
+
+    def istoric_pacient(self, cnp: str, cod: Optional[str] = None, de_la: Optional[str] = None,
+                        pana_la: Optional[str] = None) -> List[Dict]:
+        """Analizele unui pacient în ordine cronologică, opțional doar un cod (ex. HGB) și un interval de date"""
+        return self.analize(cod=cod, cnp=cnp, de_la=de_la, pana_la=pana_la)
+
+    def analize(self, cod: Optional[str] = None, cnp: Optional[str] = None, laborator: Optional[str] = None,
+                de_la: Optional[str] = None, pana_la: Optional[str] = None,
+                anormale: Optional[bool] = None, limita: Optional[int] = None) -> List[Dict]:
+        """Analize filtrate; datele de_la / pana_la acceptă formatul ISO sau dd.mm.yyyy"""
+        conditii, parametri = [], []
+        for conditie, valoare in (("b.pacient_cnp = ?", cnp), ("a.cod_analiza = ?", cod),
+                                  ("b.laborator = ?", laborator),
+                                  ("b.data_recoltare >= ?", data_iso(de_la) if de_la else None),
+                                  ("b.data_recoltare <= ?", data_iso(pana_la) if pana_la else None),
+                                  ("a.este_anormal = ?", None if anormale is None else int(anormale))):
+            if valoare is not None:
+                conditii.append(conditie)
+                parametri.append(valoare)
+        sql = ("SELECT b.data_recoltare, b.laborator, b.numar_buletin, b.pacient_cnp, a.categorie, a.nume_analiza, "
+               "a.cod_analiza, a.rezultat, a.rezultat_numeric, a.unitate_masura, a.interval_min, a.interval_max, "
+               "a.interval_text, a.este_anormal, a.directie_anormal, a.valoare_canonica, a.unitate_canonica"
+               # Cu CNP: întâi buletinele pacientului (indexul pe CNP), apoi analizele lor;
+               # CROSS JOIN fixează ordinea, altfel planificatorul poate alege indexul pe cod
+               + (" FROM buletine b CROSS JOIN analize a ON a.buletin_id = b.id" if cnp is not None else
+                  " FROM analize a JOIN buletine b ON b.id = a.buletin_id"))
+        if conditii:
+            sql += " WHERE " + " AND ".join(conditii)
+        sql += " ORDER BY b.data_recoltare, b.id, a.id"
+        if limita:
+            sql += f" LIMIT {int(limita)}"
+        randuri = self._interogheaza(sql, parametri)
+        for rand in randuri:
+            rand['este_anormal'] = bool(rand['este_anormal'])
+        return randuri
+
+    def buletine_pacient(self, cnp: str) -> List[Dict]:
+        """Buletinele unui pacient, cu numărul de analize și de anormale"""
+        return self._interogheaza(
+            "SELECT b.id, b.laborator, b.numar_buletin, b.data_recoltare, b.data_recoltare_text, b.pacient_nume, "
+            "b.fisier, COUNT(a.id) AS total_analize, COALESCE(SUM(a.este_anormal), 0) AS analize_anormale "
+            "FROM buletine b LEFT JOIN analize a ON a.buletin_id = b.id "
+            "WHERE b.pacient_cnp = ? GROUP BY b.id ORDER BY b.data_recoltare, b.id", (cnp,))
+
+    def statistici(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'buletine': self._db.execute("SELECT COUNT(*) FROM buletine").fetchone()[0],
+                'analize': self._db.execute("SELECT COUNT(*) FROM analize").fetchone()[0],
+                'pacienti': self._db.execute("SELECT COUNT(DISTINCT pacient_cnp) FROM buletine").fetchone()[0],
+            }
+
+
+# =============================================================================
+# MAIN - BENCHMARK
+# =============================================================================
+
+def main():
+    import dataclasses
+    import random
+    import tempfile
+    from parsere_laboratoare import _import_fitz, get_parser
+
+    if _import_fitz() is None:
+        print("❌ PyMuPDF nu este instalat")
+        return 1
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    pdf_dir = Path(__file__).parent
+    baza = [get_parser(key).parse_pdf(str(pdf_dir / nume)) for key, nume in (
+        ('clinica_sante', 'AnalizeMedicale.pdf'),
+        ('smartlabs', '1111200901011bolnavul.pdf'),
+        ('elite_medical', 'analize-b-51-ro.pdf'),
+    )]
+
+    # Buletine sintetice: ~20 per pacient, date și numere distincte
+    buletine, total = [], 0
+    while total < n:
+        i = len(buletine)
+        b = baza[i % len(baza)]
+        buletine.append(dataclasses.replace(
+            b, numar_buletin=f"{i}", pacient_cnp=f"2{i // 20:012d}",
+            data_recoltare=f"{i % 28 + 1:02d}.{i % 12 + 1:02d}.{2015 + i % 10}"))
+        total += len(b.analize)
+    pacienti = len(buletine) // 20 + 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'rezultate.sqlite'
+        with StoreRezultate(path) as store:
+            lot = 1000
+            start = time.perf_counter()
+            for i in range(0, len(buletine), lot):
+                store.salveaza_lot(buletine[i:i + lot])
+            durata = time.perf_counter() - start
+            stat = store.statistici()
+            print(f"\n💾 Inserare: {stat['analize']:,} analize / {stat['buletine']:,} buletine / "
+                  f"{stat['pacienti']:,} pacienți în {durata:.1f} s -> {stat['analize'] / durata:,.0f} analize/s "
+                  f"({path.stat().st_size / 1e6:.0f} MB)")
+
+            # Reimportul unui buletin îl înlocuiește; fără număr, după fișier + hash
+            store.salveaza(buletine[0])
+            ok = store.statistici() == stat
+            print(f"{'✅' if ok else '❌'} Reimport: buletinul existent este înlocuit, nu dublat")
+            fara_numar = dataclasses.replace(baza[0], numar_buletin="")
+            fisier = str(pdf_dir / 'AnalizeMedicale.pdf')
+            store.salveaza(fara_numar, fisier)
+            inainte = store.statistici()
+            store.salveaza_lot([{'fisier': fisier, 'rezultat': dataclasses.asdict(fara_numar)}])
+            ok = store.statistici() == inainte != stat
+            print(f"{'✅' if ok else '❌'} Reimport fără număr de buletin: recunoscut după fișier + hash")
+
+            # Latența căutării per pacient
+            rng = random.Random(0)
+            latente = []
+            for _ in range(2000):
+                cnp = f"2{rng.randrange(pacienti):012d}"
+                start = time.perf_counter()
+                store.istoric_pacient(cnp, cod='HGB')
+                latente.append((time.perf_counter() - start) * 1e3)
+            latente.sort()
+            cnp = buletine[0].pacient_cnp
+            istoric = store.istoric_pacient(cnp, cod='HGB')
+            print(f"🔎 istoric_pacient(cnp, cod='HGB'): p50 {latente[len(latente) // 2]:.3f} ms, "
+                  f"p99 {latente[int(len(latente) * 0.99)]:.3f} ms")
+            print(f"   {cnp}: " + ", ".join(f"{r['data_recoltare']} {r['rezultat']} {r['unitate_masura']}"
+                                          for r in istoric[:5]) + (" ..." if len(istoric) > 5 else ""))
+            with store._lock:
+                plan = store._db.execute(
+                    "EXPLAIN QUERY PLAN SELECT a.id FROM buletine b CROSS JOIN analize a ON a.buletin_id = b.id "
+                    "WHERE b.pacient_cnp = ? AND a.cod_analiza = ?", (cnp, 'HGB')).fetchall()
+            print("   Plan: " + " | ".join(r[-1] for r in plan))
+
+            start = time.perf_counter()
+            hgb = store.analize(cod='HGB', de_la='2020-01-01', pana_la='31.12.2020', anormale=True)
+            print(f"🔎 analize(cod='HGB', 2020, anormale): {len(hgb):,} rânduri în "
+                  f"{(time.perf_counter() - start) * 1e3:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
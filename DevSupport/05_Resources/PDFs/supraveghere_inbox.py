@@ -0,0 +1,654 @@
+"""
+Daemon de Import din Directoare Supravegheate (Inbox)
+=====================================================
+Laboratoarele depun PDF-urile într-un director partajat; daemonul le preia
+fără intervenție manuală:
+
+- supraveghere cu inotify (Linux, prin ctypes - fără dependențe) sau, unde
+  inotify nu există / nu vede scrierile (share-uri SMB/NFS montate, --poll),
+  prin scanare periodică. Și cu inotify directorul este rescanat din când în
+  când (la pornire, la depășirea cozii de evenimente și la RESCANARE_S), ca
+  să nu rămână fișiere pierdute
+- debounce: un fișier este preluat abia după ce mărimea și mtime-ul nu s-au
+  schimbat STABIL_S secunde (copierile lente / pe bucăți nu sunt parsate pe
+  jumătate); fișierele ascunse și temporare sunt ignorate
+- parsare pe un pool limitat de procese (batch_analize.parseaza_fisier), cu
+  cel mult IN_LUCRU_PER_PROCES fișiere trimise per proces; restul așteaptă
+  în coadă. Un worker căzut (PDF care omoară procesul) duce la un pool nou,
+  iar fișierele în lucru sunt reîncercate o dată, câte unul, ca să cadă doar
+  vinovatul
+- rezultatele merg la destinațiile configurate: NDJSON (o linie per fișier,
+  ca batch_analize), JSON (un fișier per buletin) și/sau baza locală
+  (stocare_rezultate); opțional indexul de similaritate (similaritate_buletine),
+  care doar raportează documentele asemănătoare deja importate ("aproape")
+- după scriere fișierul este mutat în procesate/ (ok, duplicat) sau esuate/
+  (eroare, respins), cu sufix numeric la conflict de nume
+- metrici pentru dimensionarea numărului de workeri: latența depunere ->
+  rezultat și timpul de așteptare în coadă (p50/p90/p99), adâncimea
+  backlog-ului (în debounce / în coadă / în lucru), vârsta celui mai vechi
+  fișier neprocesat și gradul de ocupare al workerilor - periodic pe stderr
+  și, cu --stare, într-un fișier JSON rescris atomic
+
+Oprire: SIGTERM / Ctrl+C - fișierele în lucru sunt terminate și scrise, cele
+din coadă rămân în inbox pentru pornirea următoare.
+
+Utilizare:
+    python supraveghere_inbox.py /srv/inbox --ndjson rezultate.ndjson --workers 4
+    python supraveghere_inbox.py /srv/inbox/lab1 /srv/inbox/lab2 --db rezultate.sqlite --stare inbox.json
+    python supraveghere_inbox.py /mnt/share --poll --json rezultate/ --mapare laboratoare.json
+
+Test (fără argumente): python supraveghere_inbox.py
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import shutil
+import signal
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+from batch_analize import PERCENTILE, _initializeaza_worker, laborator_mapat, parseaza_fisier
+
+# Secunde în care mărimea și mtime-ul trebuie să rămână neschimbate
+STABIL_S = 2.0
+
+# Intervalul verificărilor de stabilitate și al scanării (în modul polling)
+VERIFICARE_S = 0.5
+SCANARE_S = 2.0
+
+# Rescanare completă și cu inotify (evenimente pierdute, directoare re-montate)
+RESCANARE_S = 60.0
+
+# Fișiere trimise simultan per proces (restul rămân în coadă, măsurată)
+IN_LUCRU_PER_PROCES = 2
+
+# Încercări per fișier când pool-ul cade
+INCERCARI = 2
+
+INTERVAL_RAPORT = 10.0
+
+# Latențe păstrate pentru percentile (ultimele N fișiere)
+FEREASTRA_LATENTE = 10_000
+
+DIRECTOR_PROCESATE = 'procesate'
+DIRECTOR_ESUATE = 'esuate'
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENIMENT = struct.Struct('iIII')
+
+
+def pdf_acceptat(path: Union[str, Path]) -> bool:
+    """PDF-urile, fără fișierele ascunse și temporare ale programelor de copiere"""
+    nume = Path(path).name
+    return nume.lower().endswith('.pdf') and not nume.startswith(('.', '~'))
+
+
+# =============================================================================
+# SUPRAVEGHERE (INOTIFY / POLLING)
+# =============================================================================
+
+class SupraveghetorPolling:
+    """Scanează directoarele la fiecare interval (merge pe orice sistem de fișiere)"""
+
+    def __init__(self, directoare: Sequence[Union[str, Path]], interval: float = SCANARE_S):
+        self.directoare = [Path(d) for d in directoare]
+        self.interval = interval
+        self._ultima_scanare = 0.0
+
+    def scaneaza(self) -> List[str]:
+        fisiere = []
+        for director in self.directoare:
+            try:
+                with os.scandir(director) as intrari:
+                    fisiere += [e.path for e in intrari if pdf_acceptat(e.name) and e.is_file()]
+            except OSError:
+                pass    # director indisponibil (share deconectat) - reîncercat la scanarea următoare
+        return fisiere
+
+    def evenimente(self, timeout: float) -> List[str]:
+        """Căile vizate în ultimul interval (pot fi și fișiere deja cunoscute)"""
+        asteptare = self._ultima_scanare + self.interval - time.monotonic()
+        if asteptare > 0:
+            time.sleep(min(timeout, asteptare))
+            return []
+        self._ultima_scanare = time.monotonic()
+        return self.scaneaza()
+
+    def close(self):
+        pass
+
+
+class SupraveghetorInotify(SupraveghetorPolling):
+    """inotify prin libc (ctypes); rescanarea rămâne pentru pornire și depășiri de coadă"""
+
+    # Modificările ulterioare sunt prinse de verificarea de stabilitate (stat), nu de evenimente
+    MASCA = IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO
+
+    def __init__(self, directoare: Sequence[Union[str, Path]], rescanare: float = RESCANARE_S):
+        super().__init__(directoare, interval=rescanare)
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify indisponibil")
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self._directoare: Dict[int, Path] = {}
+        try:
+            for director in self.directoare:
+                wd = libc.inotify_add_watch(self._fd, os.fsencode(director), self.MASCA)
+                if wd < 0:
+                    eroare = ctypes.get_errno()
+                    raise OSError(eroare, f"inotify_add_watch: {os.strerror(eroare)}", str(director))
+                self._directoare[wd] = director
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def evenimente(self, timeout: float) -> List[str]:
+        if time.monotonic() - self._ultima_scanare >= self.interval:
+            self._ultima_scanare = time.monotonic()
+            return self.scaneaza()
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return []
+        try:
+            buffer = os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            return []
+        cai, pozitie = [], 0
+        while pozitie < len(buffer):
+            wd, masca, _, lungime = _EVENIMENT.unpack_from(buffer, pozitie)
+            nume = buffer[pozitie + _EVENIMENT.size:pozitie + _EVENIMENT.size + lungime].rstrip(b'\0')
+            pozitie += _EVENIMENT.size + lungime
+            if masca & IN_Q_OVERFLOW:
+                self._ultima_scanare = 0.0      # evenimente pierdute: rescanare la apelul următor
+            elif not masca & (IN_ISDIR | IN_IGNORED) and wd in self._directoare:
+                nume = os.fsdecode(nume)
+                if pdf_acceptat(nume):
+                    cai.append(str(self._directoare[wd] / nume))
+        return list(dict.fromkeys(cai))
+
+    def close(self):
+        os.close(self._fd)
+
+
+def supraveghetor(directoare: Sequence[Union[str, Path]], polling: bool = False) -> SupraveghetorPolling:
+    """inotify unde se poate, altfel polling"""
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return SupraveghetorInotify(directoare)
+        except (OSError, AttributeError) as e:
+            print(f"⚠️ inotify indisponibil ({e}) - polling la {SCANARE_S:g} s", file=sys.stderr)
+    return SupraveghetorPolling(directoare)
+
+
+# =============================================================================
+# DESTINAȚII
+# =============================================================================
+
+class DestinatiiRezultate:
+    """NDJSON (append), JSON (un fișier per buletin) și / sau baza locală"""
+
+    def __init__(self, ndjson: Optional[str] = None, director_json: Optional[str] = None,
+                 store: Optional['StoreRezultate'] = None, similaritate: Optional['IndexSimilaritate'] = None):
+        self._ndjson = open(ndjson, 'ab') if ndjson else None
+        self.director_json = Path(director_json) if director_json else None
+        if self.director_json:
+            self.director_json.mkdir(parents=True, exist_ok=True)
+        self.store = store
+        self.similaritate = similaritate
+
+    def scrie(self, inregistrare: Dict):
+        semnatura = inregistrare.pop('_semnatura', None)
+        if self.similaritate is not None and semnatura is not None and inregistrare['stare'] == 'ok':
+            # Doar raportate, ca în batch_analize: buletinul nou al pacientului arată la fel
+            potriviri = self.similaritate.cauta(semnatura)
+            altele = [p for p in potriviri if p.fisier != inregistrare['fisier']]
+            if altele:
+                inregistrare['aproape'] = [{'fisier': p.fisier, 'similaritate': p.similaritate} for p in altele]
+            if len(altele) == len(potriviri):
+                self.similaritate.adauga(inregistrare['fisier'], semnatura)
+        linie = json.dumps(inregistrare, ensure_ascii=False, default=str).encode('utf-8')
+        if self._ndjson is not None:
+            self._ndjson.write(linie + b'\n')
+            self._ndjson.flush()
+        if self.director_json is not None:
+            # Același nume din alt inbox / o depunere ulterioară nu suprascrie rezultatul anterior
+            tinta = cale_libera(self.director_json, Path(inregistrare['fisier']).stem + '.json')
+            temporar = tinta.with_name(tinta.name + '.tmp')
+            temporar.write_bytes(linie)
+            os.replace(temporar, tinta)
+        if self.store is not None and inregistrare['stare'] == 'ok':
+            self.store.salveaza_lot([inregistrare])
+
+    def close(self):
+        if self._ndjson is not None:
+            self._ndjson.close()
+
+
+def cale_libera(director: Path, nume: str) -> Path:
+    """director / nume sau, dacă există deja, primul liber dintre nume-1, nume-2, ..."""
+    tinta, i = director / nume, 0
+    while tinta.exists():
+        i += 1
+        tinta = director / f"{Path(nume).stem}-{i}{Path(nume).suffix}"
+    return tinta
+
+
+def muta(fisier: Union[str, Path], director: Path) -> Path:
+    """Mută fișierul în director; la conflict de nume adaugă -1, -2, ..."""
+    sursa = Path(fisier)
+    director.mkdir(parents=True, exist_ok=True)
+    return Path(shutil.move(str(sursa), str(cale_libera(director, sursa.name))))
+
+
+# =============================================================================
+# METRICI
+# =============================================================================
+
+def percentile(valori, procente: Sequence[int] = PERCENTILE) -> Dict[int, float]:
+    ordonate = sorted(valori)
+    if not ordonate:
+        return {p: 0.0 for p in procente}
+    return {p: ordonate[min(len(ordonate) - 1, int(len(ordonate) * p / 100))] for p in procente}
+
+
+@dataclass
+class MetriciInbox:
+    """Contoarele daemonului și latențele ultimelor FEREASTRA_LATENTE fișiere"""
+    workers: int = 1
+    procesate: int = 0
+    reincercate: int = 0
+    stari: Dict[str, int] = field(default_factory=dict)
+    in_debounce: int = 0
+    in_coada: int = 0
+    in_lucru: int = 0
+    cel_mai_vechi_s: float = 0.0
+    latente_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=FEREASTRA_LATENTE))  # depunere -> rezultat
+    asteptari_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=FEREASTRA_LATENTE))  # coadă -> worker
+    ocupat_s: float = 0.0
+    start: float = field(default_factory=time.monotonic)
+
+    @property
+    def backlog(self) -> int:
+        return self.in_debounce + self.in_coada + self.in_lucru
+
+    @property
+    def ocupare(self) -> float:
+        """Fracția din timpul workerilor petrecută parsând"""
+        durata = time.monotonic() - self.start
+        return self.ocupat_s / (durata * self.workers) if durata > 0 else 0.0
+
+    def adauga(self, inregistrare: Dict, depus: float, in_coada_s: float):
+        self.procesate += 1
+        self.stari[inregistrare['stare']] = self.stari.get(inregistrare['stare'], 0) + 1
+        self.latente_ms.append((time.time() - depus) * 1e3)
+        self.asteptari_ms.append(in_coada_s * 1e3)
+        self.ocupat_s += inregistrare['durata_ms'] / 1e3
+
+    def ca_dict(self) -> Dict:
+        return {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'workers': self.workers,
+            'procesate': self.procesate,
+            'reincercate': self.reincercate,
+            'stari': self.stari,
+            'backlog': self.backlog,
+            'in_debounce': self.in_debounce,
+            'in_coada': self.in_coada,
+            'in_lucru': self.in_lucru,
+            'cel_mai_vechi_s': round(self.cel_mai_vechi_s, 3),
+            'ocupare_workers': round(self.ocupare, 4),
+            'latenta_ms': {f"p{p}": round(v, 1) for p, v in percentile(self.latente_ms).items()},
+            'asteptare_coada_ms': {f"p{p}": round(v, 1) for p, v in percentile(self.asteptari_ms).items()},
+        }
+
+
+def raport_inbox(metrici: MetriciInbox):
+    lat = percentile(metrici.latente_ms)
+    print(f"📥 {metrici.procesate} procesate {metrici.stari}  backlog {metrici.backlog} "
+          f"(debounce {metrici.in_debounce} / coadă {metrici.in_coada} / lucru {metrici.in_lucru}, "
+          f"cel mai vechi {metrici.cel_mai_vechi_s:.1f} s)  latență p50 {lat[50] / 1e3:.2f} s "
+          f"p99 {lat[99] / 1e3:.2f} s  ocupare {metrici.ocupare:.0%}", file=sys.stderr, flush=True)
+
+
+# =============================================================================
+# DAEMON
+# =============================================================================
+
+@dataclass
+class _Candidat:
+    """Un fișier în debounce: ultima mărime / mtime văzute"""
+    depus: float                    # time.time() la prima observare
+    marime: int = -1
+    mtime_ns: int = -1
+    stabil_de: float = 0.0          # time.monotonic() de când nu s-a mai schimbat
+
+
+class DaemonInbox:
+    """Bucla supraveghere -> debounce -> pool de procese -> destinații -> mutare"""
+
+    def __init__(self, directoare: Sequence[Union[str, Path]], destinatii: DestinatiiRezultate,
+                 workers: Optional[int] = None,
+                 laborator: Optional[str] = None,
+                 mapare: Sequence[Tuple[str, str]] = (),
+                 ocr: bool = True,
+                 polling: bool = False,
+                 stabil_s: float = STABIL_S,
+                 procesate: Optional[str] = None,
+                 esuate: Optional[str] = None,
+                 path_stare: Optional[str] = None,
+                 interval_raport: float = INTERVAL_RAPORT):
+        self.directoare = [Path(d).resolve() for d in directoare]
+        self.destinatii = destinatii
+        self.workers = workers or os.cpu_count() or 1
+        self.laborator = laborator
+        self.mapare = mapare
+        self.ocr = ocr
+        self.polling = polling
+        self.stabil_s = stabil_s
+        # Implicit subdirectoare ale primului inbox (nesupravegheate recursiv)
+        self.procesate = Path(procesate) if procesate else self.directoare[0] / DIRECTOR_PROCESATE
+        self.esuate = Path(esuate) if esuate else self.directoare[0] / DIRECTOR_ESUATE
+        self.path_stare = path_stare
+        self.interval_raport = interval_raport
+        self.metrici = MetriciInbox(workers=self.workers)
+        self._semnatura = destinatii.similaritate is not None
+        self._debounce: Dict[str, _Candidat] = {}
+        # (fișier, depus, intrat în coadă, încercare); în lucru: + momentul preluării
+        self._coada: Deque[Tuple[str, float, float, int]] = deque()
+        self._in_lucru: Dict[Future, Tuple[str, float, float, int, float]] = {}
+        self._preluate: Dict[str, None] = {}                           # în coadă sau în lucru
+        self._nemutate: Dict[str, Tuple[int, int]] = {}                # procesate, dar rămase în inbox
+        self._oprire = threading.Event()
+
+    def opreste(self):
+        """Oprire după fișierele în lucru (sigur din handler de semnal sau alt fir)"""
+        self._oprire.set()
+
+    # ---- debounce ----
+
+    def _observa(self, cai: Sequence[str]):
+        for cale in cai:
+            if cale not in self._debounce and cale not in self._preluate and cale not in self._nemutate:
+                self._debounce[cale] = _Candidat(depus=time.time())
+
+    def _verifica_stabile(self):
+        acum = time.monotonic()
+        for cale, candidat in list(self._debounce.items()):
+            try:
+                st = os.stat(cale)
+            except FileNotFoundError:
+                del self._debounce[cale]        # mutat / șters înainte de preluare
+                continue
+            if (st.st_size, st.st_mtime_ns) != (candidat.marime, candidat.mtime_ns):
+                candidat.marime, candidat.mtime_ns, candidat.stabil_de = st.st_size, st.st_mtime_ns, acum
+            elif st.st_size > 0 and acum - candidat.stabil_de >= self.stabil_s:
+                del self._debounce[cale]
+                self._preluate[cale] = None
+                self._coada.append((cale, candidat.depus, time.time(), 1))
+        for cale, (marime, mtime_ns) in list(self._nemutate.items()):
+            try:
+                st = os.stat(cale)
+            except FileNotFoundError:
+                del self._nemutate[cale]
+                continue
+            if (st.st_size, st.st_mtime_ns) != (marime, mtime_ns):
+                del self._nemutate[cale]        # înlocuit cu un fișier nou, același nume
+
+    # ---- pool ----
+
+    def _trimite(self, executor: ProcessPoolExecutor):
+        while self._coada and len(self._in_lucru) < self.workers * IN_LUCRU_PER_PROCES:
+            if self._in_lucru and (self._coada[0][3] > 1 or any(c[3] > 1 for c in self._in_lucru.values())):
+                break   # reîncercările rulează singure: o nouă cădere indică fișierul vinovat
+            cale, depus, intrat, incercare = self._coada.popleft()
+            key = self.laborator or laborator_mapat(cale, self.mapare)
+            future = executor.submit(parseaza_fisier, cale, key, self.ocr, self._semnatura)
+            self._in_lucru[future] = (cale, depus, intrat, incercare, time.time())
+
+    def _colecteaza(self, gata) -> bool:
+        """Scrie rezultatele terminate; False dacă pool-ul a căzut"""
+        intact = True
+        for future in gata:
+            cale, depus, intrat, incercare, preluat = self._in_lucru.pop(future)
+            try:
+                inregistrare = future.result()
+            except BrokenProcessPool:
+                intact = False
+                self._reincearca(cale, depus, intrat, incercare, preluat)
+                continue
+            self._finalizeaza(inregistrare, depus, preluat - intrat)
+        return intact
+
+    def _reincearca(self, cale: str, depus: float, intrat: float, incercare: int, preluat: float):
+        # Workerul vinovat nu poate fi identificat: toate fișierele în lucru sunt reluate, câte unul
+        if incercare < INCERCARI:
+            self.metrici.reincercate += 1
+            self._coada.appendleft((cale, depus, intrat, incercare + 1))
+            return
+        self._finalizeaza({'fisier': cale, 'laborator': "", 'stare': 'eroare',
+                           'durata_ms': round((time.time() - preluat) * 1e3, 3), 'nr_analize': 0,
+                           'eroare': "BrokenProcessPool: procesul de parsare a căzut"}, depus, preluat - intrat)
+
+    def _finalizeaza(self, inregistrare: Dict, depus: float, in_coada_s: float):
+        cale = inregistrare['fisier']
+        self._preluate.pop(cale, None)
+        self.destinatii.scrie(inregistrare)
+        self.metrici.adauga(inregistrare, depus, in_coada_s)
+        tinta = self.esuate if inregistrare['stare'] in ('eroare', 'respins') else self.procesate
+        try:
+            muta(cale, tinta)
+        except OSError as e:
+            print(f"⚠️ {cale}: nu a putut fi mutat în {tinta} ({e})", file=sys.stderr)
+            try:
+                st = os.stat(cale)
+                self._nemutate[cale] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                pass
+
+    # ---- metrici ----
+
+    def _actualizeaza_metrici(self):
+        m = self.metrici
+        m.in_debounce, m.in_coada, m.in_lucru = len(self._debounce), len(self._coada), len(self._in_lucru)
+        depuneri = [c.depus for c in self._debounce.values()] + [c[1] for c in self._coada] + \
+                   [c[1] for c in self._in_lucru.values()]
+        m.cel_mai_vechi_s = time.time() - min(depuneri) if depuneri else 0.0
+
+    def _publica_stare(self):
+        if self.path_stare:
+            temporar = self.path_stare + '.tmp'
+            with open(temporar, 'w', encoding='utf-8') as f:
+                json.dump(self.metrici.ca_dict(), f, ensure_ascii=False, indent=2)
+            os.replace(temporar, self.path_stare)
+
+    # ---- bucla ----
+
+    def ruleaza(self) -> MetriciInbox:
+        supraveghere = supraveghetor(self.directoare, self.polling)
+        executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_initializeaza_worker)
+        ultima_verificare = ultimul_raport = 0.0
+        try:
+            while not self._oprire.is_set() or self._in_lucru:
+                if not self._oprire.is_set():
+                    self._observa(supraveghere.evenimente(0.0 if self._in_lucru else VERIFICARE_S))
+                    if time.monotonic() - ultima_verificare >= VERIFICARE_S:
+                        self._verifica_stabile()
+                        ultima_verificare = time.monotonic()
+                    self._trimite(executor)
+                if self._in_lucru:
+                    gata, _ = wait(list(self._in_lucru), timeout=VERIFICARE_S / 5, return_when=FIRST_COMPLETED)
+                    if not self._colecteaza(gata):
+                        # Pool-ul nu mai primește lucru: fișierele rămase sunt reîncercate pe unul nou
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        for future in list(self._in_lucru):
+                            self._reincearca(*self._in_lucru.pop(future))
+                        executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_initializeaza_worker)
+                if time.monotonic() - ultimul_raport >= self.interval_raport:
+                    self._actualizeaza_metrici()
+                    self._publica_stare()
+                    if self.metrici.procesate or self.metrici.backlog:
+                        raport_inbox(self.metrici)
+                    ultimul_raport = time.monotonic()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            supraveghere.close()
+            self._actualizeaza_metrici()
+            self._publica_stare()
+        return self.metrici
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def cli(argv: Sequence[str]) -> int:
+    from batch_analize import incarca_mapare
+
+    ap = argparse.ArgumentParser(prog="supraveghere_inbox.py",
+                                 description="Importă automat PDF-urile depuse în directoare supravegheate.")
+    ap.add_argument('directoare', nargs='+', help="directoarele inbox (nerecursiv)")
+    ap.add_argument('--ndjson', help="fișier NDJSON la care se adaugă o linie per fișier")
+    ap.add_argument('--json', dest='director_json', help="director cu un fișier JSON per buletin")
+    ap.add_argument('--db', help="bază SQLite locală (stocare_rezultate)")
+    ap.add_argument('--similaritate', help="index MinHash: raportează documentele asemănătoare deja importate")
+    grup = ap.add_mutually_exclusive_group()
+    grup.add_argument('--laborator', help="cheia laboratorului pentru toate fișierele")
+    grup.add_argument('--mapare', help='JSON {"tipar fnmatch": "cheie_laborator"}; restul - detectare automată')
+    ap.add_argument('--workers', type=int, default=None, help="procese (implicit: procesoarele disponibile)")
+    ap.add_argument('--fara-ocr', action='store_true', help="fără pasul OCR al cascadei")
+    ap.add_argument('--poll', action='store_true', help="scanare periodică în loc de inotify (share-uri de rețea)")
+    ap.add_argument('--stabil', type=float, default=STABIL_S, help="secunde fără modificări înainte de preluare")
+    ap.add_argument('--procesate', help=f"director pentru fișierele procesate (implicit <inbox>/{DIRECTOR_PROCESATE})")
+    ap.add_argument('--esuate', help=f"director pentru fișierele eșuate (implicit <inbox>/{DIRECTOR_ESUATE})")
+    ap.add_argument('--stare', help="fișier JSON cu metricile, rescris periodic")
+    ap.add_argument('--interval-raport', type=float, default=INTERVAL_RAPORT)
+    args = ap.parse_args(argv)
+
+    if not (args.ndjson or args.director_json or args.db):
+        ap.error("cel puțin o destinație: --ndjson, --json sau --db")
+    store = similaritate = None
+    if args.db:
+        from stocare_rezultate import StoreRezultate
+        store = StoreRezultate(args.db)
+    if args.similaritate:
+        from similaritate_buletine import IndexSimilaritate
+        similaritate = IndexSimilaritate(args.similaritate)
+    destinatii = DestinatiiRezultate(args.ndjson, args.director_json, store, similaritate)
+    daemon = DaemonInbox(args.directoare, destinatii, workers=args.workers, laborator=args.laborator,
+                         mapare=incarca_mapare(args.mapare) if args.mapare else (), ocr=not args.fara_ocr,
+                         polling=args.poll, stabil_s=args.stabil, procesate=args.procesate, esuate=args.esuate,
+                         path_stare=args.stare, interval_raport=args.interval_raport)
+    signal.signal(signal.SIGTERM, lambda *_: daemon.opreste())
+    signal.signal(signal.SIGINT, lambda *_: daemon.opreste())
+    print(f"👀 {', '.join(map(str, daemon.directoare))} - {daemon.workers} workeri", file=sys.stderr)
+    try:
+        metrici = daemon.ruleaza()
+    finally:
+        destinatii.close()
+        if similaritate is not None:
+            similaritate.close()
+        if store is not None:
+            store.close()
+    raport_inbox(metrici)
+    return 0
+
+
+# =============================================================================
+# MAIN - TEST
+# =============================================================================
+
+def main():
+    if len(sys.argv) > 1:
+        return cli(sys.argv[1:])
+
+    import tempfile
+    from parsere_laboratoare import _import_fitz
+    if _import_fitz() is None:
+        print("❌ PyMuPDF nu este instalat")
+        return 1
+
+    pdf_dir = Path(__file__).parent
+    surse = [pdf_dir / n for n in ('AnalizeMedicale.pdf', 'analize-b-51-ro.pdf', '1111200901011bolnavul.pdf')]
+
+    def depune(inbox: Path, n: int):
+        # Copieri lente, pe bucăți (ca pe un share), plus un PDF stricat
+        for i in range(n):
+            continut = surse[i % len(surse)].read_bytes()
+            with open(inbox / f"buletin_{i:03d}.pdf", 'wb') as f:
+                f.write(continut[:len(continut) // 2])
+                f.flush()
+                time.sleep(0.4)
+                f.write(continut[len(continut) // 2:])
+        (inbox / "stricat.pdf").write_bytes(b"%PDF-1.4 trunchiat")
+        (inbox / ".temporar.pdf").write_bytes(b"ignorat")
+
+    # Același nume de fișier din două inbox-uri: două JSON-uri, nu unul suprascris
+    with tempfile.TemporaryDirectory() as tmp:
+        destinatii = DestinatiiRezultate(director_json=str(Path(tmp) / 'json'))
+        for inbox in ('lab1', 'lab2'):
+            destinatii.scrie({'fisier': f"/srv/{inbox}/buletin.pdf", 'laborator': inbox, 'stare': 'ok'})
+        destinatii.close()
+        scrise = sorted(p.name for p in (Path(tmp) / 'json').glob('*.json'))
+        print(f"{'✅' if scrise == ['buletin-1.json', 'buletin.json'] else '❌'} JSON cu același nume: {scrise}")
+
+    for polling in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            inbox = Path(tmp) / 'inbox'
+            inbox.mkdir()
+            (inbox / "existent.pdf").write_bytes(surse[0].read_bytes())     # depus cât daemonul era oprit
+            destinatii = DestinatiiRezultate(ndjson=str(Path(tmp) / 'rezultate.ndjson'),
+                                             director_json=str(Path(tmp) / 'json'))
+            daemon = DaemonInbox([inbox], destinatii, workers=2, ocr=False, polling=polling, stabil_s=0.5,
+                                 path_stare=str(Path(tmp) / 'stare.json'), interval_raport=0.5)
+            fir = threading.Thread(target=daemon.ruleaza)
+            start = time.perf_counter()
+            fir.start()
+            depune(inbox, 6)
+            termen = time.monotonic() + 60
+            while time.monotonic() < termen and daemon.metrici.procesate < 8:
+                time.sleep(0.1)
+            daemon.opreste()
+            fir.join()
+            destinatii.close()
+
+            with open(Path(tmp) / 'rezultate.ndjson', encoding='utf-8') as f:
+                inregistrari = [json.loads(linie) for linie in f]
+            procesate = sorted(p.name for p in (inbox / DIRECTOR_PROCESATE).glob('*.pdf'))
+            esuate = sorted(p.name for p in (inbox / DIRECTOR_ESUATE).glob('*.pdf'))
+            ramase = sorted(p.name for p in inbox.glob('*.pdf'))
+            stare = json.loads((Path(tmp) / 'stare.json').read_text(encoding='utf-8'))
+            intregi = all(r['stare'] != 'eroare' for r in inregistrari if r['fisier'].endswith(tuple(
+                f"buletin_{i:03d}.pdf" for i in range(6))))
+            ok = len(inregistrari) == 8 and len(procesate) + len(esuate) == 8 and ramase == ['.temporar.pdf'] \
+                and 'stricat.pdf' in esuate and intregi
+            print(f"\n{'✅' if ok else '❌'} {'polling' if polling else 'inotify'}: {len(inregistrari)} rezultate "
+                  f"{stare['stari']} în {time.perf_counter() - start:.1f} s; procesate/ {len(procesate)}, "
+                  f"esuate/ {esuate}, rămase {ramase}; {len(list((Path(tmp) / 'json').glob('*.json')))} JSON")
+            print(f"   latență depunere->rezultat {stare['latenta_ms']}, în coadă {stare['asteptare_coada_ms']}, "
+                  f"backlog {stare['backlog']}, ocupare {stare['ocupare_workers']:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
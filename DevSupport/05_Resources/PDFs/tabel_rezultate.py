@@ -0,0 +1,532 @@
+"""
+Tabel Columnar de Rezultate (NumPy)
+===================================
+Layout-ul invers față de List[AnalizaResult]: câte un array NumPy per
+coloană, pentru analize în bloc peste mii de buletine.
+
+- valoare, interval_min, interval_max: float64 (NaN = lipsă)
+- este_anormal: bool, directie: int8 (-1 LOW, 0 normal, 1 HIGH)
+- nume, cod, unitate, categorie, laborator: codificate dicționar
+  (int32 în lista valorilor unice; -1 = None)
+- buletin: int32 în lista buletinelor (laborator, număr, dată, CNP)
+- după normalizeaza_unitati(): valoare_canonica, interval_min_canonic,
+  interval_max_canonic și unitate_canonica (unitati_masura)
+
+Se construiește din orice BuletinResult (parsere_laboratoare) sau
+BuletinAnalize (analize_parser_v2 / analize_parser_universal), ori dintr-un
+lot de buletine, sau dintr-un tabel Arrow citit din Parquet (export_parquet).
+Marcarea anormală, filtrele și grupările sunt vectorizate.
+
+Benchmark (1M rezultate): python tabel_rezultate.py [n]
+"""
+
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from unitati_masura import converteste_coloane, identifica_analit
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+COLOANE_NUMERICE = ('valoare', 'interval_min', 'interval_max')
+COLOANE_CANONICE = ('valoare_canonica', 'interval_min_canonic', 'interval_max_canonic')
+COLOANE_TEXT = ('nume', 'cod', 'unitate', 'categorie', 'laborator')
+DIRECTII = {-1: 'LOW', 0: None, 1: 'HIGH'}
+
+
+# =============================================================================
+# CODIFICARE DICȚIONAR
+# =============================================================================
+
+@dataclass
+class Dictionar:
+    """Valorile unice ale unei coloane text; codul = poziția în listă"""
+    valori: List[str] = field(default_factory=list)
+    index: Dict[str, int] = field(default_factory=dict)
+
+    def cod(self, valoare: Optional[str]) -> int:
+        if valoare is None:
+            return -1
+        cod = self.index.get(valoare)
+        if cod is None:
+            cod = self.index[valoare] = len(self.valori)
+            self.valori.append(valoare)
+        return cod
+
+    def coduri(self, valori: Union[str, Sequence[str]]) -> np.ndarray:
+        """Codurile existente pentru una sau mai multe valori (cele necunoscute lipsesc)"""
+        if isinstance(valori, str):
+            valori = [valori]
+        return np.array([self.index[v] for v in valori if v in self.index], dtype=np.int32)
+
+    @classmethod
+    def din_valori(cls, valori: List[str]) -> 'Dictionar':
+        return cls(list(valori), {v: i for i, v in enumerate(valori)})
+
+    def decodifica(self, coduri: np.ndarray) -> np.ndarray:
+        # None la final: codul -1 indexează ultimul element
+        tabel = np.array(self.valori + [None], dtype=object)
+        return tabel[coduri]
+
+
+def _meta_buletin(buletin) -> Tuple[str, str, str, str]:
+    """(laborator, număr buletin, dată recoltare, CNP) din orice model de buletin"""
+    if hasattr(buletin, 'buletin'):  # BuletinAnalize (v2 / universal)
+        info, pacient = buletin.buletin, buletin.pacient
+        return (info.laborator or buletin.laborator_detectat, info.numar_buletin,
+                info.data_recoltare or "", pacient.cnp)
+    return buletin.laborator, buletin.numar_buletin, buletin.data_recoltare, buletin.pacient_cnp
+
+
+# =============================================================================
+# TABEL
+# =============================================================================
+
+class ResultTable:
+    """Rezultate de analize în layout columnar"""
+
+    def __init__(self, coloane: Dict[str, np.ndarray], dictionare: Dict[str, Dictionar],
+                 buletine: List[Tuple[str, str, str, str]]):
+        self.coloane = coloane
+        self.dictionare = dictionare
+        self.buletine = buletine
+
+    # -------------------------------------------------------------------------
+    # Construcție
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def from_buletin(cls, buletin) -> 'ResultTable':
+        return cls.from_buletine([buletin])
+
+    @classmethod
+    def from_buletine(cls, buletine: Iterable) -> 'ResultTable':
+        """Construiește tabelul dintr-un lot de BuletinResult / BuletinAnalize"""
+        dictionare = {nume: Dictionar() for nume in COLOANE_TEXT}
+        cod_nume, cod_cod = dictionare['nume'].cod, dictionare['cod'].cod
+        cod_um, cod_cat = dictionare['unitate'].cod, dictionare['categorie'].cod
+
+        valoare, int_min, int_max = [], [], []
+        nume, cod, unitate, categorie, laborator, idx_buletin = [], [], [], [], [], []
+        anormal, directie = [], []
+        meta = []
+
+        for buletin in buletine:
+            info = _meta_buletin(buletin)
+            cod_lab = dictionare['laborator'].cod(info[0])
+            idx = len(meta)
+            meta.append(info)
+
+            for a in buletin.analize:
+                valoare.append(a.rezultat_numeric)
+                int_min.append(a.interval_min)
+                int_max.append(a.interval_max)
+                nume.append(cod_nume(a.nume_analiza))
+                cod.append(cod_cod(a.cod_analiza))
+                unitate.append(cod_um(a.unitate_masura))
+                categorie.append(cod_cat(a.categorie))
+                laborator.append(cod_lab)
+                idx_buletin.append(idx)
+                anormal.append(a.este_anormal)
+                directie.append(1 if a.directie_anormal == 'HIGH' else -1 if a.directie_anormal == 'LOW' else 0)
+
+        coloane = {
+            # None -> NaN la conversia în float64
+            'valoare': np.array(valoare, dtype=np.float64),
+            'interval_min': np.array(int_min, dtype=np.float64),
+            'interval_max': np.array(int_max, dtype=np.float64),
+            'nume': np.array(nume, dtype=np.int32),
+            'cod': np.array(cod, dtype=np.int32),
+            'unitate': np.array(unitate, dtype=np.int32),
+            'categorie': np.array(categorie, dtype=np.int32),
+            'laborator': np.array(laborator, dtype=np.int32),
+            'buletin': np.array(idx_buletin, dtype=np.int32),
+            # Marcajul parserului (pentru Synevo include și indicatorul "23")
+            'este_anormal': np.array(anormal, dtype=bool),
+            'directie': np.array(directie, dtype=np.int8),
+        }
+        return cls(coloane, dictionare, meta)
+
+    @classmethod
+    def from_arrow(cls, tabel: 'pa.Table') -> 'ResultTable':
+        """
+        Construiește tabelul din coloanele ImportFormat ale unui tabel Arrow
+        (export_parquet). Coloanele dicționar devin direct coduri + Dictionar,
+        numericele trec prin to_numpy - fără obiecte Python per rând; doar
+        valorile unice și buletinele sunt materializate.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        tabel = tabel.unify_dictionaries()
+
+        def codificata(nume: str) -> Tuple[np.ndarray, List[Optional[str]]]:
+            coloana = tabel.column(nume)
+            if not pa.types.is_dictionary(coloana.type):
+                # Un singur dicționar pentru toate chunk-urile
+                coloana = pa.chunked_array([pc.dictionary_encode(coloana.combine_chunks())])
+            if coloana.num_chunks == 0:
+                return np.empty(0, dtype=np.int32), []
+            valori = coloana.chunk(0).dictionary.to_pylist()
+            coduri = np.concatenate([
+                pc.fill_null(c.indices, -1).to_numpy(zero_copy_only=False) for c in coloana.chunks
+            ]).astype(np.int32, copy=False)
+            return coduri, valori
+
+        def numerica(nume: str) -> np.ndarray:
+            return np.asarray(pc.cast(tabel.column(nume), pa.float64()).to_numpy(), dtype=np.float64)
+
+        coloane: Dict[str, np.ndarray] = {}
+        dictionare: Dict[str, Dictionar] = {}
+        for nume, sursa in (('nume', 'NumeAnaliza'), ('cod', 'CodAnaliza'), ('unitate', 'UnitatiMasura'),
+                            ('categorie', 'TipAnaliza'), ('laborator', 'Laborator')):
+            coloane[nume], valori = codificata(sursa)
+            dictionare[nume] = Dictionar.din_valori(valori)
+        for nume, sursa in zip(COLOANE_NUMERICE, ('ValoareNumerica', 'ValoareNormalaMin', 'ValoareNormalaMax')):
+            coloane[nume] = numerica(sursa)
+        coloane['este_anormal'] = pc.fill_null(tabel.column('EsteInAfaraLimitelor'), False).to_numpy()
+
+        coduri, valori = codificata('DirectieAnormal')
+        directii = np.array([{'LOW': -1, 'HIGH': 1}.get(v, 0) for v in valori] + [0], dtype=np.int8)
+        coloane['directie'] = directii[coduri]
+
+        # Buletinul: combinația unică (laborator, număr, dată, CNP)
+        chei = [coloane['laborator']]
+        valori_meta = [dictionare['laborator'].valori]
+        for sursa in ('NumarBuletin', 'DataRecoltare', 'PacientCNP'):
+            coduri, valori = codificata(sursa)
+            chei.append(coduri)
+            valori_meta.append(valori)
+        # Cheia combinată într-un int64 (coduri +1: -1 = lipsă); np.unique pe rânduri e mult mai lent
+        baze = [len(v) + 1 for v in valori_meta]
+        if np.prod(baze, dtype=np.float64) < 2 ** 63:
+            cheie = np.zeros(len(tabel), dtype=np.int64)
+            for coduri, baza in zip(chei, baze):
+                cheie = cheie * baza + (coduri.astype(np.int64) + 1)
+            unice, inversa = np.unique(cheie, return_inverse=True)
+            rest, randuri = unice, []
+            for baza in reversed(baze):
+                randuri.append(rest % baza - 1)
+                rest = rest // baza
+            unice = np.stack(randuri[::-1], axis=1) if len(unice) else np.empty((0, 4), dtype=np.int64)
+        else:
+            unice, inversa = np.unique(np.stack(chei, axis=1), axis=0, return_inverse=True)
+        coloane['buletin'] = inversa.ravel().astype(np.int32)
+        buletine = [tuple(v[c] if c >= 0 else "" for v, c in zip(valori_meta, rand)) for rand in unice.tolist()]
+
+        if 'ValoareNumericaCanonic' in tabel.column_names:
+            for nume, sursa in zip(COLOANE_CANONICE, ('ValoareNumericaCanonic', 'ValoareNormalaMinCanonic',
+                                                      'ValoareNormalaMaxCanonic')):
+                coloane[nume] = numerica(sursa)
+            coloane['unitate_canonica'], valori = codificata('UnitatiMasuraCanonic')
+            dictionare['unitate_canonica'] = Dictionar.din_valori(valori)
+        return cls(coloane, dictionare, buletine)
+
+    @classmethod
+    def concat(cls, tabele: Sequence['ResultTable']) -> 'ResultTable':
+        """Lipește mai multe tabele cu aceleași coloane (dicționarele sunt comasate)"""
+        dictionare = {nume: Dictionar() for nume in tabele[0].dictionare} if tabele else {}
+        parti: Dict[str, List[np.ndarray]] = {nume: [] for nume in tabele[0].coloane} if tabele else {}
+        buletine: List[Tuple[str, str, str, str]] = []
+
+        for tabel in tabele:
+            for nume, coloana in tabel.coloane.items():
+                if nume in dictionare:
+                    # Recodificare: codul vechi -> codul din dicționarul comun (-1 rămâne -1)
+                    remap = np.array([dictionare[nume].cod(v) for v in tabel.dictionare[nume].valori] + [-1],
+                                     dtype=np.int32)
+                    coloana = remap[coloana]
+                elif nume == 'buletin':
+                    coloana = coloana + len(buletine)
+                parti[nume].append(coloana)
+            buletine.extend(tabel.buletine)
+
+        coloane = {nume: np.concatenate(arrays) for nume, arrays in parti.items()}
+        return cls(coloane, dictionare, buletine)
+
+    # -------------------------------------------------------------------------
+    # Acces
+    # -------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.coloane['valoare'])
+
+    def __getattr__(self, nume: str) -> np.ndarray:
+        coloane = self.__dict__.get('coloane', {})
+        if nume in coloane:
+            return coloane[nume]
+        raise AttributeError(nume)
+
+    def text(self, coloana: str) -> np.ndarray:
+        """Coloana text decodificată (array de obiecte str/None)"""
+        return self.dictionare[coloana].decodifica(self.coloane[coloana])
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Rândurile ca dicționare (pentru afișare / export mic)"""
+        text = {nume: self.text(nume) for nume in self.dictionare}
+        numerice = [nume for nume in COLOANE_NUMERICE + COLOANE_CANONICE if nume in self.coloane]
+        records = []
+        for i in range(len(self)):
+            rand = {nume: coloana[i] for nume, coloana in text.items()}
+            for nume in numerice:
+                val = self.coloane[nume][i]
+                rand[nume] = None if np.isnan(val) else float(val)
+            rand['este_anormal'] = bool(self.coloane['este_anormal'][i])
+            rand['directie_anormal'] = DIRECTII[int(self.coloane['directie'][i])]
+            rand['numar_buletin'] = self.buletine[self.coloane['buletin'][i]][1]
+            records.append(rand)
+        return records
+
+    # -------------------------------------------------------------------------
+    # Marcare anormală vectorizată
+    # -------------------------------------------------------------------------
+
+    def calculeaza_anormal(self) -> 'ResultTable':
+        """
+        Recalculează este_anormal / directie pe toate rândurile, cu aceeași
+        regulă ca _check_anormal: întâi sub minim (LOW), apoi peste maxim (HIGH);
+        valorile sau limitele lipsă (NaN) nu marchează nimic.
+        """
+        val = self.coloane['valoare']
+        with np.errstate(invalid='ignore'):
+            low = val < self.coloane['interval_min']
+            high = ~low & (val > self.coloane['interval_max'])
+        directie = high.astype(np.int8) - low.astype(np.int8)
+        self.coloane['directie'] = directie
+        self.coloane['este_anormal'] = low | high
+        return self
+
+    def numar_anormale(self) -> int:
+        return int(np.count_nonzero(self.coloane['este_anormal']))
+
+    # -------------------------------------------------------------------------
+    # Unități canonice
+    # -------------------------------------------------------------------------
+
+    def normalizeaza_unitati(self) -> 'ResultTable':
+        """
+        Adaugă valoarea și limitele în unitatea canonică a fiecărei analize.
+        Analiza se identifică o singură dată per pereche (nume, cod) unică,
+        iar conversia e o singură înmulțire cu factorii din matricea
+        precalculată [analiză x unitate].
+        """
+        nume, cod = self.coloane['nume'], self.coloane['cod']
+        valori_nume = self.dictionare['nume'].valori + [None]
+        valori_cod = self.dictionare['cod'].valori + [None]
+        n_cod = len(valori_cod)
+
+        # Codurile -1 (None) devin ultimul element al vocabularului
+        pereche = (np.where(nume < 0, len(valori_nume) - 1, nume).astype(np.int64) * n_cod
+                   + np.where(cod < 0, n_cod - 1, cod))
+        unice, inversa = np.unique(pereche, return_inverse=True)
+        analiti = Dictionar()
+        cod_unic = np.array([
+            analiti.cod(identifica_analit(valori_nume[p // n_cod], valori_cod[p % n_cod]))
+            for p in unice.tolist()
+        ], dtype=np.int32)
+
+        convertite, unitate_canonica, simboluri = converteste_coloane(
+            [self.coloane[c] for c in COLOANE_NUMERICE],
+            self.coloane['unitate'], cod_unic[inversa.ravel()],
+            self.dictionare['unitate'].valori, analiti.valori
+        )
+        for nume_coloana, coloana in zip(COLOANE_CANONICE, convertite):
+            self.coloane[nume_coloana] = coloana
+        self.coloane['unitate_canonica'] = unitate_canonica
+        self.dictionare['unitate_canonica'] = Dictionar.din_valori(simboluri)
+        return self
+
+    # -------------------------------------------------------------------------
+    # Filtre
+    # -------------------------------------------------------------------------
+
+    def masca(self, **conditii) -> np.ndarray:
+        """
+        Mască booleană pentru condiții de egalitate, ex:
+        masca(categorie='HEMATOLOGIE', cod=['HGB', 'RBC'], este_anormal=True)
+        """
+        rezultat = np.ones(len(self), dtype=bool)
+        for nume, valoare in conditii.items():
+            coloana = self.coloane[nume]
+            if nume in self.dictionare:
+                rezultat &= np.isin(coloana, self.dictionare[nume].coduri(valoare))
+            elif isinstance(valoare, (list, tuple, set)):
+                rezultat &= np.isin(coloana, list(valoare))
+            else:
+                rezultat &= coloana == valoare
+        return rezultat
+
+    def filtreaza(self, masca: Optional[np.ndarray] = None, **conditii) -> 'ResultTable':
+        """Sub-tabelul rândurilor selectate (dicționarele sunt partajate)"""
+        if masca is None:
+            masca = self.masca(**conditii)
+        elif conditii:
+            masca = masca & self.masca(**conditii)
+        coloane = {nume: coloana[masca] for nume, coloana in self.coloane.items()}
+        return ResultTable(coloane, self.dictionare, self.buletine)
+
+    def anormale(self) -> 'ResultTable':
+        return self.filtreaza(self.coloane['este_anormal'])
+
+    # -------------------------------------------------------------------------
+    # Grupări
+    # -------------------------------------------------------------------------
+
+    def grupeaza(self, coloana: str) -> List[Dict[str, Any]]:
+        """
+        Agregate per valoare a unei coloane text: total, anormale, LOW/HIGH,
+        medie și min/max pentru valorile numerice.
+        """
+        coduri = self.coloane[coloana]
+        valori = self.dictionare[coloana].valori + [None]
+        k = len(valori)
+        # -1 (None) -> ultimul grup
+        grup = np.where(coduri < 0, k - 1, coduri)
+
+        val = self.coloane['valoare']
+        are_valoare = ~np.isnan(val)
+        val_0 = np.where(are_valoare, val, 0.0)
+        directie = self.coloane['directie']
+
+        def numara(masca: np.ndarray) -> np.ndarray:
+            return np.bincount(grup[masca], minlength=k)
+
+        total = np.bincount(grup, minlength=k)
+        anormale = numara(self.coloane['este_anormal'])
+        low = numara(directie < 0)
+        high = numara(directie > 0)
+        numerice = numara(are_valoare)
+        suma = np.bincount(grup, weights=val_0, minlength=k)
+
+        minim = np.full(k, np.inf)
+        maxim = np.full(k, -np.inf)
+        np.minimum.at(minim, grup[are_valoare], val[are_valoare])
+        np.maximum.at(maxim, grup[are_valoare], val[are_valoare])
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            medie = suma / numerice
+
+        grupuri = []
+        for g in np.flatnonzero(total):
+            are = numerice[g] > 0
+            grupuri.append({
+                coloana: valori[g],
+                'total': int(total[g]),
+                'anormale': int(anormale[g]),
+                'low': int(low[g]),
+                'high': int(high[g]),
+                'medie': float(medie[g]) if are else None,
+                'min': float(minim[g]) if are else None,
+                'max': float(maxim[g]) if are else None,
+            })
+        return grupuri
+
+
+# =============================================================================
+# MAIN - BENCHMARK
+# =============================================================================
+
+def main():
+    import sys
+    from parsere_laboratoare import PARSERS
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    # Buletinele de test, parsate cu toate parserele
+    buletine = []
+    for pdf_path in sorted(Path(__file__).parent.glob("*.pdf")):
+        for key in PARSERS:
+            buletin = PARSERS[key].parse_pdf(str(pdf_path))
+            if buletin.analize:
+                buletine.append(buletin)
+    if not buletine:
+        print("Nu există PDF-uri de test")
+        return
+
+    tabel = ResultTable.from_buletine(buletine)
+    marcaj_parser = tabel.coloane['este_anormal'].copy()
+    tabel.calculeaza_anormal()
+
+    # Verificare: aceeași regulă ca _check_anormal (fără indicatorul "23" Synevo)
+    check = PARSERS['synevo']._check_anormal
+    asteptat = np.array([
+        {'LOW': -1, 'HIGH': 1, None: 0}[check(a.rezultat_numeric, a.interval_min, a.interval_max)[1]]
+        for b in buletine for a in b.analize
+    ], dtype=np.int8)
+    assert np.array_equal(tabel.coloane['directie'], asteptat)
+
+    print(f"\n{'='*80}")
+    print(f"RESULT TABLE - {len(buletine)} buletine, {len(tabel)} rezultate")
+    print(f"{'='*80}")
+    print(f"  Marcaj parser vs. recalculat: {int(np.count_nonzero(marcaj_parser != tabel.este_anormal))} diferențe"
+          " (indicatorul Synevo '23')")
+    print(f"\n  {'Categorie':<25} {'Total':>7} {'Anormale':>9} {'LOW':>5} {'HIGH':>5}")
+    for g in tabel.grupeaza('categorie'):
+        print(f"  {str(g['categorie']):<25} {g['total']:>7} {g['anormale']:>9} {g['low']:>5} {g['high']:>5}")
+
+    # Lot mare: buletinele repetate până la n rezultate
+    repetari = -(-n // len(tabel))
+    lot = [b for _ in range(repetari) for b in buletine]
+    analize = [a for b in lot for a in b.analize]
+
+    start = time.perf_counter()
+    mare = ResultTable.from_buletine(lot)
+    t_build = time.perf_counter() - start
+
+    # Python: o analiză pe rând, ca în parsere
+    start = time.perf_counter()
+    flags = [check(a.rezultat_numeric, a.interval_min, a.interval_max) for a in analize]
+    nr_py = sum(1 for anormal, _ in flags if anormal)
+    t_py = time.perf_counter() - start
+
+    start = time.perf_counter()
+    grupuri_py: Dict[str, List[int]] = {}
+    for a, (anormal, _) in zip(analize, flags):
+        g = grupuri_py.setdefault(a.categorie, [0, 0])
+        g[0] += 1
+        g[1] += anormal
+    t_py_grup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    mare.calculeaza_anormal()
+    nr_np = mare.numar_anormale()
+    t_np = time.perf_counter() - start
+
+    start = time.perf_counter()
+    grupuri_np = mare.grupeaza('categorie')
+    t_np_grup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hgb = mare.filtreaza(cod='HGB', este_anormal=True)
+    t_np_filtru = time.perf_counter() - start
+
+    # Unități canonice: per rând în Python vs. coloane întregi
+    from unitati_masura import converteste
+    start = time.perf_counter()
+    canonice_py = [converteste(a.rezultat_numeric, a.unitate_masura, a.nume_analiza, a.cod_analiza)[0]
+                   for a in analize]
+    t_py_um = time.perf_counter() - start
+
+    start = time.perf_counter()
+    mare.normalizeaza_unitati()
+    t_np_um = time.perf_counter() - start
+    assert np.allclose(np.array(canonice_py, dtype=np.float64), mare.valoare_canonica, equal_nan=True)
+
+    assert nr_py == nr_np
+    assert {g['categorie']: [g['total'], g['anormale']] for g in grupuri_np} == grupuri_py
+
+    print(f"\n  {len(mare):,} rezultate (construcție tabel: {t_build:.2f} s, o singură dată)")
+    print(f"  {'Operație':<32} {'Python ms':>10} {'NumPy ms':>10} {'x':>8}")
+    print(f"  {'Marcare anormal + număr':<32} {t_py * 1e3:>10.1f} {t_np * 1e3:>10.2f} {t_py / t_np:>8.0f}")
+    print(f"  {'Grupare pe categorie':<32} {t_py_grup * 1e3:>10.1f} {t_np_grup * 1e3:>10.2f} "
+          f"{t_py_grup / t_np_grup:>8.0f}")
+    print(f"  {'Normalizare unități':<32} {t_py_um * 1e3:>10.1f} {t_np_um * 1e3:>10.2f} {t_py_um / t_np_um:>8.0f}")
+    print(f"  {'Filtru cod=HGB & anormal':<32} {'':>10} {t_np_filtru * 1e3:>10.2f} {'':>8}  ({len(hgb):,} rânduri)")
+
+
+if __name__ == "__main__":
+    main()
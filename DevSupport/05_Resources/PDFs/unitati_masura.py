@@ -0,0 +1,344 @@
+"""
+Normalizarea Unităților de Măsură
+=================================
+Aceeași analiză vine de la laboratoare diferite în g/dL vs g/L, mg/dL vs
+mmol/L, x10^3/µl vs mii/µL vs /mm³. Modulul:
+
+- parsează unitatea brută (toate intrările din LaboratorParser.UNITATI și
+  variantele lor de scriere) într-o unitate canonică + familie + factor
+- ține factorii de conversie per analiză (unitatea canonică a analizei,
+  masa molară pentru mg/dL <-> mmol/L, valența pentru mEq/L)
+- convertește valori individuale (to_valyan_format) sau coloane întregi
+  cu NumPy, printr-o matrice precalculată [analiză x unitate]
+
+Valorile care nu pot fi convertite (unitate necunoscută, familie
+incompatibilă) rămân neschimbate, cu unitatea brută ca unitate canonică.
+
+Test: python unitati_masura.py
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from dictionar_analiti import rezolva_cod
+
+
+# =============================================================================
+# UNITĂȚI
+# =============================================================================
+
+@dataclass(frozen=True)
+class Unitate:
+    """O unitate recunoscută: valoare * factor = valoare în unitatea de bază a familiei"""
+    simbol: str    # forma canonică de afișare (ex: 'mg/dL')
+    familie: str   # 'masa', 'molar', 'echivalent', 'activitate', 'numar', ...
+    factor: float
+
+
+# simbol canonic -> (familie, factor față de baza familiei)
+# Baze: masa g/L, molar mmol/L, echivalent mEq/L, activitate U/L, numar /µL,
+# volum fL, masa_celula pg, procent %, viteza mm/h, timp s
+_UNITATI: Dict[str, Tuple[str, float]] = {
+    # Concentrație masică (bază g/L)
+    'g/L': ('masa', 1.0),
+    'g/dL': ('masa', 10.0),
+    'mg/mL': ('masa', 1.0),
+    'mg/dL': ('masa', 1e-2),
+    'mg/L': ('masa', 1e-3),
+    'µg/mL': ('masa', 1e-3),
+    'µg/dL': ('masa', 1e-5),
+    'µg/L': ('masa', 1e-6),
+    'ng/mL': ('masa', 1e-6),
+    'ng/dL': ('masa', 1e-8),
+    'ng/L': ('masa', 1e-9),
+    'pg/mL': ('masa', 1e-9),
+    # Concentrație molară (bază mmol/L)
+    'mol/L': ('molar', 1e3),
+    'mmol/L': ('molar', 1.0),
+    'µmol/L': ('molar', 1e-3),
+    'nmol/L': ('molar', 1e-6),
+    'pmol/L': ('molar', 1e-9),
+    'mEq/L': ('echivalent', 1.0),
+    # Activitate (bază U/L; IU = UI = U)
+    'U/L': ('activitate', 1.0),
+    'U/mL': ('activitate', 1e3),
+    'mU/L': ('activitate', 1e-3),
+    'mU/mL': ('activitate', 1.0),
+    'µU/mL': ('activitate', 1e-3),
+    # Numărătoare celulare (bază /µL; /mm³ = /µL, 10^9/L = 10^3/µL)
+    '/µL': ('numar', 1.0),
+    '10^3/µL': ('numar', 1e3),
+    '10^6/µL': ('numar', 1e6),
+    # Altele
+    'fL': ('volum', 1.0),
+    'pg': ('masa_celula', 1.0),
+    '%': ('procent', 1.0),
+    'mm/h': ('viteza', 1.0),
+    's': ('timp', 1.0),
+}
+
+# Variante de scriere -> simbol canonic (cheia: forma normalizată, vezi _cheie)
+_ALIASURI: Dict[str, str] = {
+    'mg%': 'mg/dL',
+    'umol/l': 'µmol/L',
+    'iu/l': 'U/L', 'ui/l': 'U/L',
+    'iu/ml': 'U/mL', 'ui/ml': 'U/mL',
+    'miu/l': 'mU/L', 'mui/l': 'mU/L',
+    'miu/ml': 'mU/mL', 'mui/ml': 'mU/mL',
+    'µiu/ml': 'µU/mL', 'µui/ml': 'µU/mL', 'uiu/ml': 'µU/mL',
+    '/mm³': '/µL', '/mm3': '/µL', '/ul': '/µL',
+    'mii/µl': '10^3/µL', '10^3/µl': '10^3/µL', 'x10^3/µl': '10^3/µL', '10^9/l': '10^3/µL',
+    'x10^9/l': '10^3/µL',
+    'mil./µl': '10^6/µL', 'mil/µl': '10^6/µL', '10^6/µl': '10^6/µL', 'x10^6/µl': '10^6/µL',
+    '10^12/l': '10^6/µL', 'x10^12/l': '10^6/µL',
+    'µm³': 'fL', 'µm^3': 'fL', 'µm3': 'fL', 'fl': 'fL',
+    'sec': 's',
+    'mm/1h': 'mm/h', 'mm/ora': 'mm/h',
+}
+
+
+def _cheie(um: str) -> str:
+    """Forma de căutare: fără spații, µ unic, '*' -> 'x', litere mici"""
+    um = um.strip().replace(' ', '').replace('μ', 'µ').replace('*', 'x')
+    return um.lower()
+
+
+_INDEX: Dict[str, str] = {_cheie(simbol): simbol for simbol in _UNITATI}
+_INDEX.update(_ALIASURI)
+
+
+@lru_cache(maxsize=None)
+def parse_unitate(um: Optional[str]) -> Optional[Unitate]:
+    """Unitatea canonică pentru un text brut, sau None dacă nu e recunoscută"""
+    if not um:
+        return None
+    simbol = _INDEX.get(_cheie(um))
+    if simbol is None:
+        return None
+    familie, factor = _UNITATI[simbol]
+    return Unitate(simbol, familie, factor)
+
+
+# =============================================================================
+# ANALIZE - UNITATEA CANONICĂ ȘI FACTORII SPECIFICI
+# =============================================================================
+
+@dataclass(frozen=True)
+class AnalitUnitate:
+    """Unitatea în care se raportează o analiză + date pentru conversii între familii"""
+    unitate: str                        # simbol canonic (cheie în _UNITATI)
+    masa_molara: Optional[float] = None  # g/mol, pentru masa <-> molar
+    valenta: int = 1                     # pentru molar <-> mEq/L
+
+
+# cod analiză (codurile canonice din analiti.json) -> unitatea canonică
+ANALITI: Dict[str, AnalitUnitate] = {
+    # Hemoleucogramă
+    'WBC': AnalitUnitate('10^3/µL'), 'RBC': AnalitUnitate('10^6/µL'), 'PLT': AnalitUnitate('10^3/µL'),
+    'NEUT': AnalitUnitate('10^3/µL'), 'LYM': AnalitUnitate('10^3/µL'), 'MON': AnalitUnitate('10^3/µL'),
+    'EOS': AnalitUnitate('10^3/µL'), 'BAS': AnalitUnitate('10^3/µL'),
+    'HGB': AnalitUnitate('g/dL'), 'MCHC': AnalitUnitate('g/dL'), 'MCH': AnalitUnitate('pg'),
+    'MCV': AnalitUnitate('fL'), 'MPV': AnalitUnitate('fL'), 'RDW-SD': AnalitUnitate('fL'),
+    'HCT': AnalitUnitate('%'), 'PCT': AnalitUnitate('%'), 'VSH': AnalitUnitate('mm/h'),
+    # Biochimie
+    'GLU': AnalitUnitate('mg/dL', 180.16), 'CHOL': AnalitUnitate('mg/dL', 386.65),
+    'HDL': AnalitUnitate('mg/dL', 386.65), 'LDL': AnalitUnitate('mg/dL', 386.65),
+    'TG': AnalitUnitate('mg/dL', 885.7), 'CREA': AnalitUnitate('mg/dL', 113.12),
+    'UREA': AnalitUnitate('mg/dL', 60.06), 'UA': AnalitUnitate('mg/dL', 168.11),
+    'BILT': AnalitUnitate('mg/dL', 584.66), 'BILD': AnalitUnitate('mg/dL', 584.66),
+    'CA': AnalitUnitate('mg/dL', 40.08, 2), 'MG': AnalitUnitate('mg/dL', 24.305, 2),
+    'FE': AnalitUnitate('µg/dL', 55.845), 'CRP': AnalitUnitate('mg/L'),
+    'NA': AnalitUnitate('mmol/L', 22.99), 'K': AnalitUnitate('mmol/L', 39.098),
+    'CL': AnalitUnitate('mmol/L', 35.45),
+    'ALT': AnalitUnitate('U/L'), 'AST': AnalitUnitate('U/L'), 'GGT': AnalitUnitate('U/L'),
+    # Hormoni / imunologie
+    'TSH': AnalitUnitate('mU/L'), 'FT4': AnalitUnitate('pmol/L', 776.87),
+    'ATPO': AnalitUnitate('U/mL'),
+}
+
+
+@lru_cache(maxsize=4096)
+def identifica_analit(nume: Optional[str], cod: Optional[str] = None) -> Optional[str]:
+    """Codul analizei din ANALITI (prin dicționarul canonic al analizelor) sau None"""
+    cod_analit = rezolva_cod(nume, "", cod)
+    return cod_analit if cod_analit in ANALITI else None
+
+
+# =============================================================================
+# FACTORI DE CONVERSIE
+# =============================================================================
+
+@lru_cache(maxsize=None)
+def factor_conversie(um: Optional[str], analit: Optional[str] = None) -> Tuple[float, str]:
+    """
+    (factor, unitate canonică): valoare_canonică = valoare * factor.
+    Fără conversie posibilă: (1.0, unitatea brută).
+    """
+    sursa = parse_unitate(um)
+    if sursa is None:
+        return 1.0, (um or "").strip()
+
+    tinta_analit = ANALITI.get(analit) if analit else None
+    tinta = parse_unitate(tinta_analit.unitate) if tinta_analit else None
+    if tinta is None:
+        # Analiză necunoscută: doar forma canonică a aceleiași unități
+        return 1.0, sursa.simbol
+
+    if sursa.familie == tinta.familie:
+        return sursa.factor / tinta.factor, tinta.simbol
+
+    # Între familii: prin mmol/L (masă molară / valență)
+    in_mmol = _spre_mmol(sursa, tinta_analit)
+    din_mmol = _spre_mmol(tinta, tinta_analit)
+    if in_mmol is None or din_mmol is None:
+        return 1.0, sursa.simbol
+    return in_mmol / din_mmol, tinta.simbol
+
+
+def _spre_mmol(unitate: Unitate, analit: AnalitUnitate) -> Optional[float]:
+    """Factorul unitate -> mmol/L pentru o analiză, dacă există"""
+    if unitate.familie == 'molar':
+        return unitate.factor
+    if unitate.familie == 'echivalent':
+        return unitate.factor / analit.valenta
+    if unitate.familie == 'masa' and analit.masa_molara:
+        # g/L -> mol/L = / masa molară; -> mmol/L = * 1000
+        return unitate.factor / analit.masa_molara * 1e3
+    return None
+
+
+def converteste(valoare: Optional[float], um: Optional[str], nume: Optional[str] = None,
+                cod: Optional[str] = None) -> Tuple[Optional[float], str]:
+    """(valoare canonică, unitate canonică) pentru un singur rezultat"""
+    factor, canonica = factor_conversie(um, identifica_analit(nume, cod))
+    if valoare is None:
+        return None, canonica
+    return valoare * factor, canonica
+
+
+def campuri_canonice(analiza) -> Dict[str, Optional[object]]:
+    """
+    Câmpurile canonice ale formatului de import ValyanClinic, pentru orice
+    model AnalizaResult (parsere_laboratoare, v2, universal).
+    """
+    factor, canonica = factor_conversie(
+        analiza.unitate_masura, identifica_analit(analiza.nume_analiza, analiza.cod_analiza))
+
+    def canonic(valoare: Optional[float]) -> Optional[float]:
+        return None if valoare is None else valoare * factor
+
+    return {
+        'ValoareNumericaCanonic': canonic(analiza.rezultat_numeric),
+        'UnitatiMasuraCanonic': canonica,
+        'ValoareNormalaMinCanonic': canonic(analiza.interval_min),
+        'ValoareNormalaMaxCanonic': canonic(analiza.interval_max),
+    }
+
+
+# =============================================================================
+# CONVERSIE PE COLOANE (NumPy)
+# =============================================================================
+
+def _import_numpy():
+    import numpy as np  # încărcat doar pentru conversia pe coloane
+    return np
+
+
+def matrice_conversie(unitati: Sequence[Optional[str]],
+                      analiti: Sequence[Optional[str]]) -> Tuple['np.ndarray', 'np.ndarray', List[str]]:
+    """
+    Tabelele precalculate pentru vocabularele date:
+    factori[a, u] și canonic[a, u] (index în lista de unități canonice).
+    Ultimul rând / ultima coloană corespund codului -1 (analiză / unitate lipsă).
+    """
+    np = _import_numpy()
+    unitati = list(unitati) + [None]
+    analiti = list(analiti) + [None]
+
+    factori = np.ones((len(analiti), len(unitati)), dtype=np.float64)
+    canonic = np.empty((len(analiti), len(unitati)), dtype=np.int32)
+    simboluri: List[str] = []
+    index: Dict[str, int] = {}
+    for a, analit in enumerate(analiti):
+        for u, um in enumerate(unitati):
+            factor, simbol = factor_conversie(um, analit)
+            factori[a, u] = factor
+            if simbol not in index:
+                index[simbol] = len(simboluri)
+                simboluri.append(simbol)
+            canonic[a, u] = index[simbol]
+    return factori, canonic, simboluri
+
+
+def converteste_coloane(coloane: Sequence['np.ndarray'], cod_unitate: 'np.ndarray', cod_analit: 'np.ndarray',
+                        unitati: Sequence[Optional[str]], analiti: Sequence[Optional[str]]
+                        ) -> Tuple[List['np.ndarray'], 'np.ndarray', List[str]]:
+    """
+    Convertește dintr-o dată coloanele de valori (ex: valoare, min, max).
+    cod_unitate / cod_analit: coduri int în vocabularele unitati / analiti (-1 = lipsă).
+    Returnează (coloanele convertite, codurile unității canonice, vocabularul canonic).
+    """
+    factori, canonic, simboluri = matrice_conversie(unitati, analiti)
+    factor = factori[cod_analit, cod_unitate]
+    return [coloana * factor for coloana in coloane], canonic[cod_analit, cod_unitate], simboluri
+
+
+# =============================================================================
+# MAIN - TEST
+# =============================================================================
+
+def main():
+    from parsere_laboratoare import LaboratorParser
+
+    print(f"\n{'='*70}")
+    print("UNITĂȚI DIN LaboratorParser.UNITATI")
+    print(f"{'='*70}")
+    necunoscute = []
+    for um in LaboratorParser.UNITATI:
+        unitate = parse_unitate(um)
+        if unitate is None:
+            necunoscute.append(um)
+            continue
+        print(f"  {um:<12} -> {unitate.simbol:<10} {unitate.familie:<12} x{unitate.factor:g}")
+    assert not necunoscute, f"Unități nerecunoscute: {necunoscute}"
+
+    print(f"\n{'='*70}")
+    print("CONVERSII PER ANALIZĂ")
+    print(f"{'='*70}")
+    exemple = [
+        (14.3, 'g/dl', 'Hemoglobina (HGB)', 'HGB', 14.3),
+        (143, 'g/L', 'Hemoglobina', None, 14.3),
+        (5.5, 'mmol/L', 'Glucoza serica (glicemie)', None, 99.088),
+        (250000, '/mm³', 'Trombocite (PLT)', 'PLT', 250.0),
+        (250, 'x10^9/L', 'Trombocite', None, 250.0),
+        (4.5, 'x10^12/L', 'Hematii (RBC)', 'RBC', 4.5),
+        (4.5, 'mil./µL', 'Numar de eritrocite (RBC)', 'RBC', 4.5),
+        (88.4, 'µmol/L', 'Creatinina', None, 0.99998),
+        (5.0, 'mEq/L', 'Calciu total', None, 10.02),
+        (2.1, 'µUI/mL', 'TSH (hormon de stimulare tiroidiana)', None, 2.1),
+        (90, 'µm^3', 'Volum mediu eritrocitar (MCV)', 'MCV', 90),
+        (1.2, 'mg/dL', 'Proteina C reactiva (CRP)', 'CRP', 12.0),
+    ]
+    for valoare, um, nume, cod, asteptat in exemple:
+        rezultat, canonica = converteste(valoare, um, nume, cod)
+        ok = abs(rezultat - asteptat) < 1e-3 * max(1.0, abs(asteptat))
+        print(f"  {'✓' if ok else '✗'} {valoare:>9g} {um:<10} {nume[:30]:<30} -> {rezultat:>10.4g} {canonica}")
+        assert ok
+
+    # Vectorizat: aceleași exemple ca o coloană, de 100.000 de ori
+    np = _import_numpy()
+    unitati = sorted({um for _, um, _, _, _ in exemple})
+    analiti = sorted({identifica_analit(nume, cod) for _, _, nume, cod, _ in exemple} - {None})
+    cod_u = np.array([unitati.index(um) for _, um, _, _, _ in exemple] * 100_000, dtype=np.int32)
+    cod_a = np.array([analiti.index(identifica_analit(nume, cod)) for _, _, nume, cod, _ in exemple] * 100_000,
+                     dtype=np.int32)
+    valori = np.array([v for v, _, _, _, _ in exemple] * 100_000, dtype=np.float64)
+    (convertite,), _, _ = converteste_coloane([valori], cod_u, cod_a, unitati, analiti)
+    asteptate = np.array([a for _, _, _, _, a in exemple] * 100_000)
+    assert np.allclose(convertite, asteptate, rtol=1e-3)
+    print(f"\n  ✓ Conversie vectorizată: {len(convertite):,} valori")
+
+
+if __name__ == "__main__":
+    main()